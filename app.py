@@ -3,14 +3,12 @@ Industry Classification UI  —  streamlit run ui.py
 """
 
 import streamlit as st
-import json, os, io
-from prompt import IndustryClassifier
-import pandas as pd
+import json, os
+from theme import APP_CSS, CHART_COLORS, CHART_LAYOUT, GRID_AXIS
 from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+
+# Project modules are imported inside the cached factories and handlers that use them —
+# prompt alone pulls in the OpenAI SDK, which a first page load without a key never needs.
 
 st.set_page_config(
     page_title="Industry Classifier",
@@ -19,336 +17,295 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-# ── Dark Design System ──────────────────────────────────────────────────────
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=DM+Sans:ital,opsz,wght@0,9..40,300;0,9..40,400;0,9..40,500;0,9..40,600;1,9..40,300&family=DM+Mono:wght@400;500&display=swap');
-
-html, body, [class*="css"] { font-family: 'DM Sans', sans-serif; color-scheme: dark; }
-#MainMenu, footer, header { visibility: hidden; }
-
-.stApp { background: #0d0f18 !important; }
-.block-container { padding: 2rem 2.5rem 3rem !important; max-width: 1400px !important; }
-
-[data-testid="stSidebar"] {
-    background: #080a10 !important;
-    border-right: 1px solid #1a1e2e !important;
-}
-[data-testid="stSidebar"] * { color: #8b95b0 !important; }
-[data-testid="stSidebar"] h3 { color: #e2e8f8 !important; font-size: 0.95rem !important; font-weight: 600 !important; }
-[data-testid="stSidebar"] h5 { color: #5a647a !important; font-size: 0.72rem !important; font-weight: 600 !important; text-transform: uppercase !important; letter-spacing: 0.8px !important; }
-[data-testid="stSidebar"] .stTextInput input,
-[data-testid="stSidebar"] .stSelectbox > div > div {
-    background: #131625 !important;
-    border: 1px solid #232840 !important;
-    color: #c8d4f0 !important;
-    border-radius: 8px !important;
-    font-size: 0.84rem !important;
-}
-[data-testid="stSidebar"] label {
-    font-size: 0.72rem !important; font-weight: 600 !important;
-    text-transform: uppercase !important; letter-spacing: 0.7px !important;
-    color: #4a5470 !important;
-}
-[data-testid="stSidebar"] .stButton > button {
-    width: 100% !important; background: #2563eb !important; color: #fff !important;
-    border: none !important; border-radius: 8px !important;
-    font-weight: 600 !important; font-size: 0.84rem !important;
-    box-shadow: 0 4px 14px rgba(37,99,235,0.35) !important;
-    transition: all 0.2s !important;
-}
-[data-testid="stSidebar"] .stButton > button:hover { background: #1d4ed8 !important; }
-[data-testid="stSidebar"] hr { border-color: #1a1e2e !important; margin: 0.8rem 0 !important; }
-[data-testid="stSidebar"] [data-testid="stFileUploader"] {
-    background: #131625 !important; border: 1px dashed #2a3050 !important;
-    border-radius: 8px !important; padding: 0.5rem !important;
-}
-
-.page-header { padding: 0.4rem 0 1.5rem; border-bottom: 1px solid #1a1e2e; margin-bottom: 1.5rem; }
-.page-header h1 { font-size: 1.5rem; font-weight: 600; color: #e2e8f8; margin: 0 0 0.2rem; letter-spacing: -0.3px; }
-.page-header p  { font-size: 0.84rem; color: #4a5470; margin: 0; }
-
-.section-title {
-    font-size: 0.7rem; font-weight: 600; text-transform: uppercase;
-    letter-spacing: 0.9px; color: #3d4666; margin: 1.2rem 0 0.6rem;
-}
-
-.stat-card {
-    background: #131625; border: 1px solid #1e2438; border-radius: 10px;
-    padding: 1rem 1.2rem;
-    box-shadow: 0 2px 12px rgba(0,0,0,0.35), inset 0 1px 0 rgba(255,255,255,0.03);
-}
-.stat-card .label { font-size: 0.68rem; font-weight: 600; text-transform: uppercase; letter-spacing: 0.8px; color: #3d4666; margin-bottom: 0.35rem; }
-.stat-card .value { font-size: 1.35rem; font-weight: 600; color: #c8d4f0; line-height: 1.1; }
-.stat-card .value.blue  { color: #60a5fa; }
-.stat-card .value.green { color: #4ade80; }
-.stat-card .value.amber { color: #fbbf24; }
-.stat-card .value.red   { color: #f87171; }
-
-.result-panel {
-    background: #131625; border: 1px solid #1e2438; border-radius: 10px;
-    padding: 1.1rem 1.3rem;
-    box-shadow: 0 2px 12px rgba(0,0,0,0.3), inset 0 1px 0 rgba(255,255,255,0.03);
-}
-
-.badge { display: inline-block; padding: 0.2rem 0.65rem; border-radius: 999px; font-size: 0.72rem; font-weight: 600; }
-.badge-blue  { background: rgba(37,99,235,0.2);  color: #93c5fd; border: 1px solid rgba(37,99,235,0.3); }
-.badge-green { background: rgba(22,163,74,0.18); color: #86efac; border: 1px solid rgba(22,163,74,0.3); }
-.badge-amber { background: rgba(217,119,6,0.18); color: #fcd34d; border: 1px solid rgba(217,119,6,0.3); }
-.badge-red   { background: rgba(220,38,38,0.18); color: #fca5a5; border: 1px solid rgba(220,38,38,0.3); }
-.badge-slate { background: rgba(71,85,105,0.25); color: #94a3b8;  border: 1px solid rgba(71,85,105,0.35); }
-
-.ind-row { display:flex; align-items:center; gap:0.8rem; padding:0.7rem 0; border-bottom:1px solid #1a1e2e; }
-.ind-row:last-child { border-bottom:none; }
-.ind-name { font-size:0.85rem; font-weight:500; color:#c8d4f0; flex:1; }
-.ind-sub  { font-size:0.75rem; color:#3d4666; font-weight:400; }
-.ind-pct  { font-size:0.85rem; font-weight:600; color:#60a5fa; min-width:3rem; text-align:right; }
-.pct-bar-bg   { flex:2; background:#1a1e2e; border-radius:4px; height:4px; }
-.pct-bar-fill { background: linear-gradient(90deg,#2563eb,#60a5fa); border-radius:4px; height:4px; }
-
-.reasoning-box {
-    background: rgba(37,99,235,0.07); border-left: 3px solid #2563eb;
-    border-radius: 0 8px 8px 0; padding: 0.85rem 1rem;
-    font-size: 0.83rem; color: #8b95b0; line-height: 1.7;
-}
-
-.chip-list { display:flex; flex-wrap:wrap; gap:0.3rem; margin-top:0.3rem; }
-.chip {
-    background: #0d0f18; color: #4a5470; border: 1px solid #1e2438;
-    border-radius: 5px; padding: 0.15rem 0.45rem;
-    font-size: 0.7rem; font-family: 'DM Mono', monospace;
-}
-
-.empty-state { text-align:center; padding:3.5rem 1rem; color:#2a3050; }
-.empty-state .icon { font-size:2.2rem; margin-bottom:0.7rem; filter: grayscale(0.4) opacity(0.6); }
-.empty-state p { font-size:0.85rem; color:#2a3050; margin:0; }
-
-[data-testid="stTabs"] [data-baseweb="tab-list"] {
-    background: transparent !important; border-bottom: 1px solid #1a1e2e !important; gap: 0.1rem;
-}
-[data-testid="stTabs"] [data-baseweb="tab"] {
-    font-size: 0.82rem !important; font-weight: 500 !important;
-    padding: 0.55rem 1.1rem !important; color: #3d4666 !important;
-    background: transparent !important; border: none !important;
-    border-radius: 6px 6px 0 0 !important; transition: color 0.15s !important;
-}
-[data-testid="stTabs"] [data-baseweb="tab"]:hover { color: #8b95b0 !important; }
-[data-testid="stTabs"] [aria-selected="true"] { color: #60a5fa !important; border-bottom: 2px solid #2563eb !important; }
-
-.stTextArea > div { border-radius: 8px !important; }
-.stTextArea textarea {
-    font-family: 'DM Mono', monospace !important; font-size: 0.8rem !important;
-    line-height: 1.65 !important; border-radius: 8px !important;
-    border: 1px solid #1e2438 !important; background: #080a10 !important;
-    color: #7b92c4 !important; caret-color: #60a5fa !important;
-    padding: 0.9rem 1rem !important; box-shadow: inset 0 2px 8px rgba(0,0,0,0.4) !important;
-}
-.stTextArea textarea::placeholder { color: #232840 !important; }
-.stTextArea textarea:focus {
-    border-color: #2563eb !important;
-    box-shadow: inset 0 2px 8px rgba(0,0,0,0.4), 0 0 0 3px rgba(37,99,235,0.15) !important;
-    outline: none !important;
-}
-
-.stButton > button { border-radius: 8px !important; font-weight: 500 !important; font-size: 0.83rem !important; transition: all 0.2s !important; }
-[data-testid="stBaseButton-primary"] {
-    background: #2563eb !important; border: none !important; color: #fff !important;
-    box-shadow: 0 4px 14px rgba(37,99,235,0.35) !important;
-}
-[data-testid="stBaseButton-primary"]:hover { background: #1d4ed8 !important; }
-[data-testid="stBaseButton-secondary"] {
-    background: #131625 !important; border: 1px solid #1e2438 !important; color: #4a5470 !important;
-}
-[data-testid="stBaseButton-secondary"]:hover { background: #1a1e2e !important; color: #8b95b0 !important; }
-
-[data-testid="stSlider"] [data-baseweb="slider"] [role="slider"] { background: #2563eb !important; }
-
-[data-testid="stProgress"] > div > div { background: linear-gradient(90deg,#2563eb,#60a5fa) !important; border-radius: 4px !important; }
-[data-testid="stProgress"] > div { background: #1a1e2e !important; border-radius: 4px !important; }
-
-[data-testid="stAlert"] { border-radius: 8px !important; font-size: 0.83rem !important; }
-div[data-testid="stAlert"][class*="success"] { background: rgba(22,163,74,0.1) !important; border-color: rgba(22,163,74,0.3) !important; color: #86efac !important; }
-div[data-testid="stAlert"][class*="error"]   { background: rgba(220,38,38,0.1) !important;  border-color: rgba(220,38,38,0.3) !important;  color: #fca5a5 !important; }
-div[data-testid="stAlert"][class*="warning"] { background: rgba(217,119,6,0.1) !important;  border-color: rgba(217,119,6,0.3) !important;  color: #fcd34d !important; }
-div[data-testid="stAlert"][class*="info"]    { background: rgba(37,99,235,0.1) !important;  border-color: rgba(37,99,235,0.3) !important;  color: #93c5fd !important; }
-
-[data-testid="stExpander"] {
-    background: #131625 !important; border: 1px solid #1e2438 !important;
-    border-radius: 8px !important; box-shadow: 0 2px 8px rgba(0,0,0,0.2) !important;
-}
-[data-testid="stExpander"] summary { font-size: 0.83rem !important; font-weight: 500 !important; color: #5a647a !important; }
-[data-testid="stExpander"] summary:hover { color: #8b95b0 !important; }
-
-[data-testid="stDataFrame"] {
-    border-radius: 10px !important; overflow: hidden !important;
-    border: 1px solid #1e2438 !important; background: #0d0f18 !important;
-}
-[data-testid="stDataFrame"] *, [data-testid="stDataFrame"] div,
-[data-testid="stDataFrame"] span, [data-testid="stDataFrame"] p,
-[data-testid="stDataFrame"] td, [data-testid="stDataFrame"] th,
-[data-testid="stDataFrame"] [role="cell"], [data-testid="stDataFrame"] [role="columnheader"] {
-    color: #c9d8f0 !important; background: transparent !important;
-}
-[data-testid="stDataFrame"] thead *, [data-testid="stDataFrame"] th,
-[data-testid="stDataFrame"] [role="columnheader"] {
-    background: #131625 !important; color: #6b7a99 !important;
-    font-size: 0.72rem !important; text-transform: uppercase !important;
-    letter-spacing: 0.6px !important; font-weight: 600 !important;
-}
-[data-testid="stDataFrame"] table, [data-testid="stDataFrame"] tbody,
-[data-testid="stDataFrame"] tr { background: #0d0f18 !important; }
-[data-testid="stDataFrame"] td {
-    background: #0d0f18 !important; color: #c9d8f0 !important;
-    border-bottom: 1px solid #1a1e2e !important;
-    font-size: 0.83rem !important; padding: 0.6rem 0.8rem !important;
-}
-[data-testid="stDataFrame"] tr:hover, [data-testid="stDataFrame"] tr:hover td,
-[data-testid="stDataFrame"] tr:hover * { background: #161b27 !important; color: #e8edf8 !important; }
-
-[data-testid="stCaptionContainer"] p { color: #2a3050 !important; font-size: 0.78rem !important; }
-hr { border-color: #1a1e2e !important; }
-::-webkit-scrollbar { width: 6px; height: 6px; }
-::-webkit-scrollbar-track { background: #0d0f18; }
-::-webkit-scrollbar-thumb { background: #1e2438; border-radius: 3px; }
-::-webkit-scrollbar-thumb:hover { background: #2a3050; }
-</style>
-""", unsafe_allow_html=True)
+# ── Dark Design System (built once per process in theme.py) ─────────────────
+st.markdown(APP_CSS, unsafe_allow_html=True)
 
 
-# ── Excel export helper ──────────────────────────────────────────────────────
-def results_to_xlsx(results: list) -> bytes:
-    """
-    Flatten classification results into a styled Excel file.
-    Columns: orgName, productCount, operationType, primaryIndustry,
-             isMultiIndustry, industry_1, subcategory_1,
-             industry_2, subcategory_2, industry_3, subcategory_3
-    Returns raw bytes ready for st.download_button.
-    """
-    COLUMNS = [
-        "orgName", "productCount", "operationType", "primaryIndustry",
-        "isMultiIndustry",
-        "industry_1", "subcategory_1",
-        "industry_2", "subcategory_2",
-        "industry_3", "subcategory_3",
-    ]
-
-    # ── styles ──
-    HEADER_FONT    = Font(name="Arial", bold=True, color="FFFFFF", size=10)
-    HEADER_FILL    = PatternFill("solid", start_color="1E3A5F")   # dark navy
-    HEADER_ALIGN   = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-    DATA_FONT      = Font(name="Arial", size=10)
-    ALT_FILL       = PatternFill("solid", start_color="F0F4FA")   # very light blue-grey
-    CENTER_ALIGN   = Alignment(horizontal="center", vertical="center")
-    LEFT_ALIGN     = Alignment(horizontal="left",   vertical="center")
-
-    THIN           = Side(style="thin", color="D0D8E8")
-    BORDER         = Border(left=THIN, right=THIN, top=THIN, bottom=THIN)
-
-    TRUE_FILL      = PatternFill("solid", start_color="D1FAE5")   # green tint  for TRUE
-    FALSE_FILL     = PatternFill("solid", start_color="FEE2E2")   # red tint    for FALSE
-    TRUE_FONT      = Font(name="Arial", size=10, color="065F46",  bold=True)
-    FALSE_FONT     = Font(name="Arial", size=10, color="991B1B",  bold=True)
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Classification Results"
-
-    # ── header row ──
-    ws.append(COLUMNS)
-    for col_idx, _ in enumerate(COLUMNS, start=1):
-        cell = ws.cell(row=1, column=col_idx)
-        cell.font      = HEADER_FONT
-        cell.fill      = HEADER_FILL
-        cell.alignment = HEADER_ALIGN
-        cell.border    = BORDER
-    ws.row_dimensions[1].height = 30
-
-    # ── data rows ──
-    for row_idx, r in enumerate(results, start=2):
-        clf        = r.get("classification", {})
-        industries = clf.get("industries", [])
-        is_multi   = clf.get("isMultiIndustry", False)
-
-        # pull up to 3 industries
-        def _ind(n):
-            if n < len(industries):
-                return industries[n].get("industry", ""), industries[n].get("subCategory", "")
-            return "", ""
-
-        i1_name, i1_sub = _ind(0)
-        i2_name, i2_sub = _ind(1)
-        i3_name, i3_sub = _ind(2)
-
-        row_data = [
-            r.get("orgName", ""),
-            r.get("productCount", ""),
-            r.get("operationType", ""),
-            r.get("primaryIndustry", ""),
-            "TRUE" if is_multi else "FALSE",
-            i1_name, i1_sub,
-            i2_name, i2_sub,
-            i3_name, i3_sub,
-        ]
-        ws.append(row_data)
-
-        # alternating row fill
-        use_alt = (row_idx % 2 == 0)
-
-        for col_idx, value in enumerate(row_data, start=1):
-            cell        = ws.cell(row=row_idx, column=col_idx)
-            cell.font   = DATA_FONT
-            cell.border = BORDER
-            col_name    = COLUMNS[col_idx - 1]
-
-            # isMultiIndustry — colored TRUE/FALSE
-            if col_name == "isMultiIndustry":
-                if value == "TRUE":
-                    cell.fill = TRUE_FILL
-                    cell.font = TRUE_FONT
-                else:
-                    cell.fill = FALSE_FILL
-                    cell.font = FALSE_FONT
-                cell.alignment = CENTER_ALIGN
+# ── Export helpers ───────────────────────────────────────────────────────────
+EXPORT_FORMATS = {"JSON": "json", "Excel": "xlsx", "CSV": "csv", "Parquet": "parquet"}
 
-            # numeric columns — centre aligned
-            elif col_name == "productCount":
-                cell.alignment = CENTER_ALIGN
-                if use_alt:
-                    cell.fill = ALT_FILL
 
-            # text columns — left aligned
-            else:
-                cell.alignment = LEFT_ALIGN
-                if use_alt:
-                    cell.fill = ALT_FILL
+@st.cache_data(max_entries=8, show_spinner=False)
+def build_export(digest: str, fmt: str, _results: list) -> bytes:
+    """Rendered export, cached by result-set hash — _results is not hashed by Streamlit."""
+    from exporters import export_bytes
+    return export_bytes(_results, fmt)
+
+
+# ── Industry breakdown rows ──────────────────────────────────────────────────
+def industry_rows_html(industries: list) -> str:
+    """
+    Render industry entries as the breakdown rows used in the single-org panel.
+    Shared by the final result view and the live streaming view.
+    """
+    rows_html = ""
+    for ind in industries:
+        pct   = ind.get("percentage", 0)
+        chips = "".join(f'<span class="chip">{p}</span>' for p in ind.get("sampleProducts", []))
+        rows_html += f"""
+<div class="ind-row">
+  <div style="flex:3;min-width:0;">
+    <div class="ind-name">{ind.get('industry','—')} <span class="ind-sub">/ {ind.get('subCategory','—')}</span></div>
+    <div class="chip-list">{chips}</div>
+  </div>
+  <div style="flex:2;padding:0 0.7rem;">
+    <div class="pct-bar-bg"><div class="pct-bar-fill" style="width:{pct}%;"></div></div>
+  </div>
+  <div class="ind-pct">{pct}%</div>
+</div>"""
+    return rows_html
 
-        ws.row_dimensions[row_idx].height = 18
 
-    # ── column widths ──
-    col_widths = {
-        "orgName": 28, "productCount": 13, "operationType": 22,
-        "primaryIndustry": 24, "isMultiIndustry": 14,
-        "industry_1": 24, "subcategory_1": 22,
-        "industry_2": 24, "subcategory_2": 22,
-        "industry_3": 24, "subcategory_3": 22,
-    }
-    for col_idx, col_name in enumerate(COLUMNS, start=1):
-        ws.column_dimensions[ws.cell(row=1, column=col_idx).column_letter].width = col_widths.get(col_name, 18)
+# ── Shared classifiers ───────────────────────────────────────────────────────
+@st.cache_resource(max_entries=16)
+def get_classifier(api_key: str, model: str) -> "IndustryClassifier":
+    """
+    One classifier per (API key, model) for the whole server process.
+    Every session and batch worker reuses it and its warm pooled connections.
+    """
+    from prompt import IndustryClassifier
+    return IndustryClassifier(api_key=api_key, model=model, local_router=get_local_router())
+
+
+@st.cache_resource
+def get_local_router():
+    """LocalRouter over the trained product model at LOCAL_MODEL (None if there is none)."""
+    path = os.getenv("LOCAL_MODEL", "product_model.npz")
+    if not os.path.exists(path):
+        return None
+    from local_model import LocalRouter, ProductModel   # NumPy / SciPy only when a model exists
+    return LocalRouter(ProductModel.load(path))
+
+
+# ── Shared dataset store ─────────────────────────────────────────────────────
+@st.cache_resource
+def get_dataset_store() -> "DatasetStore":
+    """Uploads are parsed once per content hash into an on-disk store shared by all sessions."""
+    from dataset_store import DatasetStore
+    return DatasetStore(os.getenv("DATASET_CACHE_DIR", ".dataset_cache"))
+
+
+# ── Analytics payload limits ─────────────────────────────────────────────────
+MAX_CHART_CATEGORIES  = 15         # bars / slices per chart; the tail is folded into "Other"
+DETAIL_PAGE_SIZE      = 8          # orgs per page in the industry detail lists
+ANALYTICS_HTML_BUDGET = 150_000    # hard cap on detail-list HTML bytes sent per rerun
+RESULTS_PAGE_SIZE     = 50         # rows per page in the Batch results table
+
+
+class HtmlBudget:
+    """Tracks HTML bytes emitted in one rerun and refuses blocks past the cap."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used  = 0
+
+    def take(self, html: str) -> bool:
+        size = len(html.encode("utf-8"))
+        if self.used + size > self.limit:
+            return False
+        self.used += size
+        return True
+
+
+def top_n_with_other(counts: list, n: int) -> list:
+    """Keep the n largest (label, count) pairs and fold the rest into one "Other" entry."""
+    if len(counts) <= n:
+        return counts
+    head = counts[:n - 1]
+    return head + [("Other", sum(c for _, c in counts[n - 1:]))]
+
+
+def org_detail_rows_html(details: list) -> str:
+    rows = []
+    for o in details:
+        conf_val = o["confidenceScore"] or 0
+        conf_col = "#4ade80" if conf_val >= 0.85 else ("#fbbf24" if conf_val >= 0.65 else "#f87171")
+        rows.append(
+            f'<div style="display:flex;justify-content:space-between;align-items:center;'
+            f'padding:0.5rem 0;border-bottom:1px solid #1a1e2e;font-size:0.83rem;">'
+            f'<span style="color:#8b95b0;font-weight:500;">{o["orgName"] or "—"}</span>'
+            f'<span style="display:flex;gap:0.6rem;align-items:center;">'
+            f'<span class="badge badge-slate">{o["operationType"] or "—"}</span>'
+            f'<span style="font-size:0.76rem;font-weight:600;color:{conf_col};">{conf_val:.0%}</span>'
+            f'</span></div>'
+        )
+    return "".join(rows)
 
-    # ── freeze header ──
-    ws.freeze_panes = "A2"
 
-    # ── write to bytes ──
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    return buf.getvalue()
+# ── Analytics charts ─────────────────────────────────────────────────────────
+@st.cache_data(max_entries=32, show_spinner=False)
+def analytics_figures(ind_count: tuple, op_count: tuple, hist: tuple, bins: int, single_n: int, multi_n: int) -> tuple:
+    """
+    Build the four Analytics charts from pre-binned counts.
+    Cached on the counts, so reruns triggered by other widgets rebuild nothing;
+    plotly is only imported the first time a chart is actually drawn.
+    """
+    import plotly.graph_objects as go
+
+    fig_bar = go.Figure(go.Bar(
+        x=[n for _, n in ind_count], y=[k for k, _ in ind_count], orientation="h",
+        marker=dict(color=[n for _, n in ind_count], colorscale=["#1e2438", "#2563eb"], line_width=0),
+        hovertemplate="%{y}<br>%{x} orgs<extra></extra>",
+    ))
+    fig_bar.update_layout(**CHART_LAYOUT, showlegend=False,
+                          yaxis=dict(autorange="reversed", tickfont=dict(size=11), **GRID_AXIS),
+                          xaxis=GRID_AXIS, height=min(56 * len(ind_count) + 60, 380))
+
+    fig_pie = go.Figure(go.Pie(
+        labels=[k for k, _ in op_count], values=[v for _, v in op_count],
+        hole=0.58, marker=dict(colors=CHART_COLORS, line=dict(color="#0d0f18", width=3)),
+        textfont=dict(size=10, color="#4a5470"),
+        hovertemplate="%{label}<br>%{value} orgs (%{percent})<extra></extra>",
+    ))
+    fig_pie.update_layout(**CHART_LAYOUT, height=290, showlegend=True,
+                          legend=dict(font=dict(size=10, color="#4a5470"), bgcolor="rgba(0,0,0,0)"))
+
+    fig_hist = go.Figure(go.Bar(
+        x=[edge + 0.5 / bins for edge, _ in hist], y=[n for _, n in hist],
+        width=0.9 / bins, marker=dict(color="#2563eb", line_width=0),
+        hovertemplate="%{x:.0%}<br>%{y} orgs<extra></extra>",
+    ))
+    fig_hist.update_layout(**CHART_LAYOUT, height=240,
+                           xaxis=dict(tickformat=".0%", **GRID_AXIS), yaxis=GRID_AXIS, bargap=0.1)
+
+    fig_sm = go.Figure(go.Bar(
+        x=["Single Industry", "Multi-Industry"], y=[single_n, multi_n],
+        marker=dict(color=["#2563eb", "#7c3aed"], line_width=0), width=[0.45, 0.45],
+    ))
+    fig_sm.update_layout(**CHART_LAYOUT, height=240,
+                         yaxis=GRID_AXIS, xaxis=dict(color="#4a5470"), showlegend=False)
+    return fig_bar, fig_pie, fig_hist, fig_sm
+
+
+# ── Results warehouse ────────────────────────────────────────────────────────
+@st.cache_resource
+def get_warehouse() -> "ResultsWarehouse":
+    """Indexed SQLite store the Analytics tab aggregates over — persists across sessions."""
+    from results_store import ResultsWarehouse
+    return ResultsWarehouse(os.getenv("RESULTS_DB", "results.sqlite"))
+
+
+# ── Background batch worker ──────────────────────────────────────────────────
+@st.cache_resource
+def get_batch_worker() -> "BatchWorker":
+    """One worker per server process — jobs survive reruns and reconnects."""
+    from batch_worker import BatchWorker
+    return BatchWorker(warehouse=get_warehouse())
+
+
+# ── Pre-run cost / time plan ─────────────────────────────────────────────────
+RATE_LIMITS = (int(os.getenv("OPENAI_RPM", 0)) or None, int(os.getenv("OPENAI_TPM", 0)) or None)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def batch_plan(digest: str, start: int, count: int, model: str, concurrency: int, calls_seen: int,
+               _classifier, _dataset) -> dict:
+    """
+    planner.plan_run() over up to planner.PLAN_SAMPLE orgs spread evenly through the selection.
+    Cached per selection and model; calls_seen re-plans once new calls have been measured.
+    """
+    from planner import Calibration, plan_run, spread_positions
+    sample = _dataset.take([start + p for p in spread_positions(count)])
+    return plan_run(_classifier, sample, total=count, concurrency=concurrency,
+                    rpm=RATE_LIMITS[0], tpm=RATE_LIMITS[1], calibration=Calibration(get_warehouse().call_history()))
+
+
+def usd_str(amount: float) -> str:
+    """Dollar amount for markdown (escaped, so two amounts never render as LaTeX)."""
+    return f"\\${amount:,.2f}" if amount >= 1 else f"\\${amount:.3f}"
+
+
+def duration_str(seconds: float) -> str:
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f} hrs"
+    return f"{seconds / 60:.1f} min" if seconds >= 60 else f"{seconds:.0f} s"
+
+
+@st.fragment(run_every=2)
+def batch_progress():
+    """Poll the current batch job and render progress plus completed rows."""
+    job = get_batch_worker().get(st.session_state.batch_job)
+    if not job:
+        return
+    p = job.progress()
+    st.session_state.results = job.results()
+
+    if job.finished:
+        # One full rerun so the summary, downloads and Analytics pick up the final results
+        if st.session_state.batch_seen_done != job.id:
+            st.session_state.batch_seen_done = job.id
+            st.rerun()
+        return
+
+    st.progress(p["done"] / p["total"] if p["total"] else 1.0)
+    label = {"retrying": "Retrying failed organizations", "paused": "Paused"}.get(p["status"], "Processing")
+    spend = p["spend"]
+    cap = f" of {usd_str(spend['budget'])}" if spend["budget"] is not None else ""
+    st.caption(f"{label} — {p['done']:,} / {p['total']:,} done · {p['elapsed'] / 60:.1f} min elapsed · "
+               f"{usd_str(spend['spent'])}{cap} spent · job {p['id']}")
+    if spend["events"]:
+        st.caption("Spend governor: " + spend["events"][-1].replace("$", "\\$"))
+    if p["status"] == "paused":
+        st.warning("Paused at the spend cap — raise it to continue, or Stop to keep the results so far.")
+        r1, r2 = st.columns([2, 1])
+        new_cap = r1.number_input("New spend cap (USD)", min_value=0.0, step=0.5, key="resume_cap",
+                                  value=round(max((spend["budget"] or 0) * 2, spend["spent"] + 1), 2),
+                                  label_visibility="collapsed")
+        if r2.button("Raise cap & resume", use_container_width=True, key="resume_batch"):
+            job.resume(new_cap)
+    partial = st.session_state.results[-200:]
+    if partial:
+        import pandas as pd
+        st.dataframe(pd.DataFrame([{
+            "Organization":     r.get("orgName", "—"),
+            "Primary Industry": r.get("primaryIndustry") or ("Error" if "error" in r.get("classification", {}) else "—"),
+            "Operation Type":   r.get("operationType") or "—",
+        } for r in partial]), use_container_width=True, hide_index=True)
+
+
+@st.fragment(run_every=2)
+def estimate_progress():
+    """Poll the current industry-mix estimate and render the shares with their intervals."""
+    job = get_batch_worker().get(st.session_state.estimate_job)
+    if not job:
+        return
+    rep = job.report
+    if job.status == "failed":
+        st.error(f"Estimate failed: {job.error}")
+    if not rep:
+        st.caption("Classifying the first sample round…" if not job.finished else "No estimate.")
+        return
+
+    import pandas as pd
+    state = {"precision": "target precision reached", "budget": "sample budget used",
+             "exhausted": "every org classified", "cancelled": "stopped"}.get(rep.get("stoppedBy"), "sampling…")
+    st.caption(f"{rep['classified']:,} of {rep['population']:,} orgs classified ({rep['classified'] / max(rep['population'], 1):.1%}) "
+               f"across {rep['strata']} strata · widest {rep['confidence']:.0%} interval ±{rep['maxHalfWidth']:.1%} · {state}")
+
+    def table(shares):
+        return pd.DataFrame([{
+            "Value": s["value"], "Share": f"{s['share']:.1%}", "Interval": f"{s['low']:.1%} – {s['high']:.1%}",
+        } for s in shares])
+
+    e1, e2 = st.columns(2)
+    e1.markdown("**Primary industry**")
+    e1.dataframe(table(rep["primaryIndustry"]), use_container_width=True, hide_index=True)
+    e2.markdown("**Operation type**")
+    e2.dataframe(table(rep["operationType"]), use_container_width=True, hide_index=True)
+    m = rep["multiIndustry"]
+    if m:
+        e2.caption(f"Multi-industry orgs: **{m['share']:.1%}** ({m['low']:.1%} – {m['high']:.1%})")
+    if job.finished and st.session_state.estimate_seen_done != job.id:
+        st.session_state.estimate_seen_done = job.id
+        st.rerun()
 
 
 # ── Session state ────────────────────────────────────────────────────────────
-for k, v in [("classifier", None), ("results", []), ("loaded_data", []),
-             ("current_result", None), ("test_org", "")]:
+for k, v in [("classifier", None), ("results", []), ("dataset", None), ("dataset_file_id", None),
+             ("current_result", None), ("test_org", ""),
+             ("batch_job", st.query_params.get("job")), ("batch_seen_done", None),
+             ("export_set", None), ("export_digest", None), ("export_ready", None),
+             ("estimate_job", None), ("estimate_seen_done", None)]:
     if k not in st.session_state:
         st.session_state[k] = v
 
@@ -357,7 +314,7 @@ if "auto_init_done" not in st.session_state:
 
 if not st.session_state.auto_init_done and os.getenv("OPENAI_API_KEY"):
     try:
-        st.session_state.classifier = IndustryClassifier(model="gpt-4o-mini")
+        st.session_state.classifier = get_classifier(os.getenv("OPENAI_API_KEY"), "gpt-4o-mini")
         st.session_state.auto_init_done = True
     except:
         pass
@@ -382,7 +339,7 @@ with st.sidebar:
         if st.button("Initialize Classifier", type="primary"):
             if api_key:
                 try:
-                    st.session_state.classifier = IndustryClassifier(api_key=api_key, model=model)
+                    st.session_state.classifier = get_classifier(api_key, model)
                     st.success(f"Ready — {model}")
                 except Exception as e:
                     st.error(str(e))
@@ -391,7 +348,7 @@ with st.sidebar:
     else:
         if st.button("Switch Model", type="primary"):
             try:
-                st.session_state.classifier = IndustryClassifier(api_key=api_key, model=model)
+                st.session_state.classifier = get_classifier(api_key, model)
                 st.success(f"Switched to {model}")
             except Exception as e:
                 st.error(str(e))
@@ -402,13 +359,19 @@ with st.sidebar:
 
     st.markdown("<hr>", unsafe_allow_html=True)
     st.markdown("##### Data Input")
-    uploaded_file = st.file_uploader("Upload JSON file", type=["json"])
+    uploaded_file = st.file_uploader("Upload data file", type=["json", "jsonl", "ndjson", "csv", "xlsx"],
+                                     help="JSON array, JSON Lines, or CSV/XLSX with one row per product.")
     if uploaded_file:
-        try:
-            st.session_state.loaded_data = json.load(uploaded_file)
-            st.success(f"{len(st.session_state.loaded_data):,} organizations loaded")
-        except Exception as e:
-            st.error(f"Parse error: {e}")
+        # Parse once per upload; identical files are shared by every session via the store
+        if st.session_state.dataset_file_id != uploaded_file.file_id:
+            try:
+                st.session_state.dataset = get_dataset_store().ingest(uploaded_file, uploaded_file.name)
+                st.session_state.dataset_file_id = uploaded_file.file_id
+            except Exception as e:
+                st.session_state.dataset = None
+                st.error(f"Parse error: {e}")
+        if st.session_state.dataset:
+            st.success(f"{len(st.session_state.dataset):,} organizations loaded")
 
     st.markdown("<hr>", unsafe_allow_html=True)
     st.markdown('<p style="font-size:0.75rem;color:#2a3050;line-height:1.65;">Classify organizations into industries using OpenAI GPT based on their product portfolio.</p>', unsafe_allow_html=True)
@@ -446,6 +409,15 @@ with tab1:
             }
             st.session_state.test_org = json.dumps(sample, indent=2)
 
+        if st.session_state.dataset:
+            lookup_id = st.text_input("Load from uploaded file by _id", placeholder="_id", key="lookup_id")
+            if lookup_id:
+                found = st.session_state.dataset.get(lookup_id.strip())
+                if found:
+                    st.session_state.test_org = json.dumps(found, indent=2, ensure_ascii=False)
+                else:
+                    st.warning(f"No organization with _id '{lookup_id}' in {st.session_state.dataset.name}.")
+
         org_json_input = st.text_area(
             label="JSON", height=340,
             value=st.session_state.test_org,
@@ -459,8 +431,18 @@ with tab1:
             else:
                 try:
                     org_data = json.loads(org_json_input)
-                    with st.spinner("Classifying…"):
-                        st.session_state.current_result = st.session_state.classifier.classify_organization(org_data)
+                    # Stream into a placeholder in the result column so industries
+                    # show up as soon as the model finishes writing each entry.
+                    live_ph  = right.empty()
+                    streamed = []
+                    live_ph.markdown('<div class="result-panel" style="padding:0.9rem 1.2rem;"><span class="ind-sub">Classifying…</span></div>', unsafe_allow_html=True)
+                    for kind, payload in st.session_state.classifier.classify_organization_stream(org_data):
+                        if kind == "industry":
+                            streamed.append(payload)
+                            live_ph.markdown(f'<div class="result-panel" style="padding:0.3rem 1.2rem;">{industry_rows_html(streamed)}</div>', unsafe_allow_html=True)
+                        else:
+                            st.session_state.current_result = payload
+                    live_ph.empty()
                     st.success("Classification complete.")
                 except json.JSONDecodeError:
                     st.error("Invalid JSON — check your input format.")
@@ -509,21 +491,7 @@ with tab1:
 """, unsafe_allow_html=True)
 
             st.markdown('<p class="section-title">Industries Breakdown</p>', unsafe_allow_html=True)
-            rows_html = ""
-            for ind in clf.get("industries", []):
-                pct   = ind.get("percentage", 0)
-                chips = "".join(f'<span class="chip">{p}</span>' for p in ind.get("sampleProducts", []))
-                rows_html += f"""
-<div class="ind-row">
-  <div style="flex:3;min-width:0;">
-    <div class="ind-name">{ind.get('industry','—')} <span class="ind-sub">/ {ind.get('subCategory','—')}</span></div>
-    <div class="chip-list">{chips}</div>
-  </div>
-  <div style="flex:2;padding:0 0.7rem;">
-    <div class="pct-bar-bg"><div class="pct-bar-fill" style="width:{pct}%;"></div></div>
-  </div>
-  <div class="ind-pct">{pct}%</div>
-</div>"""
+            rows_html = industry_rows_html(clf.get("industries", []))
             st.markdown(f'<div class="result-panel" style="padding:0.3rem 1.2rem;">{rows_html}</div>', unsafe_allow_html=True)
 
             st.markdown('<p class="section-title">AI Reasoning</p>', unsafe_allow_html=True)
@@ -545,202 +513,295 @@ with tab1:
 #  TAB 2 — Batch Processing
 # ════════════════════════════════════════════════════════════
 with tab2:
-    if not st.session_state.loaded_data:
-        st.markdown('<div class="empty-state"><div class="icon">📁</div><p>Upload a JSON file in the sidebar to begin batch processing.</p></div>', unsafe_allow_html=True)
+    if not st.session_state.dataset:
+        st.markdown('<div class="empty-state"><div class="icon">📁</div><p>Upload a data file in the sidebar to begin batch processing.</p></div>', unsafe_allow_html=True)
     else:
-        total_orgs = len(st.session_state.loaded_data)
+        total_orgs = len(st.session_state.dataset)
         cl, cr = st.columns([3, 1], gap="large")
 
         with cl:
             st.markdown('<p class="section-title">Select batch size</p>', unsafe_allow_html=True)
+            start_at = st.number_input(
+                "Start at organization #", min_value=1, max_value=total_orgs, value=1, step=1,
+                help="Run a range from the middle of the file — only the selected orgs are read.",
+            ) - 1
             max_items = st.slider(
-                "orgs", min_value=1, max_value=min(total_orgs, 1000),
-                value=min(10, total_orgs), step=1, label_visibility="collapsed",
+                "orgs", min_value=1, max_value=min(total_orgs - start_at, 1000),
+                value=min(10, total_orgs - start_at), step=1, label_visibility="collapsed",
+            )
+            t1, t2 = st.columns(2)
+            time_limit = t1.number_input(
+                "Time limit (minutes, 0 = none)", min_value=0, max_value=24 * 60, value=0, step=5,
+                help="Orgs not started before the limit are reported as skipped; results so far are kept.",
             )
-            mins_low  = round(max_items * 3 / 60, 1)
-            mins_high = round(max_items * 8 / 60, 1)
-            time_str  = f"~{mins_low/60:.1f}–{mins_high/60:.1f} hrs" if mins_high >= 60 else f"~{mins_low}–{mins_high} min"
-            st.caption(f"Processing **{max_items}** of **{total_orgs:,}** loaded organizations · Est. time: **{time_str}** (gpt-4o-mini)")
+            spend_cap = t2.number_input(
+                "Spend cap (USD, 0 = none)", min_value=0.0, value=0.0, step=0.5,
+                help="Switches to a cheaper model when the projected spend overshoots, and pauses at the cap.",
+            )
+
+            concurrency = st.slider(
+                "Parallel requests", min_value=1, max_value=16, value=4,
+                help="Organizations classified at the same time by the background worker.",
+            )
+
+            clf = st.session_state.classifier
+            plan = None
+            if clf:
+                plan = batch_plan(st.session_state.dataset.digest, start_at, max_items, clf.model, concurrency,
+                                  get_warehouse().call_count(), clf, st.session_state.dataset)
+                basis = (f"calibrated on {plan['calibratedCalls']:,} measured calls" if plan["calibratedCalls"]
+                         else "default speed figures until a run has been measured")
+                limit = f" · limited by {plan['bottleneck'].upper()}" if plan["bottleneck"] != "concurrency" else ""
+                st.caption(f"Processing **{max_items}** (from #{start_at + 1:,}) of **{total_orgs:,}** loaded organizations · "
+                           f"Est. **~{usd_str(plan['cost'])}** · **~{duration_str(plan['secondsLow'])}–{duration_str(plan['secondsHigh'])}**{limit}")
+                st.caption(f"{plan['llmCalls']:,} API calls ({', '.join(plan['models'])}) · "
+                           f"{plan['inputTokens']:,} input / {plan['outputTokens']:,} output tokens · "
+                           f"{plan['localOrgs']:,} orgs labelled locally · {basis}")
+                if spend_cap and plan["cost"] > spend_cap:
+                    st.warning(f"⚠ The estimate exceeds the {usd_str(spend_cap)} cap — the run will switch to a cheaper "
+                               "model and pause at the cap.")
+            else:
+                st.caption(f"Processing **{max_items}** (from #{start_at + 1:,}) of **{total_orgs:,}** loaded organizations · "
+                           "initialize the classifier for a cost and time estimate")
             if max_items >= 500:
                 st.warning(f"⚠ Large batch selected ({max_items:,} orgs). Make sure your OpenAI account has sufficient rate limits.")
 
+        job = get_batch_worker().get(st.session_state.batch_job)
+        running = bool(job) and not job.finished
+
         with cr:
             st.markdown('<p class="section-title">&nbsp;</p>', unsafe_allow_html=True)
-            run_batch = st.button("Run Batch →", type="primary", use_container_width=True, key="run_batch")
+            run_batch = st.button("Run Batch →", type="primary", use_container_width=True, key="run_batch", disabled=running)
+            if st.button("Stop", use_container_width=True, key="stop_batch", disabled=not running):
+                job.cancel("Cancelled by user")
 
         if run_batch:
             if not st.session_state.classifier:
                 st.error("Initialize the classifier in the sidebar first.")
             else:
-                progress_bar  = st.progress(0)
-                status_ph     = st.empty()
-                batch_results = []
-                for i, org in enumerate(st.session_state.loaded_data[:max_items]):
-                    name = org.get("orgName", "Unknown")
-                    status_ph.caption(f"Processing {i+1} / {max_items} — {name}")
-                    try:
-                        batch_results.append(st.session_state.classifier.classify_organization(org))
-                    except Exception as e:
-                        batch_results.append({"orgName": name, "classification": {"error": str(e)}})
-                    progress_bar.progress((i + 1) / max_items)
-                st.session_state.results = batch_results
-                status_ph.empty()
-                st.success(f"Batch complete — {len(batch_results)} organizations classified.")
-
-        if st.session_state.results:
+                # The batch runs on the process-wide worker, outside this script run —
+                # reruns, refreshes and reconnects just poll it by job id.
+                job_id = get_batch_worker().submit(
+                    st.session_state.classifier,
+                    st.session_state.dataset.page(start_at, max_items),
+                    concurrency=concurrency,
+                    deadline=time_limit * 60 if time_limit else None,
+                    budget=spend_cap or None,
+                    plan=plan,
+                    tpm=RATE_LIMITS[1],
+                )
+                st.session_state.batch_job = job_id
+                st.session_state.results   = []
+                st.query_params["job"]     = job_id
+                st.rerun()
+
+        if job and (running or st.session_state.batch_seen_done != job.id):
+            batch_progress()
+        if job and job.status == "failed":
+            st.error(f"Batch failed: {job.error} — the results so far are kept below.")
+
+        with st.expander("Estimate the industry mix from a sample", expanded=bool(st.session_state.estimate_job)):
+            st.caption("Classifies a stratified random sample (country × catalog size) in rounds and stops "
+                       "once every share is known within the target — a dataset-level answer at a fraction of the cost.")
+            est_job = get_batch_worker().get(st.session_state.estimate_job)
+            est_running = bool(est_job) and not est_job.finished
+            x1, x2, x3 = st.columns([2, 2, 1])
+            target_pp = x1.slider("Target precision (± percentage points)", 1, 10, 3, key="est_target")
+            max_sample = x2.number_input("Max sample size", min_value=100, max_value=20_000, value=2000, step=100,
+                                         key="est_max")
+            x3.markdown('<p class="section-title">&nbsp;</p>', unsafe_allow_html=True)
+            if est_running:
+                if x3.button("Stop", use_container_width=True, key="stop_estimate"):
+                    est_job.cancel("Stopped by user")
+            elif x3.button("Estimate →", use_container_width=True, key="run_estimate"):
+                if not st.session_state.classifier:
+                    st.error("Initialize the classifier in the sidebar first.")
+                else:
+                    st.session_state.estimate_job = get_batch_worker().submit_estimate(
+                        st.session_state.classifier, st.session_state.dataset,
+                        target_halfwidth=target_pp / 100, max_samples=int(max_sample), concurrency=concurrency,
+                    )
+                    st.rerun()
+            if est_job:
+                estimate_progress()
+
+        if st.session_state.results and not running:
+            import pandas as pd   # only reruns that draw the results table pay for pandas
             results = st.session_state.results
-            good = [r for r in results if "error" not in r.get("classification", {})]
-            errs = [r for r in results if "error"     in r.get("classification", {})]
+            wh      = get_warehouse()
+            run_id  = st.session_state.batch_job or "session"
+            if not wh.has_run(run_id):
+                wh.add(results, run_id=run_id)
 
             st.markdown("<hr>", unsafe_allow_html=True)
             st.markdown('<p class="section-title">Batch Summary</p>', unsafe_allow_html=True)
 
-            multi_n  = sum(1 for r in good if r["classification"].get("isMultiIndustry"))
-            avg_conf = sum(r.get("confidenceScore", r.get("classification", {}).get("confidenceScore", 0)) for r in good) / len(good) if good else 0
+            # Counters are maintained per result by the job — no rescans on rerun
+            agg      = job.aggregate if job else wh.aggregate(run_id)
+            avg_conf = agg.avg_confidence
             s1, s2, s3, s4 = st.columns(4)
             def _sc(col, lbl, val, cls=""):
                 col.markdown(f'<div class="stat-card"><div class="label">{lbl}</div><div class="value {cls}">{val}</div></div>', unsafe_allow_html=True)
-            _sc(s1, "Processed",      f"{len(results):,}")
-            _sc(s2, "Successful",     f"{len(good):,}",  "green")
-            _sc(s3, "Multi-Industry", f"{multi_n:,}",    "blue")
+            _sc(s1, "Processed",      f"{agg.total:,}")
+            _sc(s2, "Successful",     f"{agg.ok:,}",     "green")
+            _sc(s3, "Multi-Industry", f"{agg.multi:,}",  "blue")
             _sc(s4, "Avg Confidence", f"{avg_conf:.0%}", "green" if avg_conf >= 0.85 else "amber")
 
+            # ── Results table: filtered, sorted and paged in SQL; only one page reaches the browser ──
             st.markdown('<p class="section-title" style="margin-top:1.4rem;">Results Table</p>', unsafe_allow_html=True)
-            rows = []
-            for r in results:
-                clf = r.get("classification", {})
-                rows.append({
-                    "Organization":     r.get("orgName", "—"),
-                    "Primary Industry": r.get("primaryIndustry", clf.get("primaryIndustry", "Error" if "error" in clf else "—")),
-                    "Operation Type":   r.get("operationType", clf.get("operationType", "—")),
-                    "Multi-Industry":   "Yes" if clf.get("isMultiIndustry") else "No",
-                    "Confidence":       f'{r.get("confidenceScore", clf.get("confidenceScore",0)):.0%}' if "error" not in clf else "—",
-                })
-            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
-
-            # ── Download buttons ──────────────────────────────────────────
+            f1, f2, f3, f4 = st.columns([3, 3, 2, 2])
+            ind_f    = f1.multiselect("Industry", [k for k, _ in agg.industry_counts()], key="tbl_industry")
+            op_f     = f2.multiselect("Operation type", [k for k, _ in agg.operation_type_counts()], key="tbl_op")
+            status_f = f3.selectbox("Status", ["All", "Successful", "Failed"], key="tbl_status")
+            conf_f   = f4.slider("Min confidence", 0.0, 1.0, 0.0, 0.05, key="tbl_conf")
+            o1, o2, o3 = st.columns([3, 2, 2])
+            sort_labels = {"Input order": "input", "Confidence": "confidence", "Organization": "orgName",
+                           "Primary industry": "primaryIndustry", "Operation type": "operationType"}
+            sort_f = o1.selectbox("Sort by", list(sort_labels), key="tbl_sort")
+            desc_f = o2.selectbox("Order", ["Ascending", "Descending"], key="tbl_order") == "Descending"
+
+            query = dict(run_id=run_id, industries=ind_f, operation_types=op_f, min_confidence=conf_f,
+                         status={"All": "all", "Successful": "ok", "Failed": "error"}[status_f],
+                         sort=sort_labels[sort_f], descending=desc_f)
+            total_rows = wh.page(limit=0, **query)[1]
+            pages = max(1, -(-total_rows // RESULTS_PAGE_SIZE))
+            page  = o3.number_input("Page", 1, pages, 1, key="tbl_page")
+            rows, _ = wh.page(limit=RESULTS_PAGE_SIZE, offset=(page - 1) * RESULTS_PAGE_SIZE, **query)
+            st.dataframe(pd.DataFrame([{
+                "Organization":     r["orgName"] or "—",
+                "Primary Industry": r["primaryIndustry"] or ("Error" if r["error"] else "—"),
+                "Operation Type":   r["operationType"] or "—",
+                "Multi-Industry":   "Yes" if r["isMultiIndustry"] else "No",
+                "Confidence":       f'{r["confidenceScore"]:.0%}' if r["confidenceScore"] is not None else "—",
+            } for r in rows], columns=["Organization", "Primary Industry", "Operation Type", "Multi-Industry", "Confidence"]),
+                use_container_width=True, hide_index=True)
+            first = (page - 1) * RESULTS_PAGE_SIZE
+            st.caption(f"Showing {min(first + 1, total_rows):,}–{min(first + RESULTS_PAGE_SIZE, total_rows):,} of {total_rows:,} matching results")
+
+            # ── Downloads: rendered only on request, cached by result-set hash ──
+            from exporters import MIME_TYPES, result_set_hash
             ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            dl1, dl2 = st.columns(2)
-
-            with dl1:
-                st.download_button(
-                    "⬇ Download results (JSON)",
-                    data=json.dumps(results, ensure_ascii=False, indent=2),
-                    file_name=f"classification_{ts}.json",
-                    mime="application/json",
-                    use_container_width=True,
-                )
-
-            with dl2:
-                # ── NEW: Excel export ──────────────────────────────────
-                xlsx_bytes = results_to_xlsx(results)
-                st.download_button(
-                    "📊 Download results (Excel)",
-                    data=xlsx_bytes,
-                    file_name=f"classification_{ts}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    use_container_width=True,
-                )
-
-            if errs:
-                with st.expander(f"⚠ {len(errs)} failed classification(s)"):
-                    for r in errs:
-                        st.markdown(f"**{r.get('orgName','Unknown')}** — `{r['classification'].get('error','Unknown error')}`")
+            dl1, dl2, dl3 = st.columns([2, 2, 3])
+            fmt_label = dl1.selectbox("Export format", list(EXPORT_FORMATS), key="export_fmt", label_visibility="collapsed")
+            fmt = EXPORT_FORMATS[fmt_label]
+            set_key = (run_id, len(results))
+            if dl2.button("Prepare download", use_container_width=True, key="prepare_export"):
+                if st.session_state.export_set != set_key:
+                    st.session_state.export_digest = result_set_hash(results)
+                    st.session_state.export_set = set_key
+                st.session_state.export_ready = (set_key, fmt)
+            if st.session_state.export_ready == (set_key, fmt):
+                try:
+                    with st.spinner(f"Building {fmt_label} export…"):
+                        data = build_export(st.session_state.export_digest, fmt, results)
+                except ImportError as e:
+                    dl3.error(str(e))
+                else:
+                    dl3.download_button(
+                        f"⬇ Download results ({fmt_label})",
+                        data=data,
+                        file_name=f"classification_{ts}.{fmt}",
+                        mime=MIME_TYPES[fmt],
+                        use_container_width=True,
+                    )
+
+            if agg.error_total:
+                err_kinds = {k: n for k, n in agg.errors.items() if n > 0}
+                kind_labels = {"timeout": "timed out", "cancelled": "cancelled", "deadline": "skipped (time limit)",
+                               "parse": "invalid JSON", "schema": "invalid response", "error": "failed",
+                               "budget": "skipped (spend cap)"}
+                st.caption(" · ".join(f"{n:,} {kind_labels.get(k, k)}" for k, n in err_kinds.items()))
+            rs = job.retry_stats if job else None
+            if rs and rs["retried"]:
+                st.caption(f"Retry lane: {rs['retried']:,} retries · {rs['recovered']:,} recovered · {rs['deadLetters']:,} dead-lettered")
+            clf = st.session_state.get("classifier")
+            rp = clf.repairer.stats() if clf is not None and clf.repairer is not None else None
+            if rp and rp["repairedLocally"] + rp["repairedByFollowUp"]:
+                st.caption(f"Response repair: {rp['repairedLocally']:,} fixed locally · "
+                           f"{rp['repairedByFollowUp']:,} fixed by a follow-up call · {rp['failed']:,} unrecoverable")
+            router = get_local_router()
+            if router is not None and router.stats()["orgs"]:
+                ls = router.stats()
+                st.caption(f"Local model: {ls['productsAbsorbed']:.0%} of products labelled locally · "
+                           f"{ls['orgsLocal']:,} of {ls['orgs']:,} orgs without an API call · {ls['orgsPartial']:,} partially routed")
+            if agg.error_total:
+                with st.expander(f"⚠ {agg.error_total:,} failed classification(s)"):
+                    err_pages = max(1, -(-agg.error_total // RESULTS_PAGE_SIZE))
+                    err_page  = st.number_input("Page", 1, err_pages, 1, key="err_page") if err_pages > 1 else 1
+                    err_rows, _ = wh.page(run_id=run_id, status="error", limit=RESULTS_PAGE_SIZE,
+                                          offset=(err_page - 1) * RESULTS_PAGE_SIZE)
+                    st.dataframe(pd.DataFrame([{
+                        "Organization": r["orgName"] or "Unknown",
+                        "Type":         r["errorType"] or "error",
+                        "Error":        r["error"],
+                    } for r in err_rows]), use_container_width=True, hide_index=True)
 
 
 # ════════════════════════════════════════════════════════════
 #  TAB 3 — Results Analysis
 # ════════════════════════════════════════════════════════════
 with tab3:
-    results = [r for r in st.session_state.results if "error" not in r.get("classification", {})]
-
-    if not results:
+    from batch_worker import BatchJob
+
+    wh   = get_warehouse()
+    live = get_batch_worker().get(st.session_state.batch_job)
+    live = live if isinstance(live, BatchJob) else None
+    # A running job is partly stored already — list it with its full size
+    runs = [r for r in wh.runs() if not live or r[0] != live.id]
+    if live:
+        runs = [(live.id, live.total, live.created_at)] + runs
+    # Default to this session's batch; everything stored is one click away
+    scopes = ["All stored results"] + [f"Run {rid} · {n:,} orgs" for rid, n, _ in runs]
+    run_ids = [None] + [rid for rid, _, _ in runs]
+    default = run_ids.index(st.session_state.batch_job) if st.session_state.batch_job in run_ids else 0
+    scope = st.selectbox("Scope", scopes, index=default, key="analytics_scope") if runs else scopes[0]
+    run_id = run_ids[scopes.index(scope)]
+
+    # A batch still held by the worker has live O(1) counters; anything else (finished runs,
+    # estimate samples) comes from SQL
+    live = get_batch_worker().get(run_id)
+    agg  = live.aggregate if isinstance(live, BatchJob) else wh.aggregate(run_id)
+    if not agg.ok:
         st.markdown('<div class="empty-state"><div class="icon">📈</div><p>Run a batch classification to see analysis charts.</p></div>', unsafe_allow_html=True)
     else:
-        COLORS = ["#2563eb","#3b82f6","#60a5fa","#93c5fd","#1d4ed8","#7c3aed"]
-        BG = "#131625"
-        LAYOUT = dict(
-            paper_bgcolor=BG, plot_bgcolor=BG,
-            font=dict(family="DM Sans", size=11, color="#4a5470"),
-            margin=dict(t=30, b=20, l=10, r=10),
+        ind_count = agg.industry_counts()
+        fig_bar, fig_pie, fig_hist, fig_sm = analytics_figures(
+            tuple(top_n_with_other(ind_count, MAX_CHART_CATEGORIES)),
+            tuple(top_n_with_other(agg.operation_type_counts(), MAX_CHART_CATEGORIES)),
+            tuple(agg.histogram_bins()), agg.bins, agg.single, agg.multi,
         )
 
         ch1, ch2 = st.columns([3, 2], gap="large")
-
         with ch1:
             st.markdown('<p class="section-title">Primary Industry Distribution</p>', unsafe_allow_html=True)
-            ind_count = {}
-            for r in results:
-                k = r.get("primaryIndustry", r.get("classification", {}).get("primaryIndustry", "Unknown"))
-                ind_count[k] = ind_count.get(k, 0) + 1
-            df_ind = pd.DataFrame(sorted(ind_count.items(), key=lambda x: x[1], reverse=True), columns=["Industry","Count"])
-            fig_bar = px.bar(df_ind, x="Count", y="Industry", orientation="h",
-                             color="Count", color_continuous_scale=["#1e2438","#2563eb"])
-            fig_bar.update_layout(**LAYOUT, showlegend=False, coloraxis_showscale=False,
-                                  yaxis=dict(autorange="reversed", tickfont=dict(size=11), gridcolor="#1a1e2e", color="#4a5470"),
-                                  xaxis=dict(gridcolor="#1a1e2e", color="#4a5470"),
-                                  height=min(56*len(df_ind)+60, 380))
-            fig_bar.update_traces(marker_line_width=0)
             st.plotly_chart(fig_bar, use_container_width=True)
-
         with ch2:
             st.markdown('<p class="section-title">Operation Type Breakdown</p>', unsafe_allow_html=True)
-            bt_count = {}
-            for r in results:
-                k = r.get("operationType", r["classification"].get("operationType", "Unknown"))
-                bt_count[k] = bt_count.get(k, 0) + 1
-            fig_pie = go.Figure(go.Pie(
-                labels=list(bt_count.keys()), values=list(bt_count.values()),
-                hole=0.58, marker=dict(colors=COLORS, line=dict(color="#0d0f18", width=3)),
-                textfont=dict(size=10, color="#4a5470"),
-                hovertemplate="%{label}<br>%{value} orgs (%{percent})<extra></extra>",
-            ))
-            fig_pie.update_layout(**LAYOUT, height=290, showlegend=True,
-                                  legend=dict(font=dict(size=10, color="#4a5470"), bgcolor="rgba(0,0,0,0)"))
             st.plotly_chart(fig_pie, use_container_width=True)
 
         ch3, ch4 = st.columns(2, gap="large")
-
         with ch3:
             st.markdown('<p class="section-title">Confidence Score Distribution</p>', unsafe_allow_html=True)
-            confs = [r.get("confidenceScore", r.get("classification", {}).get("confidenceScore", 0)) for r in results]
-            fig_hist = px.histogram(x=confs, nbins=15, color_discrete_sequence=["#2563eb"])
-            fig_hist.update_layout(**LAYOUT, height=240,
-                                   xaxis=dict(tickformat=".0%", gridcolor="#1a1e2e", color="#4a5470"),
-                                   yaxis=dict(gridcolor="#1a1e2e", color="#4a5470"), bargap=0.1)
-            fig_hist.update_traces(marker_line_width=0)
             st.plotly_chart(fig_hist, use_container_width=True)
-
         with ch4:
             st.markdown('<p class="section-title">Single vs Multi-Industry</p>', unsafe_allow_html=True)
-            multi_n  = sum(1 for r in results if r["classification"].get("isMultiIndustry"))
-            single_n = len(results) - multi_n
-            fig_sm = go.Figure(go.Bar(
-                x=["Single Industry","Multi-Industry"], y=[single_n, multi_n],
-                marker_color=["#2563eb","#7c3aed"], width=[0.45, 0.45],
-            ))
-            fig_sm.update_layout(**LAYOUT, height=240,
-                                 yaxis=dict(gridcolor="#1a1e2e", color="#4a5470"),
-                                 xaxis=dict(color="#4a5470"), showlegend=False)
-            fig_sm.update_traces(marker_line_width=0)
             st.plotly_chart(fig_sm, use_container_width=True)
 
         st.markdown("<hr>", unsafe_allow_html=True)
         st.markdown('<p class="section-title">Top Industries — Organization Detail</p>', unsafe_allow_html=True)
 
-        for industry, count in sorted(ind_count.items(), key=lambda x: x[1], reverse=True)[:6]:
-            with st.expander(f"{industry}  ·  {count} org{'s' if count != 1 else ''}"):
-                for o in [r for r in results if r.get("primaryIndustry", r.get("classification", {}).get("primaryIndustry")) == industry][:8]:
-                    c2       = o["classification"]
-                    conf_val = o.get("confidenceScore", c2.get("confidenceScore", 0))
-                    conf_col = "#4ade80" if conf_val >= 0.85 else ("#fbbf24" if conf_val >= 0.65 else "#f87171")
-                    st.markdown(
-                        f'<div style="display:flex;justify-content:space-between;align-items:center;'
-                        f'padding:0.5rem 0;border-bottom:1px solid #1a1e2e;font-size:0.83rem;">'
-                        f'<span style="color:#8b95b0;font-weight:500;">{o.get("orgName","—")}</span>'
-                        f'<span style="display:flex;gap:0.6rem;align-items:center;">'
-                        f'<span class="badge badge-slate">{o.get("operationType", c2.get("operationType","—"))}</span>'
-                        f'<span style="font-size:0.76rem;font-weight:600;color:{conf_col};">{conf_val:.0%}</span>'
-                        f'</span></div>',
-                        unsafe_allow_html=True,
-                    )
\ No newline at end of file
+        budget = HtmlBudget(ANALYTICS_HTML_BUDGET)
+        for industry, count in ind_count[:6]:
+            with st.expander(f"{industry}  ·  {count:,} org{'s' if count != 1 else ''}"):
+                # Live jobs write their results to the warehouse as they go, so both page the same way
+                pages = max(1, -(-count // DETAIL_PAGE_SIZE))
+                page  = st.number_input("Page", 1, pages, 1, key=f"detail_page_{run_id}_{industry}") if pages > 1 else 1
+                details = wh.org_details(industry, run_id, limit=DETAIL_PAGE_SIZE, offset=(page - 1) * DETAIL_PAGE_SIZE)
+                # One HTML block per page, charged against the per-rerun payload cap
+                html = org_detail_rows_html(details)
+                if budget.take(html):
+                    st.markdown(html, unsafe_allow_html=True)
+                    if pages > 1:
+                        st.caption(f"Page {page:,} of {pages:,}")
+                else:
+                    st.caption("Detail output limit reached for this view — narrow the scope or open fewer industries.")
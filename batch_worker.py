@@ -0,0 +1,352 @@
+"""
+Background batch execution for the Streamlit Batch tab.
+Jobs run on threads owned by a process-wide BatchWorker, so a batch outlives
+the script run that submitted it: reruns, refreshes and reconnects just poll
+the job by id and render whatever has completed so far. Sample-based industry
+mix estimates (estimate.py) run the same way as EstimateJobs. Every batch is
+metered by a planner.SpendGovernor, which can degrade it to a cheaper model or
+pause it at its spend cap until the cap is raised, and dispatched in the order
+of a scheduler.SizeAwareScheduler (largest first, paced against the TPM limit).
+"""
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple, Union
+
+from aggregates import ResultAggregate
+from cancellation import CancellationToken
+from planner import Calibration, SpendGovernor
+from records import ClassificationResult, Organization
+from retry import RetryLane
+from scheduler import SizeAwareScheduler
+
+PAUSE_TIMEOUT = 30 * 60     # seconds a job paused at its spend cap waits for a raised cap
+SAVE_EVERY = 2.0            # seconds between warehouse writes of a running job's new results
+
+logger = logging.getLogger(__name__)
+
+
+class BatchJob:
+    """State of one submitted batch — safe to read from any thread"""
+
+    def __init__(self, orgs: List[Dict], concurrency: int, deadline: Optional[float],
+                 budget: Optional[float] = None, plan: Optional[Dict] = None, tpm: Optional[int] = None,
+                 model: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        # Held as slotted records for the job's lifetime — a fraction of the nested dicts' memory
+        self.orgs = [o if isinstance(o, Organization) else Organization.from_dict(o) for o in orgs]
+        self.total = len(orgs)
+        self.concurrency = max(1, concurrency)
+        self.deadline = deadline
+        self.tpm = tpm
+        self.cancel_token = CancellationToken()
+        self.governor = SpendGovernor(budget, deadline, self.total, plan, model=model)
+
+        self.status = "queued"          # queued | running | paused | retrying | done | cancelled | failed
+        self.error: Optional[str] = None     # why the job failed, when it did
+        self.done = 0
+        self.retry_stats: Optional[Dict] = None
+        self.aggregate = ResultAggregate()   # live counters for the Batch summary / Analytics
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+        self._results: List[Optional[ClassificationResult]] = [None] * self.total
+        self._unsaved: List[int] = []        # completed since the last take_unsaved()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "cancelled", "failed")
+
+    def cancel(self, reason: str = "Cancelled by user"):
+        self.cancel_token.cancel(reason)
+
+    def resume(self, budget: Optional[float] = None):
+        """Continue a job paused at its spend cap, optionally with a raised cap."""
+        self.governor.resume(budget)
+
+    def _set(self, index: int, result: Dict, count: bool = True):
+        record = ClassificationResult.from_dict(result)
+        with self._lock:
+            old = self._results[index]
+            self.aggregate.replace(old.to_dict() if old is not None else None, result)
+            self._results[index] = record
+            if count:
+                self.done += 1
+                self._unsaved.append(index)
+
+    def take_unsaved(self) -> Tuple[List[str], List[ClassificationResult]]:
+        """(org _ids, results) completed since the last call — written to the warehouse while the job runs."""
+        with self._lock:
+            indices, self._unsaved = self._unsaved, []
+            return [self.orgs[i].id for i in indices], [self._results[i] for i in indices]
+
+    def completed(self) -> Tuple[List[str], List[ClassificationResult]]:
+        """(org _ids, results) of every completed org, in input order — what the warehouse stores."""
+        with self._lock:
+            done = [i for i, r in enumerate(self._results) if r is not None]
+            return [self.orgs[i].id for i in done], [self._results[i] for i in done]
+
+    def records(self) -> List[ClassificationResult]:
+        """Completed results so far as ClassificationResult records, in input order."""
+        with self._lock:
+            return [r for r in self._results if r is not None]
+
+    def results(self) -> List[Dict]:
+        """Completed results so far, in input order."""
+        return [r.to_dict() for r in self.records()]
+
+    def progress(self) -> Dict:
+        with self._lock:
+            done = self.done
+        return {
+            "id":      self.id,
+            "status":  self.status,
+            "error":   self.error,
+            "done":    done,
+            "total":   self.total,
+            "elapsed": (self.finished_at or time.time()) - self.created_at,
+            "spend":   self.governor.stats(),
+        }
+
+
+class EstimateJob:
+    """State of one sample-based industry-mix estimate — safe to read from any thread"""
+
+    def __init__(self, dataset, options: Dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.dataset = dataset
+        self.total = len(dataset)
+        self.options = options
+        self.cancel_token = CancellationToken()
+
+        self.status = "queued"          # queued | running | done | cancelled | failed
+        self.error: Optional[str] = None     # why the job failed, when it did
+        self.report: Optional[Dict] = None   # latest interim / final estimate
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+        self._results: List[Dict] = []
+        self._indices: List[int] = []       # dataset index of each result
+        self._calls: List[Dict] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "cancelled", "failed")
+
+    def cancel(self, reason: str = "Cancelled by user"):
+        self.cancel_token.cancel(reason)
+
+
+class BatchWorker:
+    """Process-wide executor for batch jobs (one instance per server process)"""
+
+    def __init__(self, max_jobs: int = 2, keep_finished: float = 24 * 3600, warehouse=None,
+                 pause_timeout: float = PAUSE_TIMEOUT):
+        """
+        Args:
+            max_jobs:      Batches that may run at the same time; the rest queue.
+            keep_finished: Seconds a finished job stays available for polling.
+            pause_timeout: Seconds a job paused at its spend cap waits to be resumed before it
+                           finishes with its remaining orgs reported as "budget" errors.
+            warehouse:     Optional ResultsWarehouse every job is persisted to (run_id = job id),
+                           whether or not a session is still watching. Results are written as
+                           they complete (every SAVE_EVERY seconds) and rewritten once at the end.
+        """
+        self.warehouse = warehouse
+        self._jobs: Dict[str, BatchJob] = {}
+        self._lock = threading.Lock()
+        self._runner = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="batch-job")
+        self.keep_finished = keep_finished
+        self.pause_timeout = pause_timeout
+
+    def submit(
+        self,
+        classifier,
+        orgs: List[Dict],
+        concurrency: int = 4,
+        deadline: Optional[float] = None,
+        budget: Optional[float] = None,
+        plan: Optional[Dict] = None,
+        tpm: Optional[int] = None,
+    ) -> str:
+        """
+        Queue a batch and return its job id immediately.
+
+        Args:
+            classifier:  IndustryClassifier used for every org in the batch.
+            orgs:        Org dicts to classify.
+            concurrency: Orgs classified in parallel within this job.
+            deadline:    Wall-clock budget for the job in seconds (None = no limit).
+            budget:      Spend cap in USD (None = no cap) — see planner.SpendGovernor.
+            plan:        planner.plan_run() result for these orgs; its cost and time per org
+                         guide the governor until the job has measured its own.
+            tpm:         Account tokens-per-minute limit the dispatch is paced against
+                         (None = no pacing; orgs still start largest first).
+
+        Returns:
+            Job id to poll with get().
+        """
+        job = BatchJob(list(orgs), concurrency, deadline, budget, plan, tpm, classifier.model)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._runner.submit(self._run, job, classifier)
+        return job.id
+
+    def submit_estimate(self, classifier, dataset, **options) -> str:
+        """
+        Queue a sample-based industry-mix estimate and return its job id.
+
+        Args:
+            classifier: IndustryClassifier used for the sample orgs.
+            dataset:    DatasetHandle (or list of org dicts) to estimate.
+            options:    Keyword arguments for estimate.estimate_distribution().
+        """
+        job = EstimateJob(dataset, options)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._runner.submit(self._run_estimate, job, classifier)
+        return job.id
+
+    def get(self, job_id: Optional[str]) -> Optional[Union[BatchJob, EstimateJob]]:
+        with self._lock:
+            return self._jobs.get(job_id) if job_id else None
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_finished
+        for jid in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self._jobs[jid]
+
+    # ------------------------------------------------------------------
+    # Job execution
+    # ------------------------------------------------------------------
+
+    def _run(self, job: BatchJob, classifier):
+        job.status = "running"
+        token = job.cancel_token
+        governor = job.governor
+        deadline_at = time.monotonic() + job.deadline if job.deadline else None
+        lane = RetryLane()
+
+        def call(org: Dict) -> Dict:
+            timeout = classifier.request_timeout
+            if deadline_at is not None:
+                timeout = max(1.0, min(timeout, deadline_at - time.monotonic()))
+            try:
+                return classifier.classify_organization(org, timeout=timeout,
+                                                        model=governor.model_override(classifier.model),
+                                                        on_usage=governor.record)
+            except Exception as e:
+                return classifier._error_result(org, f"Classification failed: {e}")
+
+        def open_for_dispatch() -> bool:
+            return not token.cancelled and (deadline_at is None or time.monotonic() < deadline_at)
+
+        save_at = time.monotonic() + SAVE_EVERY
+
+        def save_progress():
+            # Lets Analytics page a live run's detail rows out of the warehouse
+            nonlocal save_at
+            if self.warehouse is not None and time.monotonic() >= save_at:
+                org_ids, records = job.take_unsaved()
+                self.warehouse.add(records, run_id=job.id, replace=False, org_ids=org_ids)
+                save_at = time.monotonic() + SAVE_EVERY
+
+        try:
+            calibration = Calibration(self.warehouse.call_history()) if self.warehouse is not None else None
+            schedule = SizeAwareScheduler.for_orgs(classifier, job.orgs, calibration, tpm=job.tpm)
+            with ThreadPoolExecutor(max_workers=job.concurrency, thread_name_prefix=f"batch-{job.id}") as pool:
+                in_flight = {}
+                while len(schedule) or in_flight:
+                    # Keep at most `concurrency` orgs in flight; stop feeding on cancel / deadline / spend cap
+                    blocked = None          # seconds until the TPM budget admits the next org
+                    while (len(schedule) and len(in_flight) < job.concurrency and open_for_dispatch()
+                           and governor.update(job.done, len(in_flight)) in ("normal", "degraded")):
+                        idx, delay = schedule.next()
+                        if idx is None:
+                            blocked = delay
+                            break
+                        fut = pool.submit(call, job.orgs[idx])
+                        in_flight[fut] = idx
+                    if not in_flight:
+                        if governor.paused and len(schedule) and not token.cancelled:
+                            job.status = "paused"
+                            resumed = governor.wait_resume(token, deadline_at, self.pause_timeout)
+                            job.status = "running"
+                            if resumed:
+                                continue
+                        if blocked and open_for_dispatch():
+                            time.sleep(min(blocked, 1.0))
+                            continue
+                        break
+                    done, _ = wait(list(in_flight), timeout=blocked, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        idx = in_flight.pop(fut)
+                        result = fut.result()
+                        if "error" in result.get("classification", {}):
+                            lane.defer(idx, job.orgs[idx], result)
+                        job._set(idx, result)
+                    save_progress()
+
+            if len(lane) and not token.cancelled and not governor.paused:
+                job.status = "retrying"
+                lane.drain(call, token, deadline_at, on_result=lambda i, r: job._set(i, r, count=False))
+            job.retry_stats = lane.stats()
+
+            # Orgs never started are still reported, distinctly, so the job is complete
+            if token.cancelled:
+                reason, kind = token.reason or "Cancelled", "cancelled"
+            elif governor.paused and (deadline_at is None or time.monotonic() < deadline_at):
+                reason, kind = "Spend cap reached", "budget"
+            else:
+                reason, kind = "Batch time limit reached", "deadline"
+            for idx in range(job.total):
+                if job._results[idx] is None:
+                    job._set(idx, classifier._error_result(job.orgs[idx], reason, kind))
+
+            if self.warehouse is not None:
+                org_ids, records = job.completed()
+                self.warehouse.add(records, run_id=job.id, org_ids=org_ids)
+                self.warehouse.add_calls(governor.records, run_id=job.id)
+            job.status = "cancelled" if token.cancelled else "done"
+        except Exception as e:
+            # Runs on the executor — a raised exception would only end up in a discarded Future
+            logger.exception("Batch job %s failed", job.id)
+            job.error = str(e) or type(e).__name__
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _run_estimate(self, job: EstimateJob, classifier):
+        from estimate import _dataset_access, estimate_distribution
+
+        def keep(index: int, result: Dict):
+            job._indices.append(index)
+            job._results.append(result)
+
+        job.status = "running"
+        try:
+            job.report = estimate_distribution(
+                classifier, job.dataset, cancel_token=job.cancel_token,
+                on_round=lambda report: setattr(job, "report", report),
+                on_result=keep,
+                on_usage=job._calls.append,
+                **job.options,
+            )
+            # Sample classifications are real results — keep them with the rest
+            if self.warehouse is not None and job._results:
+                org_ids = [org.get("_id") for org in _dataset_access(job.dataset)[1](job._indices)]
+                self.warehouse.add(job._results, run_id=job.id, org_ids=org_ids)
+                self.warehouse.add_calls(job._calls, run_id=job.id)
+            job.status = "cancelled" if job.cancel_token.cancelled else "done"
+        except Exception as e:
+            logger.exception("Estimate job %s failed", job.id)
+            job.error = str(e) or type(e).__name__
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
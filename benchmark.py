@@ -0,0 +1,419 @@
+"""
+Performance benchmarks for the Industry Classifier
+Run a section with:  python benchmark.py <section>  (see --help)
+
+Only prompt-accuracy calls the OpenAI API (it needs --labels and OPENAI_API_KEY);
+every other figure is measured locally.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Modules app.py may pull in, heaviest last — each is timed in a fresh interpreter
+STARTUP_MODULES = [
+    "streamlit", "openai", "prompt", "batch_worker", "dataset_store", "results_store",
+    "exporters", "theme", "pandas", "plotly.graph_objects", "plotly.express", "openpyxl",
+]
+
+
+def _report(title: str, rows: List[tuple], header: tuple):
+    print(f"\n{title}")
+    print("-" * len(title))
+    widths = [max(len(str(r[i])) for r in rows + [header]) for i in range(len(header))]
+    for row in [header] + rows:
+        print("  ".join(str(v).ljust(w) for v, w in zip(row, widths)))
+
+
+def _timed(fn: Callable, repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {"median": statistics.median(samples), "max": max(samples)}
+
+
+# ----------------------------------------------------------------------
+# Startup: import time and rerun latency
+# ----------------------------------------------------------------------
+
+def import_times(modules: List[str] = STARTUP_MODULES) -> Dict[str, float]:
+    """Cold import time of each module, in seconds, each in its own interpreter."""
+    out = {}
+    for mod in modules:
+        code = f"import time; t = time.perf_counter(); import {mod}; print(time.perf_counter() - t)"
+        proc = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True)
+        out[mod] = float(proc.stdout.strip()) if proc.returncode == 0 else float("nan")
+    return out
+
+
+def rerun_times(repeat: int = 10) -> Dict[str, Dict[str, float]]:
+    """
+    Script-run latency of app.py under streamlit.testing's AppTest.
+
+    Returns timings for the first (cold) run, a plain rerun, and a rerun
+    triggered by typing into the single-org box — the interaction that
+    should stay cheapest.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    tmp = tempfile.mkdtemp(prefix="bench-app-")
+    os.environ.setdefault("RESULTS_DB", os.path.join(tmp, "results.sqlite"))
+    os.environ.setdefault("DATASET_CACHE_DIR", os.path.join(tmp, "datasets"))
+
+    at = AppTest.from_file(os.path.join(HERE, "app.py"), default_timeout=60)
+    t0 = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - t0
+    if at.exception:
+        raise RuntimeError(f"app.py raised during the benchmark run: {at.exception[0].value}")
+
+    typed = iter(range(repeat))
+    return {
+        "first run":   {"median": cold, "max": cold},
+        "rerun":       _timed(at.run, repeat),
+        "type in org": _timed(lambda: at.text_area[0].input(f'{{"orgName": "Org {next(typed)}"}}').run(), repeat),
+    }
+
+
+def bench_startup(args):
+    imports = import_times()
+    _report("Cold import time", [(m, f"{s * 1000:8.1f} ms") for m, s in imports.items()], ("module", "time"))
+    try:
+        reruns = rerun_times(args.repeat)
+    except ImportError as e:
+        print(f"\nRerun profile skipped: {e}")
+        return
+    _report(
+        f"app.py script runs (AppTest, {args.repeat} repeats)",
+        [(k, f"{v['median'] * 1000:8.1f} ms", f"{v['max'] * 1000:8.1f} ms") for k, v in reruns.items()],
+        ("run", "median", "max"),
+    )
+
+
+# ----------------------------------------------------------------------
+# Prompt: input tokens with per-org section retrieval
+# ----------------------------------------------------------------------
+
+SAMPLE_FILES = ["example.json", "Data/50_productList_Data.json", "Data/another100productList.json",
+                "Data/nextfrom151.json", "Data/batch_processing.json"]
+
+
+def load_sample_orgs(paths: List[str] = SAMPLE_FILES) -> List[Dict]:
+    orgs = []
+    for path in paths:
+        full = os.path.join(HERE, path)
+        if os.path.exists(full):
+            with open(full, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            orgs.extend(data if isinstance(data, list) else [data])
+    return orgs
+
+
+def bench_prompt(args):
+    from collections import Counter
+    from catalog import fold_org, fold_stats
+    from planner import token_counter
+    from prompt import IndustryClassifier
+    from prompt_sections import build_system_prompt, select_sections
+
+    count, counter = token_counter()
+    orgs = load_sample_orgs()
+    full_sys = count(IndustryClassifier.SYSTEM_PROMPT)
+    variants = Counter(select_sections(o) for o in orgs)
+    sys_tokens = {v: count(build_system_prompt(v)) for v in variants}
+    def user_tokens(org):
+        return count(IndustryClassifier.USER_PROMPT_TEMPLATE.format(
+            organization_data=json.dumps(org, ensure_ascii=False, indent=2)))
+
+    def without_empty_fields(org):
+        return dict(org, product_names=[{k: v for k, v in p.items() if v not in ("", None)}
+                                        for p in org.get("product_names") or []])
+
+    user = sum(user_tokens(o) for o in orgs)
+    user_compact = sum(user_tokens(without_empty_fields(o)) for o in orgs)
+    user_folded = sum(user_tokens(fold_org(o)) for o in orgs)
+    total_full = full_sys * len(orgs)
+    total_dyn = sum(sys_tokens[select_sections(o)] for o in orgs)
+    _report(
+        f"System prompt per variant ({len(orgs)} sample orgs, tokens: {counter})",
+        [(" + ".join(("core",) + v), n, f"{variants[v]:,}", f"{1 - n / full_sys:6.1%}")
+         for v, n in sorted(sys_tokens.items(), key=lambda kv: kv[1])],
+        ("sections", "tokens", "orgs", "saved"),
+    )
+    print(f"\nFull system prompt: {full_sys:,} tokens · shared cacheable prefix (core): {count(build_system_prompt(())):,}")
+    print(f"System tokens for the sample: {total_full:,} → {total_dyn:,} ({1 - total_dyn / total_full:.1%} less)")
+    fold = fold_stats(orgs)
+    print(f"Product rows after junk / duplicate / variant folding: {fold['products']:,} → {fold['prompted']:,} "
+          f"({fold['folded']:.1%} less, {fold['junk']:,} junk)")
+    print(f"Org-data tokens: {user:,} → {user_folded:,} ({1 - user_folded / user:.1%} less), of which")
+    print(f"  dropping empty fields:          {user - user_compact:,} ({1 - user_compact / user:.1%})")
+    print(f"  dropping / folding product rows: {user_compact - user_folded:,} ({(user_compact - user_folded) / user:.1%})")
+    print(f"All input tokens (system + org data): {total_full + user:,} → {total_dyn + user_folded:,} "
+          f"({1 - (total_dyn + user_folded) / (total_full + user):.1%} less)")
+    per_country: Dict[str, set] = {}
+    for o in orgs:
+        per_country.setdefault(str(o.get("countryCode") or "—"), set()).add(select_sections(o))
+    unstable = sorted(c for c, v in per_country.items() if len(v) > 1)
+    print(f"Countries with more than one variant: {', '.join(unstable) or 'none'}")
+    print("Token savings only — run the prompt-accuracy section for the effect on the labels.")
+
+
+def bench_prompt_accuracy(args):
+    """Full vs retrieved system prompt, both scored against the same reviewed labels."""
+    if not args.labels or not os.getenv("OPENAI_API_KEY"):
+        print("\nPrompt accuracy skipped: needs --labels <reviewed results JSON> and OPENAI_API_KEY")
+        return
+    from estimate import _wilson
+    from planner import spread_positions
+    from prompt import IndustryClassifier
+    from prompt_sections import SECTION_ORDER, select_sections
+
+    with open(args.labels, "r", encoding="utf-8") as f:
+        labels = {r["_id"]: r for r in json.load(f) if "error" not in r.get("classification", {})}
+    orgs = [o for o in load_sample_orgs() if o.get("_id") in labels]
+    orgs = [orgs[i] for i in spread_positions(len(orgs), args.labelled)]
+    if not orgs:
+        print("\nPrompt accuracy skipped: no sample org has a label")
+        return
+    trimmed = {i for i, o in enumerate(orgs) if select_sections(o) != SECTION_ORDER}
+
+    def industry_set(r: Dict) -> frozenset:
+        return frozenset(i.get("industry") for i in r.get("classification", {}).get("industries", []))
+
+    checks = {
+        "primaryIndustry": lambda r, ref: r.get("primaryIndustry") == ref.get("primaryIndustry"),
+        "operationType":   lambda r, ref: r.get("operationType") == ref.get("operationType"),
+        "industry set":    lambda r, ref: industry_set(r) == industry_set(ref),
+    }
+    runs = {}
+    for name, retrieval in (("full", False), ("retrieved", True)):
+        clf = IndustryClassifier(model=args.model, prompt_retrieval=retrieval)
+        runs[name] = dict(clf.classify_stream(orgs, concurrency=args.concurrency))
+
+    def accuracy(name: str, check: Callable, subset) -> str:
+        hits = sum(1 for i in subset if check(runs[name][i], labels[orgs[i]["_id"]]))
+        low, high = _wilson(hits / len(subset), len(subset), 1.96) if subset else (0.0, 1.0)
+        return f"{hits / max(len(subset), 1):6.1%} [{low:.0%}–{high:.0%}]"
+
+    everyone = range(len(orgs))
+    _report(
+        f"Accuracy against {args.labels} ({len(orgs)} labelled orgs, {len(trimmed)} sent a trimmed prompt, "
+        f"{args.model}, 95% intervals)",
+        [(field, accuracy("full", check, everyone), accuracy("retrieved", check, everyone),
+          accuracy("full", check, trimmed), accuracy("retrieved", check, trimmed))
+         for field, check in checks.items()],
+        ("field", "full", "retrieved", "full (trimmed orgs)", "retrieved (trimmed orgs)"),
+    )
+    flips = sum(1 for i in everyone
+                if runs["full"][i].get("primaryIndustry") != runs["retrieved"][i].get("primaryIndustry"))
+    print(f"\nprimaryIndustry differs between the two prompts for {flips:,} of {len(orgs):,} orgs")
+
+
+# ----------------------------------------------------------------------
+# Quality: vectorized STEP 5 pre-scoring
+# ----------------------------------------------------------------------
+
+def bench_quality(args):
+    from quality import org_quality, prescore, quality_summary
+
+    sample = load_sample_orgs()
+    orgs = (sample * (args.orgs // len(sample) + 1))[:args.orgs]
+    products = sum(len(o.get("product_names") or ()) for o in orgs)
+    t0 = time.perf_counter()
+    scores = prescore(orgs)
+    vectorized = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for o in sample:
+        org_quality(o)
+    per_org = (time.perf_counter() - t0) / len(sample)
+
+    summary = quality_summary(scores)
+    _report(
+        f"prescore() over {len(orgs):,} orgs ({products:,} products, sample orgs repeated)",
+        [("vectorized pass", f"{vectorized:8.2f} s", f"{products / vectorized / 1e6:5.2f} M products/s"),
+         ("org_quality() loop (projected)", f"{per_org * len(orgs):8.2f} s", f"{per_org * 1e3:5.2f} ms/org")],
+        ("path", "time", "rate"),
+    )
+    print(f"\nMedian quality score {summary['median']:.2f} · {summary['lowShare']:.1%} of orgs below 0.80 · "
+          f"{summary['missingDescriptions']:.0%} of products per org lack a description")
+
+
+# ----------------------------------------------------------------------
+# Schedule: simulated makespan, file order vs size-aware
+# ----------------------------------------------------------------------
+
+API_BURST = 60.0            # the API's own TPM bucket holds a full minute of tokens
+RETRY_SECONDS = 0.3         # a 429 comes back fast
+
+
+def production_mix(sample: List[Dict], n: int, large_share: float = 0.03, seed: int = 0,
+                   large_last: bool = False) -> List[Dict]:
+    """
+    `n` orgs drawn from the sample, `large_share` of them synthetic large catalogs
+    (200–1,000 products, built from several sample catalogs) at random positions —
+    or all at the end with large_last.
+    """
+    import random
+    rng = random.Random(seed)
+    orgs = [rng.choice(sample) for _ in range(n)]
+    for _ in range(int(n * large_share)):
+        products: List[Dict] = []
+        target = rng.randint(200, 1000)
+        while len(products) < target:
+            products += rng.choice(sample).get("product_names") or []
+        large = {"orgName": "Large catalog", "product_names": products[:target]}
+        orgs.insert(len(orgs) if large_last else rng.randrange(len(orgs) + 1), large)
+    return orgs[-n:] if large_last else orgs[:n]
+
+
+def simulate(estimates: List[Dict], concurrency: int, tpm, policy: str, seed: int = 0) -> Dict:
+    """
+    Discrete-event run of one batch against a TPM-limited API.
+
+    Actual call times are the predicted ones with lognormal noise. Policies:
+      fifo   — file order, no pacing (BatchWorker before the scheduler): prompts the
+               API's bucket can't admit fail with a 429 and go to the RetryLane, which
+               retries them one by one with backoff after the main pass.
+      paced  — file order through the scheduler's token bucket.
+      size   — SizeAwareScheduler: largest first, backfilled, paced.
+    """
+    import heapq
+    import random
+    from retry import RetryLane
+    from scheduler import SizeAwareScheduler, job_tokens
+
+    rng = random.Random(seed)
+    actual = [e["seconds"] * rng.lognormvariate(0, 0.3) for e in estimates]
+    api = {"level": tpm * API_BURST / 60 if tpm else None, "clock": 0.0}
+
+    def admit(i: int, now: float) -> bool:
+        if not tpm:
+            return True
+        api["level"] = min(tpm * API_BURST / 60, api["level"] + (now - api["clock"]) * tpm / 60)
+        api["clock"] = now
+        if job_tokens(estimates[i]) > api["level"]:
+            return False
+        api["level"] -= job_tokens(estimates[i])
+        return True
+
+    now, running, failed = 0.0, [], []
+    if policy == "fifo":
+        pending = list(range(len(estimates)))
+        schedule = None
+    else:
+        schedule = SizeAwareScheduler(estimates, tpm, largest_first=policy == "size", backfill=policy == "size")
+    while True:
+        blocked = None
+        while len(running) < concurrency:
+            if schedule is None:
+                if not pending:
+                    break
+                i = pending.pop(0)
+            else:
+                i, blocked = schedule.next(now)
+                if i is None:
+                    break
+            ok = admit(i, now)
+            heapq.heappush(running, (now + (actual[i] if ok else RETRY_SECONDS), i, ok))
+        if not running:
+            if blocked:
+                now += blocked
+                continue
+            break
+        end, i, ok = heapq.heappop(running)
+        if blocked and now + blocked < end:
+            heapq.heappush(running, (end, i, ok))
+            now += blocked
+            continue
+        now = end
+        if not ok:
+            failed.append(i)
+
+    # Rate-limited orgs are retried one at a time after the main pass, with RetryLane's backoff
+    lane, dead = RetryLane(), 0
+    for i in failed:
+        for attempt in range(1, lane.max_attempts):
+            cap = min(lane.max_delay, lane.base_delay * 2 ** (attempt - 1))
+            now += rng.uniform(cap / 2, cap)
+            if admit(i, now):
+                now += actual[i]
+                break
+            now += RETRY_SECONDS
+        else:
+            dead += 1
+    return {"makespan": now, "rateLimited": len(failed), "deadLetters": dead}
+
+
+def bench_schedule(args):
+    from planner import Calibration, org_estimate
+    from prompt import IndustryClassifier
+
+    classifier = IndustryClassifier(api_key="benchmark")
+    cal = Calibration()
+    sample = load_sample_orgs()
+    workloads = {
+        "sample orgs (file order)": sample,
+        f"production mix ({args.batch:,}, 3% large)": production_mix(sample, args.batch),
+        "… large catalogs last": production_mix(sample, args.batch, large_last=True),
+    }
+    rows = []
+    for name, orgs in workloads.items():
+        estimates = [org_estimate(classifier, o, cal) for o in orgs]
+        for tpm in (None, 2_000_000, 200_000):
+            runs = {p: simulate(estimates, args.concurrency, tpm, p) for p in ("fifo", "paced", "size")}
+            fifo, size = runs["fifo"], runs["size"]
+            rows.append((
+                name, f"{tpm:,}" if tpm else "none",
+                f"{fifo['makespan'] / 60:7.1f} min" + (f" ({fifo['rateLimited']:,} × 429)" if fifo["rateLimited"] else ""),
+                f"{runs['paced']['makespan'] / 60:7.1f} min",
+                f"{size['makespan'] / 60:7.1f} min",
+                f"{1 - size['makespan'] / fifo['makespan']:6.1%}",
+            ))
+    _report(
+        f"Simulated makespan, concurrency {args.concurrency} (predicted call times ±30% lognormal noise)",
+        rows, ("workload", "TPM", "file order", "file order, paced", "size-aware", "saved"),
+    )
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+SECTIONS = {
+    "startup": bench_startup,
+    "prompt":  bench_prompt,
+    "prompt-accuracy": bench_prompt_accuracy,
+    "quality": bench_quality,
+    "schedule": bench_schedule,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("section", choices=sorted(SECTIONS) + ["all"])
+    parser.add_argument("--repeat", type=int, default=10, help="Repetitions per timed measurement")
+    parser.add_argument("--orgs", type=int, default=100_000, help="Dataset size for the quality section")
+    parser.add_argument("--batch", type=int, default=1000, help="Batch size for the schedule section")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Parallel requests for the schedule and prompt-accuracy sections")
+    parser.add_argument("--labels", help="Reviewed results JSON (by _id) for the prompt-accuracy section")
+    parser.add_argument("--labelled", type=int, default=200, help="Labelled orgs to classify for prompt-accuracy")
+    parser.add_argument("--model", default="gpt-4o-mini", help="Model for the prompt-accuracy section")
+    args = parser.parse_args()
+    for name, fn in SECTIONS.items():
+        if args.section in (name, "all"):
+            fn(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Cooperative cancellation for batch classification.
+A CancellationToken is shared between the code driving a batch (CLI, Streamlit
+button, another thread) and the batch loop, which checks it between orgs.
+"""
+
+import threading
+from typing import Optional
+
+
+class CancellationToken:
+    """Thread-safe flag a batch loop polls between organizations"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "Cancelled by user"):
+        """Request cancellation. Orgs already in flight finish; the rest are skipped."""
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep up to `timeout` seconds, waking as soon as cancel() is called. Returns cancelled."""
+        return self._event.wait(timeout)
+
+    def reset(self):
+        self.reason = None
+        self._event.clear()
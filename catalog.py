@@ -0,0 +1,226 @@
+"""
+Catalog normalization applied before an org is prompted.
+Placeholder names ("Piezas", "Item", "N/A") and repeated rows are dropped, and
+SKU variants that differ only by colour, size or code tokens
+(H02-SPOTLIGHT-BLK-3W-WHWW/BX, H109-SPOTLIGHT-GRN-3W-WHWW/BX …) are folded into
+one representative carrying a "variantCount". The model reports percentages
+over the rows it was shown and names the representatives it put in each
+industry; apply_variant_weights() then weights them by their count in Python,
+so percentages stay true to the full catalog while the prompt only lists each
+product family once, without empty fields.
+"""
+
+import logging
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from records import operation_type_from_name, round_percentages
+
+logger = logging.getLogger(__name__)
+
+WEIGHT_KEY = "variantCount"
+VARIANTS_KEY = "variantProducts"    # per industry in the reply: representatives the model put there
+
+# Names that say nothing about the product — whole-name matches only
+PLACEHOLDER_NAMES = frozenset({
+    "piezas", "pieza", "pza", "pzas", "pieces", "piece", "pcs", "item", "items", "producto",
+    "productos", "product", "products", "articulo", "articulos", "article", "test", "testing",
+    "prueba", "sample", "muestra", "na", "n a", "none", "null", "nil", "unknown", "misc",
+    "miscellaneous", "varios", "otros", "other", "others", "general", "new", "nuevo", "default",
+    "demo", "xxx", "abc", "asdf", "sin nombre", "no name", "barang", "lainnya",
+})
+
+# Tokens that only distinguish variants of one product
+COLOUR_TOKENS = frozenset({
+    "blk", "bk", "black", "wht", "wh", "white", "red", "rd", "blu", "bl", "blue", "grn", "gr",
+    "green", "yel", "yl", "yellow", "gry", "grey", "gray", "brn", "brown", "pnk", "pink", "pur",
+    "purple", "org", "orange", "gld", "gold", "slv", "silver", "beige", "navy", "maroon",
+    "negro", "blanco", "rojo", "azul", "verde", "amarillo", "gris", "rosa", "morado", "marron",
+    "hitam", "putih", "merah", "biru", "hijau", "kuning",
+})
+SIZE_TOKENS = frozenset({"xxs", "xs", "s", "m", "l", "xl", "xxl", "xxxl", "sm", "md", "lg", "small",
+                         "medium", "large", "mini", "big", "pequeno", "mediano", "grande"})
+# Colour / size codes that are also ordinary words or abbreviations ("Org" = organic, "Gr" = gram,
+# "L" = litre) — they only count as variant tokens after a code separator: "Kaos - M", "TEE-BL-L"
+AMBIGUOUS_TOKENS = frozenset({"s", "m", "l", "sm", "md", "lg", "bk", "wh", "rd", "bl", "gr", "yl", "org"})
+
+_SPLIT = re.compile(r"[\W_]+")
+_SEGMENT = re.compile(r"[-/_|,;()\[\]]+")
+_DIGIT = re.compile(r"\d")
+_LETTER = re.compile(r"[^\W\d_]")
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    text = unicodedata.normalize("NFKD", str(text or "").lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in _SPLIT.split(text) if t]
+
+
+def _informative(text: Optional[str]) -> bool:
+    tokens = _tokens(text)
+    return bool(tokens) and " ".join(tokens) not in PLACEHOLDER_NAMES and any(_LETTER.search(t) for t in tokens)
+
+
+def is_junk(product: Dict) -> bool:
+    """
+    Placeholder row: the name is empty, a placeholder ("Piezas", "Otros") or digits
+    only, and neither categoryName nor description says anything either.
+    """
+    return not any(_informative(product.get(k)) for k in ("productName", "categoryName", "discription"))
+
+
+def _is_variant_token(token: str, suffix: bool) -> bool:
+    if _DIGIT.search(token):
+        return True
+    if token not in COLOUR_TOKENS and token not in SIZE_TOKENS:
+        return False
+    return suffix or token not in AMBIGUOUS_TOKENS
+
+
+def _variant_stem(name: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Name tokens minus colour / size / code tokens, or None if too little is left to group on.
+    AMBIGUOUS_TOKENS are only dropped from the segments after the first code separator.
+    """
+    segments = [_tokens(segment) for segment in _SEGMENT.split(str(name or ""))]
+    tokens = [t for segment in segments for t in segment]
+    stem = tuple(t for n, segment in enumerate(segments) for t in segment if not _is_variant_token(t, n > 0))
+    if len(stem) == len(tokens) or not any(len(t) >= 3 for t in stem):
+        return None
+    return stem
+
+
+def product_weight(product: Dict) -> int:
+    """Catalog products a (possibly folded) product stands for."""
+    return int(product.get(WEIGHT_KEY) or 1)
+
+
+def fold_products(products: List[Dict]) -> List[Dict]:
+    """
+    Drop junk and duplicate rows and fold SKU variants, keeping first-seen order.
+    Kept products lose their empty fields — an absent key reads the same as "".
+
+    Duplicates (same name and category up to case, accents and punctuation) are
+    dropped without weight; variants (same category and same name once colour,
+    size and code tokens are removed) become the first variant with
+    "variantCount" set to the family size. Short codes that are also words
+    (AMBIGUOUS_TOKENS: S, M, L, Org, Gr …) only count after a code separator, so
+    "Susu Org" (organic milk) does not fold with "Susu Gr". A catalog that is
+    entirely junk is returned unchanged — there is nothing better to send.
+    """
+    kept: List[Dict] = []
+    seen = set()
+    families: Dict[Tuple, int] = {}
+    for product in products:
+        if is_junk(product):
+            continue
+        tokens = _tokens(product.get("productName"))
+        category = tuple(_tokens(product.get("categoryName")))
+        exact = (tuple(tokens), category)
+        if exact in seen:
+            continue
+        seen.add(exact)
+        stem = _variant_stem(product.get("productName"))
+        if stem is not None and (stem, category) in families:
+            rep = kept[families[(stem, category)]]
+            rep[WEIGHT_KEY] = product_weight(rep) + product_weight(product)
+            continue
+        if stem is not None:
+            families[(stem, category)] = len(kept)
+        kept.append({k: v for k, v in product.items() if v not in ("", None)})
+    return kept if kept else list(products)
+
+
+def fold_org(org: Dict) -> Dict:
+    """The org as it is prompted — a shallow copy with folded product_names."""
+    return dict(org, product_names=fold_products(org.get("product_names") or []))
+
+
+def _name_key(name) -> str:
+    return " ".join(_tokens(name))
+
+
+def apply_variant_weights(result: Dict, org: Dict) -> Dict:
+    """
+    Turn the model's per-row percentages into catalog percentages, in place.
+
+    Each industry's row share of the prompted (folded) catalog is taken from its
+    percentage; every representative it names under "variantProducts" adds its
+    variantCount - 1 extra products. Representatives are keyed by name and category,
+    so one name folded in two categories keeps both weights: an industry naming it
+    claims them all, several industries naming it share them out in catalog order.
+    The shares are then re-rounded to multiples of 5 summing to 100. primaryIndustry
+    follows the largest share when the model had picked its own largest one (not when
+    an org-name rule chose it), or when its industry drops out (again not
+    for an org-name rule: HOTEL → Hotels & Villa stays, listed or not). The "variantProducts"
+    lists are removed either way. A reply that names no representatives while the
+    catalog has folded variants is left unweighted, with a warning logged.
+
+    Args:
+        result: Parsed model reply (dict shape of the USER_PROMPT_TEMPLATE schema).
+        org:    The org as given to the classifier (folded again here — folding is idempotent).
+
+    Returns:
+        The same result dict.
+    """
+    industries = result.get("classification", {}).get("industries")
+    if not isinstance(industries, list):
+        return result
+    named = [ind.pop(VARIANTS_KEY, None) if isinstance(ind, dict) else None for ind in industries]
+    products = fold_products(org.get("product_names") or [])
+    weights = {(_name_key(p.get("productName")), _name_key(p.get("categoryName"))): product_weight(p)
+               for p in products if product_weight(p) > 1}
+    if not any(named):
+        if weights:
+            logger.warning("%s: reply names no %s for %d folded products; percentages left unweighted",
+                           org.get("orgName") or org.get("_id") or "org", VARIANTS_KEY, len(weights))
+        return result
+    if not all(isinstance(ind, dict) and isinstance(ind.get("percentage"), (int, float)) for ind in industries):
+        return result
+
+    families: Dict[str, List[int]] = {}                  # name → its (name, category) weights, catalog order
+    for (name, _), weight in weights.items():
+        families.setdefault(name, []).append(weight)
+    claimants: Dict[str, List[int]] = {}                 # name → industries naming it, reply order
+    for n, names in enumerate(named):
+        for key in {_name_key(x) for x in (names if isinstance(names, list) else []) if isinstance(x, str)}:
+            if key in families:
+                claimants.setdefault(key, []).append(n)
+    extra = [0] * len(industries)
+    for name, by in claimants.items():
+        for k, weight in enumerate(families[name]):
+            extra[by[k % len(by)]] += weight - 1
+
+    top = max(industries, key=lambda ind: ind["percentage"])["industry"]
+    counts: Dict[str, float] = {}
+    for ind, added in zip(industries, extra):
+        counts[ind["industry"]] = counts.get(ind["industry"], 0.0) + ind["percentage"] / 100 * len(products) + added
+    shares = dict(round_percentages(counts))
+    kept = {}
+    for ind in industries:
+        if shares.get(ind["industry"]) and ind["industry"] not in kept:
+            kept[ind["industry"]] = dict(ind, percentage=shares[ind["industry"]])
+    industries[:] = sorted(kept.values(), key=lambda ind: -ind["percentage"])
+    primary = result.get("primaryIndustry")
+    forced = operation_type_from_name(org.get("orgName", ""))[1]
+    if industries and (primary == top or primary not in kept and primary != forced):
+        result["primaryIndustry"] = industries[0]["industry"]
+    result["classification"]["isMultiIndustry"] = len(industries) >= 2
+    return result
+
+
+def fold_stats(orgs) -> Dict:
+    """Product rows before and after folding over a set of orgs."""
+    before = after = junk = 0
+    for org in orgs:
+        products = org.get("product_names") or []
+        before += len(products)
+        after += len(fold_products(products))
+        junk += sum(1 for p in products if is_junk(p))
+    return {
+        "products":   before,
+        "prompted":   after,
+        "junk":       junk,
+        "folded":     round(1 - after / before, 3) if before else 0.0,
+    }
@@ -0,0 +1,312 @@
+"""
+Deduplicated, disk-backed store for uploaded organization files.
+Each upload is parsed once per content hash — in a streaming fashion — into an
+indexed SQLite file. Sessions keep only a small DatasetHandle and page orgs on
+demand, so memory stays flat however many analysts open the same export.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+CHUNK_SIZE = 1 << 20   # 1 MiB
+
+# Flat (CSV / XLSX) exports: one row per product, org columns repeated
+ORG_FIELDS = ("_id", "orgName", "businessId", "countryCode")
+PRODUCT_FIELDS = ("productName", "categoryName", "unit", "productCode", "typeOfCommodity", "discription")
+
+
+# ----------------------------------------------------------------------
+# Streaming parsers
+# ----------------------------------------------------------------------
+
+def _text(f: IO[bytes]) -> io.TextIOWrapper:
+    return io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+
+
+def iter_json_array(f: IO[bytes]) -> Iterator[Dict]:
+    """Yield org objects from a JSON array (or a single top-level object) without loading it whole."""
+    text = _text(f)
+    try:
+        yield from _decode_stream(text)
+    finally:
+        text.detach()   # leave the caller's file object open
+
+
+def iter_json_array_spans(f: IO[bytes]) -> Iterator[Tuple[int, int, Dict]]:
+    """Yield (start_byte, end_byte, org) for each top-level object of a JSON array file (see org_index)."""
+    base = 3 if f.read(3) == b"\xef\xbb\xbf" else 0
+    f.seek(base)
+    text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+    try:
+        yield from _decode_stream(text, base)
+    finally:
+        text.detach()
+
+
+def _decode_stream(text: io.TextIOWrapper, offset: Optional[int] = None) -> Iterator:
+    """
+    Decode the top-level objects of a JSON array (or a single object) chunk by chunk.
+    With `offset` — the byte position `text` starts at — yields (start_byte, end_byte, obj)
+    instead of bare objects.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, started, eof = "", 0, False, False
+    byte_pos = offset or 0
+
+    while True:
+        # skip whitespace, the opening bracket and separators (all one byte each)
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+            byte_pos += 1
+        if not started and pos < len(buf):
+            started = True
+            if buf[pos] == "[":
+                pos += 1
+                byte_pos += 1
+                continue
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf):
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                if offset is None:
+                    yield obj
+                else:
+                    size = len(buf[pos:end].encode("utf-8"))
+                    yield byte_pos, byte_pos + size, obj
+                    byte_pos += size
+                pos = end
+                continue
+        elif eof:
+            return
+
+        chunk = text.read(CHUNK_SIZE)
+        buf, pos = buf[pos:] + chunk, 0
+        eof = not chunk
+
+
+def iter_jsonl(f: IO[bytes]) -> Iterator[Dict]:
+    text = _text(f)
+    try:
+        for line in text:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    finally:
+        text.detach()
+
+
+def _group_flat_rows(rows: Iterator[Dict]) -> Iterator[Dict]:
+    """Fold consecutive product rows that share an org _id into one org object."""
+    org = None
+    for row in rows:
+        org_id = str(row.get("_id") or "")
+        if org is None or org_id != org["_id"]:
+            if org is not None:
+                yield org
+            org = {k: ("" if row.get(k) is None else str(row.get(k))) for k in ORG_FIELDS}
+            org["_id"] = org_id
+            org["product_names"] = []
+        if row.get("productName"):
+            product = {k: ("" if row.get(k) is None else row.get(k)) for k in PRODUCT_FIELDS}
+            try:
+                product["typeOfCommodity"] = int(product["typeOfCommodity"] or 0)
+            except (TypeError, ValueError):
+                product["typeOfCommodity"] = 0
+            org["product_names"].append(product)
+    if org is not None:
+        yield org
+
+
+def iter_csv(f: IO[bytes]) -> Iterator[Dict]:
+    text = _text(f)
+    try:
+        yield from _group_flat_rows(csv.DictReader(text))
+    finally:
+        text.detach()
+
+
+def iter_xlsx(f: IO[bytes]) -> Iterator[Dict]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(f, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+        yield from _group_flat_rows(dict(zip(header, r)) for r in rows)
+    finally:
+        wb.close()   # also when parsing fails or the generator is abandoned
+
+
+PARSERS = {"json": iter_json_array, "jsonl": iter_jsonl, "csv": iter_csv, "xlsx": iter_xlsx}
+
+
+# ----------------------------------------------------------------------
+# Store
+# ----------------------------------------------------------------------
+
+class DatasetHandle:
+    """Lightweight reference to an ingested dataset — safe to keep in session state"""
+
+    def __init__(self, path: str, digest: str, name: str, count: int):
+        self.path = path
+        self.digest = digest
+        self.name = name
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+
+    def page(self, offset: int = 0, limit: int = 100) -> List[Dict]:
+        """Orgs [offset, offset + limit) in file order."""
+        with self._connect() as con:
+            rows = con.execute(
+                "SELECT data FROM orgs WHERE idx >= ? ORDER BY idx LIMIT ?", (offset, limit)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def get(self, org_id: str) -> Optional[Dict]:
+        """Look up one org by _id."""
+        with self._connect() as con:
+            row = con.execute("SELECT data FROM orgs WHERE org_id = ? LIMIT 1", (str(org_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def take(self, indices: List[int]) -> List[Dict]:
+        """Orgs at the given positions, in the order requested."""
+        found = {}
+        with self._connect() as con:
+            for start in range(0, len(indices), 500):
+                chunk = indices[start:start + 500]
+                found.update(con.execute(
+                    f"SELECT idx, data FROM orgs WHERE idx IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall())
+        return [json.loads(found[i]) for i in indices]
+
+    def strata_keys(self) -> List[Tuple[str, int]]:
+        """(countryCode, product count) per org in file order — from indexed columns, no JSON parsed."""
+        with self._connect() as con:
+            return con.execute("SELECT country, product_count FROM orgs ORDER BY idx").fetchall()
+
+    def iter(self, batch: int = 500) -> Iterator[Dict]:
+        """Stream every org without materializing the dataset."""
+        offset = 0
+        while offset < self.count:
+            chunk = self.page(offset, batch)
+            if not chunk:
+                return
+            yield from chunk
+            offset += len(chunk)
+
+
+class DatasetStore:
+    """Content-addressed directory of ingested datasets, shared by all sessions"""
+
+    def __init__(self, root: str = ".dataset_cache"):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._building: Dict[str, threading.Event] = {}   # digest -> set when its parse ends
+
+    @staticmethod
+    def detect_format(filename: str) -> str:
+        ext = os.path.splitext(filename)[1].lower().lstrip(".")
+        if ext == "ndjson":
+            ext = "jsonl"
+        if ext not in PARSERS:
+            raise ValueError(f"Unsupported file type '.{ext}' — use JSON, JSONL, CSV or XLSX.")
+        return ext
+
+    @staticmethod
+    def content_hash(f: IO[bytes]) -> str:
+        h = hashlib.sha256()
+        f.seek(0)
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+        f.seek(0)
+        return h.hexdigest()
+
+    def ingest(self, f: IO[bytes], filename: str) -> DatasetHandle:
+        """
+        Parse an uploaded file into the store, or reuse it if the same bytes were seen before.
+
+        Args:
+            f:        Binary file object (e.g. a Streamlit UploadedFile).
+            filename: Original name — the extension selects the parser.
+
+        Returns:
+            DatasetHandle for paging the orgs.
+        """
+        fmt = self.detect_format(filename)
+        digest = self.content_hash(f)
+        path = os.path.join(self.root, f"{digest}.sqlite")
+
+        # The lock covers only the hash lookup and the commit, so uploads of different files
+        # parse in parallel; a session uploading bytes already being parsed waits for that parse.
+        building = None
+        while True:
+            with self._lock:
+                if os.path.exists(path):
+                    break
+                pending = self._building.get(digest)
+                if pending is None:
+                    building = self._building[digest] = threading.Event()
+                    break
+            pending.wait()
+
+        if building is not None:
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                self._build(PARSERS[fmt](f), tmp)
+                with self._lock:
+                    os.replace(tmp, path)
+            finally:
+                with self._lock:
+                    del self._building[digest]
+                building.set()
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+        with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as con:
+            count = con.execute("SELECT COUNT(*) FROM orgs").fetchone()[0]
+        return DatasetHandle(path, digest, filename, count)
+
+    @staticmethod
+    def _build(orgs: Iterator[Dict], path: str, batch: int = 1000):
+        con = sqlite3.connect(path)
+        try:
+            con.execute("""CREATE TABLE orgs (
+                idx           INTEGER PRIMARY KEY,
+                org_id        TEXT,
+                org_name      TEXT,
+                country       TEXT,
+                product_count INTEGER,
+                data          TEXT
+            )""")
+            rows = []
+            for idx, org in enumerate(orgs):
+                rows.append((
+                    idx, str(org.get("_id", "")), org.get("orgName", ""), org.get("countryCode", ""),
+                    len(org.get("product_names") or []), json.dumps(org, ensure_ascii=False),
+                ))
+                if len(rows) >= batch:
+                    con.executemany("INSERT INTO orgs VALUES (?, ?, ?, ?, ?, ?)", rows)
+                    rows = []
+            if rows:
+                con.executemany("INSERT INTO orgs VALUES (?, ?, ?, ?, ?, ?)", rows)
+            con.execute("CREATE INDEX orgs_org_id ON orgs (org_id)")
+            con.commit()
+        finally:
+            con.close()
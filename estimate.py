@@ -0,0 +1,304 @@
+"""
+Sample-based estimate of a dataset's industry mix.
+Orgs are stratified by countryCode and catalog-size band and a proportional
+random sample is classified in rounds. After each round the stratified shares
+of primaryIndustry, operationType and multi-industry orgs are re-estimated
+with confidence intervals, and sampling stops once every interval is tight
+enough — a dataset-level answer for a small fraction of a full run.
+
+    python estimate.py export.json --target 0.03 --max-samples 2000
+"""
+
+import math
+import random
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from cancellation import CancellationToken
+
+SIZE_BANDS = (10, 30, 60)           # catalog-size band upper bounds; larger catalogs form the last band
+Z_SCORES = {0.90: 1.645, 0.95: 1.96, 0.99: 2.576}
+
+
+def size_band(product_count: int) -> str:
+    lower = 1
+    for upper in SIZE_BANDS:
+        if product_count <= upper:
+            return f"{lower}-{upper}"
+        lower = upper + 1
+    return f"{lower}+"
+
+
+def _wilson(p: float, n: float, z: float) -> Tuple[float, float]:
+    if n <= 0:
+        return 0.0, 1.0
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+# ----------------------------------------------------------------------
+# Stratified sampling
+# ----------------------------------------------------------------------
+
+class StratifiedSample:
+    """Draws orgs without replacement, proportionally across countryCode × size-band strata"""
+
+    def __init__(self, keys: Sequence[Tuple[str, int]], min_country_share: float = 0.01, seed: int = 0):
+        """
+        Args:
+            keys:              (countryCode, productCount) per org, in dataset order.
+            min_country_share: Countries with a smaller share of the orgs share one "other"
+                               stratum per size band, so no stratum is too thin to sample.
+            seed:              Sampling seed (same seed, same sample).
+        """
+        countries = Counter(str(c or "—") for c, _ in keys)
+        floor = min_country_share * len(keys)
+        self.strata: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        self.stratum_of: List[Tuple[str, str]] = []
+        for idx, (country, count) in enumerate(keys):
+            country = str(country or "—")
+            key = (country if countries[country] >= floor else "other", size_band(count or 0))
+            self.strata[key].append(idx)
+            self.stratum_of.append(key)
+        rng = random.Random(seed)
+        for members in self.strata.values():
+            rng.shuffle(members)
+        self.population = len(keys)
+        self.drawn: Counter = Counter()
+
+    @property
+    def exhausted(self) -> bool:
+        return sum(self.drawn.values()) >= self.population
+
+    def draw(self, n: int) -> List[int]:
+        """
+        Next n org indices. Each stratum's running total tracks its population share
+        (largest remainder rounding), so every prefix of the sample stays proportional.
+        """
+        total = min(self.population, sum(self.drawn.values()) + n)
+        want = {h: total * len(m) / self.population for h, m in self.strata.items()}
+        quota = {h: max(0, min(len(self.strata[h]), int(w)) - self.drawn[h]) for h, w in want.items()}
+        short = total - sum(self.drawn.values()) - sum(quota.values())
+        by_remainder = sorted(want, key=lambda h: want[h] - int(want[h]), reverse=True)
+        for h in by_remainder:
+            if short <= 0:
+                break
+            if self.drawn[h] + quota[h] < want[h]:      # never past the stratum's rounded-up share
+                quota[h] += 1
+                short -= 1
+        for h in reversed(by_remainder):        # strata ahead of their share from earlier rounds
+            if short >= 0:
+                break
+            if quota[h]:
+                quota[h] -= 1
+                short += 1
+        picked = []
+        for h, q in quota.items():
+            picked += self.strata[h][self.drawn[h]:self.drawn[h] + q]
+            self.drawn[h] += q
+        return picked
+
+
+# ----------------------------------------------------------------------
+# Stratified estimates
+# ----------------------------------------------------------------------
+
+class DistributionEstimator:
+    """Stratified share estimates with confidence intervals over classified sample orgs"""
+
+    def __init__(self, sample: StratifiedSample, confidence: float = 0.95):
+        self.sample = sample
+        self.z = Z_SCORES.get(confidence) or 1.96
+        self.confidence = confidence
+        self.ok: Counter = Counter()                           # stratum -> classified orgs
+        self.errors = 0
+        self.counts: Dict[str, Dict[Tuple, Counter]] = {
+            "primaryIndustry": defaultdict(Counter),
+            "operationType":   defaultdict(Counter),
+            "isMultiIndustry": defaultdict(Counter),
+        }
+
+    def add(self, index: int, result: Dict):
+        """Record the classification of sample org `index` (failed results only count as errors)."""
+        clf = result.get("classification", {})
+        if "error" in clf:
+            self.errors += 1
+            return
+        h = self.sample.stratum_of[index]
+        self.ok[h] += 1
+        self.counts["primaryIndustry"][h][result.get("primaryIndustry") or "Unknown"] += 1
+        self.counts["operationType"][h][result.get("operationType") or "Unknown"] += 1
+        self.counts["isMultiIndustry"][h][bool(clf.get("isMultiIndustry"))] += 1
+
+    def _share(self, field: str, value) -> Dict:
+        """Stratified share of `value` with its interval; unsampled strata are left out and reweighted."""
+        sampled = [h for h in self.ok if self.ok[h]]
+        weight = sum(len(self.sample.strata[h]) for h in sampled)
+        p = var = 0.0
+        for h in sampled:
+            n_h, N_h = self.ok[h], len(self.sample.strata[h])
+            w = N_h / weight
+            p_h = self.counts[field][h][value] / n_h
+            p += w * p_h
+            var += w * w * (1 - n_h / N_h) * p_h * (1 - p_h) / max(n_h - 1, 1)
+        n = sum(self.ok.values())
+        if n >= self.sample.population:
+            low, high = p, p
+        else:
+            low, high = _wilson(p, p * (1 - p) / var if var > 0 else n, self.z)
+        return {"value": value, "share": round(p, 4), "low": round(low, 4), "high": round(high, 4)}
+
+    def distribution(self, field: str) -> List[Dict]:
+        values = set()
+        for c in self.counts[field].values():
+            values.update(c)
+        return sorted((self._share(field, v) for v in values), key=lambda s: -s["share"])
+
+    def max_halfwidth(self) -> float:
+        """Widest interval half-width over every reported share (1.0 before any result)."""
+        if not self.ok:
+            return 1.0
+        shares = self.distribution("primaryIndustry") + self.distribution("operationType")
+        shares.append(self._share("isMultiIndustry", True))
+        return max((s["high"] - s["low"]) / 2 for s in shares)
+
+    def report(self) -> Dict:
+        multi = self._share("isMultiIndustry", True) if self.ok else None
+        return {
+            "population":      self.sample.population,
+            "sampled":         sum(self.sample.drawn.values()),
+            "classified":      sum(self.ok.values()),
+            "errors":          self.errors,
+            "strata":          len(self.sample.strata),
+            "confidence":      self.confidence,
+            "maxHalfWidth":    round(self.max_halfwidth(), 4),
+            "primaryIndustry": self.distribution("primaryIndustry"),
+            "operationType":   self.distribution("operationType"),
+            "multiIndustry":   {k: multi[k] for k in ("share", "low", "high")} if multi else None,
+        }
+
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+
+def _dataset_access(dataset) -> Tuple[List[Tuple[str, int]], Callable[[List[int]], List[Dict]]]:
+    """(strata keys, fetch by indices) for a DatasetHandle, an OrgIndex or a list of org dicts."""
+    if hasattr(dataset, "strata_keys"):
+        return dataset.strata_keys(), dataset.take
+    keys = [(o.get("countryCode"), len(o.get("product_names") or [])) for o in dataset]
+    return keys, lambda indices: [dataset[i] for i in indices]
+
+
+def estimate_distribution(
+    classifier,
+    dataset,
+    target_halfwidth: float = 0.03,
+    confidence: float = 0.95,
+    min_samples: int = 200,
+    max_samples: int = 2000,
+    round_size: int = 100,
+    concurrency: int = 8,
+    seed: int = 0,
+    cancel_token: Optional[CancellationToken] = None,
+    on_round: Optional[Callable[[Dict], None]] = None,
+    on_result: Optional[Callable[[int, Dict], None]] = None,
+    on_usage: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """
+    Estimate the industry mix of a dataset from a stratified sample.
+
+    Args:
+        classifier:       IndustryClassifier (its classify_stream runs each round).
+        dataset:          DatasetHandle, OrgIndex or list of org dicts.
+        target_halfwidth: Stop once every share's interval is within ± this.
+        confidence:       Interval level (0.90, 0.95 or 0.99).
+        min_samples:      Orgs classified before the stopping rule is checked.
+        max_samples:      Hard cap on orgs sent to the classifier.
+        round_size:       Orgs drawn per round after the first.
+        concurrency:      Parallel LLM calls within a round.
+        seed:             Sampling seed.
+        cancel_token:     Stops after the current round; the estimate so far is returned.
+        on_round:         Called with the interim report after every round.
+        on_result:        Called with (dataset index, result) for every sample org.
+        on_usage:         Called with planner.usage_record() of every API call.
+
+    Returns:
+        Report dict (see DistributionEstimator.report) plus "rounds" and "stoppedBy":
+        precision | budget | exhausted | cancelled.
+    """
+    keys, fetch = _dataset_access(dataset)
+    sample = StratifiedSample(keys, seed=seed)
+    est = DistributionEstimator(sample, confidence)
+    rounds, stopped_by = 0, "exhausted"
+
+    while not sample.exhausted:
+        if cancel_token is not None and cancel_token.cancelled:
+            stopped_by = "cancelled"
+            break
+        drawn = sum(sample.drawn.values())
+        if drawn >= max_samples:
+            stopped_by = "budget"
+            break
+        size = min(max(min_samples, round_size) if not drawn else round_size, max_samples - drawn)
+        indices = sample.draw(size)
+        for pos, result in classifier.classify_stream(fetch(indices), concurrency=concurrency,
+                                                      cancel_token=cancel_token, on_usage=on_usage):
+            est.add(indices[pos], result)
+            if on_result is not None:
+                on_result(indices[pos], result)
+        rounds += 1
+        if on_round is not None:
+            on_round(dict(est.report(), rounds=rounds))
+        if sum(est.ok.values()) >= min_samples and est.max_halfwidth() <= target_halfwidth:
+            stopped_by = "precision"
+            break
+
+    return dict(est.report(), rounds=rounds, stoppedBy=stopped_by)
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+def main():
+    import argparse
+    import json
+
+    from org_index import OrgIndex
+    from prompt import IndustryClassifier
+
+    parser = argparse.ArgumentParser(description="Estimate the industry mix of an export from a stratified sample")
+    parser.add_argument("input", help="JSON array or JSON Lines export")
+    parser.add_argument("--target", type=float, default=0.03, help="Interval half-width to stop at")
+    parser.add_argument("--max-samples", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--out", help="Write the report here as JSON")
+    args = parser.parse_args()
+
+    def progress(report: Dict):
+        print(f"round {report['rounds']}: {report['classified']:,} classified · "
+              f"widest interval ±{report['maxHalfWidth']:.1%}")
+
+    with OrgIndex(args.input) as index:
+        report = estimate_distribution(IndustryClassifier(model=args.model), index, args.target,
+                                       max_samples=args.max_samples, concurrency=args.concurrency,
+                                       on_round=progress)
+    print(f"\nStopped by {report['stoppedBy']} after {report['classified']:,} of {report['population']:,} orgs")
+    for field in ("primaryIndustry", "operationType"):
+        print(f"\n{field}")
+        for s in report[field]:
+            print(f"  {s['value']:<34} {s['share']:6.1%}  [{s['low']:.1%} – {s['high']:.1%}]")
+    if report["multiIndustry"]:
+        m = report["multiIndustry"]
+        print(f"\nmulti-industry  {m['share']:6.1%}  [{m['low']:.1%} – {m['high']:.1%}]")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
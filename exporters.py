@@ -0,0 +1,202 @@
+"""
+Streaming exporters for classification results.
+All formats share one flattened column layout. XLSX uses openpyxl's
+write-only mode with named styles registered once, CSV uses the csv module and
+Parquet is written in row groups — memory stays bounded by one chunk of rows.
+"""
+
+import csv
+import hashlib
+import io
+import json
+from typing import IO, Dict, Iterable, Iterator, List
+
+from records import iter_result_dicts
+
+COLUMNS = [
+    "orgName", "productCount", "operationType", "primaryIndustry",
+    "isMultiIndustry",
+    "industry_1", "subcategory_1",
+    "industry_2", "subcategory_2",
+    "industry_3", "subcategory_3",
+]
+
+COLUMN_WIDTHS = {
+    "orgName": 28, "productCount": 13, "operationType": 22,
+    "primaryIndustry": 24, "isMultiIndustry": 14,
+    "industry_1": 24, "subcategory_1": 22,
+    "industry_2": 24, "subcategory_2": 22,
+    "industry_3": 24, "subcategory_3": 22,
+}
+
+MIME_TYPES = {
+    "json":    "application/json",
+    "xlsx":    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv":     "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def flatten(r: Dict) -> List:
+    """One result dict → one row in COLUMNS order (up to 3 industries)."""
+    clf = r.get("classification", {})
+    industries = clf.get("industries", [])
+    row = [
+        r.get("orgName", ""),
+        r.get("productCount", ""),
+        r.get("operationType", ""),
+        r.get("primaryIndustry", ""),
+        "TRUE" if clf.get("isMultiIndustry", False) else "FALSE",
+    ]
+    for n in range(3):
+        if n < len(industries):
+            row += [industries[n].get("industry", ""), industries[n].get("subCategory", "")]
+        else:
+            row += ["", ""]
+    return row
+
+
+def iter_rows(results: Iterable) -> Iterator[List]:
+    for r in iter_result_dicts(results):
+        yield flatten(r)
+
+
+def result_set_hash(results: Iterable) -> str:
+    """Content hash of a result set — the cache key for prepared exports."""
+    h = hashlib.sha256()
+    for r in iter_result_dicts(results):
+        h.update(json.dumps(r, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+# ----------------------------------------------------------------------
+# Writers
+# ----------------------------------------------------------------------
+
+def write_xlsx(results: Iterable, out: IO[bytes]):
+    """Styled workbook in openpyxl write-only mode — rows are streamed, never held."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+    thin = Side(style="thin", color="D0D8E8")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    center = Alignment(horizontal="center", vertical="center")
+    left = Alignment(horizontal="left", vertical="center")
+
+    def style(name, font, alignment, fill=None):
+        s = NamedStyle(name=name, font=font, alignment=alignment, border=border)
+        if fill is not None:
+            s.fill = fill
+        return s
+
+    base_font = Font(name="Arial", size=10)
+    alt_fill = PatternFill("solid", start_color="F0F4FA")
+    styles = [
+        style("hdr", Font(name="Arial", bold=True, color="FFFFFF", size=10),
+              Alignment(horizontal="center", vertical="center", wrap_text=True),
+              PatternFill("solid", start_color="1E3A5F")),
+        style("txt", base_font, left),
+        style("txt_alt", base_font, left, alt_fill),
+        style("num", base_font, center),
+        style("num_alt", base_font, center, alt_fill),
+        style("true", Font(name="Arial", size=10, color="065F46", bold=True), center,
+              PatternFill("solid", start_color="D1FAE5")),
+        style("false", Font(name="Arial", size=10, color="991B1B", bold=True), center,
+              PatternFill("solid", start_color="FEE2E2")),
+    ]
+
+    wb = Workbook(write_only=True)
+    for s in styles:
+        wb.add_named_style(s)
+    ws = wb.create_sheet("Classification Results")
+    for idx, name in enumerate(COLUMNS):
+        ws.column_dimensions[chr(ord("A") + idx)].width = COLUMN_WIDTHS.get(name, 18)
+    ws.freeze_panes = "A2"
+
+    def cell(value, style_name):
+        c = WriteOnlyCell(ws, value=value)
+        c.style = style_name
+        return c
+
+    ws.append([cell(name, "hdr") for name in COLUMNS])
+    multi_col = COLUMNS.index("isMultiIndustry")
+    count_col = COLUMNS.index("productCount")
+    for row_idx, row in enumerate(iter_rows(results), start=2):
+        alt = "_alt" if row_idx % 2 == 0 else ""
+        cells = []
+        for col_idx, value in enumerate(row):
+            if col_idx == multi_col:
+                cells.append(cell(value, "true" if value == "TRUE" else "false"))
+            elif col_idx == count_col:
+                cells.append(cell(value, "num" + alt))
+            else:
+                cells.append(cell(value, "txt" + alt))
+        ws.append(cells)
+
+    wb.save(out)
+
+
+def write_csv(results: Iterable, out: IO[str]):
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    writer.writerows(iter_rows(results))
+
+
+def write_parquet(results: Iterable, out, chunk_rows: int = 50_000):
+    """Parquet via pyarrow, one row group per chunk_rows results."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from e
+
+    schema = pa.schema([
+        (name, pa.int64() if name == "productCount" else pa.string()) for name in COLUMNS
+    ])
+
+    def table(rows):
+        cols = list(zip(*rows)) if rows else [[] for _ in COLUMNS]
+        arrays = []
+        for name, values in zip(COLUMNS, cols):
+            if name == "productCount":
+                arrays.append(pa.array([v if isinstance(v, int) else None for v in values], pa.int64()))
+            else:
+                arrays.append(pa.array([None if v is None else str(v) for v in values], pa.string()))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    with pq.ParquetWriter(out, schema) as writer:
+        rows = []
+        for row in iter_rows(results):
+            rows.append(row)
+            if len(rows) >= chunk_rows:
+                writer.write_table(table(rows))
+                rows = []
+        if rows:
+            writer.write_table(table(rows))
+
+
+def write_json(results: Iterable, out: IO[str]):
+    out.write("[")
+    for n, r in enumerate(iter_result_dicts(results)):
+        out.write(",\n" if n else "\n")
+        out.write(json.dumps(r, ensure_ascii=False, indent=2))
+    out.write("\n]")
+
+
+def export_bytes(results: Iterable, fmt: str) -> bytes:
+    """Render results in one of MIME_TYPES' formats and return the file contents."""
+    if fmt == "xlsx":
+        buf = io.BytesIO()
+        write_xlsx(results, buf)
+        return buf.getvalue()
+    if fmt == "parquet":
+        buf = io.BytesIO()
+        write_parquet(results, buf)
+        return buf.getvalue()
+    if fmt in ("csv", "json"):
+        text = io.StringIO(newline="") if fmt == "csv" else io.StringIO()
+        (write_csv if fmt == "csv" else write_json)(results, text)
+        return text.getvalue().encode("utf-8")
+    raise ValueError(f"Unknown export format '{fmt}'")
@@ -0,0 +1,209 @@
+"""
+Request hedging for tail-latency reduction.
+When a call has not answered by a dynamic percentile of recent latencies, a
+duplicate is sent (to a backup key/provider when one is configured) and
+whichever answers first wins. Latencies are timed from when a call starts
+running on the shared pool, so time spent queued behind other calls neither
+inflates the percentile nor brings a hedge forward.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Callable, Dict, Optional
+
+
+class _Attempt:
+    """One call on the pool, timed from when it starts running rather than when it was queued"""
+
+    __slots__ = ("fn", "began", "started", "finished")
+
+    def __init__(self, fn: Callable):
+        self.fn = fn
+        self.began = threading.Event()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def __call__(self):
+        self.started = time.monotonic()
+        self.began.set()
+        try:
+            return self.fn()
+        finally:
+            self.finished = time.monotonic()
+
+    @property
+    def latency(self) -> float:
+        return self.finished - self.started
+
+
+class HedgePolicy:
+    """Decides when to hedge, enforces the extra-spend cap and keeps stats"""
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        window: int = 200,
+        min_samples: int = 20,
+        min_delay: float = 1.0,
+        max_hedge_fraction: float = 0.10,
+        max_workers: int = 8,
+    ):
+        """
+        Args:
+            percentile:          Hedge once a call outlives this percentile of recent latencies.
+            window:              Number of recent latencies the percentile is computed over.
+            min_samples:         No hedging until this many latencies have been observed.
+            min_delay:           Never hedge sooner than this many seconds.
+            max_hedge_fraction:  Cap on hedges / requests — bounds the extra spend.
+            max_workers:         Thread pool size shared by primary and hedge calls.
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_hedge_fraction = max_hedge_fraction
+
+        self.max_workers = max_workers
+
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.late_finishes = 0      # losing calls that ran to completion anyway (and were billed)
+        self.time_saved = 0.0
+
+    def __getstate__(self) -> Dict:
+        # Pickled copies (e.g. for worker processes) get their own lock and thread pool
+        state = dict(self.__dict__)
+        del state["_lock"], state["_pool"]
+        return state
+
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hedge")
+
+    # ------------------------------------------------------------------
+    # Policy
+    # ------------------------------------------------------------------
+
+    def threshold(self) -> Optional[float]:
+        """Current hedge delay in seconds, or None while there is too little history."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        idx = min(len(ordered) - 1, int(round(self.percentile / 100 * (len(ordered) - 1))))
+        return max(self.min_delay, ordered[idx])
+
+    def _may_hedge(self) -> bool:
+        with self._lock:
+            return (self.hedges + 1) <= self.max_hedge_fraction * self.requests
+
+    def _record(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def run(self, primary: Callable, backup: Callable, on_late: Optional[Callable] = None):
+        """
+        Run primary(); if it is still running threshold() seconds after it started,
+        also run backup() and return whichever finishes first. A loser that has not
+        started is cancelled. One already running cannot be stopped and is billed
+        like any other call, so when it completes it is counted in stats(), its
+        latency joins the window and its return value goes to on_late.
+
+        Args:
+            primary: Zero-arg callable for the original request.
+            backup:  Zero-arg callable for the duplicate request.
+            on_late: Called with the loser's return value when it completes after the
+                     winner was returned (e.g. to record the tokens it used).
+
+        Returns:
+            The winning call's return value (exceptions propagate from the
+            winner, or from the survivor when one attempt fails).
+        """
+        with self._lock:
+            self.requests += 1
+
+        first = _Attempt(primary)
+        first_future = self._pool.submit(first)
+        delay = self.threshold()
+
+        if delay is None or not self._may_hedge():
+            value = first_future.result()
+            self._record(first.latency)
+            return value
+
+        # The hedge delay runs from when the primary starts, not from when it was queued
+        first.began.wait()
+        done, _ = wait([first_future], timeout=max(0.0, first.started + delay - time.monotonic()))
+        if done:
+            value = first_future.result()
+            self._record(first.latency)
+            return value
+
+        with self._lock:
+            self.hedges += 1
+        second = _Attempt(backup)
+        attempts = {first_future: first, self._pool.submit(second): second}
+        pending = set(attempts)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = done.pop()
+            if winner.exception() is not None and pending:
+                continue   # one attempt failed — wait for the survivor
+
+            won_at = time.monotonic()
+            self._record(attempts[winner].latency)
+            saved_from = None
+            if attempts[winner] is second and winner.exception() is None:
+                with self._lock:
+                    self.hedge_wins += 1
+                saved_from = won_at   # the real saving is known once the abandoned primary lands
+            for loser in pending | done:
+                if not loser.cancel():
+                    loser.add_done_callback(partial(self._late, attempts[loser], on_late,
+                                                    saved_from if attempts[loser] is first else None))
+            return winner.result()
+
+    def _late(self, attempt: _Attempt, on_late: Optional[Callable], saved_from: Optional[float],
+              future: Future):
+        """Account for a losing call that kept running after the winner was returned."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._record(attempt.latency)
+        with self._lock:
+            self.late_finishes += 1
+            if saved_from is not None:
+                self.time_saved += attempt.finished - saved_from
+        if on_late is not None:
+            on_late(future.result())
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict:
+        """Hedge rate, wins, losers billed anyway and wall-clock time saved so far."""
+        with self._lock:
+            requests, hedges, wins, saved = self.requests, self.hedges, self.hedge_wins, self.time_saved
+            late = self.late_finishes
+        return {
+            "requests":       requests,
+            "hedges":         hedges,
+            "hedgeRate":      hedges / requests if requests else 0.0,
+            "hedgeWins":      wins,
+            "lateFinishes":   late,
+            "timeSavedSec":   round(saved, 2),
+            "thresholdSec":   self.threshold(),
+        }
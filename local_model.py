@@ -0,0 +1,519 @@
+"""
+Local learned product classifier trained on past LLM labels.
+Product names are turned into hashed character n-grams and scored by a
+softmax-regression model (NumPy/SciPy, CPU only) whose probabilities are
+temperature-calibrated on held-out labels. A LocalRouter uses it to classify
+confident products locally and send only the uncertain rest to the LLM.
+
+Train from saved result files or the results warehouse:
+    python local_model.py train results/*.json --warehouse results.sqlite --out product_model.npz
+"""
+
+import json
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from catalog import product_weight
+from records import INDUSTRIES, iter_result_dicts, operation_type_from_name, round_percentages
+
+_SPACE = re.compile(r"\s+")
+
+MIN_COVERAGE = 0.5          # feature coverage below which the model abstains (see ProductModel.scores)
+PREDICT_CACHE = 10_000      # single-text predict() answers kept per model
+
+
+# ----------------------------------------------------------------------
+# Training labels
+# ----------------------------------------------------------------------
+
+def labelled_products(results: Iterable) -> Iterator[Tuple[str, str, str]]:
+    """
+    (productName, industry, subCategory) pairs from past classification results.
+
+    The LLM reports its per-product assignments as each industry's sampleProducts;
+    failed results and industries outside the taxonomy are skipped.
+    """
+    for r in iter_result_dicts(results):
+        clf = r.get("classification") or {}
+        if "error" in clf:
+            continue
+        for ind in clf.get("industries") or []:
+            industry = ind.get("industry")
+            if industry not in INDUSTRIES:
+                continue
+            for name in ind.get("sampleProducts") or []:
+                if isinstance(name, str) and name.strip():
+                    yield name, industry, ind.get("subCategory") or ""
+
+
+# ----------------------------------------------------------------------
+# Features
+# ----------------------------------------------------------------------
+
+def product_text(product: Dict) -> str:
+    """
+    What the model scores for a product — its name only, the same text it is trained on
+    (past results list products by name in sampleProducts, without their category).
+    """
+    return str(product.get("productName") or "")
+
+
+def _normalize(text: str) -> str:
+    return " " + _SPACE.sub(" ", text.lower()).strip() + " "
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    """32-bit avalanche finalizer so neighbouring n-grams land in unrelated buckets."""
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & 0xFFFFFFFF
+    h ^= h >> 16
+    return h
+
+
+def _hashed(texts: List[str], n_features: int, ngram_range: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Signed hashed byte n-grams of the space-padded lowercase texts as (row, feature, value)
+    triplets, summed per feature and L2-normalized per row. All texts are hashed together
+    with vector ops, so a batch costs microseconds per text.
+    """
+    encoded = [_normalize(t).encode("utf-8") for t in texts]
+    lengths = np.fromiter((len(e) for e in encoded), np.int64, len(encoded))
+    buf = np.frombuffer(b"".join(encoded), np.uint8).astype(np.uint64)
+    owner = np.repeat(np.arange(len(texts)), lengths)
+    ends = np.repeat(np.cumsum(lengths), lengths)
+    pos = np.arange(len(buf))
+
+    keys, signs = [], []
+    lo, hi = ngram_range
+    for n in range(lo, hi + 1):
+        start = pos[pos + n <= ends]
+        h = np.full(len(start), n * 0x9E3779B1 & 0xFFFFFFFF, np.uint64)
+        for j in range(n):
+            h = (h * 0x01000193 ^ buf[start + j]) & 0xFFFFFFFF
+        h = _mix(h)
+        keys.append(owner[start] * n_features + (h & (n_features - 1)).astype(np.int64))
+        signs.append(np.where(h & 0x80000000, 1.0, -1.0))
+
+    keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    values = np.bincount(inverse.ravel(), np.concatenate(signs), len(keys))
+    keep = values != 0
+    rows, cols, values = keys[keep] // n_features, keys[keep] % n_features, values[keep]
+    norms = np.sqrt(np.bincount(rows, values * values, len(texts)))
+    norms[norms == 0] = 1.0
+    return rows, cols, (values / norms[rows]).astype(np.float32)
+
+
+def _matrix(texts: List[str], n_features: int, ngram_range: Tuple[int, int]) -> sparse.csr_matrix:
+    rows, cols, values = _hashed(texts, n_features, ngram_range)
+    return sparse.csr_matrix((values, (rows, cols)), shape=(len(texts), n_features))
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+# ----------------------------------------------------------------------
+# Model
+# ----------------------------------------------------------------------
+
+class ProductModel:
+    """Hashed byte-n-gram softmax regression over industries with a fitted temperature"""
+
+    def __init__(self, classes: List[str], rows: np.ndarray, weights: np.ndarray, bias: np.ndarray,
+                 temperature: float = 1.0, n_features: int = 1 << 18, ngram_range: Tuple[int, int] = (3, 5),
+                 subcategories: Optional[Dict[str, str]] = None, metrics: Optional[Dict] = None,
+                 min_coverage: float = MIN_COVERAGE):
+        """
+        Args:
+            classes:       Industry per output column.
+            rows:          Sorted feature ids that have weights (all others are zero).
+            weights:       (len(rows), len(classes)) weight rows for those features.
+            bias:          Per-class bias.
+            temperature:   Logit divisor fitted on held-out labels (probability calibration).
+            n_features:    Hash space size (power of two).
+            ngram_range:   Character n-gram lengths.
+            subcategories: Most common subCategory per industry in the training labels.
+            metrics:       Held-out figures recorded at training time.
+            min_coverage:  Feature coverage below which the model abstains.
+        """
+        self.classes = list(classes)
+        self.rows = np.asarray(rows, np.int64)
+        self.weights = np.asarray(weights, np.float32)
+        self.bias = np.asarray(bias, np.float32)
+        self.temperature = float(temperature)
+        self.n_features = int(n_features)
+        self.ngram_range = (int(ngram_range[0]), int(ngram_range[1]))
+        self.subcategories = subcategories or {}
+        self.metrics = metrics or {}
+        self.min_coverage = float(min_coverage)
+        self._memo: Dict[str, Tuple[Optional[str], float]] = {}
+
+    # ------------------------------------------------------------------
+    # Training
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _fit(X: sparse.csr_matrix, y: np.ndarray, k: int, epochs: int, lr: float, l2: float):
+        n, d = X.shape
+        Y = np.zeros((n, k), np.float32)
+        Y[np.arange(n), y] = 1.0
+        W = np.zeros((d, k), np.float32)
+        b = np.zeros(k, np.float32)
+        vW, vb = np.zeros_like(W), np.zeros_like(b)
+        Xt = X.T.tocsr()
+        for _ in range(epochs):
+            G = (_softmax(X @ W + b) - Y) / n
+            gW = Xt @ G + l2 * W
+            vW = 0.9 * vW + gW
+            vb = 0.9 * vb + G.sum(axis=0)
+            W -= lr * vW
+            b -= lr * vb
+        return W, b
+
+    @staticmethod
+    def _fit_temperature(logits: np.ndarray, y: np.ndarray) -> float:
+        best_t, best_nll = 1.0, np.inf
+        for t in np.logspace(-1.3, 1.3, 53):
+            p = _softmax(logits / t)[np.arange(len(y)), y]
+            nll = -np.log(np.clip(p, 1e-12, None)).mean()
+            if nll < best_nll:
+                best_t, best_nll = float(t), nll
+        return best_t
+
+    @classmethod
+    def train(
+        cls,
+        examples: Iterable[Tuple[str, str, str]],
+        n_features: int = 1 << 18,
+        ngram_range: Tuple[int, int] = (3, 5),
+        epochs: int = 300,
+        lr: float = 2.0,
+        l2: float = 1e-5,
+        holdout: float = 0.2,
+        seed: int = 0,
+    ) -> "ProductModel":
+        """
+        Fit on (productName, industry, subCategory) examples, e.g. labelled_products(results).
+
+        A `holdout` share of the (deduplicated) examples is kept back to fit the
+        temperature and record accuracy / calibration error; the final weights are
+        then refit on everything.
+        """
+        if n_features & (n_features - 1):
+            raise ValueError("n_features must be a power of two")
+        votes: Dict[str, Counter] = defaultdict(Counter)
+        subs: Dict[str, Counter] = defaultdict(Counter)
+        for name, industry, sub in examples:
+            key = _normalize(name).strip()
+            votes[key][industry] += 1
+            if sub:
+                subs[industry][sub] += 1
+        if not votes:
+            raise ValueError("No labelled products to train on")
+
+        texts = list(votes)
+        labels = [votes[t].most_common(1)[0][0] for t in texts]
+        classes = sorted(set(labels))
+        y = np.array([classes.index(l) for l in labels])
+        X = _matrix(texts, n_features, ngram_range)
+        k = len(classes)
+
+        # Fit only the hashed features that occur — every other weight row stays zero
+        rows, cols = np.unique(X.indices, return_inverse=True)
+        X = sparse.csr_matrix((X.data, cols.ravel(), X.indptr), shape=(X.shape[0], len(rows)))
+
+        temperature, metrics = 1.0, {"examples": len(texts), "classes": k}
+        order = np.random.default_rng(seed).permutation(len(texts))
+        n_hold = int(len(texts) * holdout) if len(texts) >= 50 and k > 1 else 0
+        if n_hold:
+            hold, fit = order[:n_hold], order[n_hold:]
+            W, b = cls._fit(X[fit], y[fit], k, epochs, lr, l2)
+            logits = np.asarray(X[hold] @ W + b)
+            temperature = cls._fit_temperature(logits, y[hold])
+            p = _softmax(logits / temperature)
+            conf, pred = p.max(axis=1), p.argmax(axis=1)
+            bins = np.minimum((conf * 10).astype(int), 9)
+            ece = sum(abs((pred[bins == i] == y[hold][bins == i]).mean() - conf[bins == i].mean())
+                      * (bins == i).mean() for i in range(10) if (bins == i).any())
+            metrics.update(holdout=int(n_hold), accuracy=float((pred == y[hold]).mean()), ece=float(ece))
+
+        W, b = cls._fit(X, y, k, epochs, lr, l2) if k > 1 else (np.zeros((len(rows), 1), np.float32), np.zeros(1, np.float32))
+        return cls(classes, rows, W, b, temperature, n_features, ngram_range,
+                   {ind: c.most_common(1)[0][0] for ind, c in subs.items()}, metrics)
+
+    # ------------------------------------------------------------------
+    # Inference
+    # ------------------------------------------------------------------
+
+    def scores(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calibrated class probabilities plus feature coverage, one row per text.
+
+        Coverage is the share of a text's feature weight the model has seen in
+        training. Near 0, for vocabulary it knows nothing about, the logits are
+        little more than the bias, and the temperature fitted on held-out labels
+        turns that into near-certainty. Below min_coverage the model therefore
+        abstains: the row is uniform (1 / classes).
+        """
+        k = len(self.classes)
+        if not texts:
+            return np.empty((0, k), np.float32), np.empty(0, np.float32)
+        rows, cols, values = _hashed(texts, self.n_features, self.ngram_range)
+        pos = np.minimum(np.searchsorted(self.rows, cols), max(len(self.rows) - 1, 0))
+        hit = self.rows[pos] == cols if len(self.rows) else np.zeros(len(cols), bool)
+        logits = np.tile(self.bias, (len(texts), 1))
+        np.add.at(logits, rows[hit], values[hit, None] * self.weights[pos[hit]])
+        coverage = np.bincount(rows[hit], values[hit] ** 2, len(texts)).astype(np.float32)
+        proba = _softmax(logits / self.temperature)
+        proba[coverage < self.min_coverage] = 1.0 / k
+        return proba, coverage
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        """Calibrated class probabilities, one row per text."""
+        return self.scores(texts)[0]
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        (industry, probability) for one product name — (None, 1 / classes) when the model
+        abstains. A single text costs a few hundred µs of NumPy overhead, so answers are
+        memoized; score many texts at once with scores() / predict_proba() (~20 µs each).
+        """
+        hit = self._memo.get(text)
+        if hit is not None:
+            return hit
+        p, coverage = self.scores([text])
+        best = int(p[0].argmax())
+        answer = (None if coverage[0] < self.min_coverage else self.classes[best]), float(p[0][best])
+        if len(self._memo) >= PREDICT_CACHE:
+            self._memo.clear()
+        self._memo[text] = answer
+        return answer
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: str):
+        """Compressed .npz artifact (no pickled objects)."""
+        np.savez_compressed(
+            path,
+            classes=np.array(self.classes), rows=self.rows, weights=self.weights.astype(np.float16),
+            bias=self.bias, temperature=self.temperature, n_features=self.n_features,
+            ngram_range=np.array(self.ngram_range),
+            meta=np.array(json.dumps({"subcategories": self.subcategories, "metrics": self.metrics,
+                                      "minCoverage": self.min_coverage})),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ProductModel":
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            return cls([str(c) for c in z["classes"]], z["rows"], z["weights"].astype(np.float32), z["bias"],
+                       float(z["temperature"]), int(z["n_features"]), tuple(z["ngram_range"]),
+                       meta.get("subcategories"), meta.get("metrics"), meta.get("minCoverage", MIN_COVERAGE))
+
+
+# ----------------------------------------------------------------------
+# Routing
+# ----------------------------------------------------------------------
+
+class RoutePlan:
+    """How one org is split between the local model and the LLM"""
+
+    __slots__ = ("org", "mode", "local", "uncertain")
+
+    def __init__(self, org: Dict, mode: str, local: List[Tuple[Dict, str, float]], uncertain: List[Dict]):
+        self.org = org
+        self.mode = mode              # local | partial | llm
+        self.local = local            # (product, industry, probability) for confident products
+        self.uncertain = uncertain    # products the LLM has to label
+
+    @property
+    def llm_org(self) -> Dict:
+        """The org as sent to the LLM — only the uncertain products when partially routed."""
+        if self.mode != "partial":
+            return self.org
+        return dict(self.org, product_names=self.uncertain)
+
+
+class LocalRouter:
+    """Decides per org which products the local model keeps and which go to the LLM"""
+
+    def __init__(self, model: ProductModel, threshold: float = 0.9, max_uncertain: float = 0.3,
+                 min_coverage: float = MIN_COVERAGE):
+        """
+        Args:
+            model:         Trained ProductModel.
+            threshold:     Minimum calibrated probability for a local product label.
+            max_uncertain: Share of uncertain products (weighted by variantCount) above which
+                           the whole org goes to the LLM.
+            min_coverage:  Minimum feature coverage (see ProductModel.scores) for a local label.
+        """
+        self.model = model
+        self.threshold = threshold
+        self.max_uncertain = max_uncertain
+        self.min_coverage = min_coverage
+        self._lock = threading.Lock()
+        self._orgs = Counter()
+        self._products = Counter()
+
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def plan(self, org: Dict, record: bool = True) -> RoutePlan:
+        """Split an org's products into local labels and LLM work (record=False: leave stats() alone)."""
+        products = org.get("product_names") or []
+        local, uncertain = [], []
+        if products:
+            proba, coverage = self.model.scores([product_text(p) for p in products])
+            for product, p, cov in zip(products, proba, coverage):
+                best = int(p.argmax())
+                if p[best] >= self.threshold and cov >= self.min_coverage:
+                    local.append((product, self.model.classes[best], float(p[best])))
+                else:
+                    uncertain.append(product)
+
+        weight = sum(product_weight(p) for p in products)
+        if not products or sum(product_weight(p) for p in uncertain) > self.max_uncertain * weight:
+            mode, local, uncertain = "llm", [], list(products)
+        elif uncertain:
+            mode = "partial"
+        else:
+            mode = "local"
+        if record:
+            with self._lock:
+                self._orgs[mode] += 1
+                self._products["local"] += len(local)
+                self._products["llm"] += len(uncertain)
+        return RoutePlan(org, mode, local, uncertain)
+
+    def _industries(self, counts: Dict[str, float], samples: Dict[str, List[str]],
+                    subs: Dict[str, str]) -> List[Dict]:
+        return [
+            {
+                "industry": ind,
+                "subCategory": subs.get(ind) or self.model.subcategories.get(ind, ""),
+                "percentage": pct,
+                "sampleProducts": samples.get(ind, [])[:3],
+            }
+            for ind, pct in round_percentages(counts)
+        ]
+
+    def _local_counts(self, plan: RoutePlan) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+        counts: Dict[str, float] = Counter()
+        samples: Dict[str, List[str]] = defaultdict(list)
+        for product, industry, _ in plan.local:
+            counts[industry] += product_weight(product)
+            samples[industry].append(product.get("productName", ""))
+        return counts, samples
+
+    def _assemble(self, plan: RoutePlan, industries: List[Dict], op_type: Optional[str], confidence: float) -> Dict:
+        name_op, forced = operation_type_from_name(plan.org.get("orgName", ""))
+        # A name rule only picks among the predicted industries — it never adds one
+        names = [ind["industry"] for ind in industries]
+        primary = forced if forced in names else (names[0] if names else None)
+        if op_type is None:
+            op_type = name_op or ("Manufacturer" if primary == "Manufacturing Supplies" else "Seller")
+        return {
+            "orgName": plan.org.get("orgName", ""),
+            "productCount": None,
+            "primaryIndustry": primary,
+            "operationType": op_type,
+            "confidenceScore": round(min(1.0, max(0.5, confidence)), 2),
+            "AIreasoning": "",
+            "classification": {"isMultiIndustry": len(industries) >= 2, "industries": industries},
+        }
+
+    def local_result(self, plan: RoutePlan) -> Dict:
+        """Result for an org whose products were all labelled locally."""
+        counts, samples = self._local_counts(plan)
+        confidence = (sum(p * product_weight(prod) for prod, _, p in plan.local)
+                      / sum(product_weight(prod) for prod, _, _ in plan.local))
+        result = self._assemble(plan, self._industries(counts, samples, {}), None, confidence)
+        result["classifiedBy"] = "local"
+        return result
+
+    def merge(self, plan: RoutePlan, llm_result: Dict) -> Dict:
+        """Combine local labels with the LLM's result for the uncertain products."""
+        counts, samples = self._local_counts(plan)
+        subs = {}
+        n_llm = sum(product_weight(p) for p in plan.uncertain)
+        for ind in llm_result["classification"].get("industries", []):
+            counts[ind["industry"]] = counts.get(ind["industry"], 0) + ind.get("percentage", 0) / 100 * n_llm
+            samples[ind["industry"]] = list(ind.get("sampleProducts") or []) + samples.get(ind["industry"], [])
+            subs[ind["industry"]] = ind.get("subCategory", "")
+        n_local = sum(product_weight(prod) for prod, _, _ in plan.local)
+        confidence = (sum(p * product_weight(prod) for prod, _, p in plan.local)
+                      + (llm_result.get("confidenceScore") or 0.5) * n_llm) / (n_local + n_llm)
+        result = self._assemble(plan, self._industries(counts, samples, subs),
+                                llm_result.get("operationType"), confidence)
+        result["classifiedBy"] = "hybrid"
+        return result
+
+    def stats(self) -> Dict:
+        """How much traffic the local model absorbed."""
+        with self._lock:
+            orgs, products = dict(self._orgs), dict(self._products)
+        n_orgs = sum(orgs.values())
+        n_products = products.get("local", 0) + products.get("llm", 0)
+        return {
+            "orgs":             n_orgs,
+            "orgsLocal":        orgs.get("local", 0),
+            "orgsPartial":      orgs.get("partial", 0),
+            "orgsLLM":          orgs.get("llm", 0),
+            "products":         n_products,
+            "productsLocal":    products.get("local", 0),
+            "llmCallsAvoided":  round(orgs.get("local", 0) / n_orgs, 3) if n_orgs else 0.0,
+            "productsAbsorbed": round(products.get("local", 0) / n_products, 3) if n_products else 0.0,
+        }
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the local product model from past results")
+    sub = parser.add_subparsers(dest="command", required=True)
+    tr = sub.add_parser("train")
+    tr.add_argument("results", nargs="*", help="Result JSON / JSON Lines files")
+    tr.add_argument("--warehouse", help="ResultsWarehouse SQLite file to read results from")
+    tr.add_argument("--out", default="product_model.npz")
+    args = parser.parse_args()
+
+    def examples():
+        for path in args.results:
+            with open(path, "r", encoding="utf-8") as f:
+                if path.endswith((".jsonl", ".ndjson")):
+                    data = [json.loads(line) for line in f if line.strip()]
+                else:
+                    data = json.load(f)
+            yield from labelled_products(data if isinstance(data, list) else [data])
+        if args.warehouse:
+            from results_store import ResultsWarehouse
+            yield from labelled_products(ResultsWarehouse(args.warehouse).iter_results())
+
+    model = ProductModel.train(examples())
+    model.save(args.out)
+    print(f"Saved {args.out}: {model.metrics}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Byte-offset index for large organization exports.
+A one-time pass records where every org object starts and ends in a JSON array
+or JSON Lines file and keeps it in a sidecar "<file>.idx". Afterwards any _id,
+offset range or shard is read straight out of an mmap of the source without
+parsing the rest of the file.
+"""
+
+import json
+import mmap
+import os
+import tempfile
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from dataset_store import iter_json_array_spans
+
+INDEX_SUFFIX = ".idx"
+INDEX_HEADER = "#orgindex v1"
+
+
+# ----------------------------------------------------------------------
+# Indexing pass
+# ----------------------------------------------------------------------
+
+def _scan_jsonl(f) -> Iterator[Tuple[int, int, Dict]]:
+    offset = 0
+    for line in f:
+        start, offset = offset, offset + len(line)
+        body = line.strip()
+        if body:
+            if start == 0 and body.startswith(b"\xef\xbb\xbf"):
+                body, start = body[3:], 3
+            lead = len(line) - len(line.lstrip())
+            yield start + lead, start + lead + len(body), json.loads(body)
+
+
+def is_jsonl(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson")
+
+
+def build_index(path: str) -> str:
+    """
+    Scan an export once and write its sidecar index.
+
+    Args:
+        path: JSON array (or single object) / JSON Lines file of orgs.
+
+    Returns:
+        Path of the written "<path>.idx".
+    """
+    st = os.stat(path)
+    idx_path = path + INDEX_SUFFIX
+    # Own temp file per writer — workers opening a fresh export at once each build and rename theirs
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(idx_path) + ".", suffix=".tmp",
+                               dir=os.path.dirname(os.path.abspath(path)))
+    scan = _scan_jsonl if is_jsonl(path) else iter_json_array_spans
+    try:
+        with open(path, "rb") as src, open(fd, "w", encoding="utf-8") as out:
+            out.write(f"{INDEX_HEADER} size={st.st_size} mtime={st.st_mtime_ns}\n")
+            for start, end, org in scan(src):
+                org_id = str(org.get("_id", "")).replace("\t", " ").replace("\n", " ")
+                out.write(f"{start}\t{end}\t{org_id}\n")
+        os.replace(tmp, idx_path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return idx_path
+
+
+def _index_is_fresh(path: str, idx_path: str) -> bool:
+    if not os.path.exists(idx_path):
+        return False
+    st = os.stat(path)
+    with open(idx_path, "r", encoding="utf-8") as f:
+        header = f.readline().strip()
+    return header == f"{INDEX_HEADER} size={st.st_size} mtime={st.st_mtime_ns}"
+
+
+# ----------------------------------------------------------------------
+# Random access
+# ----------------------------------------------------------------------
+
+class OrgIndex:
+    """Random access to the orgs of an export through its sidecar index"""
+
+    def __init__(self, path: str, rebuild: bool = False):
+        """
+        Args:
+            path:    Source export (JSON array / JSON Lines).
+            rebuild: Force a fresh indexing pass even if the sidecar looks current.
+        """
+        self.path = path
+        idx_path = path + INDEX_SUFFIX
+        if rebuild or not _index_is_fresh(path, idx_path):
+            build_index(path)
+
+        self._starts = array("q")
+        self._ends = array("q")
+        self._ids: List[str] = []
+        with open(idx_path, "r", encoding="utf-8") as f:
+            f.readline()
+            for line in f:
+                start, end, org_id = line.rstrip("\n").split("\t", 2)
+                self._starts.append(int(start))
+                self._ends.append(int(end))
+                self._ids.append(org_id)
+        self._by_id: Optional[Dict[str, int]] = None
+
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "OrgIndex":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    def at(self, position: int) -> Dict:
+        """Org at a 0-based position in the file."""
+        return json.loads(self._mm[self._starts[position]:self._ends[position]])
+
+    def position_of(self, org_id: str) -> Optional[int]:
+        if self._by_id is None:
+            self._by_id = {}
+            for n, i in enumerate(self._ids):
+                self._by_id.setdefault(i, n)
+        return self._by_id.get(str(org_id))
+
+    def get(self, org_id: str) -> Optional[Dict]:
+        """Org with this _id, or None."""
+        pos = self.position_of(org_id)
+        return None if pos is None else self.at(pos)
+
+    def range(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        """Orgs at positions [start, stop)."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for n in range(max(0, start), stop):
+            yield self.at(n)
+
+    def take(self, positions: List[int]) -> List[Dict]:
+        """Orgs at the given positions, in the order requested."""
+        return [self.at(p) for p in positions]
+
+    def strata_keys(self) -> List[Tuple[str, int]]:
+        """(countryCode, product count) per org — every org is parsed once, none is kept."""
+        return [(org.get("countryCode") or "", len(org.get("product_names") or [])) for org in self.range()]
+
+    def shard(self, index: int, count: int) -> Iterator[Dict]:
+        """Contiguous shard `index` of `count` equal parts (0-based)."""
+        if not 0 <= index < count:
+            raise ValueError(f"shard index must be in [0, {count}), got {index}")
+        per = -(-len(self) // count)
+        return self.range(index * per, (index + 1) * per)
+
+    def select(self, org_ids: List[str]) -> Iterator[Dict]:
+        """Orgs with the given _ids, in the order requested (unknown ids are skipped)."""
+        for org_id in org_ids:
+            org = self.get(org_id)
+            if org is not None:
+                yield org
@@ -0,0 +1,286 @@
+"""
+Multi-core runner for very large classify_from_file jobs.
+One Python process runs out of CPU (JSON decoding, variant folding, local-model
+routing, post-processing) long before the API is saturated. The selected orgs
+are split into contiguous parts that a pool of worker processes classifies
+through their own classify_stream pipeline (the per-process I/O loop), every
+API call drawing on one rate limiter shared by all workers. Each part is
+written to its own file and the parts are merged back in input order.
+
+Inside a worker, in-flight calls run on classify_stream's LLM-stage threads
+rather than an asyncio event loop. The OpenAI client, HedgePolicy, RetryLane
+and the pipeline are all synchronous. A thread blocked on a socket releases
+the GIL, so `concurrency` threads keep that many calls open per process. An
+event loop would do the same work but need a second, async copy of the
+classifier.
+
+    python parallel.py export.json out.json --processes 8 --concurrency 8 --tpm 2000000
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from cancellation import CancellationToken
+from org_index import OrgIndex
+from planner import record_cost
+from records import dump_results
+from retry import RetryLane, is_retryable
+from scheduler import BURST_SECONDS
+
+_POLL = 0.5                 # seconds between cancellation checks while parts are running
+_PART_SIZE = 1000           # orgs per part at most — smaller parts balance the pool better
+
+
+# ----------------------------------------------------------------------
+# Shared rate limiter
+# ----------------------------------------------------------------------
+
+class GlobalRateLimiter:
+    """Requests- and tokens-per-minute buckets in shared memory, drawn on by every worker process"""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None, burst: float = BURST_SECONDS,
+                 context=None):
+        """
+        Args:
+            rpm:     Requests per minute for the whole node (None = unlimited).
+            tpm:     Tokens per minute for the whole node (None = unlimited).
+            burst:   Bucket capacity in seconds of the rate.
+            context: multiprocessing context the shared state is created in (default: spawn).
+                     Hand the limiter to workers when they start (Process args, pool initargs).
+        """
+        ctx = context or multiprocessing.get_context("spawn")
+        self.rates = (rpm / 60.0 if rpm else 0.0, tpm / 60.0 if tpm else 0.0)
+        self.capacity = (max(1.0, self.rates[0] * burst), self.rates[1] * burst)
+        self._lock = ctx.Lock()
+        self._state = ctx.RawArray("d", [self.capacity[0], self.capacity[1], time.monotonic()])
+        self._waited = ctx.RawValue("d", 0.0)
+
+    def acquire(self, tokens: float = 0.0) -> float:
+        """
+        Block until one request carrying `tokens` fits both buckets, then take it.
+        A call bigger than the token bucket goes out once the bucket is full.
+
+        Returns:
+            Seconds spent waiting.
+        """
+        started = time.monotonic()
+        need = (1.0, min(tokens, self.capacity[1]))
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed, self._state[2] = now - self._state[2], now
+                short = 0.0
+                for k in (0, 1):
+                    if self.rates[k]:
+                        self._state[k] = min(self.capacity[k], self._state[k] + elapsed * self.rates[k])
+                        short = max(short, (need[k] - self._state[k]) / self.rates[k])
+                if short <= 0:
+                    for k in (0, 1):
+                        if self.rates[k]:
+                            self._state[k] -= need[k]
+                    waited = now - started
+                    self._waited.value += waited
+                    return waited
+            time.sleep(min(short, 1.0))
+
+    @property
+    def waited(self) -> float:
+        """Seconds all workers together have spent waiting on the limiter."""
+        return self._waited.value
+
+
+# ----------------------------------------------------------------------
+# Worker side
+# ----------------------------------------------------------------------
+
+_worker: Dict = {}
+
+
+def _init_worker(classifier, limiter: Optional[GlobalRateLimiter]):
+    classifier.rate_limiter = limiter
+    _worker["classifier"] = classifier
+
+
+def _classify_part(input_file: str, positions: Sequence[int], part_file: str, concurrency: int) -> Dict:
+    """Classify the orgs at `positions` and write their results, in order, as JSON Lines."""
+    classifier = _worker["classifier"]
+    usage: List[Dict] = []
+    results: List[Optional[Dict]] = [None] * len(positions)
+    lane = RetryLane()
+    with OrgIndex(input_file) as index:
+        stream = classifier.classify_stream((index.at(p) for p in positions), concurrency=concurrency,
+                                            on_usage=usage.append)
+        for i, result in stream:
+            results[i] = result
+            if is_retryable(result):
+                lane.defer(i, index.at(positions[i]), result)
+    if len(lane):
+        retried = lane.drain(lambda org: classifier.classify_organization(org, on_usage=usage.append))
+        for i, result in retried.items():
+            results[i] = result
+
+    with open(part_file, "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return {
+        "orgs":   len(results),
+        "errors": sum(1 for r in results if "error" in r.get("classification", {})),
+        "calls":  len(usage),
+        "spent":  sum(record_cost(r) for r in usage),
+    }
+
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+
+def _read_part(part_file: str) -> Iterator[Dict]:
+    with open(part_file, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def classify_parallel(
+    classifier,
+    input_file: str,
+    output_file: str,
+    positions: Optional[Sequence[int]] = None,
+    processes: Optional[int] = None,
+    concurrency: int = 4,
+    rpm: Optional[int] = None,
+    tpm: Optional[int] = None,
+    part_size: Optional[int] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    on_result: Optional[Callable[[int, Dict], None]] = None,
+) -> Dict:
+    """
+    Classify orgs of an export across a pool of worker processes and write the merged results.
+
+    Workers are spawned, so scripts calling this need an `if __name__ == "__main__":` guard.
+
+    Args:
+        classifier:   IndustryClassifier — each worker gets a pickled copy with its own HTTP pool.
+        input_file:   JSON array or JSON Lines export (read through its OrgIndex).
+        output_file:  Merged results, a JSON array in the order of `positions`.
+        positions:    Org positions to classify (default: the whole file).
+        processes:    Worker processes (default: one per CPU core).
+        concurrency:  Parallel LLM calls inside each worker.
+        rpm:          Requests-per-minute limit shared by all workers (default: OPENAI_RPM env).
+        tpm:          Tokens-per-minute limit shared by all workers (default: OPENAI_TPM env).
+        part_size:    Orgs per part (default: about four parts per process, at most 1,000 orgs).
+        cancel_token: Once cancelled, parts not yet started are reported with errorType
+                      "cancelled"; running parts finish.
+        on_result:    Called with (position, result) for every org while the output is merged.
+
+    Returns:
+        Summary: orgs, errors, calls, spent (USD), processes, parts, rateLimitWait (s), seconds.
+    """
+    started = time.monotonic()
+    processes = processes or os.cpu_count() or 1
+    rpm = rpm if rpm is not None else int(os.getenv("OPENAI_RPM", 0)) or None
+    tpm = tpm if tpm is not None else int(os.getenv("OPENAI_TPM", 0)) or None
+    with OrgIndex(input_file) as index:            # built here once, not by every worker at the same time
+        if positions is None:
+            positions = range(len(index))
+    size = part_size or max(1, min(_PART_SIZE, -(-len(positions) // (processes * 4))))
+    parts = [positions[s:s + size] for s in range(0, len(positions), size)]
+
+    ctx = multiprocessing.get_context("spawn")
+    limiter = GlobalRateLimiter(rpm, tpm, context=ctx) if (rpm or tpm) else None
+    workdir = tempfile.mkdtemp(prefix=".parts-", dir=os.path.dirname(os.path.abspath(output_file)))
+    stats: Dict[int, Dict] = {}
+    failed: Dict[int, str] = {}
+    try:
+        with ProcessPoolExecutor(max_workers=processes, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(classifier, limiter)) as pool:
+            futures = {
+                pool.submit(_classify_part, input_file, part, os.path.join(workdir, f"{k}.jsonl"), concurrency): k
+                for k, part in enumerate(parts)
+            }
+            pending = set(futures)
+            while pending:
+                if cancel_token is not None and cancel_token.cancelled:
+                    for fut in pending:
+                        fut.cancel()
+                finished, pending = wait(pending, timeout=_POLL, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    k = futures[fut]
+                    if fut.cancelled():
+                        failed[k] = "cancelled"
+                        continue
+                    try:
+                        stats[k] = fut.result()
+                    except Exception as e:
+                        failed[k] = f"Worker failed: {e}"
+                        continue
+                    print(f"[{len(stats)}/{len(parts)}] part {k}: {stats[k]['orgs']} orgs, "
+                          f"{stats[k]['errors']} errors")
+
+        classifier_cls = type(classifier)
+
+        def merged() -> Iterator[Dict]:
+            with OrgIndex(input_file) as index:
+                for k, part in enumerate(parts):
+                    if k in stats:
+                        rows = _read_part(os.path.join(workdir, f"{k}.jsonl"))
+                    elif failed[k] == "cancelled":
+                        reason = (cancel_token.reason if cancel_token else None) or "Cancelled"
+                        rows = (classifier_cls._error_result(index.at(p), reason, "cancelled") for p in part)
+                    else:
+                        rows = (classifier_cls._error_result(index.at(p), failed[k]) for p in part)
+                    for p, result in zip(part, rows):
+                        if on_result is not None:
+                            on_result(p, result)
+                        yield result
+
+        dump_results(merged(), output_file, indent=2)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "orgs":          len(positions),
+        "errors":        sum(s["errors"] for s in stats.values()) + sum(len(parts[k]) for k in failed),
+        "calls":         sum(s["calls"] for s in stats.values()),
+        "spent":         round(sum(s["spent"] for s in stats.values()), 4),
+        "processes":     processes,
+        "parts":         len(parts),
+        "rateLimitWait": round(limiter.waited, 1) if limiter else 0.0,
+        "seconds":       round(time.monotonic() - started, 1),
+    }
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+def main():
+    import argparse
+
+    from prompt import IndustryClassifier
+
+    parser = argparse.ArgumentParser(description="Classify an export across all CPU cores")
+    parser.add_argument("input", help="JSON array or JSON Lines export")
+    parser.add_argument("output", help="Where the merged results are written")
+    parser.add_argument("--processes", type=int, help="Worker processes (default: CPU cores)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel LLM calls per process")
+    parser.add_argument("--rpm", type=int, help="Requests-per-minute limit (default: OPENAI_RPM)")
+    parser.add_argument("--tpm", type=int, help="Tokens-per-minute limit (default: OPENAI_TPM)")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    args = parser.parse_args()
+
+    summary = classify_parallel(IndustryClassifier(model=args.model), args.input, args.output,
+                                processes=args.processes, concurrency=args.concurrency,
+                                rpm=args.rpm, tpm=args.tpm)
+    print(f"\n{summary['orgs']:,} orgs in {summary['seconds']:.0f}s on {summary['processes']} processes · "
+          f"{summary['errors']:,} errors · ${summary['spent']:.2f} on {summary['calls']:,} calls · "
+          f"{summary['rateLimitWait']:.0f}s waiting on the rate limit")
+
+
+if __name__ == "__main__":
+    main()
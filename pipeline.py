@@ -0,0 +1,139 @@
+"""
+Staged generator pipeline over bounded queues.
+Each stage runs on its own worker thread(s) and hands items to the next through
+a queue.Queue of fixed size, so upstream stages work ahead of slow downstream
+ones by at most `queue_size` items — a fast reader blocks instead of loading the
+whole input into memory while the API is slow.
+"""
+
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from cancellation import CancellationToken
+
+_DONE = object()       # end-of-stream marker passed down the queues
+_POLL = 0.1            # seconds between stop checks while blocked on a queue
+
+
+class Stage:
+    """One pipeline step: fn(item) returns the items to pass on (none, one or several)"""
+
+    def __init__(self, name: str, fn: Callable[[object], Iterable], workers: int = 1):
+        """
+        Args:
+            name:    Label used in thread names and error messages.
+            fn:      Called once per input item; returns an iterable of output items.
+            workers: Threads running this stage in parallel (output order is not kept).
+        """
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+
+
+class Pipeline:
+    """Runs a source iterable through a chain of stages and yields the final items"""
+
+    def __init__(self, stages: List[Stage], queue_size: int = 16,
+                 cancel_token: Optional[CancellationToken] = None):
+        """
+        Args:
+            stages:       Stages in order; the last stage's outputs are yielded.
+            queue_size:   Capacity of every inter-stage queue (the backpressure bound).
+            cancel_token: Once cancelled, the source stops being read; items already
+                          inside the pipeline still flow through to the consumer.
+        """
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.cancel_token = cancel_token
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    # ------------------------------------------------------------------
+    # Blocking queue ops that give up once the pipeline is stopped
+    # ------------------------------------------------------------------
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, stage: str, exc: BaseException):
+        if self._error is None:
+            self._error = RuntimeError(f"Pipeline stage '{stage}' failed: {exc}")
+            self._error.__cause__ = exc
+        self._stop.set()
+
+    # ------------------------------------------------------------------
+    # Threads
+    # ------------------------------------------------------------------
+
+    def _read(self, source: Iterable, out: queue.Queue):
+        try:
+            for item in source:
+                if self.cancel_token is not None and self.cancel_token.cancelled:
+                    break
+                if not self._put(out, item):
+                    return
+        except Exception as e:
+            self._fail("read", e)
+        self._put(out, _DONE)
+
+    def _work(self, stage: Stage, inq: queue.Queue, out: queue.Queue, remaining: List[int], lock: threading.Lock):
+        try:
+            while True:
+                item = self._get(inq)
+                if item is _DONE:
+                    self._put(inq, _DONE)         # let sibling workers see it too
+                    break
+                for produced in stage.fn(item):
+                    if not self._put(out, produced):
+                        return
+        except Exception as e:
+            self._fail(stage.name, e)
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            self._put(out, _DONE)
+
+    def run(self, source: Iterable) -> Iterator:
+        """Start the stage threads and yield final outputs as they arrive."""
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._read, args=(source, queues[0]),
+                                    name="pipeline-read", daemon=True)]
+        for n, stage in enumerate(self.stages):
+            remaining, lock = [stage.workers], threading.Lock()
+            threads += [
+                threading.Thread(target=self._work, args=(stage, queues[n], queues[n + 1], remaining, lock),
+                                 name=f"pipeline-{stage.name}-{w}", daemon=True)
+                for w in range(stage.workers)
+            ]
+        for t in threads:
+            t.start()
+
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            # Consumer finished, stopped early or a stage failed — release every blocked thread
+            self._stop.set()
+            for t in threads:
+                t.join()
+        if self._error is not None:
+            raise self._error
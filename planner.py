@@ -0,0 +1,428 @@
+"""
+Pre-run cost / time planning and a runtime spend governor.
+plan_run() builds the prompts a run would actually send for the selected orgs
+(folding, local routing and section retrieval included), counts their tokens
+locally and prices them; output tokens and latency come from calls measured in
+past runs (ResultsWarehouse.call_history), so the estimate tracks the real
+model instead of a fixed seconds-per-org guess. SpendGovernor keeps a running
+batch inside a spend cap and deadline: it switches to a cheaper model when the
+projection overshoots and pauses dispatching once the cap is reached.
+"""
+
+import functools
+import statistics
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from cancellation import CancellationToken
+from records import Organization
+
+# USD per 1M tokens (input, output)
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o":      (2.50, 10.00),
+}
+CHEAPER = {"gpt-4o": "gpt-4o-mini"}    # where a governed run degrades to — gpt-4o-mini has no cheaper fallback
+
+MESSAGE_OVERHEAD = 4        # chat-format tokens per message on top of its content
+MIN_CALLS = 20              # measured calls a model needs before its figures replace the defaults
+PLAN_SAMPLE = 200           # orgs actually prompted and tokenized per plan; the rest is scaled
+
+# Used until enough calls are measured — ~300-token replies at gpt-4o-mini speed
+DEFAULT_OUTPUT  = (280.0, 1.0)      # output tokens  = a + b × prompted products
+DEFAULT_LATENCY = (0.6, 0.012)      # seconds / call = a + b × (output tokens + PREFILL_WEIGHT × input tokens)
+PREFILL_WEIGHT  = 1 / 80            # reading a prompt token takes ~1/80 the time of writing a reply token
+DEFAULT_SPREAD  = (0.75, 1.6)       # actual / predicted wall time, low and high
+
+
+@functools.lru_cache(maxsize=None)
+def token_counter() -> Tuple[Callable[[str], int], str]:
+    """(counter, label) — tiktoken's o200k_base (gpt-4o family) when available, else ~4 characters per token."""
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding("o200k_base")
+        return (lambda text: len(enc.encode(text))), "o200k_base"
+    except Exception:
+        return (lambda text: len(text) // 4), "≈4 chars/token, tiktoken encoding unavailable"
+
+
+def message_tokens(messages: List[Dict]) -> int:
+    count, _ = token_counter()
+    return sum(count(m["content"]) + MESSAGE_OVERHEAD for m in messages)
+
+
+def price(model: str) -> Tuple[float, float]:
+    """(input, output) USD per 1M tokens; dated snapshots match their family, unknown models price as gpt-4o."""
+    for name in sorted(PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return PRICES[name]
+    return PRICES["gpt-4o"]
+
+
+def call_cost(model: str, input_tokens: float, output_tokens: float) -> float:
+    p_in, p_out = price(model)
+    return (input_tokens * p_in + output_tokens * p_out) / 1e6
+
+
+def expected_tokens(messages: List[Dict], products: int) -> float:
+    """Tokens a call is expected to use against a TPM limit — its prompt plus the default reply estimate."""
+    return message_tokens(messages) + DEFAULT_OUTPUT[0] + DEFAULT_OUTPUT[1] * products
+
+
+def usage_record(model: str, messages: List[Dict], response, latency: float, products: int) -> Dict:
+    """One measured API call, as stored by ResultsWarehouse.add_calls()."""
+    usage = getattr(response, "usage", None)
+    return {
+        "model":            model,
+        "products":         products,
+        "estInputTokens":   message_tokens(messages),
+        "promptTokens":     getattr(usage, "prompt_tokens", None),
+        "completionTokens": getattr(usage, "completion_tokens", None),
+        "latency":          round(latency, 3),
+    }
+
+
+def record_cost(record: Dict) -> float:
+    """Cost of a usage_record — the local token count stands in when the API reported no usage."""
+    tokens_in = record.get("promptTokens") or record.get("estInputTokens") or 0
+    tokens_out = record.get("completionTokens") or DEFAULT_OUTPUT[0]
+    return call_cost(record["model"], tokens_in, tokens_out)
+
+
+# ----------------------------------------------------------------------
+# Calibration on past calls
+# ----------------------------------------------------------------------
+
+def _fit(xs: List[float], ys: List[float], default: Tuple[float, float]) -> Tuple[float, float]:
+    """Least-squares (intercept, slope) with a non-negative slope, or `default` on too few points."""
+    if len(xs) < MIN_CALLS:
+        return default
+    mx, my = statistics.fmean(xs), statistics.fmean(ys)
+    sxx = sum((x - mx) ** 2 for x in xs)
+    slope = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx if sxx else 0.0
+    if slope <= 0:
+        return my, 0.0
+    return max(0.0, my - slope * mx), slope
+
+
+class Calibration:
+    """Per-model output-token and latency figures fitted on measured calls"""
+
+    def __init__(self, records: Iterable[Dict] = ()):
+        """
+        Args:
+            records: usage_record() dicts of past calls (see ResultsWarehouse.call_history).
+                     Models with fewer than MIN_CALLS measured calls use the defaults.
+        """
+        by_model: Dict[str, List[Dict]] = defaultdict(list)
+        for r in records:
+            if r.get("completionTokens") and r.get("latency"):
+                by_model[r["model"]].append(r)
+        self.calls = sum(len(v) for v in by_model.values() if len(v) >= MIN_CALLS)
+
+        self._output = {m: _fit([r["products"] or 0 for r in rs], [r["completionTokens"] for r in rs], DEFAULT_OUTPUT)
+                        for m, rs in by_model.items()}
+        self._latency = {m: _fit([self._work(r["completionTokens"], r.get("promptTokens") or r.get("estInputTokens"))
+                                  for r in rs], [r["latency"] for r in rs], DEFAULT_LATENCY)
+                         for m, rs in by_model.items()}
+
+        # Local token counts vs what the API billed — corrects the ~4 chars/token fallback
+        pairs = [(r["promptTokens"], r["estInputTokens"]) for rs in by_model.values() for r in rs
+                 if r.get("promptTokens") and r.get("estInputTokens")]
+        self.input_scale = (sum(p for p, _ in pairs) / sum(e for _, e in pairs)) if len(pairs) >= MIN_CALLS else 1.0
+
+        ratios = sorted(
+            r["latency"] / self.latency(m, r["completionTokens"], r.get("promptTokens") or r.get("estInputTokens"))
+            for m, rs in by_model.items() if len(rs) >= MIN_CALLS for r in rs
+        )
+        if len(ratios) >= MIN_CALLS:
+            self.spread = (ratios[len(ratios) // 10], ratios[len(ratios) * 9 // 10])
+        else:
+            self.spread = DEFAULT_SPREAD
+
+    def output_tokens(self, model: str, products: int) -> float:
+        a, b = self._output.get(model, DEFAULT_OUTPUT)
+        return a + b * products
+
+    @staticmethod
+    def _work(output_tokens: float, input_tokens: Optional[float]) -> float:
+        return output_tokens + PREFILL_WEIGHT * (input_tokens or 0)
+
+    def latency(self, model: str, output_tokens: float, input_tokens: float = 0.0) -> float:
+        a, b = self._latency.get(model, DEFAULT_LATENCY)
+        return a + b * self._work(output_tokens, input_tokens)
+
+
+# ----------------------------------------------------------------------
+# Pre-run plan
+# ----------------------------------------------------------------------
+
+def spread_positions(count: int, n: int = PLAN_SAMPLE) -> List[int]:
+    """Up to n positions in [0, count), evenly spread from the first to the last."""
+    if count <= n:
+        return list(range(count))
+    return [i * (count - 1) // (n - 1) for i in range(n)] if n > 1 else [0]
+
+
+def org_estimate(classifier, org: Dict, calibration: Calibration) -> Optional[Dict]:
+    """
+    Predicted model, inputTokens, outputTokens, seconds and cost of one org's API call,
+    or None when the local router labels the org without one.
+    """
+    if isinstance(org, Organization):
+        org = org.to_dict()
+    prompt_org = classifier._prompt_org(org)
+    plan = classifier._plan(prompt_org, record=False)
+    if plan is not None and plan.mode == "local":
+        return None
+    llm_org = plan.llm_org if plan else prompt_org
+    model = classifier._model_for(org)
+    t_in = calibration.input_scale * message_tokens(classifier._build_messages(llm_org))
+    t_out = calibration.output_tokens(model, len(llm_org.get("product_names") or []))
+    return {
+        "model":        model,
+        "inputTokens":  t_in,
+        "outputTokens": t_out,
+        "seconds":      calibration.latency(model, t_out, t_in),
+        "cost":         call_cost(model, t_in, t_out),
+    }
+
+
+def plan_run(
+    classifier,
+    orgs: List[Dict],
+    total: Optional[int] = None,
+    concurrency: int = 4,
+    rpm: Optional[int] = None,
+    tpm: Optional[int] = None,
+    calibration: Optional[Calibration] = None,
+) -> Dict:
+    """
+    Predict tokens, cost and wall time of classifying `orgs` with `classifier`.
+
+    Args:
+        classifier:  IndustryClassifier the run will use (its folding, routing, prompt
+                     retrieval and strong-model settings all shape the prompts).
+        orgs:        The orgs to run, or an evenly spread sample of them.
+        total:       Orgs in the full run when `orgs` is a sample (default: len(orgs)).
+        concurrency: Parallel requests the run will use.
+        rpm, tpm:    Account rate limits (requests / tokens per minute), None = unlimited.
+        calibration: Fitted figures from past calls (default: built-in defaults).
+
+    Returns:
+        Dict with orgs, llmCalls, localOrgs, inputTokens, outputTokens, tokensPerProduct,
+        cost, costPerOrg, seconds, secondsLow, secondsHigh, bottleneck
+        (concurrency | rpm | tpm), models ({model: calls}), calibratedCalls and tokenizer.
+    """
+    cal = calibration or Calibration()
+    _, tokenizer = token_counter()
+    total = len(orgs) if total is None else total
+    scale = total / len(orgs) if orgs else 0.0
+
+    calls = local = products = 0
+    tokens_in = tokens_out = busy = cost = 0.0
+    models: Dict[str, int] = defaultdict(int)
+    for org in orgs:
+        est = org_estimate(classifier, org, cal)
+        if est is None:
+            local += 1
+            continue
+        calls += 1
+        products += len(org.get("product_names") or [])
+        tokens_in += est["inputTokens"]
+        tokens_out += est["outputTokens"]
+        busy += est["seconds"]
+        cost += est["cost"]
+        models[est["model"]] += 1
+
+    # Wall time is whichever runs out first: request slots, requests/min or tokens/min
+    limits = {"concurrency": busy * scale / max(1, concurrency)}
+    if rpm:
+        limits["rpm"] = calls * scale / rpm * 60
+    if tpm:
+        limits["tpm"] = (tokens_in + tokens_out) * scale / tpm * 60
+    bottleneck = max(limits, key=limits.get)
+    seconds = limits[bottleneck]
+    low, high = cal.spread if bottleneck == "concurrency" else (1.0, 1.0 + (cal.spread[1] - 1) / 2)
+
+    return {
+        "orgs":             total,
+        "llmCalls":         round(calls * scale),
+        "localOrgs":        round(local * scale),
+        "inputTokens":      round(tokens_in * scale),
+        "outputTokens":     round(tokens_out * scale),
+        "tokensPerProduct": round((tokens_in + tokens_out) / products, 1) if products else 0.0,
+        "cost":             round(cost * scale, 4),
+        "costPerOrg":       cost / len(orgs) if orgs else 0.0,
+        "seconds":          round(seconds, 1),
+        "secondsLow":       round(seconds * low, 1),
+        "secondsHigh":      round(seconds * high, 1),
+        "bottleneck":       bottleneck,
+        "models":           {m: round(n * scale) for m, n in models.items()},
+        "calibratedCalls":  cal.calls,
+        "tokenizer":        tokenizer,
+    }
+
+
+# ----------------------------------------------------------------------
+# Runtime governor
+# ----------------------------------------------------------------------
+
+class SpendGovernor:
+    """Keeps a running batch inside a spend cap and a deadline — safe to use from any thread"""
+
+    def __init__(self, budget: Optional[float] = None, deadline: Optional[float] = None, total: int = 0,
+                 plan: Optional[Dict] = None, min_orgs: int = 10, model: Optional[str] = None):
+        """
+        Args:
+            budget:   Spend cap in USD (None = no cap). Dispatching pauses once spend plus
+                      the expected cost of calls in flight would reach it.
+            deadline: Wall-clock budget of the run in seconds (None = none). Only used to
+                      degrade early; orgs past the deadline are skipped by the runner.
+            total:    Orgs in the run.
+            plan:     plan_run() result — the cost and time per org assumed until min_orgs
+                      are done. Without one, a capped run sends a single probe call and
+                      uses its measured cost before fanning out.
+            min_orgs: Completed orgs before measured figures replace the plan's.
+            model:    The run's default model (whether a cheaper fallback exists is judged
+                      on the plan's models, else on this one).
+        """
+        self.budget = budget
+        self.deadline = deadline
+        self.total = total
+        self.min_orgs = min_orgs
+        self._planned_cost = (plan or {}).get("costPerOrg")
+        self._planned_seconds = (plan or {}).get("seconds")
+        self._planned_models = (plan or {}).get("models") or ({model: 1} if model else {})
+
+        self.mode = "normal"            # normal | degraded | paused (update() may also answer "probing")
+        self.spent = 0.0
+        self.records: List[Dict] = []
+        self.events: List[str] = []     # why the governor degraded or paused, in order
+        self._degraded = False
+        self._degrade_tried = False
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._resumed = threading.Event()
+
+    @property
+    def paused(self) -> bool:
+        return self.mode == "paused"
+
+    def record(self, usage: Dict):
+        """on_usage callback for the classifier — one measured call."""
+        with self._lock:
+            self.records.append(usage)
+            self.spent += record_cost(usage)
+
+    def model_override(self, model: str) -> Optional[str]:
+        """Model every call should use while degraded (None = the classifier's own choice)."""
+        return CHEAPER.get(model, model) if self._degraded else None
+
+    def _cost_per_org(self, done: int) -> Optional[float]:
+        """Expected cost of the next org — None until a plan-less run has measured a call."""
+        if done >= self.min_orgs or (done and self.records and self._planned_cost is None):
+            return self.spent / done
+        return self._planned_cost
+
+    def update(self, done: int, in_flight: int = 0) -> str:
+        """
+        Re-evaluate before dispatching the next org.
+
+        Args:
+            done:      Orgs completed so far.
+            in_flight: Orgs sent but not yet completed.
+
+        Returns:
+            The mode the next dispatch runs in: normal | degraded | paused — or "probing"
+            (hold further dispatches until the calls in flight are measured) while a capped
+            run without a plan has no cost figure yet.
+        """
+        with self._lock:
+            if self.mode == "paused":
+                return self.mode
+            per_org = self._cost_per_org(done)
+            remaining = max(0, self.total - done)
+            if self.budget is not None and self.spent >= self.budget:
+                return self._pause()
+            if self.budget is not None and per_org is None and in_flight:
+                return "probing"
+            if self.budget is not None and per_org is not None:
+                if self.spent + (in_flight + 1) * per_org > self.budget:
+                    return self._pause()
+                if not self._degrade_tried and self.spent + remaining * per_org > self.budget:
+                    self._degrade(f"projected ${self.spent + remaining * per_org:.2f} exceeds the ${self.budget:.2f} cap")
+            if self.deadline is not None and not self._degrade_tried:
+                elapsed = time.monotonic() - self._started
+                if done >= self.min_orgs:
+                    projected = elapsed + remaining * elapsed / done
+                else:
+                    projected = self._planned_seconds or 0.0
+                if projected > self.deadline:
+                    self._degrade(f"projected {projected / 60:.1f} min exceeds the {self.deadline / 60:.1f} min limit")
+            return self.mode
+
+    def _pause(self) -> str:
+        self.mode = "paused"
+        self.events.append(f"paused at ${self.spent:.2f} of the ${self.budget:.2f} cap")
+        return self.mode
+
+    def _degrade(self, reason: str):
+        self._degrade_tried = True
+        if not any(m in CHEAPER for m in self._planned_models):
+            models = ", ".join(sorted(self._planned_models)) or "this model"
+            self.events.append(f"{reason}; no cheaper fallback for {models}, the run keeps its model")
+            return
+        self._degraded = True
+        self.mode = "degraded"
+        self.events.append(f"switched to the cheaper model: {reason}")
+        # The plan priced the original models — rescale its cost per org to the fallbacks
+        if self._planned_cost and self._planned_models:
+            before = sum(n * price(m)[0] for m, n in self._planned_models.items())
+            after = sum(n * price(CHEAPER.get(m, m))[0] for m, n in self._planned_models.items())
+            self._planned_cost *= after / before if before else 1.0
+
+    def resume(self, budget: Optional[float] = None):
+        """Continue a paused run, optionally under a raised cap."""
+        with self._lock:
+            if budget is not None:
+                self.budget = budget
+            self.mode = "degraded" if self._degraded else "normal"
+            self.events.append("resumed" + (f" with a ${budget:.2f} cap" if budget is not None else ""))
+        self._resumed.set()
+
+    def wait_resume(self, cancel_token: Optional[CancellationToken] = None, deadline_at: Optional[float] = None,
+                    max_wait: Optional[float] = None, poll: float = 0.5) -> bool:
+        """
+        Block while paused, until resume(), cancellation, the run's deadline or max_wait.
+
+        Args:
+            cancel_token: Stops waiting once cancelled.
+            deadline_at:  time.monotonic() value of the run's deadline.
+            max_wait:     Seconds an unattended pause may last (None = until one of the above).
+
+        Returns:
+            True when the run was resumed, False when it should stop.
+        """
+        give_up = time.monotonic() + max_wait if max_wait is not None else None
+        while self.paused:
+            now = time.monotonic()
+            if (cancel_token is not None and cancel_token.cancelled) or \
+                    (deadline_at is not None and now >= deadline_at) or (give_up is not None and now >= give_up):
+                return False
+            ends = [t for t in (deadline_at, give_up) if t is not None]
+            self._resumed.wait(min([poll] + [t - now for t in ends]))
+        self._resumed.clear()
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "mode":   self.mode,
+                "spent":  round(self.spent, 4),
+                "calls":  len(self.records),
+                "budget": self.budget,
+                "events": list(self.events),
+            }
@@ -4,192 +4,36 @@ This module handles the classification of organizations based on their product d
 Switch to Gemini anytime by changing the provider in IndustryClassifier.__init__()
 """
 
+import copy
+import itertools
 import json
 import os
-from typing import Dict, List, Optional
-from openai import OpenAI
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from openai import APIConnectionError, APITimeoutError, InternalServerError, OpenAI, RateLimitError
+
+from catalog import apply_variant_weights, fold_org
+from cancellation import CancellationToken
+from hedging import HedgePolicy
+from org_index import OrgIndex
+from pipeline import Pipeline, Stage
+from planner import SpendGovernor, expected_tokens, plan_run, spread_positions, usage_record
+from prompt_sections import build_system_prompt, select_sections
+from quality import confidence_score, org_quality
+from records import Organization, dump_results
+from repair import ResponseRepairer
+from retry import RetryLane
+from streaming import IndustryStreamParser
+from transport import get_http_client
 
 
 class IndustryClassifier:
     """Handles industry classification using OpenAI API"""
 
-    SYSTEM_PROMPT = """You are an expert business analyst specializing in precise industry classification.
-Your responses must be valid JSON only — no markdown fences, no extra text, no explanations outside the JSON.
-
-== STEP 1: PRODUCT-TO-INDUSTRY MAPPING ==
-Map EVERY product to EXACTLY ONE industry:
-
-Electronics & Tech: chokes, switches, plugs, sockets, wiring, circuit breakers, transformers, ballasts, LED bulbs, spotlights, tube lights, lamps, fixtures, phones, tablets, TVs, remotes, cables, adapters, chargers, phone holders, wireless mice, keyboards, USB devices, batteries (AA, AAA, C, D cell, 9V), zero watt bulbs, energy saving bulbs, CFL, tape (electrical/insulation: black tape, white tape, red tape, osaka tape), scotch tape, power banks
-
-Fashion & Apparel: shirting fabric, linen, cotton, silk, polyester fabric, dress materials, shirts, pants, dresses, jackets, uniforms, shoes, sandals, boots, insoles, belts, ties, scarves, shapewear
-
-Home Appliances: vacuum cleaners, air coolers, fans, humidifiers, heaters, dryers, washing machines, refrigerators
-
-Home & Living: air fresheners, diffusers, organizers, storage, decor, detergents, sprays, wipes, drain cleaners, insect killers, fire extinguishers, disposable cups/glasses/plates, tissue paper, napkins
-
-Health & Medical: bandages, gauze, surgical items, first aid kits, BP monitors, thermometers, glucose meters, pain patches, compression supports, braces, tapes (medical), medical devices, sani plast, band-aid, plasters, ispaghol (psyllium husk), johar joshanda, herbal health sachets, digestive powders, rose patel (ayurvedic), khama cream, irani cream, herbal remedies, OTC medicines, supplements, cotton swabs, wipes (medical/hygiene context)
-
-Fitness & Sports: weights, resistance bands, ab wheels, pushup stands, yoga mats, skipping ropes, hand grips, massage guns, gym gloves, sports accessories
-
-Beauty & Personal Care: straighteners, curling irons, hair dryers, hair brushes, derma rollers, wax, facial tools, beard oil, nail clippers, bath brushes, skincare products, cosmetics, razors (trim razor, hygiene razor, universal razor, 7 o'clock blade, treat blade, platinum blade, shaving blades), shaving cream, wipes (personal care), rocket wipes, hair wax, pomade, grooming products
-
-Food & Beverage: teas (isb tea, green tea, black tea sachets), spices, snacks, drinks, cooking ingredients, edible products, candies (kish candy, local candy, caramel toffee, gold coin, choco beans, cc stick, imli teeka, lolypop, bigtop lolypop, doremon lolypop, lolypop 5), chocolates (ramtin chocolate, nani chocolate, dream caramel chocolate, spark), gum (trigum, tridegum, cat bubble, panda), juices (smiley juice), bubble gum jar, lawa shak, till patti
-
-Tobacco & Vaping: vapes, e-cigarettes, lighters (simple lighter, gerari lighter, heater lighter, pine light, any brand lighter), smoking accessories, hip flasks, matchboxes, disposable lighters
-
-Tobacco & Pan Products: supari (raseeli supari, bombay sapari), paan masala, gutka, khaini, chewing tobacco, mouth freshener pouches, elaichi (cardamom pouches sold as mouth freshener), tulsi (paan/mouth freshener brand), shahi meewa, sultan (pan masala brand), ratan, delhi/dehli (pan masala), host (pan masala), josh black, knight rider, sathi, mond blue, mond red, milano, olivia (mouth freshener/supari brand), touch blue, touch green, gemsa elfi, platinum blue, qm55, ramtin irani, clay (chewing product), paan products — NOTE: Tulsi, Shahi Meewa, Sultan, Ratan, Delhi, Host, Josh Black, Knight Rider, Sathi, Mond, Milano, Olivia, Touch are South Asian pan masala / supari brands, NOT food
-
-Stationery & Office: pens, paper, rulers, geometry sets, calculators, desk organizers, notebooks, agendas
-
-Automotive: car parts, car accessories, car care products, tyres, batteries, oils
-
-Manufacturing Supplies: inks, chemicals, adhesives, solvents, printing supplies, raw industrial materials, dyes
-
-General Trade & Wholesale: mixed small goods traders who sell a broad combination of unrelated everyday consumer items — including pan masala, lighters, blades/razors, candies, batteries, bulbs, tapes, health sachets, and other fast-moving consumer goods (FMCG) in one portfolio. Use this when an org sells 4 or more distinct industry categories together with no clear dominant industry above 60%.
-
-== STEP 2: COUNT DISTINCT INDUSTRIES ==
-1. Count unique industries found
-2. unique_industries >= 2 → isMultiIndustry = TRUE
-3. unique_industries == 1 → isMultiIndustry = FALSE
-NO EXCEPTIONS. This is a count, not a judgment call.
-
-== STEP 3: PERCENTAGE CALCULATION ==
-percentage = (products_in_industry / total_products) * 100
-Round to nearest 5%. All must sum to 100. Exclude industries below 5%.
-
-IMPORTANT for South Asian wholesale traders: Be very careful to correctly split:
-- Pan masala/supari brands (Tulsi, Olivia, Mond, Milano, Touch, Sultan, Knight Rider, Josh, Sathi etc.) → Tobacco & Pan Products
-- Lighters → Tobacco & Vaping
-- Blades/Razors → Beauty & Personal Care
-- Batteries/Bulbs/Electrical tape → Electronics & Tech
-- Candies/Chocolates/Gum/Juices → Food & Beverage
-- Herbal medicine sachets (Ispaghol, Johar Joshanda) → Health & Medical
-
-== STEP 4: OPERATION TYPE (9 CLASSES ONLY) ==
-Pick EXACTLY ONE from this fixed list. No other values allowed.
-
-1. "Seller"
-   WHO: Org that ONLY sells products, no evidence of services or maintenance
-   SIGNALS: Product catalogue only, no service language, no repair/installation signals
-   EXAMPLES: retail store, wholesale dealer, online shop, trading company, depot, home depot, general store
-
-2. "Manufacturer"
-   WHO: Org that produces/makes goods
-   SIGNALS: Raw materials, production inputs, industrial equipment, factory supplies, bulk chemicals, inks, dyes
-   EXAMPLES: factory, production company, industrial supplier, printing press, food processor
-
-3. "Maintenance & Installation"
-   WHO: Org that repairs, installs, or maintains equipment/property
-   SIGNALS: Service-oriented, tools for repair, maintenance contracts, installation services
-   EXAMPLES: electrician, plumber, HVAC company, IT support, equipment repair shop, contractor
-
-4. "Professional Service"
-   WHO: Licensed professionals or specialist knowledge-based services
-   SIGNALS: Professional title in org name, certifications, specialized services
-   EXAMPLES: doctor, dentist, lawyer, engineer, architect, accountant, consultant, clinic, law firm
-
-5. "Food Service"
-   WHO: Org in food preparation, cooking, or catering
-   SIGNALS: Cooking equipment, food ingredients, restaurant supplies, catering services
-   EXAMPLES: restaurant, hotel kitchen, catering company, bakery, food stall, cafe
-
-6. "Supermarket"
-   WHO: General merchandise store selling a wide mix of everyday consumer products under one roof
-   SIGNALS: Org name contains MART, SUPERMARKET, HYPERMARKET, MINIMART, or sells a very broad mix (food + household + personal care + electronics together)
-   EXAMPLES: Easy Mart, Quick Mart, SuperMart, FreshMart, any store with "MART" in the name
-
-7. "Seller, Service and Maintenance"
-   WHO: Org that sells physical products AND also provides services OR maintenance/installation
-   SIGNALS: Physical products for sale + any combination of: consulting, advice, support, repair, installation, maintenance
-   EXAMPLES: electronics shop that sells + provides IT support, hardware store that sells + installs, auto parts dealer + repair shop
-   NOTE: Do NOT use this for orgs that only provide services without selling physical goods
-
-8. "Service"
-   WHO: Org that ONLY provides services — no physical product sales
-   SIGNALS: All revenue from services: accommodation (hotels, villas), laundry/dry cleaning, consulting, catering, event services
-   EXAMPLES: hotel, villa, laundry service, dry cleaner, event planner, catering service, consulting firm
-   NOTE: Includes Hotels & Villa (accommodation) and Laundry & Services (dry cleaning) as primary industries
-
-9. "Mixed"
-   WHO: Org whose operation type doesn't clearly fit any single class above
-   SIGNALS: Genuinely ambiguous — cannot determine primary mode of operation from available data
-
-DECISION RULES (in order — stop at first match):
-- Org name contains "MART", "SUPERMARKET", "HYPERMARKET", "MINIMART", "SUPERSTORE" → "Supermarket"
-- Org name contains "LAUNDRY", "LAUNDROMAT", "DRY CLEAN", "LAVANDERÍA", "LAVANDERIA", "DRYCLEANING" → "Service" (primary industry: Laundry & Services)
-- Org name contains "HOTEL", "VILLA", "MOTEL", "INN", "RESORT", "LODGE", "HOSTAL", "HOSPEDAJE" → "Service" (primary industry: Hotels & Villa)
-- Org name has "APARTA-HOTEL" + "LAVANDERÍA" together → "Service" (primary industry: Laundry & Services)
-- Raw materials / production inputs → "Manufacturer"
-- Org name has "CLINIC", "HOSPITAL", "DR.", "DOCTOR", "DENTAL", "LAW", "CONSULT", "ENGINEER" → "Professional Service"
-- Org name has "RESTAURANT", "BAKERY", "CATERING", "CAFE", "KITCHEN" → "Food Service"
-- ALL products are pure services (accommodation, laundry, consulting, events) with NO physical goods → "Service"
-- Evidence of selling physical goods + (services OR maintenance OR both) → "Seller, Service and Maintenance"
-- Org name has "DEPOT", "STORE", "SHOP", "TRADING", "SUPPLIERS", "WHOLESALER", "DISTRIBUTOR", "IMPORTER", "EXPORTER", "TRADERS", "TRADER", "ENTERPRISE", "GENERAL STORE" → "Seller"
-- Products only, no service signals → "Seller"
-- Cannot clearly determine → "Mixed"
-
-== STEP 5: CONFIDENCE SCORE ==
-Start at 1.0, subtract penalties:
-- Missing descriptions for >50% products: -0.10
-- Vague/codified product names (e.g. "ITEM-A", "SKU123"): -0.05 per vague product (max -0.20)
-- Missing units when units would help: -0.05
-- Ambiguous industry assignment: -0.10
-Clamp final score to [0.50, 1.0].
-
-== CONSISTENCY RULES ==
-- "Shirting", "Linen", "Fabric", "Cloth", "Sabana", "Corcha", "Funda", "Colchon", "Frisa", "Toalla", "Mantel", "Cortina" → ALWAYS Home & Living (hotel/laundry linens, NOT fashion)
-- "Lavar", "Planchar", "Planchado", "Lavado", "Lavandería", "Washing", "Ironing", "Dry Clean" → ALWAYS Laundry & Services (laundry service products)
-- "Renta de Habitaciones", "Room Rental", "Alquiler", "Accommodation", "Accomodation" → ALWAYS Hotels & Villa (accommodation products)
-- "CHOKE", "SPOTLIGHT", "LED", "Switch", "Plug", "Bulb", "Battery", "AAA", "AA", "Zero watt" → ALWAYS Electronics & Tech
-- "Electrical tape", "Insulation tape", "Black tape", "White tape", "Red tape", "Osaka tape" → ALWAYS Electronics & Tech (NOT Stationery)
-- "Scotch tape", "Cello tape" used in general stationery context → Stationery & Office
-- "Supari", "Pan masala", "Tulsi", "Shahi Meewa", "Sultan", "Ratan", "Delhi", "Dehli", "Host", "Josh Black", "Knight Rider", "Sathi", "Mond", "Milano", "Olivia", "Touch Blue", "Touch Green", "Bombay Sapari", "Raseeli Supari", "Elaichi (pouch)" → ALWAYS Tobacco & Pan Products
-- "Lighter", "Gerari lighter", "Simple lighter", "Heater lighter", "Pine light" → ALWAYS Tobacco & Vaping
-- "Razor", "Blade", "Rezor", "Shaving" (Trim, Universal, Hygiene, 7 O'Clock, Treat, Platinum, Kangi) → ALWAYS Beauty & Personal Care
-- "Ispaghol", "Johar Joshanda", "Sani plast", "Saniplast", "Rose patel", "Khama cream", "Irani cream" → ALWAYS Health & Medical
-- "Candy", "Chocolate", "Gum", "Lolypop", "Lollipop", "Toffee", "Juice", "Snack", "Tea sachet", "Shak", "Till patti" → ALWAYS Food & Beverage
-- "Wipes" in grooming/personal hygiene context (Rocket wipes) → Beauty & Personal Care
-- "Wipes" in household cleaning context → Home & Living
-- "MART", "SUPERMARKET", "MINIMART" in org name → operationType = "Supermarket"
-- "DEPOT", "STORE", "SHOP", "TRADING", "TRADERS", "TRADER", "ENTERPRISE" in org name → operationType = "Seller"
-- "LAUNDRY", "LAVANDERÍA", "LAUNDROMAT", "DRY CLEAN" in org name → operationType = "Service", primaryIndustry = "Laundry & Services"
-- "HOTEL", "VILLA", "MOTEL", "RESORT" in org name → operationType = "Service", primaryIndustry = "Hotels & Villa"
-- If count >= 2 → isMultiIndustry = TRUE (no exceptions)
-- If 4+ distinct industries found → consider primaryIndustry = "General Trade & Wholesale" and list all industries in breakdown
-
-== SOUTH ASIAN WHOLESALE TRADER RECOGNITION ==
-When an org name contains "TRADERS", "ENTERPRISE", "GENERAL STORE", "STORE", "SHOP" AND the product list contains a mix of:
-pan masala brands + lighters + blades/razors + candies/sweets + batteries/bulbs + health sachets
-→ This is a GENERAL TRADE / WHOLESALE organization
-→ primaryIndustry = whichever single industry has the highest % OR "General Trade & Wholesale" if no industry exceeds 35%
-→ operationType = "Seller"
-→ isMultiIndustry = TRUE (guaranteed, as these always span multiple industries)
-→ List ALL individual industries in the breakdown with accurate percentages
-
-KNOWN SOUTH ASIAN BRAND CLASSIFICATION REFERENCE:
-Pan Masala / Mouth Freshener / Supari brands → Tobacco & Pan Products:
-Tulsi, Shahi Meewa, Sultan, Ratan, Delhi/Dehli, Host, Josh Black, Knight Rider, Sathi, Mond Blue, Mond Red, Touch Blue, Touch Green, Milano, Olivia (all variants: 1-12), Gemsa Elfi, Platinum Blue, Qm55, Bombay Sapari, Raseeli Supari, Elaichi (pouch form), Clay, Pine Light (paan brand), Ramtin Irani, Panda, Cat Bubble
-
-Lighter brands → Tobacco & Vaping:
-Simple Lighter, Gerari Lighter, Heater Lighter, Pine Light (lighter variant)
-
-Blade/Razor brands → Beauty & Personal Care:
-Trim Razor/Rezor, Universal Razor, Hygiene Razor/Rezor, 7 O'Clock Blade, Treat Blade, Platinum Blade, Universal Razor Kangi
-
-Candy/Confectionery brands → Food & Beverage:
-Kish Candy, Local Candy, Caramel Toffee, Gold Coin, Choco Beans, CC Stick, Imli Teeka, Trigum Bubble Jar, Tridegum, Lolypop 5, Bigtop Lolypop, Doremon Lolypop, Ramtin Chocolate, Nani Chocolate, Dream Caramel Chocolate, Spark, Smiley Juice, Lawa Shak, Till Patti
-
-Health/Herbal brands → Health & Medical:
-Johar Joshanda, Ispaghol (Sashy/Box), Sani Plast, Rose Patel, Khama Irani Cream, Rocket Wipes (medical wipes)
-
-Electronics brands → Electronics & Tech:
-Power Plus AA/AAA/D, 777D (battery), Bulb Osaka B22/E27, Bulb Tuff B22/E27, Zero Watt 2 Pin, White Tape Osaka, Osaka Red Tape, Osaka Black Tape, Scotch Tape
-
-== MULTILINGUAL PRODUCT SIGNALS (Spanish/French/Arabic/Portuguese) ==
-Laundry services (→ Laundry & Services): Lavar, Lavado, Planchar, Planchado, Planchando, Lavandería, Secado, Doblado, Hamper, Dry Clean, Press, Fold, Wash
-Hotel/accommodation (→ Hotels & Villa): Renta de Habitaciones, Alquiler, Habitacion, Hostal, Accommodation, Accomodation, Room Rental, Lodging
-Linens/bedding (→ Home & Living): Sabana, Corcha, Funda, Colchon, Frisa, Toalla, Mantel, Servilleta, Cortina, Almohada
-Clothing items being serviced (→ Laundry & Services, NOT Fashion): Vestido Lavar, Poloche Lavar, Pantalon Lavar, Native, Gown, Uniform with "wash/press/fold" context — these are laundry items, not clothing for sale"""
+    # Full prompt (core + every section); per-org calls send build_system_prompt(select_sections(org))
+    SYSTEM_PROMPT = build_system_prompt()
 
     USER_PROMPT_TEMPLATE = """Classify the organization below. Follow every step in the system prompt strictly.
 
@@ -215,7 +59,8 @@ Return ONLY this exact JSON (no extra keys, no markdown):
         "industry": "<industry name>",
         "subCategory": "<specific subcategory>",
         "percentage": <integer, multiple of 5, sum=100>,
-        "sampleProducts": ["<product>", "<product>", "<product>"]
+        "sampleProducts": ["<product>", "<product>", "<product>"],
+        "variantProducts": ["<every product of this industry that has a variantCount>"]
       }}
     ]
   }}
@@ -224,14 +69,53 @@ Return ONLY this exact JSON (no extra keys, no markdown):
 Organization data:
 {organization_data}"""
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-4o-mini",
+        hedge_policy: Optional[HedgePolicy] = None,
+        backup_api_keys: Optional[List[str]] = None,
+        request_timeout: float = 60.0,
+        pool_size: int = 50,
+        local_router=None,
+        prompt_retrieval: bool = True,
+        fold_variants: bool = True,
+        prescore_confidence: bool = False,
+        strong_model: Optional[str] = None,
+        strong_below: float = 0.8,
+        rate_limiter=None,
+        repair_responses: bool = True,
+    ):
         """
         Initialize the classifier.
 
         Args:
-            api_key: OpenAI API key. Falls back to OPENAI_API_KEY env variable.
-            model:   OpenAI model to use. Default: gpt-4o-mini (fast + cheap).
-                     Use "gpt-4o" for higher accuracy on ambiguous data.
+            api_key:         OpenAI API key. Falls back to OPENAI_API_KEY env variable.
+            model:           OpenAI model to use. Default: gpt-4o-mini (fast + cheap).
+                             Use "gpt-4o" for higher accuracy on ambiguous data.
+            hedge_policy:    Optional HedgePolicy — duplicates slow requests to cut tail latency.
+            backup_api_keys: Extra keys that hedged duplicates are sent with (round-robin).
+                             Without them the duplicate goes through the primary key.
+            request_timeout: Seconds before a single API call is abandoned as timed out.
+            pool_size:       Connection pool size of the shared keep-alive HTTP transport.
+                             Classifiers with the same pool size share one transport.
+            local_router:    Optional local_model.LocalRouter — products the local model is
+                             confident about are labelled without an API call; only the
+                             rest (or the whole org, if too many are uncertain) go to the LLM.
+            prompt_retrieval: Send the core prompt plus only the sections this org's country,
+                             name and products call for (False = always the full prompt).
+            fold_variants:   Drop junk / duplicate product rows and fold SKU variants into one
+                             weighted representative before routing and prompting (see catalog.py).
+            prescore_confidence: Compute confidenceScore from the STEP 5 penalties in Python
+                             (quality.py) instead of taking the model's figure (opt-in).
+            strong_model:    Model for orgs whose data-quality score is below strong_below,
+                             e.g. "gpt-4o" for vague, undescribed catalogs. None = always `model`.
+            strong_below:    Data-quality score under which strong_model is used.
+            rate_limiter:    Optional object with acquire(tokens) — called before every API call
+                             with its expected tokens (e.g. parallel.GlobalRateLimiter).
+            repair_responses: Fix invalid replies locally where the fix is deterministic and send
+                             one small follow-up for the fields that are not (see repair.py),
+                             instead of failing the org. False = replies are accepted unvalidated.
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
@@ -241,70 +125,133 @@ Organization data:
             )
 
         self.model = model
-        self.client = OpenAI(api_key=self.api_key)
+        self.request_timeout = request_timeout
+        self.pool_size = pool_size
+        self.backup_api_keys = list(backup_api_keys or [])
+        self._connect()
+
+        self.hedge_policy = hedge_policy
+        self.local_router = local_router
+        self.prompt_retrieval = prompt_retrieval
+        self.fold_variants = fold_variants
+        self.prescore_confidence = prescore_confidence
+        self.strong_model = strong_model
+        self.strong_below = strong_below
+        self.rate_limiter = rate_limiter
+        self.repairer = ResponseRepairer() if repair_responses else None
+
+    def _connect(self):
+        """OpenAI clients for the primary and backup keys on this process's shared transport."""
+        http_client = get_http_client(self.pool_size)
+        self.client = OpenAI(api_key=self.api_key, timeout=self.request_timeout, http_client=http_client)
+        self.backup_clients = [
+            OpenAI(api_key=k, timeout=self.request_timeout, http_client=http_client)
+            for k in self.backup_api_keys
+        ]
+        self._backup_turn = itertools.count()   # next() is atomic — safe across calling threads
+
+    def __getstate__(self) -> Dict:
+        # Clients hold the process's HTTP pool — a pickled copy (e.g. in a worker process) reconnects
+        state = dict(self.__dict__)
+        del state["client"], state["backup_clients"], state["_backup_turn"]
+        return state
+
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self._connect()
 
     # ------------------------------------------------------------------
     # Core classification
     # ------------------------------------------------------------------
 
-    def classify_organization(self, organization_data: Dict) -> Dict:
+    def classify_organization(
+        self,
+        organization_data: Dict,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None,
+        on_usage: Optional[Callable[[Dict], None]] = None,
+    ) -> Dict:
         """
         Classify a single organization.
 
         Args:
             organization_data: Dict with _id, orgName, countryCode, product_names …
+                               (an Organization record is accepted too).
+            timeout:           Per-call timeout in seconds (default: self.request_timeout).
+            model:             Use this model regardless of model / strong_model (e.g. a
+                               SpendGovernor's cheaper fallback).
+            on_usage:          Called with planner.usage_record() of the API call, if one is made.
 
         Returns:
             Dict with classification results (or an error entry on failure).
         """
-        # Count products in Python — never trust LLM to count accurately
-        actual_product_count = len(organization_data.get("product_names", []))
-
-        org_json_str = json.dumps(organization_data, ensure_ascii=False, indent=2)
-        user_message = self.USER_PROMPT_TEMPLATE.format(organization_data=org_json_str)
-
+        if isinstance(organization_data, Organization):
+            organization_data = organization_data.to_dict()
+        prompt_org = self._prompt_org(organization_data)
+        plan = self._plan(prompt_org)
+        if plan is not None and plan.mode == "local":
+            return self._finalize_result(self.local_router.local_result(plan), organization_data)
+        llm_org = plan.llm_org if plan else prompt_org
+        model = model or self._model_for(organization_data)
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                temperature=0.0,  # Completely deterministic - no randomness
-                max_tokens=2048,
-                response_format={"type": "json_object"},   # guarantees valid JSON back
-                messages=[
-                    {"role": "system", "content": self.SYSTEM_PROMPT},
-                    {"role": "user",   "content": user_message},
-                ],
-            )
-
-            raw = response.choices[0].message.content.strip()
-            result = json.loads(raw)
-
-            # ── Always overwrite productCount with true Python-computed value ──
-            result["productCount"] = actual_product_count
-
-            # ── Rebuild AIreasoning with accurate numbers (LLM often hallucinates counts) ──
-            industries = result.get("classification", {}).get("industries", [])
-            total = actual_product_count
-            industry_parts = []
-            for ind in industries:
-                pct = ind.get("percentage", 0)
-                real_count = round((pct / 100) * total)
-                industry_parts.append(
-                    f"{ind.get('industry', '?')} ({pct}% ≈ {real_count} products)"
-                )
-            op_type = result.get("operationType", "—")
-            industries_str = ", ".join(industry_parts) if industry_parts else "—"
-            result["AIreasoning"] = (
-                f"Industries found: {industries_str}. "
-                f"Total products: {total}. "
-                f"Operation type '{op_type}' determined from org name signals and product nature."
-            )
+            raw = self._call_model(self._build_messages(llm_org), timeout, model, on_usage, llm_org)
+        except Exception as e:
+            return self._exception_result(organization_data, e)
+        return self._parse_routed(raw, organization_data, plan, self._follow_up(timeout, model, on_usage, llm_org))
 
-            return result
+    def classify_organization_stream(
+        self,
+        organization_data: Dict,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None,
+        on_usage: Optional[Callable[[Dict], None]] = None,
+    ) -> Iterator[Tuple[str, Dict]]:
+        """
+        Classify a single organization, yielding industries as they stream in.
+        Goes through the same local routing, rate limiter, hedging and usage reporting
+        as classify_organization().
 
-        except json.JSONDecodeError as e:
-            return self._error_result(organization_data, f"JSON parse error: {e}")
+        Args:
+            organization_data: Dict with _id, orgName, countryCode, product_names …
+            timeout:           Per-call timeout in seconds (default: self.request_timeout).
+            model:             Use this model regardless of model / strong_model.
+            on_usage:          Called with planner.usage_record() of each API call made.
+
+        Yields:
+            ("industry", entry) for every industry entry as soon as it is complete,
+            then exactly one ("result", result) with the same dict that
+            classify_organization() would have returned. When the local model labels
+            some or all products, the entries come from the merged result instead.
+        """
+        if isinstance(organization_data, Organization):
+            organization_data = organization_data.to_dict()
+        prompt_org = self._prompt_org(organization_data)
+        plan = self._plan(prompt_org)
+        if plan is not None and plan.mode == "local":
+            result = self._finalize_result(self.local_router.local_result(plan), organization_data)
+            yield from (("industry", entry) for entry in result["classification"]["industries"])
+            yield "result", result
+            return
+
+        # The LLM's own entries only stand for the org when it sees every product
+        live = plan is None
+        llm_org = plan.llm_org if plan else prompt_org
+        model = model or self._model_for(organization_data)
+        parser = IndustryStreamParser()
+        try:
+            for delta in self._stream_model(self._build_messages(llm_org), timeout, model, on_usage, llm_org):
+                for entry in parser.feed(delta):
+                    if live:
+                        yield "industry", entry
         except Exception as e:
-            return self._error_result(organization_data, f"Classification failed: {e}")
+            yield "result", self._exception_result(organization_data, e)
+            return
+
+        result = self._parse_routed(parser.text(), organization_data, plan,
+                                    self._follow_up(timeout, model, on_usage, llm_org))
+        if not live:
+            yield from (("industry", entry) for entry in result["classification"].get("industries", []))
+        yield "result", result
 
     # ------------------------------------------------------------------
     # Batch helpers
@@ -314,6 +261,10 @@ Organization data:
         self,
         organizations: List[Dict],
         max_items: Optional[int] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        deadline: Optional[float] = None,
+        retry_lane: Optional[RetryLane] = None,
+        governor: Optional[SpendGovernor] = None,
     ) -> List[Dict]:
         """
         Classify a list of organizations.
@@ -321,54 +272,504 @@ Organization data:
         Args:
             organizations: List of org dicts.
             max_items:      Cap the number processed (handy for testing).
+            cancel_token:   Checked between orgs — once cancelled, the rest are
+                            reported with errorType "cancelled".
+            deadline:       Wall-clock budget for the whole batch in seconds. Calls are
+                            capped to the time left; orgs not started in time are
+                            reported with errorType "deadline".
+            retry_lane:     Where transient failures are parked during the main pass and
+                            retried afterwards (default: RetryLane()). Pass your own to
+                            read .dead_letters and .stats() afterwards.
+            governor:       Optional SpendGovernor — every call is metered against it; it can
+                            switch the rest of the batch to a cheaper model, and once it pauses
+                            the remaining orgs are reported with errorType "budget".
 
         Returns:
-            List of classification result dicts.
+            List of classification result dicts (one per org, in input order).
         """
         items = organizations[:max_items] if max_items else organizations
+        deadline_at = time.monotonic() + deadline if deadline else None
+        lane = retry_lane if retry_lane is not None else RetryLane()
         results = []
 
         for i, org in enumerate(items, 1):
+            if cancel_token is not None and cancel_token.cancelled:
+                results.append(self._error_result(org, cancel_token.reason or "Cancelled", "cancelled"))
+                continue
+
+            timeout = self.request_timeout
+            if deadline_at is not None:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    results.append(self._error_result(org, "Batch deadline reached", "deadline"))
+                    continue
+                timeout = min(timeout, remaining)
+
+            if governor is not None and governor.update(i - 1) == "paused":
+                results.append(self._error_result(org, "Spend cap reached", "budget"))
+                continue
+
             print(f"[{i}/{len(items)}] {org.get('orgName', 'Unknown')}")
-            results.append(self.classify_organization(org))
+            result = self._governed_call(org, timeout, governor)
+            if "error" in result.get("classification", {}):
+                lane.defer(i - 1, org, result)
+            results.append(result)
+
+        if len(lane) and not (governor is not None and governor.paused):
+            print(f"Retrying {len(lane)} failed organization(s)…")
+            retried = lane.drain(self._retry_call(deadline_at, governor), cancel_token, deadline_at)
+            for idx, result in retried.items():
+                results[idx] = result
+            stats = lane.stats()
+            print(f"Recovered {stats['recovered']}, dead-lettered {stats['deadLetters']}")
 
         return results
 
+    def _retry_call(self, deadline_at: Optional[float], governor: Optional[SpendGovernor] = None):
+        """Build the per-org call used by the retry lane, capped to the batch deadline."""
+        def call(org: Dict) -> Dict:
+            timeout = self.request_timeout
+            if deadline_at is not None:
+                timeout = max(1.0, min(timeout, deadline_at - time.monotonic()))
+            return self._governed_call(org, timeout, governor)
+        return call
+
+    def _governed_call(self, org: Dict, timeout: float, governor: Optional[SpendGovernor]) -> Dict:
+        """classify_organization() metered by a governor and on its fallback model when degraded."""
+        if governor is None:
+            return self.classify_organization(org, timeout=timeout)
+        return self.classify_organization(org, timeout=timeout, model=governor.model_override(self.model),
+                                          on_usage=governor.record)
+
     def classify_from_file(
         self,
         input_file: str,
         output_file: str,
         max_items: Optional[int] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        deadline: Optional[float] = None,
+        offset: int = 0,
+        org_ids: Optional[List[str]] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        budget: Optional[float] = None,
+        processes: int = 1,
+        concurrency: int = 4,
     ) -> List[Dict]:
         """
         Load orgs from a JSON file, classify them, and write results.
 
+        Orgs are read through a byte-offset sidecar index ("<input_file>.idx",
+        built on first use), so only the selected orgs are ever parsed.
+
         Args:
-            input_file:  Path to source JSON (array of org objects).
+            input_file:  Path to source JSON (array of org objects) or JSON Lines.
             output_file: Path where classified JSON will be saved.
             max_items:   Optional cap for testing.
+            cancel_token: See classify_batch().
+            deadline:     See classify_batch().
+            offset:       Position of the first org to classify.
+            org_ids:      Classify only these _ids (takes precedence over offset/shard).
+            shard:        (index, count) — classify contiguous shard `index` of `count`.
+            budget:       Spend cap in USD — the batch degrades to a cheaper model when its
+                          projected spend overshoots and stops at the cap (see planner.SpendGovernor).
+            processes:    Above 1, the orgs are split across this many worker processes sharing
+                          one OPENAI_RPM / OPENAI_TPM rate limiter (see parallel.classify_parallel);
+                          deadline and budget are not supported there.
+            concurrency:  Parallel LLM calls per worker process (processes > 1 only).
 
         Returns:
             List of classification result dicts.
         """
-        with open(input_file, "r", encoding="utf-8") as f:
-            organizations = json.load(f)
-
-        print(f"Loaded {len(organizations)} organizations from {input_file}")
-        results = self.classify_batch(organizations, max_items)
+        if processes > 1:
+            return self._classify_file_parallel(input_file, output_file, max_items, cancel_token, deadline,
+                                                offset, org_ids, shard, budget, processes, concurrency)
+
+        with OrgIndex(input_file) as index:
+            if org_ids:
+                organizations = list(index.select(org_ids))
+            elif shard:
+                organizations = list(index.shard(*shard))
+            else:
+                stop = offset + max_items if max_items else None
+                organizations = list(index.range(offset, stop))
+            total = len(index)
+
+        print(f"Loaded {len(organizations)} of {total} organizations from {input_file}")
+        governor = None
+        if budget is not None:
+            items = organizations[:max_items] if max_items else organizations
+            sample = [items[p] for p in spread_positions(len(items))]
+            governor = SpendGovernor(budget, deadline, len(items), plan_run(self, sample, total=len(items)),
+                                     model=self.model)
+        results = self.classify_batch(organizations, max_items, cancel_token, deadline, governor=governor)
+        if governor is not None:
+            stats = governor.stats()
+            print(f"Spent ${stats['spent']:.2f} on {stats['calls']} calls" +
+                  "".join(f"; {e}" for e in stats["events"]))
+
+        dump_results(results, output_file, indent=2)
 
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Saved {len(results)} results to {output_file}")
+        return results
 
+    def _classify_file_parallel(self, input_file, output_file, max_items, cancel_token, deadline,
+                                offset, org_ids, shard, budget, processes, concurrency) -> List[Dict]:
+        """classify_from_file() over a process pool — same selection rules, same output."""
+        from parallel import classify_parallel
+
+        if deadline is not None or budget is not None:
+            raise ValueError("deadline and budget are not supported with processes > 1")
+        with OrgIndex(input_file) as index:
+            total = len(index)
+            if org_ids:
+                positions = [p for p in (index.position_of(i) for i in org_ids) if p is not None]
+            elif shard:
+                if not 0 <= shard[0] < shard[1]:
+                    raise ValueError(f"shard index must be in [0, {shard[1]}), got {shard[0]}")
+                per = -(-total // shard[1])
+                positions = range(shard[0] * per, min(total, (shard[0] + 1) * per))
+            else:
+                positions = range(offset, min(total, offset + max_items) if max_items else total)
+        if max_items and (org_ids or shard):
+            positions = positions[:max_items]
+
+        print(f"Classifying {len(positions)} of {total} organizations from {input_file} on {processes} processes")
+        results: List[Dict] = []
+        summary = classify_parallel(self, input_file, output_file, positions, processes, concurrency,
+                                    cancel_token=cancel_token, on_result=lambda _, r: results.append(r))
+        print(f"Spent ${summary['spent']:.2f} on {summary['calls']} calls; "
+              f"{summary['rateLimitWait']:.0f}s waiting on the rate limit")
         print(f"Saved {len(results)} results to {output_file}")
         return results
 
+    # ------------------------------------------------------------------
+    # Streaming pipeline
+    # ------------------------------------------------------------------
+
+    def classify_stream(
+        self,
+        organizations: Iterable,
+        concurrency: int = 4,
+        queue_size: int = 16,
+        cancel_token: Optional[CancellationToken] = None,
+        dedupe: bool = True,
+        cache_size: int = 10_000,
+        on_result: Optional[Callable[[int, Dict], None]] = None,
+        on_usage: Optional[Callable[[Dict], None]] = None,
+    ) -> Iterator[Tuple[int, Dict]]:
+        """
+        Classify an iterable of orgs through a staged pipeline, yielding results as they complete.
+
+        Stages: read → normalize (variant folding) → cache/dedupe → prompt build (incl. local-model routing)
+        → LLM call → post-process → sink, connected by bounded queues. Reading and prompt building for upcoming orgs overlap with
+        in-flight requests, and a slow API blocks the reader instead of letting it run ahead.
+
+        Args:
+            organizations: Any iterable of org dicts / Organization records (e.g. OrgIndex.range()).
+            concurrency:   Parallel LLM calls.
+            queue_size:    Capacity of each inter-stage queue — at most about
+                           (stages × queue_size + concurrency) orgs are held at once.
+            cancel_token:  Once cancelled, no further orgs are read and queued orgs not yet
+                           sent are reported with errorType "cancelled".
+            dedupe:        Classify orgs with identical name, country and products once;
+                           repeats get a copy of the result.
+            cache_size:    Successful results kept for dedupe (least recently used evicted).
+            on_result:     Optional sink called with (index, result) before each is yielded.
+            on_usage:      Called with planner.usage_record() of every API call.
+
+        Yields:
+            (index, result) — index is the org's 0-based position in `organizations`.
+            Results arrive in completion order, not input order.
+        """
+        done: "OrderedDict[str, Dict]" = OrderedDict()
+        waiting: Dict[str, List[int]] = {}
+        lock = threading.Lock()
+
+        def normalize(entry):
+            index, org = entry
+            if isinstance(org, Organization):
+                org = org.to_dict()
+            yield {"index": index, "org": org, "prompt_org": self._prompt_org(org), "key": None, "result": None}
+
+        def lookup(item):
+            if not dedupe:
+                yield item
+                return
+            org = item["org"]
+            key = json.dumps([org.get("orgName"), org.get("countryCode"), org.get("product_names")],
+                             sort_keys=True, ensure_ascii=False)
+            with lock:
+                if key in done:
+                    done.move_to_end(key)
+                    item["result"] = copy.deepcopy(done[key])
+                elif key in waiting:
+                    waiting[key].append(item["index"])     # parked until the first copy completes
+                    return
+                else:
+                    waiting[key] = []
+                    item["key"] = key
+            yield item
+
+        def build_prompt(item):
+            if item["result"] is None:
+                plan = item["plan"] = self._plan(item["prompt_org"])
+                if plan is not None and plan.mode == "local":
+                    item["result"] = self._finalize_result(self.local_router.local_result(plan), item["org"])
+                else:
+                    item["llm_org"] = plan.llm_org if plan else item["prompt_org"]
+                    item["messages"] = self._build_messages(item["llm_org"])
+                    item["model"] = self._model_for(item["org"])
+            yield item
+
+        def call(item):
+            if item["result"] is None:
+                if cancel_token is not None and cancel_token.cancelled:
+                    item["result"] = self._error_result(item["org"], cancel_token.reason or "Cancelled", "cancelled")
+                else:
+                    try:
+                        item["raw"] = self._call_model(item.pop("messages"), model=item["model"],
+                                                       on_usage=on_usage, llm_org=item["llm_org"])
+                    except Exception as e:
+                        item["result"] = self._exception_result(item["org"], e)
+            yield item
+
+        def post_process(item):
+            if item["result"] is None:
+                follow_up = self._follow_up(None, item["model"], on_usage, item.pop("llm_org"))
+                item["result"] = self._parse_routed(item["raw"], item["org"], item["plan"], follow_up)
+            result = item["result"]
+            yield item["index"], result
+            if item["key"] is not None:
+                with lock:
+                    followers = waiting.pop(item["key"], [])
+                    if "error" not in result.get("classification", {}):
+                        done[item["key"]] = result
+                        if len(done) > cache_size:
+                            done.popitem(last=False)
+                for index in followers:
+                    yield index, copy.deepcopy(result)
+
+        def sink(pair):
+            if on_result is not None:
+                on_result(*pair)
+            yield pair
+
+        pipeline = Pipeline(
+            [
+                Stage("normalize", normalize),
+                Stage("dedupe", lookup),
+                Stage("prompt", build_prompt),
+                Stage("llm", call, workers=concurrency),
+                Stage("post", post_process),
+                Stage("sink", sink),
+            ],
+            queue_size=queue_size,
+            cancel_token=cancel_token,
+        )
+        yield from pipeline.run(enumerate(organizations))
+
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
 
+    def _create_completion(self, on_late: Optional[Callable] = None, **kwargs):
+        """
+        Send a chat completion, hedged through self.hedge_policy when one is set.
+        on_late gets the response of a hedged duplicate that lost the race but still completed.
+        """
+        if self.hedge_policy is None:
+            return self.client.chat.completions.create(**kwargs)
+
+        if self.backup_clients:
+            backup_client = self.backup_clients[next(self._backup_turn) % len(self.backup_clients)]
+        else:
+            backup_client = self.client
+
+        return self.hedge_policy.run(
+            lambda: self.client.chat.completions.create(**kwargs),
+            lambda: backup_client.chat.completions.create(**kwargs),
+            on_late=on_late,
+        )
+
+    def _call_model(self, messages: List[Dict], timeout: Optional[float] = None,
+                    model: Optional[str] = None, on_usage: Optional[Callable[[Dict], None]] = None,
+                    llm_org: Optional[Dict] = None) -> str:
+        """
+        One (possibly hedged) completion for prebuilt messages; returns the raw reply text.
+        With on_usage set, the call's tokens and latency are reported, as are those of a hedged
+        duplicate that lost but still completed (llm_org: the org the messages were built from,
+        for its prompted product count).
+        """
+        model = model or self.model
+        products = len((llm_org or {}).get("product_names") or [])
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(expected_tokens(messages, products))
+        started = time.monotonic()
+
+        def billed(response):
+            on_usage(usage_record(model, messages, response, time.monotonic() - started, products))
+
+        response = self._create_completion(
+            on_late=billed if on_usage is not None else None,
+            model=model,
+            temperature=0.0,  # Completely deterministic - no randomness
+            max_tokens=2048,
+            response_format={"type": "json_object"},   # guarantees valid JSON back
+            messages=messages,
+            timeout=timeout or self.request_timeout,
+        )
+        if on_usage is not None:
+            billed(response)
+        return response.choices[0].message.content
+
+    def _stream_model(self, messages: List[Dict], timeout: Optional[float] = None,
+                      model: Optional[str] = None, on_usage: Optional[Callable[[Dict], None]] = None,
+                      llm_org: Optional[Dict] = None) -> Iterator[str]:
+        """
+        _call_model for a streamed reply — yields the reply text as it arrives. A hedge races
+        the two streams to their first response; a losing stream that still opens is closed
+        and reported through on_usage with estimated tokens.
+        """
+        model = model or self.model
+        products = len((llm_org or {}).get("product_names") or [])
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(expected_tokens(messages, products))
+        started = time.monotonic()
+
+        def abandoned(stream):
+            stream.close()
+            if on_usage is not None:
+                on_usage(usage_record(model, messages, None, time.monotonic() - started, products))
+
+        stream = self._create_completion(
+            on_late=abandoned,
+            model=model,
+            temperature=0.0,
+            max_tokens=2048,
+            response_format={"type": "json_object"},
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},   # token counts arrive in a final chunk
+            timeout=timeout or self.request_timeout,
+        )
+        last = None
+        for chunk in stream:
+            last = chunk
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        if on_usage is not None:
+            on_usage(usage_record(model, messages, last, time.monotonic() - started, products))
+
+    def _follow_up(self, timeout: Optional[float], model: str, on_usage: Optional[Callable[[Dict], None]],
+                   llm_org: Dict) -> Optional[Callable[[List[Dict]], str]]:
+        """The call the repairer may send for fields it cannot fix locally (None when repair is off)."""
+        if self.repairer is None:
+            return None
+        return lambda messages: self._call_model(messages, timeout, model, on_usage, llm_org)
+
+    def _parse_response(self, raw: str, organization_data: Dict,
+                        follow_up: Optional[Callable[[List[Dict]], str]] = None) -> Dict:
+        """
+        Raw reply text → finalized result, or a parse / schema error result.
+        With the repairer on, replies are validated strictly and repaired where possible;
+        without it they are accepted as they come, as long as they parse.
+        """
+        try:
+            if self.repairer is None:
+                result = json.loads(raw.strip())
+            else:
+                result, problems = self.repairer.repair(raw, organization_data, follow_up)
+                if problems:
+                    return self._error_result(organization_data, "Invalid response: " + "; ".join(problems), "schema")
+            # ── variantCount weighting is arithmetic — the model only says which industry each family is in ──
+            if self.fold_variants:
+                apply_variant_weights(result, organization_data)
+            return self._finalize_result(result, organization_data)
+        except json.JSONDecodeError as e:
+            return self._error_result(organization_data, f"JSON parse error: {e}", "parse")
+        except Exception as e:
+            return self._error_result(organization_data, f"Classification failed: {e}")
+
+    def _model_for(self, organization_data: Dict) -> str:
+        """self.model, or strong_model when the org's catalog scores below strong_below."""
+        if self.strong_model and org_quality(organization_data) < self.strong_below:
+            return self.strong_model
+        return self.model
+
+    def _prompt_org(self, organization_data: Dict) -> Dict:
+        """The org as routed and prompted — folded catalog when fold_variants is on."""
+        return fold_org(organization_data) if self.fold_variants else organization_data
+
+    def _plan(self, organization_data: Dict, record: bool = True):
+        """Local-model routing plan for an org (None when no local router is set)."""
+        if self.local_router is None or not organization_data.get("product_names"):
+            return None
+        return self.local_router.plan(organization_data, record=record)
+
+    def _parse_routed(self, raw: str, organization_data: Dict, plan=None,
+                      follow_up: Optional[Callable[[List[Dict]], str]] = None) -> Dict:
+        """_parse_response for a possibly partially routed org — merges local labels back in."""
+        if plan is None or plan.mode != "partial":
+            return self._parse_response(raw, organization_data, follow_up)
+        result = self._parse_response(raw, plan.llm_org, follow_up)
+        if "error" in result.get("classification", {}):
+            result["productCount"] = len(organization_data.get("product_names", []))
+            return result
+        return self._finalize_result(self.local_router.merge(plan, result), organization_data)
+
+    def _exception_result(self, organization_data: Dict, exc: Exception) -> Dict:
+        """Map an API-call exception onto the errorType taxonomy."""
+        if isinstance(exc, APITimeoutError):
+            return self._error_result(organization_data, "Request timed out", "timeout")
+        if isinstance(exc, (RateLimitError, APIConnectionError, InternalServerError)):
+            return self._error_result(organization_data, f"Classification failed: {exc}", "transient")
+        return self._error_result(organization_data, f"Classification failed: {exc}")
+
+    def _build_messages(self, organization_data: Dict) -> List[Dict]:
+        org_json_str = json.dumps(organization_data, ensure_ascii=False, indent=2)
+        user_message = self.USER_PROMPT_TEMPLATE.format(organization_data=org_json_str)
+        system = build_system_prompt(select_sections(organization_data)) if self.prompt_retrieval else self.SYSTEM_PROMPT
+        return [
+            {"role": "system", "content": system},
+            {"role": "user",   "content": user_message},
+        ]
+
+    def _finalize_result(self, result: Dict, organization_data: Dict) -> Dict:
+        # Count products in Python — never trust LLM to count accurately
+        actual_product_count = len(organization_data.get("product_names", []))
+
+        # ── Always overwrite productCount with true Python-computed value ──
+        result["productCount"] = actual_product_count
+
+        # ── STEP 5 penalties are deterministic — score them in Python too ──
+        if self.prescore_confidence:
+            result["confidenceScore"] = confidence_score(org_quality(organization_data), result)
+
+        # ── Rebuild AIreasoning with accurate numbers (LLM often hallucinates counts) ──
+        industries = result.get("classification", {}).get("industries", [])
+        total = actual_product_count
+        industry_parts = []
+        for ind in industries:
+            pct = ind.get("percentage", 0)
+            real_count = round((pct / 100) * total)
+            industry_parts.append(
+                f"{ind.get('industry', '?')} ({pct}% ≈ {real_count} products)"
+            )
+        op_type = result.get("operationType", "—")
+        industries_str = ", ".join(industry_parts) if industry_parts else "—"
+        result["AIreasoning"] = (
+            f"Industries found: {industries_str}. "
+            f"Total products: {total}. "
+            f"Operation type '{op_type}' determined from org name signals and product nature."
+        )
+
+        return result
+
     @staticmethod
-    def _error_result(org: Dict, message: str) -> Dict:
+    def _error_result(org, message: str, error_type: str = "error") -> Dict:
+        """error_type: error | parse | schema | transient | timeout | cancelled | deadline | budget"""
+        if isinstance(org, Organization):
+            org = org.to_dict()
         return {
             "orgName":        org.get("orgName", "unknown"),
             "productCount":   len(org.get("product_names", [])),
@@ -376,7 +777,7 @@ Organization data:
             "operationType":  None,
             "confidenceScore": None,
             "AIreasoning":    None,
-            "classification": {"error": message},
+            "classification": {"error": message, "errorType": error_type},
         }
 
 
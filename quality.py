@@ -0,0 +1,151 @@
+"""
+Data-quality pre-scoring of organizations (STEP 5 of the system prompt).
+confidenceScore is defined as deterministic penalties on the catalog — missing
+descriptions, vague or codified product names, missing units — so it is
+computed here instead of by the model: org_quality() for one org in plain
+Python, prescore() for a whole dataset in one vectorized pass (per-product
+flags evaluated once per distinct value, summed per org with np.bincount).
+The score doubles as a routing signal, e.g. a stronger model for poor catalogs.
+"""
+
+import re
+from typing import Dict, Iterable, List
+
+from catalog import PLACEHOLDER_NAMES
+
+DESCRIPTION_PENALTY = 0.10     # more than half the products have no description
+VAGUE_PENALTY       = 0.05     # per vague / codified product name …
+VAGUE_PENALTY_CAP   = 0.20     # … up to this much
+UNIT_PENALTY        = 0.05     # most physical products (typeOfCommodity 1) have no unit
+AMBIGUITY_PENALTY   = 0.10     # no industry holds a clear majority (applied after classification)
+DOMINANT_SHARE      = 60       # percentage a primary industry needs to count as clear
+MIN_SCORE           = 0.50
+
+# Words that don't say what a product is ("ITEM-A", "SKU123", "Part No 4")
+VAGUE_WORDS = frozenset({
+    "item", "items", "sku", "code", "ref", "art", "product", "prod", "part", "model", "type",
+    "unit", "pcs", "piece", "pieces", "no", "nos", "num", "number", "lot", "batch", "var",
+}) | PLACEHOLDER_NAMES
+
+_WORD = re.compile(r"[^\W\d_]{3,}")
+
+
+# ----------------------------------------------------------------------
+# Per-product flags
+# ----------------------------------------------------------------------
+
+def is_vague_name(name) -> bool:
+    """No word of three or more letters beyond codes and placeholders."""
+    return not any(w.lower() not in VAGUE_WORDS for w in _WORD.findall(str(name or "")))
+
+
+def _blank(value) -> bool:
+    return not str(value or "").strip()
+
+
+def _penalties(n: int, missing_desc: int, vague: int, physical: int, missing_units: int) -> float:
+    penalty = min(VAGUE_PENALTY_CAP, VAGUE_PENALTY * vague)
+    if not n or missing_desc * 2 > n:
+        penalty += DESCRIPTION_PENALTY
+    if physical and missing_units * 2 > physical:
+        penalty += UNIT_PENALTY
+    return penalty
+
+
+# ----------------------------------------------------------------------
+# One org
+# ----------------------------------------------------------------------
+
+def org_quality(org: Dict) -> float:
+    """STEP 5 score before the ambiguity penalty, in [MIN_SCORE, 1]."""
+    products = org.get("product_names") or []
+    physical = [p for p in products if p.get("typeOfCommodity") == 1]
+    penalty = _penalties(
+        len(products),
+        sum(1 for p in products if _blank(p.get("discription"))),
+        sum(1 for p in products if is_vague_name(p.get("productName"))),
+        len(physical),
+        sum(1 for p in physical if _blank(p.get("unit"))),
+    )
+    return round(max(MIN_SCORE, 1.0 - penalty), 2)
+
+
+def confidence_score(quality: float, result: Dict) -> float:
+    """Final confidenceScore: the data-quality score minus the ambiguity penalty of a result."""
+    shares = [ind.get("percentage") or 0 for ind in result.get("classification", {}).get("industries") or []]
+    ambiguous = len(shares) >= 2 and max(shares) < DOMINANT_SHARE
+    return round(max(MIN_SCORE, quality - (AMBIGUITY_PENALTY if ambiguous else 0.0)), 2)
+
+
+# ----------------------------------------------------------------------
+# Whole datasets
+# ----------------------------------------------------------------------
+
+def _flags(values: List, fn):
+    """fn(value) for every value, evaluated once per distinct value."""
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    table = np.fromiter((fn(u) for u in uniques), bool, len(uniques))
+    out = np.full(len(codes), fn(None), bool)
+    hit = codes >= 0
+    out[hit] = table[codes[hit]]
+    return out
+
+
+def prescore(orgs: Iterable[Dict]):
+    """
+    Data-quality figures for every org, one DataFrame row per org in input order.
+
+    Columns: products, missingDescriptions (share), vagueNames, missingUnits (bool)
+    and qualityScore — the same score org_quality() gives for each org alone.
+    """
+    import numpy as np
+    import pandas as pd
+
+    sizes, flat = [], []
+    for org in orgs:
+        products = org.get("product_names") or ()
+        sizes.append(len(products))
+        flat += products
+
+    def column(key):
+        return [p.get(key) for p in flat]
+
+    n_orgs = len(sizes)
+    sizes = np.asarray(sizes, np.int64)
+    owner = np.repeat(np.arange(n_orgs), sizes)
+    physical = _flags(column("typeOfCommodity"), lambda v: v == 1)
+
+    def per_org(mask):
+        return np.bincount(owner, mask.astype(np.float64), n_orgs).astype(np.int64)
+
+    missing_desc = per_org(_flags(column("discription"), _blank))
+    vague = per_org(_flags(column("productName"), is_vague_name))
+    n_physical = per_org(physical)
+    missing_units = per_org(_flags(column("unit"), _blank) & physical)
+
+    penalty = np.minimum(VAGUE_PENALTY_CAP, VAGUE_PENALTY * vague)
+    penalty += np.where((sizes == 0) | (missing_desc * 2 > sizes), DESCRIPTION_PENALTY, 0.0)
+    units_missing = (n_physical > 0) & (missing_units * 2 > n_physical)
+    penalty += np.where(units_missing, UNIT_PENALTY, 0.0)
+
+    return pd.DataFrame({
+        "products":            sizes,
+        "missingDescriptions": np.divide(missing_desc, sizes, out=np.ones(n_orgs), where=sizes > 0),
+        "vagueNames":          vague,
+        "missingUnits":        units_missing,
+        "qualityScore":        np.maximum(MIN_SCORE, 1.0 - penalty).round(2),
+    })
+
+
+def quality_summary(scores, low: float = 0.8) -> Dict:
+    """Headline figures of a prescore() frame."""
+    q = scores["qualityScore"]
+    return {
+        "orgs":     int(len(q)),
+        "median":   float(q.median()) if len(q) else None,
+        "lowShare": round(float((q < low).mean()), 3) if len(q) else 0.0,
+        "missingDescriptions": round(float(scores["missingDescriptions"].mean()), 3) if len(q) else 0.0,
+    }
@@ -0,0 +1,326 @@
+"""
+Compact typed records for organizations, products and classification results.
+Slotted classes with interned category strings instead of nested dicts, plus
+schema validation for raw LLM responses. Every record converts back to the
+plain dict shape app.py and results_to_xlsx() already consume.
+"""
+
+import json
+import re
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+INDUSTRIES = (
+    "Electronics & Tech", "Fashion & Apparel", "Home Appliances", "Home & Living",
+    "Health & Medical", "Fitness & Sports", "Beauty & Personal Care", "Food & Beverage",
+    "Tobacco & Vaping", "Tobacco & Pan Products", "Stationery & Office", "Automotive",
+    "Manufacturing Supplies", "General Trade & Wholesale", "Laundry & Services", "Hotels & Villa",
+)
+
+OPERATION_TYPES = (
+    "Seller", "Manufacturer", "Maintenance & Installation", "Professional Service",
+    "Food Service", "Supermarket", "Seller, Service and Maintenance", "Service", "Mixed",
+)
+
+# Org-name decision rules of the prompt (CONSISTENCY RULES): (pattern, operationType, forced primaryIndustry)
+_NAME_RULES = [
+    (r"MART|SUPERMARKET|HYPERMARKET|MINIMART|SUPERSTORE", "Supermarket", None),
+    (r"LAUNDRY|LAUNDROMAT|DRY ?CLEAN\w*|LAVANDER[IÍ]A", "Service", "Laundry & Services"),
+    (r"HOTEL|VILLA|MOTEL|INN|RESORT|LODGE|HOSTAL|HOSPEDAJE", "Service", "Hotels & Villa"),
+    (r"CLINIC|HOSPITAL|DR\.?|DOCTOR|DENTAL|LAW|CONSULT\w*|ENGINEER\w*", "Professional Service", None),
+    (r"RESTAURANT|BAKERY|CATERING|CAFE|KITCHEN", "Food Service", None),
+    (r"DEPOT|STORE|SHOP|TRADING|SUPPLIERS|WHOLESALER|DISTRIBUTOR|IMPORTER|EXPORTER|TRADERS?|ENTERPRISE",
+     "Seller", None),
+]
+_NAME_RULES = [(re.compile(rf"(?<![A-Z]){p}(?![A-Z])"), op, ind) for p, op, ind in _NAME_RULES]
+
+
+def operation_type_from_name(org_name: str) -> Tuple[Optional[str], Optional[str]]:
+    """(operationType, forced primaryIndustry) from the org-name decision rules of the prompt."""
+    name = (org_name or "").upper()
+    for pattern, op_type, industry in _NAME_RULES:
+        if pattern.search(name):
+            return op_type, industry
+    return None, None
+
+
+def _s(value) -> str:
+    """Intern short repeated strings (units, categories, industries) — one copy per process."""
+    if value is None:
+        return ""
+    value = str(value)
+    return sys.intern(value) if len(value) <= 64 else value
+
+
+# ----------------------------------------------------------------------
+# Input records
+# ----------------------------------------------------------------------
+
+class Product:
+    __slots__ = ("name", "category", "unit", "code", "commodity", "description")
+
+    def __init__(self, name: str, category: str = "", unit: str = "", code: str = "",
+                 commodity: int = 0, description: str = ""):
+        self.name = name
+        self.category = category
+        self.unit = unit
+        self.code = code
+        self.commodity = commodity
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "Product":
+        return cls(
+            d.get("productName") or "",
+            _s(d.get("categoryName")),
+            _s(d.get("unit")),
+            _s(d.get("productCode")),
+            int(d.get("typeOfCommodity") or 0),
+            d.get("discription") or "",
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "productName":     self.name,
+            "categoryName":    self.category,
+            "unit":            self.unit,
+            "productCode":     self.code,
+            "typeOfCommodity": self.commodity,
+            "discription":     self.description,
+        }
+
+
+class Organization:
+    __slots__ = ("id", "name", "business_id", "country", "products")
+
+    def __init__(self, id: str, name: str, business_id: str = "", country: str = "",
+                 products: Tuple[Product, ...] = ()):
+        self.id = id
+        self.name = name
+        self.business_id = business_id
+        self.country = country
+        self.products = products
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "Organization":
+        return cls(
+            str(d.get("_id", "")),
+            d.get("orgName") or "",
+            d.get("businessId") or "",
+            _s(d.get("countryCode")),
+            tuple(Product.from_dict(p) for p in d.get("product_names") or ()),
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "_id":           self.id,
+            "orgName":       self.name,
+            "businessId":    self.business_id,
+            "countryCode":   self.country,
+            "product_names": [p.to_dict() for p in self.products],
+        }
+
+
+# ----------------------------------------------------------------------
+# Result records
+# ----------------------------------------------------------------------
+
+class IndustryShare:
+    __slots__ = ("industry", "sub_category", "percentage", "samples")
+
+    def __init__(self, industry: str, sub_category: str, percentage: int, samples: Tuple[str, ...] = ()):
+        self.industry = industry
+        self.sub_category = sub_category
+        self.percentage = percentage
+        self.samples = samples
+
+    def to_dict(self) -> Dict:
+        return {
+            "industry":       self.industry,
+            "subCategory":    self.sub_category,
+            "percentage":     self.percentage,
+            "sampleProducts": list(self.samples),
+        }
+
+
+class ClassificationResult:
+    __slots__ = ("org_name", "product_count", "primary_industry", "operation_type",
+                 "confidence", "reasoning", "is_multi", "industries", "error", "error_type", "classified_by")
+
+    def __init__(self, org_name: str, product_count: int, primary_industry: Optional[str] = None,
+                 operation_type: Optional[str] = None, confidence: Optional[float] = None,
+                 reasoning: Optional[str] = None, is_multi: bool = False,
+                 industries: Tuple[IndustryShare, ...] = (), error: Optional[str] = None,
+                 error_type: Optional[str] = None, classified_by: Optional[str] = None):
+        self.org_name = org_name
+        self.product_count = product_count
+        self.primary_industry = primary_industry
+        self.operation_type = operation_type
+        self.confidence = confidence
+        self.reasoning = reasoning
+        self.is_multi = is_multi
+        self.industries = industries
+        self.error = error
+        self.error_type = error_type
+        self.classified_by = classified_by
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "ClassificationResult":
+        """Build from a result dict as produced by IndustryClassifier (success or error)."""
+        clf = d.get("classification") or {}
+        primary, op = d.get("primaryIndustry"), d.get("operationType")
+        return cls(
+            d.get("orgName") or "",
+            d.get("productCount") or 0,
+            _s(primary) if primary else None,
+            _s(op) if op else None,
+            d.get("confidenceScore"),
+            d.get("AIreasoning"),
+            bool(clf.get("isMultiIndustry", False)),
+            tuple(
+                IndustryShare(
+                    _s(i.get("industry")), _s(i.get("subCategory")),
+                    int(i.get("percentage") or 0), tuple(i.get("sampleProducts") or ()),
+                )
+                for i in clf.get("industries") or ()
+            ),
+            clf.get("error"),
+            _s(clf.get("errorType")) if "error" in clf else None,
+            _s(d["classifiedBy"]) if d.get("classifiedBy") else None,
+        )
+
+    def to_dict(self) -> Dict:
+        if self.error is not None:
+            classification = {"error": self.error, "errorType": self.error_type or "error"}
+        else:
+            classification = {
+                "isMultiIndustry": self.is_multi,
+                "industries":      [i.to_dict() for i in self.industries],
+            }
+        d = {
+            "orgName":         self.org_name,
+            "productCount":    self.product_count,
+            "primaryIndustry": self.primary_industry,
+            "operationType":   self.operation_type,
+            "confidenceScore": self.confidence,
+            "AIreasoning":     self.reasoning,
+            "classification":  classification,
+        }
+        if self.classified_by:
+            d["classifiedBy"] = self.classified_by       # local | hybrid (see local_model.LocalRouter)
+        return d
+
+
+# ----------------------------------------------------------------------
+# Validation
+# ----------------------------------------------------------------------
+
+def round_percentages(counts: Dict[str, float]) -> List[Tuple[str, int]]:
+    """Counts → (industry, percentage) in multiples of 5 summing to 100, largest first, <5% dropped."""
+    total = sum(counts.values())
+    if not total:
+        return []
+    shares = {k: v * 20 / total for k, v in counts.items()}
+    units = {k: int(s) for k, s in shares.items()}
+    for k in sorted(shares, key=lambda k: shares[k] - units[k], reverse=True)[:20 - sum(units.values())]:
+        units[k] += 1
+    return sorted(((k, u * 5) for k, u in units.items() if u), key=lambda kv: -kv[1])
+
+
+def validate_llm_response(raw: Dict, org_name: Optional[str] = None) -> List[str]:
+    """
+    Check a parsed LLM response against the USER_PROMPT_TEMPLATE schema — shape, the
+    INDUSTRIES / OPERATION_TYPES enums and the STEP 2-3 rules (industry count, percentages
+    in multiples of 5 summing to 100). primaryIndustry must be one of the listed industries,
+    or the one an org-name rule (operation_type_from_name) sets, listed or not.
+
+    Args:
+        raw:      Parsed JSON object returned by the model.
+        org_name: Name of the org the reply is for (default: the reply's orgName).
+
+    Returns:
+        List of human-readable problems (empty when the response is valid).
+    """
+    problems = []
+    if not isinstance(raw, dict):
+        return ["response is not a JSON object"]
+
+    for key, kind in (("primaryIndustry", str), ("operationType", str)):
+        if not isinstance(raw.get(key), kind):
+            problems.append(f"{key} missing or not a string")
+    if isinstance(raw.get("operationType"), str) and raw["operationType"] not in OPERATION_TYPES:
+        problems.append(f"operationType {raw['operationType']!r} is not one of the fixed classes")
+    conf = raw.get("confidenceScore")
+    if not isinstance(conf, (int, float)) or isinstance(conf, bool) or not 0.0 <= conf <= 1.0:
+        problems.append("confidenceScore missing or outside [0, 1]")
+
+    clf = raw.get("classification")
+    if not isinstance(clf, dict):
+        return problems + ["classification missing or not an object"]
+    if not isinstance(clf.get("isMultiIndustry"), bool):
+        problems.append("classification.isMultiIndustry missing or not a boolean")
+    industries = clf.get("industries")
+    if not isinstance(industries, list) or not industries:
+        return problems + ["classification.industries missing or empty"]
+    names, total, before = [], 0, len(problems)
+    for n, ind in enumerate(industries):
+        if not isinstance(ind, dict):
+            problems.append(f"industries[{n}] is not an object")
+            continue
+        name = ind.get("industry")
+        if not isinstance(name, str):
+            problems.append(f"industries[{n}].industry missing or not a string")
+        elif name not in INDUSTRIES:
+            problems.append(f"industries[{n}].industry {name!r} is not in the taxonomy")
+        names.append(name)
+        pct = ind.get("percentage")
+        if not isinstance(pct, (int, float)) or isinstance(pct, bool):
+            problems.append(f"industries[{n}].percentage missing or not a number")
+        else:
+            total += pct
+            if pct <= 0 or pct % 5:
+                problems.append(f"industries[{n}].percentage {pct} is not a positive multiple of 5")
+        if not isinstance(ind.get("sampleProducts", []), list):
+            problems.append(f"industries[{n}].sampleProducts is not a list")
+    if len(problems) > before:
+        return problems
+
+    if len(set(names)) < len(names):
+        problems.append("classification.industries lists an industry twice")
+    if total != 100:
+        problems.append(f"percentages sum to {total:g}, not 100")
+    forced = operation_type_from_name(raw.get("orgName") if org_name is None else org_name)[1]
+    if forced and raw.get("primaryIndustry") != forced:
+        problems.append(f"primaryIndustry must be {forced!r} for this org name")
+    elif isinstance(raw.get("primaryIndustry"), str) and raw["primaryIndustry"] not in names + [forced]:
+        problems.append(f"primaryIndustry {raw['primaryIndustry']!r} is not among the industries")
+    if clf["isMultiIndustry"] != (len(set(names)) >= 2):
+        problems.append("classification.isMultiIndustry does not match the industry count")
+    return problems
+
+
+# ----------------------------------------------------------------------
+# Fast I/O
+# ----------------------------------------------------------------------
+
+def iter_result_dicts(results: Iterable) -> Iterator[Dict]:
+    """Yield today's dict shape from a mix of ClassificationResult records and dicts."""
+    for r in results:
+        yield r.to_dict() if isinstance(r, ClassificationResult) else r
+
+
+def dump_results(results: Iterable, path: str, indent: Optional[int] = None):
+    """
+    Encode results (records or dicts) to a JSON array file.
+    Rows are written one at a time, so the full JSON string is never held in memory.
+    """
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=indent,
+                               separators=None if indent else (",", ":"))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for n, d in enumerate(iter_result_dicts(results)):
+            if n:
+                f.write(",")
+            f.write("\n" if indent else "")
+            f.write(encoder.encode(d))
+        f.write("\n]" if indent else "]")
@@ -0,0 +1,370 @@
+"""
+Targeted repair of invalid LLM responses.
+A reply that is cut off at max_tokens or breaks the schema no longer costs the
+whole org: deterministic problems are fixed locally (truncated JSON closed and
+reparsed, near-miss enum values matched, percentages renormalized, derived
+fields such as primaryIndustry and isMultiIndustry recomputed), and only what
+cannot be decided locally — an unknown industry name, a missing operationType,
+an unusable industry list — is asked for again in one small follow-up call.
+"""
+
+import json
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from quality import org_quality
+from records import INDUSTRIES, OPERATION_TYPES, operation_type_from_name, round_percentages, validate_llm_response
+
+FOLLOW_UP_PRODUCTS = 40          # product names shown to the follow-up call
+
+FOLLOW_UP_SYSTEM = "You correct single fields of an industry classification. Reply with valid JSON only."
+
+FOLLOW_UP_TEMPLATE = """Organization: {org_name}
+Products: {products}
+
+Current answer:
+{answer}
+
+Fix ONLY these fields:
+{fields}
+
+Return ONLY a JSON object with exactly these keys: {keys}"""
+
+_KEY = re.compile(r"[^a-z0-9&]")
+
+
+# ----------------------------------------------------------------------
+# Deterministic helpers
+# ----------------------------------------------------------------------
+
+def salvage_json(text: str) -> Optional[Dict]:
+    """
+    Parse a reply that was cut off mid-object (max_tokens): the incomplete trailing
+    value is dropped and the open arrays and objects are closed. None when nothing
+    usable remains.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    stack: List[str] = []
+    cuts: List[Tuple[int, str]] = []          # (end, closers) after every complete value
+    in_str = escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_str:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_str = False
+        elif c == '"':
+            in_str = True
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+            cuts.append((i + 1, "".join(reversed(stack))))
+        elif c in "}]":
+            if not stack:
+                break
+            stack.pop()
+            if not stack:
+                text = text[start:i + 1]
+                cuts = [(len(text), "")]
+                start = 0
+                break
+            cuts.append((i + 1, "".join(reversed(stack))))
+        elif c == ",":
+            cuts.append((i, "".join(reversed(stack))))
+    for end, closers in reversed(cuts[-8:]):
+        try:
+            parsed = json.loads(text[start:end] + closers)
+        except json.JSONDecodeError:
+            continue
+        return parsed if isinstance(parsed, dict) else None
+    return None
+
+
+def match_choice(value, choices) -> Optional[str]:
+    """
+    The allowed value `value` unambiguously stands for, ignoring case, spacing,
+    punctuation and "and" vs "&" (a unique prefix match counts too), else None.
+    """
+    if not isinstance(value, str):
+        return None
+    key = _KEY.sub("", value.lower().replace(" and ", " & "))
+    if not key:
+        return None
+    keys = {_KEY.sub("", c.lower().replace(" and ", " & ")): c for c in choices}
+    if key in keys:
+        return keys[key]
+    hits = {c for k, c in keys.items() if k.startswith(key) or key.startswith(k)}
+    return hits.pop() if len(hits) == 1 else None
+
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value.strip().rstrip("%"))
+        except ValueError:
+            return None
+    return None
+
+
+# ----------------------------------------------------------------------
+# Repairer
+# ----------------------------------------------------------------------
+
+class ResponseRepairer:
+    """Fixes invalid replies locally where the fix is deterministic and asks a follow-up for the rest"""
+
+    def __init__(self, follow_ups: bool = True):
+        """
+        Args:
+            follow_ups: Ask the model again for fields that cannot be fixed locally
+                        (False = such replies fail with errorType "schema").
+        """
+        self.follow_ups = follow_ups
+        self._lock = threading.Lock()
+        self._outcomes = Counter()
+        self._fixes = Counter()
+
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def repair(self, raw: str, org: Dict,
+               follow_up: Optional[Callable[[List[Dict]], str]] = None) -> Tuple[Dict, List[str]]:
+        """
+        Parse and repair one reply.
+
+        Args:
+            raw:       Reply text of the classification call.
+            org:       The org as prompted (for its name, products and quality score).
+            follow_up: Sends messages to the model and returns the reply text; None = no follow-up.
+
+        Returns:
+            (response, problems) — problems left after every repair (empty = valid).
+
+        Raises:
+            json.JSONDecodeError: the reply holds no recoverable JSON object.
+        """
+        fixes: List[str] = []
+        try:
+            response = json.loads(raw.strip())
+            truncated = False
+        except json.JSONDecodeError:
+            response = salvage_json(raw)
+            if response is None:
+                self._count("unparseable", fixes)
+                raise
+            truncated = True
+            fixes.append("truncated JSON closed")
+
+        if not isinstance(response, dict):
+            problems = validate_llm_response(response)
+            self._count("failed", fixes)
+            return response, problems
+        if not truncated and not validate_llm_response(response, org.get("orgName", "")):
+            self._count("clean", fixes)
+            return response, []
+
+        needs = self._fix_locally(response, org, truncated, fixes)
+        outcome = "repairedLocally"
+        if needs and self.follow_ups and follow_up is not None:
+            outcome = "repairedByFollowUp"
+            fixes.append("follow-up asked")
+            try:
+                reply = json.loads(follow_up(self._follow_up_messages(response, org, needs)).strip())
+            except Exception:
+                reply = None
+            if isinstance(reply, dict) and self._merge(response, reply, needs):
+                fixes.append("follow-up answered: " + ", ".join(needs))
+                self._fix_locally(response, org, False, fixes)
+
+        problems = validate_llm_response(response, org.get("orgName", ""))
+        self._count("failed" if problems else outcome, fixes)
+        return response, problems
+
+    # ------------------------------------------------------------------
+    # Local fixes
+    # ------------------------------------------------------------------
+
+    def _fix_locally(self, response: Dict, org: Dict, truncated: bool, fixes: List[str]) -> Dict[str, str]:
+        """Apply every deterministic fix in place; returns {field: problem} still needing the model."""
+        needs: Dict[str, str] = {}
+        if not isinstance(response.get("orgName"), str):
+            response["orgName"] = org.get("orgName", "")
+
+        clf = response.get("classification")
+        if not isinstance(clf, dict):
+            clf = response["classification"] = {}
+        industries, unknown, problem = self._fix_industries(clf.get("industries"), truncated, fixes)
+        if problem:
+            needs["industries"] = problem
+        elif unknown:
+            needs["industryMap"] = "names outside the taxonomy: " + ", ".join(json.dumps(u) for u in unknown)
+        clf["industries"] = industries
+
+        names = [ind["industry"] for ind in industries]
+        if industries and not problem:
+            multi = len(set(names)) >= 2
+            if clf.get("isMultiIndustry") is not multi:
+                clf["isMultiIndustry"] = multi
+                fixes.append("isMultiIndustry recounted")
+            # CONSISTENCY RULES: a LAUNDRY / HOTEL … org name sets the primary, listed or not
+            forced = operation_type_from_name(org.get("orgName", ""))[1]
+            primary = forced or match_choice(response.get("primaryIndustry"), INDUSTRIES)
+            if primary not in names and not forced:
+                primary = max(industries, key=lambda ind: ind["percentage"])["industry"]
+            if response.get("primaryIndustry") != primary:
+                response["primaryIndustry"] = primary
+                fixes.append("primaryIndustry set")
+
+        op_type = response.get("operationType")
+        matched = match_choice(op_type, OPERATION_TYPES)
+        if matched is None:
+            needs["operationType"] = "missing" if not op_type else f"{op_type!r} is not one of the fixed classes"
+        elif matched != op_type:
+            response["operationType"] = matched
+            fixes.append("operationType matched")
+
+        score = _number(response.get("confidenceScore"))
+        if score is not None and 1.0 < score <= 100.0:
+            score /= 100.0
+        if score is None or not 0.0 <= score <= 1.0:
+            score = org_quality(org)
+        if score != response.get("confidenceScore"):
+            response["confidenceScore"] = score
+            fixes.append("confidenceScore set")
+        return needs
+
+    @staticmethod
+    def _fix_industries(industries, truncated: bool, fixes: List[str]) -> Tuple[List[Dict], List[str], Optional[str]]:
+        """(industries, unknown names, problem) — problem set when only the model can rebuild the list."""
+        if not isinstance(industries, list) or not industries:
+            return [], [], "missing or empty"
+        merged: Dict[str, Dict] = {}
+        unknown: List[str] = []
+        for ind in industries:
+            if not isinstance(ind, dict) or not isinstance(ind.get("industry"), str):
+                fixes.append("malformed industry entry dropped")
+                continue
+            name = match_choice(ind["industry"], INDUSTRIES)
+            if name is None:
+                name = ind["industry"]
+                unknown.append(name)
+            elif name != ind["industry"]:
+                fixes.append("industry name matched")
+            pct = _number(ind.get("percentage"))
+            if pct is None:
+                return industries, [], "percentages missing"
+            samples = ind.get("sampleProducts")
+            samples = samples if isinstance(samples, list) else [samples] if isinstance(samples, str) else []
+            if name in merged:
+                merged[name]["percentage"] += pct
+                merged[name]["sampleProducts"] += samples
+                if isinstance(ind.get("variantProducts"), list):
+                    merged[name]["variantProducts"] = merged[name].get("variantProducts", []) + ind["variantProducts"]
+                fixes.append("duplicate industries merged")
+            else:
+                merged[name] = dict(ind, industry=name, percentage=pct, sampleProducts=samples,
+                                    subCategory=ind.get("subCategory") or "")
+        if not merged:
+            return [], [], "no usable industry entries"
+
+        pcts = [ind["percentage"] for ind in merged.values()]
+        if sum(pcts) <= 0:
+            return list(merged.values()), unknown, "percentages missing"
+        if sum(pcts) != 100 or any(p <= 0 or p % 5 for p in pcts):
+            if truncated and sum(pcts) != 100:
+                return list(merged.values()), unknown, "list cut off at the token limit"
+            rounded = dict(round_percentages({k: max(0.0, v["percentage"]) for k, v in merged.items()}))
+            merged = {k: dict(v, percentage=rounded[k]) for k, v in merged.items() if k in rounded}
+            unknown = [u for u in unknown if u in merged]
+            fixes.append("percentages renormalized")
+        for ind in merged.values():
+            if isinstance(ind["percentage"], float) and ind["percentage"].is_integer():
+                ind["percentage"] = int(ind["percentage"])
+        return sorted(merged.values(), key=lambda ind: -ind["percentage"]), unknown, None
+
+    # ------------------------------------------------------------------
+    # Follow-up
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _follow_up_messages(response: Dict, org: Dict, needs: Dict[str, str]) -> List[Dict]:
+        products = [str(p.get("productName", "")) for p in (org.get("product_names") or [])[:FOLLOW_UP_PRODUCTS]]
+        allowed_industries = ", ".join(json.dumps(i) for i in INDUSTRIES)
+        fields = []
+        if "operationType" in needs:
+            fields.append(f'- operationType ({needs["operationType"]}): exactly one of '
+                          + ", ".join(json.dumps(o) for o in OPERATION_TYPES))
+        if "industryMap" in needs:
+            fields.append(f'- industryMap ({needs["industryMap"]}): an object mapping each of those names '
+                          f"to the one industry that fits best from: {allowed_industries}")
+        if "industries" in needs:
+            fields.append(f'- industries ({needs["industries"]}): the full list of '
+                          '{"industry", "subCategory", "percentage", "sampleProducts", "variantProducts"} '
+                          f"objects — industries from: {allowed_industries}; percentages in multiples of 5 "
+                          "summing to 100")
+        answer = {k: v for k, v in response.items() if k != "AIreasoning"}
+        return [
+            {"role": "system", "content": FOLLOW_UP_SYSTEM},
+            {"role": "user", "content": FOLLOW_UP_TEMPLATE.format(
+                org_name=org.get("orgName", ""),
+                products="; ".join(products) or "—",
+                answer=json.dumps(answer, ensure_ascii=False),
+                fields="\n".join(fields),
+                keys=", ".join(needs),
+            )},
+        ]
+
+    @staticmethod
+    def _merge(response: Dict, reply: Dict, needs: Dict[str, str]) -> bool:
+        """Fold the follow-up reply into the response; False when it answered nothing usable."""
+        used = False
+        if "operationType" in needs and isinstance(reply.get("operationType"), str):
+            response["operationType"] = reply["operationType"]
+            used = True
+        if "industries" in needs and isinstance(reply.get("industries"), list):
+            response["classification"]["industries"] = reply["industries"]
+            used = True
+        elif "industryMap" in needs and isinstance(reply.get("industryMap"), dict):
+            for ind in response["classification"]["industries"]:
+                ind["industry"] = reply["industryMap"].get(ind["industry"], ind["industry"])
+            used = True
+        return used
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+
+    def _count(self, outcome: str, fixes: List[str]):
+        with self._lock:
+            self._outcomes[outcome] += 1
+            self._fixes.update(set(fixes))
+
+    def stats(self) -> Dict:
+        """How many replies were clean, repaired locally, repaired by a follow-up or failed."""
+        with self._lock:
+            outcomes, fixes = dict(self._outcomes), dict(self._fixes)
+        return {
+            "responses":       sum(outcomes.values()),
+            "clean":           outcomes.get("clean", 0),
+            "repairedLocally": outcomes.get("repairedLocally", 0),
+            "repairedByFollowUp": outcomes.get("repairedByFollowUp", 0),
+            "followUps":       fixes.get("follow-up asked", 0),
+            "failed":          outcomes.get("failed", 0) + outcomes.get("unparseable", 0),
+            "fixes":           fixes,
+        }
@@ -0,0 +1,328 @@
+"""
+Indexed local warehouse for classification results.
+Results are persisted to SQLite with one row per org plus an exploded
+industries table, so the Analytics tab runs SQL aggregates instead of looping
+over result dicts — and keeps its data across sessions and restarts. Measured
+API calls (tokens, latency) are kept alongside to calibrate planner.plan_run().
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from aggregates import ResultAggregate
+from records import iter_result_dicts
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id               INTEGER PRIMARY KEY,
+    run_id           TEXT NOT NULL,
+    org_id           TEXT,
+    org_name         TEXT,
+    product_count    INTEGER,
+    primary_industry TEXT,
+    operation_type   TEXT,
+    confidence       REAL,
+    is_multi         INTEGER,
+    error            TEXT,
+    error_type       TEXT,
+    created_at       REAL,
+    data             TEXT
+);
+CREATE INDEX IF NOT EXISTS results_run      ON results (run_id);
+CREATE INDEX IF NOT EXISTS results_primary  ON results (primary_industry);
+CREATE INDEX IF NOT EXISTS results_op_type  ON results (operation_type);
+CREATE INDEX IF NOT EXISTS results_conf     ON results (confidence);
+CREATE INDEX IF NOT EXISTS results_multi    ON results (is_multi);
+
+CREATE TABLE IF NOT EXISTS result_industries (
+    result_id    INTEGER NOT NULL REFERENCES results (id) ON DELETE CASCADE,
+    position     INTEGER,
+    industry     TEXT,
+    sub_category TEXT,
+    percentage   INTEGER
+);
+CREATE INDEX IF NOT EXISTS industries_result   ON result_industries (result_id);
+CREATE INDEX IF NOT EXISTS industries_industry ON result_industries (industry);
+
+CREATE TABLE IF NOT EXISTS calls (
+    run_id            TEXT NOT NULL,
+    model             TEXT,
+    products          INTEGER,
+    est_input_tokens  INTEGER,
+    prompt_tokens     INTEGER,
+    completion_tokens INTEGER,
+    latency           REAL,
+    created_at        REAL
+);
+CREATE INDEX IF NOT EXISTS calls_model ON calls (model, created_at);
+"""
+
+CALL_FIELDS = ("model", "products", "estInputTokens", "promptTokens", "completionTokens", "latency")
+
+
+class ResultsWarehouse:
+    """SQLite-backed result store shared by every session in the process"""
+
+    def __init__(self, path: str = "results.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as con:
+            con.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        con.execute("PRAGMA foreign_keys = ON")
+        con.execute("PRAGMA journal_mode = WAL")
+        return con
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def add(self, results: Iterable, run_id: str, replace: bool = True,
+            org_ids: Optional[Iterable[Optional[str]]] = None) -> int:
+        """
+        Persist results (dicts or ClassificationResult records) under a run id.
+
+        Args:
+            results: Classification results.
+            run_id:  Batch / job identifier the rows are grouped by.
+            replace: Drop rows already stored for this run first (idempotent re-saves).
+            org_ids: Org _id of each result, in the same order — results themselves carry no _id.
+                     Without it the org_id column is only filled for results that do.
+
+        Returns:
+            Number of result rows written.
+        """
+        now = time.time()
+        n = 0
+        with self._lock, self._connect() as con:
+            if replace:
+                con.execute("DELETE FROM results WHERE run_id = ?", (run_id,))
+            ids = iter(org_ids) if org_ids is not None else None
+            for r in iter_result_dicts(results):
+                org_id = next(ids) if ids is not None else r.get("_id")
+                clf = r.get("classification") or {}
+                cur = con.execute(
+                    "INSERT INTO results (run_id, org_id, org_name, product_count, primary_industry,"
+                    " operation_type, confidence, is_multi, error, error_type, created_at, data)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_id, org_id, r.get("orgName"), r.get("productCount"),
+                        r.get("primaryIndustry"), r.get("operationType"), r.get("confidenceScore"),
+                        int(bool(clf.get("isMultiIndustry"))), clf.get("error"),
+                        clf.get("errorType") if "error" in clf else None,
+                        now, json.dumps(r, ensure_ascii=False),
+                    ),
+                )
+                con.executemany(
+                    "INSERT INTO result_industries VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (cur.lastrowid, pos, ind.get("industry"), ind.get("subCategory"), ind.get("percentage"))
+                        for pos, ind in enumerate(clf.get("industries") or [])
+                    ],
+                )
+                n += 1
+        return n
+
+    def add_calls(self, records: Iterable[Dict], run_id: str) -> int:
+        """Persist planner.usage_record() dicts of a run's API calls; returns rows written."""
+        now = time.time()
+        rows = [(run_id,) + tuple(r.get(k) for k in CALL_FIELDS) + (now,) for r in records]
+        with self._lock, self._connect() as con:
+            con.executemany("INSERT INTO calls VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def call_history(self, model: Optional[str] = None, limit: int = 5000) -> List[Dict]:
+        """The most recent measured calls (of one model, or all), newest first."""
+        where, params = ("WHERE model = ?", (model,)) if model else ("", ())
+        rows = self._query(
+            "SELECT model, products, est_input_tokens, prompt_tokens, completion_tokens, latency"
+            f" FROM calls {where} ORDER BY created_at DESC LIMIT ?", params + (limit,),
+        )
+        return [dict(zip(CALL_FIELDS, row)) for row in rows]
+
+    def call_count(self) -> int:
+        return self._query("SELECT COUNT(*) FROM calls")[0][0]
+
+    # ------------------------------------------------------------------
+    # Aggregates (successful results only)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _where(run_id: Optional[str]) -> Tuple[str, tuple]:
+        if run_id:
+            return "WHERE error IS NULL AND run_id = ?", (run_id,)
+        return "WHERE error IS NULL", ()
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._connect() as con:
+            return con.execute(sql, params).fetchall()
+
+    def count(self, run_id: Optional[str] = None) -> int:
+        where, params = self._where(run_id)
+        return self._query(f"SELECT COUNT(*) FROM results {where}", params)[0][0]
+
+    def industry_counts(self, run_id: Optional[str] = None) -> List[Tuple[str, int]]:
+        """(primaryIndustry, orgs) sorted by count, descending."""
+        where, params = self._where(run_id)
+        return self._query(
+            f"SELECT COALESCE(primary_industry, 'Unknown'), COUNT(*) AS n FROM results {where}"
+            " GROUP BY 1 ORDER BY n DESC", params,
+        )
+
+    def operation_type_counts(self, run_id: Optional[str] = None) -> List[Tuple[str, int]]:
+        where, params = self._where(run_id)
+        return self._query(
+            f"SELECT COALESCE(operation_type, 'Unknown'), COUNT(*) AS n FROM results {where}"
+            " GROUP BY 1 ORDER BY n DESC", params,
+        )
+
+    def multi_counts(self, run_id: Optional[str] = None) -> Tuple[int, int]:
+        """(single-industry orgs, multi-industry orgs)."""
+        where, params = self._where(run_id)
+        row = self._query(
+            f"SELECT COALESCE(SUM(1 - is_multi), 0), COALESCE(SUM(is_multi), 0) FROM results {where}", params,
+        )[0]
+        return int(row[0]), int(row[1])
+
+    def confidence_histogram(self, bins: int = 15, run_id: Optional[str] = None) -> List[Tuple[float, int]]:
+        """(bin lower edge, orgs) over [0, 1] — pre-binned so the chart never sees raw values."""
+        where, params = self._where(run_id)
+        rows = dict(self._query(
+            f"SELECT MIN(CAST(confidence * ? AS INTEGER), ? - 1), COUNT(*) FROM results {where}"
+            " AND confidence IS NOT NULL GROUP BY 1", (bins, bins) + params,
+        ))
+        return [(b / bins, rows.get(b, 0)) for b in range(bins)]
+
+    def industry_share(self, run_id: Optional[str] = None) -> List[Tuple[str, int]]:
+        """(industry, orgs listing it anywhere in their breakdown) from the exploded table."""
+        where, params = self._where(run_id)
+        return self._query(
+            "SELECT i.industry, COUNT(DISTINCT i.result_id) AS n FROM result_industries i"
+            f" JOIN results ON results.id = i.result_id {where} GROUP BY 1 ORDER BY n DESC", params,
+        )
+
+    def org_details(self, industry: str, run_id: Optional[str] = None,
+                    limit: int = 8, offset: int = 0) -> List[Dict]:
+        """Orgs whose primaryIndustry is `industry` — orgName, operationType, confidenceScore."""
+        where, params = self._where(run_id)
+        rows = self._query(
+            f"SELECT org_name, operation_type, confidence FROM results {where} AND primary_industry = ?"
+            " ORDER BY id LIMIT ? OFFSET ?", params + (industry, limit, offset),
+        )
+        return [{"orgName": n, "operationType": o, "confidenceScore": c} for n, o, c in rows]
+
+    def aggregate(self, run_id: Optional[str] = None, bins: int = 15) -> ResultAggregate:
+        """All Analytics counters for a run (or everything) as one ResultAggregate."""
+        where, params = self._where(run_id)
+        conf_mean = self._query(
+            f"SELECT COALESCE(AVG(confidence), 0), COUNT(confidence) FROM results {where}", params,
+        )[0]
+        if run_id:
+            errors = self._query(
+                "SELECT COALESCE(error_type, 'error'), COUNT(*) FROM results"
+                " WHERE error IS NOT NULL AND run_id = ? GROUP BY 1", (run_id,),
+            )
+        else:
+            errors = self._query(
+                "SELECT COALESCE(error_type, 'error'), COUNT(*) FROM results WHERE error IS NOT NULL GROUP BY 1"
+            )
+        return ResultAggregate.from_counts(
+            self.industry_counts(run_id), self.operation_type_counts(run_id), self.multi_counts(run_id),
+            self.confidence_histogram(bins, run_id), conf_mean, errors,
+        )
+
+    # ------------------------------------------------------------------
+    # Paged table
+    # ------------------------------------------------------------------
+
+    SORT_COLUMNS = {
+        "input":          "id",
+        "confidence":     "confidence",
+        "orgName":        "org_name",
+        "primaryIndustry": "primary_industry",
+        "operationType":  "operation_type",
+    }
+
+    def page(
+        self,
+        run_id: Optional[str] = None,
+        industries: Optional[List[str]] = None,
+        operation_types: Optional[List[str]] = None,
+        min_confidence: Optional[float] = None,
+        status: str = "all",
+        sort: str = "input",
+        descending: bool = False,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Tuple[List[Dict], int]:
+        """
+        One filtered, sorted page of result rows — only this page leaves the database.
+
+        Args:
+            run_id:          Restrict to one run.
+            industries:      Keep these primaryIndustry values.
+            operation_types: Keep these operationType values.
+            min_confidence:  Keep rows with confidenceScore >= this (errors have none).
+            status:          "all" | "ok" | "error".
+            sort:            Key of SORT_COLUMNS.
+            descending:      Sort direction.
+            limit, offset:   Page window.
+
+        Returns:
+            (rows, total rows matching the filters).
+        """
+        clauses, params = [], []
+        if run_id:
+            clauses.append("run_id = ?")
+            params.append(run_id)
+        if industries:
+            clauses.append(f"primary_industry IN ({', '.join('?' * len(industries))})")
+            params.extend(industries)
+        if operation_types:
+            clauses.append(f"operation_type IN ({', '.join('?' * len(operation_types))})")
+            params.extend(operation_types)
+        if min_confidence:
+            clauses.append("confidence >= ?")
+            params.append(min_confidence)
+        if status == "ok":
+            clauses.append("error IS NULL")
+        elif status == "error":
+            clauses.append("error IS NOT NULL")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        column = self.SORT_COLUMNS.get(sort, "id")
+        direction = "DESC" if descending else "ASC"
+        total = self._query(f"SELECT COUNT(*) FROM results {where}", tuple(params))[0][0]
+        rows = self._query(
+            f"SELECT org_name, primary_industry, operation_type, is_multi, confidence, error, error_type"
+            f" FROM results {where} ORDER BY {column} IS NULL, {column} {direction}, id LIMIT ? OFFSET ?",
+            tuple(params) + (limit, offset),
+        )
+        return [
+            {
+                "orgName": n, "primaryIndustry": p, "operationType": o, "isMultiIndustry": bool(m),
+                "confidenceScore": c, "error": e, "errorType": et,
+            }
+            for n, p, o, m, c, e, et in rows
+        ], total
+
+    def iter_results(self, run_id: Optional[str] = None) -> Iterator[Dict]:
+        """Stored result dicts (successful ones only), in insertion order."""
+        where, params = self._where(run_id)
+        with self._connect() as con:
+            for (data,) in con.execute(f"SELECT data FROM results {where} ORDER BY id", params):
+                yield json.loads(data)
+
+    def has_run(self, run_id: str) -> bool:
+        return bool(self._query("SELECT 1 FROM results WHERE run_id = ? LIMIT 1", (run_id,)))
+
+    def runs(self) -> List[Tuple[str, int, float]]:
+        """(run_id, results, last written) — newest first."""
+        return self._query(
+            "SELECT run_id, COUNT(*), MAX(created_at) FROM results GROUP BY run_id ORDER BY 3 DESC"
+        )
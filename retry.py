@@ -0,0 +1,129 @@
+"""
+Deferred retry lane for batch classification.
+Transient failures are parked here during the main pass and retried afterwards
+with jittered exponential backoff; orgs that keep failing end up in a
+dead-letter list instead of blocking the rest of the batch.
+"""
+
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+from cancellation import CancellationToken
+
+# errorType values (see IndustryClassifier._error_result) worth another attempt
+RETRYABLE_ERRORS = {"transient", "timeout", "parse"}
+
+
+def is_retryable(result: Dict) -> bool:
+    clf = result.get("classification", {})
+    return "error" in clf and clf.get("errorType", "error") in RETRYABLE_ERRORS
+
+
+class RetryLane:
+    """Holds failed orgs until the main pass is done, then retries them"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 2.0, max_delay: float = 60.0):
+        """
+        Args:
+            max_attempts: Total attempts per org, including the one in the main pass.
+            base_delay:   Backoff before the first retry; doubles on every further attempt.
+            max_delay:    Upper bound on a single backoff.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._queue: List[Dict] = []
+        self.dead_letters: List[Dict] = []
+        self.retried = 0
+        self.recovered = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def _backoff(self, attempts: int) -> float:
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return random.uniform(cap / 2, cap)   # equal jitter — spreads retries, never zero
+
+    def defer(self, index: int, org: Dict, result: Dict, attempts: int = 1):
+        """
+        Route a failed result: retryable ones are queued, the rest are dead-lettered.
+
+        Args:
+            index:    Position of the org in the batch (so results keep input order).
+            org:      The org dict to resend.
+            result:   The failed result from the last attempt.
+            attempts: Attempts made so far.
+        """
+        if not is_retryable(result) or attempts >= self.max_attempts:
+            self.dead_letters.append({"index": index, "org": org, "result": result, "attempts": attempts})
+            return
+        self._queue.append({
+            "index": index, "org": org, "result": result, "attempts": attempts,
+            "ready_at": time.monotonic() + self._backoff(attempts),
+        })
+
+    def drain(
+        self,
+        call: Callable[[Dict], Dict],
+        cancel_token: Optional[CancellationToken] = None,
+        deadline_at: Optional[float] = None,
+        on_result: Optional[Callable[[int, Dict], None]] = None,
+    ) -> Dict[int, Dict]:
+        """
+        Retry everything in the lane until it succeeds or runs out of attempts.
+
+        Args:
+            call:         Classifies one org and returns a result dict.
+            cancel_token: Stops draining once cancelled, also mid-backoff; pending orgs keep
+                          their last error and are dead-lettered.
+            deadline_at:  time.monotonic() value after which no retry is started (pending
+                          orgs are dead-lettered as on cancel).
+            on_result:    Optional callback(index, result) after every retry.
+
+        Returns:
+            Final result per batch index for every org that passed through the lane.
+        """
+        final: Dict[int, Dict] = {}
+        while self._queue:
+            self._queue.sort(key=lambda e: e["ready_at"])
+            entry = self._queue[0]
+            wait = entry["ready_at"] - time.monotonic()
+            if deadline_at is not None and time.monotonic() + max(wait, 0) >= deadline_at:
+                break
+            if cancel_token is not None and cancel_token.cancelled:
+                break
+            if wait > 0:
+                if cancel_token is not None:
+                    if cancel_token.wait(wait):
+                        break
+                else:
+                    time.sleep(wait)
+
+            self._queue.pop(0)
+            self.retried += 1
+            result = call(entry["org"])
+            attempts = entry["attempts"] + 1
+            final[entry["index"]] = result
+            if on_result is not None:
+                on_result(entry["index"], result)
+
+            if "error" not in result.get("classification", {}):
+                self.recovered += 1
+            else:
+                self.defer(entry["index"], entry["org"], result, attempts)
+
+        # Whatever is still queued (cancel / deadline) is reported with its last error
+        for entry in self._queue:
+            final.setdefault(entry["index"], entry["result"])
+            self.dead_letters.append({k: entry[k] for k in ("index", "org", "result", "attempts")})
+        self._queue = []
+        return final
+
+    def stats(self) -> Dict:
+        return {
+            "retried":     self.retried,
+            "recovered":   self.recovered,
+            "deadLetters": len(self.dead_letters),
+        }
@@ -0,0 +1,106 @@
+"""
+Size-aware dispatch order for concurrent batches.
+Orgs are started longest-predicted-call first, so the few huge catalogs run
+alongside the bulk instead of trailing at the end of the run, and paced through
+a token bucket refilled at the account's tokens-per-minute rate, so large
+prompts never arrive in a burst the API answers with 429s. While the next
+large org waits for tokens, smaller ones that fit are started in the gap.
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+from planner import Calibration, org_estimate
+
+BURST_SECONDS = 10.0        # bucket capacity in seconds of TPM — how far a burst may run ahead of the rate
+_SLACK = 1e-6               # tokens — absorbs float drift in the bucket arithmetic
+
+
+def job_tokens(estimate: Optional[Dict]) -> float:
+    """Tokens a dispatch is charged against the TPM budget (0 for locally labelled orgs)."""
+    return estimate["inputTokens"] + estimate["outputTokens"] if estimate else 0.0
+
+
+class SizeAwareScheduler:
+    """Decides which org a free request slot takes next — not thread-safe, drive it from one loop"""
+
+    def __init__(self, estimates: List[Optional[Dict]], tpm: Optional[int] = None,
+                 largest_first: bool = True, backfill: bool = True, burst: float = BURST_SECONDS):
+        """
+        Args:
+            estimates:     planner.org_estimate() per org, in input order (None = no API call).
+            tpm:           Tokens-per-minute budget to pace against (None = no pacing).
+            largest_first: Longest predicted call first (False = input order).
+            backfill:      While the head org waits for tokens, start the largest pending org
+                           that fits — for at most the head's own predicted call time.
+            burst:         Bucket capacity in seconds of `tpm`.
+        """
+        self.estimates = estimates
+        self.tpm = tpm
+        self.backfill = backfill
+        self.pending = list(range(len(estimates)))
+        if largest_first:
+            self.pending.sort(key=lambda i: -(estimates[i] or {}).get("seconds", 0.0))
+
+        self._rate = tpm / 60.0 if tpm else None
+        self._capacity = self._rate * burst if tpm else None
+        self._level = self._capacity
+        self._clock: Optional[float] = None
+        self._head_waiting_since: Optional[float] = None
+
+    @classmethod
+    def for_orgs(cls, classifier, orgs: List[Dict], calibration: Optional[Calibration] = None,
+                 **kwargs) -> "SizeAwareScheduler":
+        """Estimate every org's call with `classifier` and schedule them."""
+        cal = calibration or Calibration()
+        return cls([org_estimate(classifier, org, cal) for org in orgs], **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def _refill(self, now: float):
+        if self._clock is not None:
+            self._level = min(self._capacity, self._level + (now - self._clock) * self._rate)
+        self._clock = now
+
+    def _need(self, index: int) -> float:
+        # A prompt bigger than the whole bucket goes out once the bucket is full
+        return min(job_tokens(self.estimates[index]), self._capacity)
+
+    def next(self, now: Optional[float] = None) -> Tuple[Optional[int], float]:
+        """
+        The org to start now.
+
+        Args:
+            now: time.monotonic() value (injectable for simulation).
+
+        Returns:
+            (index, 0.0) — start this org now; (None, seconds) — nothing fits, ask again
+            after `seconds` or when a running call finishes; (None, 0.0) — nothing left.
+        """
+        if not self.pending:
+            return None, 0.0
+        if self._rate is None:
+            return self.pending.pop(0), 0.0
+
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        head = self.pending[0]
+        if self._need(head) <= self._level + _SLACK:
+            self._head_waiting_since = None
+            return self._take(0), 0.0
+
+        if self._head_waiting_since is None:
+            self._head_waiting_since = now
+        head_seconds = (self.estimates[head] or {}).get("seconds", 0.0)
+        if self.backfill and now - self._head_waiting_since < head_seconds:
+            for pos in range(1, len(self.pending)):
+                if self._need(self.pending[pos]) <= self._level + _SLACK:
+                    return self._take(pos), 0.0
+        return None, (self._need(head) - self._level) / self._rate
+
+    def _take(self, pos: int) -> int:
+        index = self.pending.pop(pos)
+        if self._rate is not None:
+            self._level -= self._need(index)
+        return index
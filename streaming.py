@@ -0,0 +1,84 @@
+"""
+Incremental JSON parsing for streamed classification responses.
+Pulls complete industry entries out of a partially received completion so the
+UI can render them before the model has finished writing the whole object.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+
+class IndustryStreamParser:
+    """Feeds completion chunks and returns industry entries as soon as they close"""
+
+    _ARRAY_KEY = '"industries"'
+
+    def __init__(self):
+        self.buffer = ""
+        self._array_start: Optional[int] = None   # index just after the '['
+        self._pos = 0                             # scan cursor inside the array
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._obj_start: Optional[int] = None
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """
+        Append a chunk of streamed text and return newly completed entries.
+
+        Args:
+            chunk: Raw delta text from the streamed completion.
+
+        Returns:
+            List of industry dicts that became complete with this chunk.
+        """
+        self.buffer += chunk
+        if self._done:
+            return []
+
+        if self._array_start is None:
+            key_at = self.buffer.find(self._ARRAY_KEY)
+            if key_at < 0:
+                return []
+            bracket = self.buffer.find("[", key_at + len(self._ARRAY_KEY))
+            if bracket < 0:
+                return []
+            self._array_start = self._pos = bracket + 1
+
+        completed = []
+        buf = self.buffer
+        while self._pos < len(buf):
+            ch = buf[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._obj_start = self._pos
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._obj_start is not None:
+                    try:
+                        completed.append(json.loads(buf[self._obj_start:self._pos + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._obj_start = None
+            elif ch == "]" and self._depth == 0:
+                self._done = True
+                self._pos += 1
+                break
+            self._pos += 1
+
+        return completed
+
+    def text(self) -> str:
+        """Full text received so far."""
+        return self.buffer
@@ -0,0 +1,80 @@
+"""
+Shared fixtures: synthetic orgs and an IndustryClassifier whose API call is faked,
+so no test needs a key or the network.
+"""
+
+import copy
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace as NS
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VALID_REPLY = {
+    "orgName": "Test Org",
+    "productCount": None,
+    "primaryIndustry": "Automotive",
+    "operationType": "Seller",
+    "confidenceScore": 0.9,
+    "AIreasoning": "",
+    "classification": {
+        "isMultiIndustry": False,
+        "industries": [
+            {"industry": "Automotive", "subCategory": "Parts", "percentage": 100, "sampleProducts": ["Oil filter"]},
+        ],
+    },
+}
+
+
+def _org(n: int, products: int = 3, country: str = "ID") -> dict:
+    return {
+        "_id": f"org-{n}",
+        "orgName": f"Org {n}",
+        "countryCode": country,
+        "product_names": [
+            {"productName": f"Product {n}-{p}", "categoryName": "Parts", "unit": "pcs"} for p in range(products)
+        ],
+    }
+
+
+@pytest.fixture
+def valid_reply():
+    """A deep copy of a schema-valid classification reply."""
+    return copy.deepcopy(VALID_REPLY)
+
+
+@pytest.fixture
+def make_orgs():
+    """make_orgs(count, products=3, country="ID") -> list of org dicts with distinct _ids."""
+    return lambda count, **kw: [_org(n, **kw) for n in range(count)]
+
+
+@pytest.fixture
+def fake_classifier():
+    """
+    fake_classifier(delay=0.0, reply=VALID_REPLY, prompt_tokens=2000) -> IndustryClassifier
+    whose completions sleep `delay` seconds and answer `reply` (a dict, or a callable
+    returning one or raising). Each call's kwargs are appended to `.calls`.
+    """
+    from prompt import IndustryClassifier
+
+    def build(delay: float = 0.0, reply=VALID_REPLY, prompt_tokens: int = 2000, **options):
+        clf = IndustryClassifier(api_key="test", **options)
+        clf.calls = []
+
+        def create(**kw):
+            clf.calls.append(kw)
+            if delay:
+                time.sleep(delay)
+            body = reply() if callable(reply) else reply
+            return NS(choices=[NS(message=NS(content=json.dumps(body)))],
+                      usage=NS(prompt_tokens=prompt_tokens, completion_tokens=300))
+
+        clf._create_completion = create
+        return clf
+
+    return build
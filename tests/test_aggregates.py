@@ -0,0 +1,75 @@
+import pytest
+
+from aggregates import ResultAggregate
+
+
+def _ok(industry="Automotive", op="Seller", conf=0.9, multi=False):
+    return {"primaryIndustry": industry, "operationType": op, "confidenceScore": conf,
+            "classification": {"isMultiIndustry": multi, "industries": []}}
+
+
+def _failed(error_type="transient"):
+    return {"primaryIndustry": None, "operationType": None, "confidenceScore": None,
+            "classification": {"error": "boom", "errorType": error_type}}
+
+
+def _state(agg):
+    return (agg.total, agg.ok, agg.multi, +agg.errors, +agg.industries, +agg.operation_types,
+            list(agg.histogram), round(agg.conf_sum, 9), agg.conf_n)
+
+
+def test_add_counts_everything():
+    agg = ResultAggregate(bins=10)
+    for result in (_ok(conf=0.95), _ok("Food & Beverage", "Food Service", 0.5, multi=True), _ok(conf=1.0),
+                   _failed(), _failed("deadline")):
+        agg.add(result)
+
+    assert (agg.total, agg.ok, agg.multi, agg.single, agg.error_total) == (5, 3, 1, 2, 2)
+    assert agg.industry_counts() == [("Automotive", 2), ("Food & Beverage", 1)]
+    assert agg.operation_type_counts() == [("Seller", 2), ("Food Service", 1)]
+    assert agg.errors == {"transient": 1, "deadline": 1}
+    assert agg.avg_confidence == pytest.approx((0.95 + 0.5 + 1.0) / 3)
+    assert agg.histogram[5] == 1 and agg.histogram[9] == 2        # 1.0 lands in the top bin
+    assert agg.histogram_bins()[5] == (0.5, 1)
+
+
+def test_remove_undoes_add():
+    agg = ResultAggregate()
+    agg.add(_ok("Automotive"))
+    before = _state(agg)
+    for result in (_ok("Food & Beverage", conf=0.3, multi=True), _failed()):
+        agg.add(result)
+        agg.remove(result)
+    assert _state(agg) == before
+
+
+def test_replace_swaps_a_retried_result():
+    agg = ResultAggregate()
+    agg.add(_ok())
+    agg.add(_failed())
+    agg.replace(_failed(), _ok("Food & Beverage", conf=0.7))
+    agg.replace(None, _ok(conf=0.8))
+
+    assert (agg.total, agg.ok, agg.error_total) == (3, 3, 0)
+    assert agg.industry_counts() == [("Automotive", 2), ("Food & Beverage", 1)]
+    assert agg.avg_confidence == pytest.approx(0.8)
+
+
+def test_missing_fields_and_non_numeric_confidence():
+    agg = ResultAggregate()
+    agg.add({"classification": {}, "confidenceScore": "high"})
+    assert agg.industry_counts() == [("Unknown", 1)]
+    assert agg.conf_n == 0 and agg.avg_confidence == 0.0
+
+
+def test_from_counts_matches_incremental():
+    results = [_ok(conf=0.95), _ok("Food & Beverage", conf=0.5, multi=True), _failed()]
+    agg = ResultAggregate(bins=15)
+    for result in results:
+        agg.add(result)
+
+    rebuilt = ResultAggregate.from_counts(
+        agg.industry_counts(), agg.operation_type_counts(), (agg.single, agg.multi),
+        agg.histogram_bins(), (agg.avg_confidence, agg.conf_n), list(agg.errors.items()),
+    )
+    assert _state(rebuilt) == _state(agg)
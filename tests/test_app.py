@@ -0,0 +1,56 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The Streamlit app on a fresh warehouse, with the BatchWorker it creates captured in `.workers`."""
+    import streamlit as st
+
+    import batch_worker
+
+    monkeypatch.setenv("RESULTS_DB", str(tmp_path / "results.sqlite"))
+    monkeypatch.setenv("DATASET_CACHE_DIR", str(tmp_path / "datasets"))
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    workers = []
+
+    class Worker(batch_worker.BatchWorker):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            workers.append(self)
+
+    monkeypatch.setattr(batch_worker, "BatchWorker", Worker)
+    st.cache_resource.clear()
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.workers = workers
+    yield at
+    st.cache_resource.clear()
+
+
+def test_analytics_scope_on_an_estimate_run(app, fake_classifier, make_orgs):
+    app.run()
+    assert not app.exception
+    worker = app.workers[0]
+
+    job = worker.get(worker.submit_estimate(fake_classifier(), make_orgs(40), min_samples=10, max_samples=10,
+                                            round_size=10, concurrency=2))
+    until = time.monotonic() + 10
+    while not job.finished and time.monotonic() < until:
+        time.sleep(0.02)
+    assert job.status == "done"
+
+    app.run()
+    scope = app.selectbox(key="analytics_scope")
+    label = next(option for option in scope.options if job.id in option)
+    scope.select(label).run()
+
+    assert not app.exception
+    assert worker.get(job.id) is job            # still held by the worker, so not read as a live batch
@@ -0,0 +1,86 @@
+import time
+from collections import Counter
+
+from batch_worker import BatchWorker
+from cancellation import CancellationToken
+
+
+def _error_types(results):
+    return Counter(r["classification"].get("errorType", "ok") for r in results)
+
+
+def _wait(job, limit: float = 10.0):
+    until = time.monotonic() + limit
+    while not job.finished and time.monotonic() < until:
+        time.sleep(0.02)
+    assert job.finished, f"job still {job.status} after {limit}s"
+
+
+def test_token_cancel_and_reset():
+    token = CancellationToken()
+    assert not token.cancelled
+    token.cancel("stop")
+    assert token.cancelled and token.reason == "stop"
+    token.reset()
+    assert not token.cancelled and token.reason is None
+
+
+def test_classify_batch_cancelled_up_front_makes_no_calls(fake_classifier, make_orgs):
+    clf = fake_classifier()
+    token = CancellationToken()
+    token.cancel("Stopped")
+
+    results = clf.classify_batch(make_orgs(4), cancel_token=token)
+
+    assert clf.calls == []
+    assert _error_types(results) == {"cancelled": 4}
+    assert results[0]["classification"]["error"] == "Stopped"
+
+
+def test_classify_batch_cancel_between_orgs(fake_classifier, make_orgs, valid_reply):
+    token = CancellationToken()
+    clf = fake_classifier(reply=lambda: token.cancel() or valid_reply)
+
+    results = clf.classify_batch(make_orgs(5), cancel_token=token)
+
+    assert len(clf.calls) == 1                  # the org in flight finishes, the rest are skipped
+    assert _error_types(results) == {"ok": 1, "cancelled": 4}
+
+
+def test_classify_batch_deadline_skips_unstarted_orgs(fake_classifier, make_orgs):
+    clf = fake_classifier(delay=0.2)
+
+    results = clf.classify_batch(make_orgs(6), deadline=0.3)
+
+    assert [r["classification"].get("errorType", "ok") for r in results][:2] == ["ok", "ok"]
+    assert _error_types(results)["deadline"] >= 3
+    assert results[-1]["classification"]["error"] == "Batch deadline reached"
+
+
+def test_batch_job_cancel(fake_classifier, make_orgs):
+    clf = fake_classifier(delay=0.05)
+    worker = BatchWorker()
+    job = worker.get(worker.submit(clf, make_orgs(40), concurrency=2))
+    time.sleep(0.2)
+    job.cancel("Stopped by test")
+    _wait(job)
+
+    types = _error_types(job.results())
+    assert job.status == "cancelled"
+    assert job.progress()["done"] == 40
+    assert types["ok"] >= 1 and types["cancelled"] >= 1
+    assert set(types) <= {"ok", "cancelled"}
+
+
+def test_batch_job_deadline(fake_classifier, make_orgs):
+    clf = fake_classifier(delay=0.1)
+    worker = BatchWorker()
+    started = time.monotonic()
+    job = worker.get(worker.submit(clf, make_orgs(60), concurrency=2, deadline=0.5))
+    _wait(job)
+
+    types = _error_types(job.results())
+    assert job.status == "done"
+    assert time.monotonic() - started < 2.0
+    assert types["ok"] >= 1 and types["deadline"] >= 1
+    assert set(types) <= {"ok", "deadline"}
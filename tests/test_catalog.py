@@ -0,0 +1,168 @@
+import copy
+import logging
+
+import pytest
+
+from catalog import VARIANTS_KEY, WEIGHT_KEY, apply_variant_weights, fold_org, fold_products, fold_stats, is_junk
+
+
+def _p(name, category="Parts", **extra):
+    return dict({"productName": name, "categoryName": category}, **extra)
+
+
+def _names(products):
+    return [(p["productName"], p.get(WEIGHT_KEY, 1)) for p in products]
+
+
+def _reply(*industries):
+    """industries: (industry, percentage, variantProducts or None)"""
+    entries = []
+    for industry, pct, variants in industries:
+        entry = {"industry": industry, "subCategory": "", "percentage": pct, "sampleProducts": []}
+        if variants is not None:
+            entry[VARIANTS_KEY] = variants
+        entries.append(entry)
+    return {"primaryIndustry": industries[0][0], "operationType": "Seller", "confidenceScore": 0.9,
+            "classification": {"isMultiIndustry": len(entries) >= 2, "industries": entries}}
+
+
+def _shares(result):
+    return [(i["industry"], i["percentage"]) for i in result["classification"]["industries"]]
+
+
+# ----------------------------------------------------------------------
+# Folding
+# ----------------------------------------------------------------------
+
+def test_sku_variants_fold_into_the_first_with_a_count():
+    products = [_p("H02-SPOTLIGHT-BLK-3W-WHWW/BX"), _p("H109-SPOTLIGHT-GRN-3W-WHWW/BX"),
+                _p("Kaos Polos Black"), _p("Kaos Polos White"), _p("Kaos Polos Navy")]
+    assert _names(fold_products(products)) == [("H02-SPOTLIGHT-BLK-3W-WHWW/BX", 2), ("Kaos Polos Black", 3)]
+
+
+@pytest.mark.parametrize("names, folded", [
+    (["Kaos Polos - M", "Kaos Polos - L", "Kaos Polos - S"], True),
+    (["TEE-BL-L", "TEE-GR-M"], True),
+    (["Kaos Polos (M)", "Kaos Polos (XL)"], True),
+    (["Kaos Polos M", "Kaos Polos L"], False),        # bare size letter, no separator
+    (["Susu Org", "Susu Gr"], False),                 # organic / gram, not colours
+    (["Teh Bl", "Teh"], False),
+    (["Vitamin S", "Vitamin M"], False),
+])
+def test_ambiguous_size_and_colour_codes_need_a_separator(names, folded):
+    products = fold_products([_p(n) for n in names])
+    assert (len(products) == 1) is folded
+
+
+def test_duplicates_drop_without_weight_and_categories_stay_apart():
+    products = [_p("Oil Filter"), _p("oil  filter!"), _p("Kaos - M", "Pakaian"), _p("Kaos - L", "Lap"),
+                _p("Kaos - S", "Lap")]
+    assert [(p["productName"], p["categoryName"], p.get(WEIGHT_KEY, 1)) for p in fold_products(products)] == [
+        ("Oil Filter", "Parts", 1), ("Kaos - M", "Pakaian", 1), ("Kaos - L", "Lap", 2)]
+
+
+def test_junk_rows_and_empty_fields_are_dropped():
+    products = [_p("Piezas", ""), _p("12345", None), _p("N/A", "", discription="Pompa air"), _p("Lampu", "", unit="")]
+    assert is_junk(products[0]) and is_junk(products[1]) and not is_junk(products[2])
+    assert fold_products(products) == [{"productName": "N/A", "discription": "Pompa air"}, {"productName": "Lampu"}]
+    only_junk = [_p("Item", ""), _p("Test", "")]
+    assert fold_products(only_junk) == only_junk
+
+
+def test_folding_is_idempotent_and_leaves_the_org_alone():
+    org = {"orgName": "X", "product_names": [_p("Kaos - M"), _p("Kaos - L"), _p("Lampu")]}
+    before = copy.deepcopy(org)
+    folded = fold_org(org)
+    assert fold_org(folded) == folded
+    assert org == before
+    assert fold_stats([org]) == {"products": 3, "prompted": 2, "junk": 0, "folded": 0.333}
+
+
+# ----------------------------------------------------------------------
+# Weighting
+# ----------------------------------------------------------------------
+
+SHIRTS = [_p("Kaos - M", "Pakaian"), _p("Kaos - L", "Pakaian"), _p("Kaos - S", "Pakaian"), _p("Kaos - XL", "Pakaian")]
+HOME = [_p("Lampu Meja", "Rumah"), _p("Vas Bunga", "Rumah"), _p("Jam Dinding", "Rumah")]
+
+
+def test_named_representatives_carry_their_variant_count():
+    org = {"product_names": SHIRTS + HOME}                       # prompted as 4 rows, 7 products
+    result = _reply(("Home & Living", 75, []), ("Fashion & Apparel", 25, ["Kaos - M"]))
+
+    apply_variant_weights(result, org)
+
+    assert _shares(result) == [("Fashion & Apparel", 55), ("Home & Living", 45)]
+    assert result["primaryIndustry"] == "Fashion & Apparel"
+    assert all(VARIANTS_KEY not in i for i in result["classification"]["industries"])
+
+
+def test_one_name_folded_in_two_categories_keeps_both_weights():
+    org = {"product_names": [_p("Kaos - M", "Pakaian"), _p("Kaos - L", "Pakaian"),
+                             _p("Kaos - M", "Lap"), _p("Kaos - S", "Lap"), _p("Kaos - XL", "Lap")] + HOME[:2]}
+    result = _reply(("Fashion & Apparel", 50, ["Kaos - M"]), ("Home & Living", 50, []))
+    apply_variant_weights(result, org)
+    assert _shares(result) == [("Fashion & Apparel", 70), ("Home & Living", 30)]      # 5 of 7
+
+    shared = _reply(("Fashion & Apparel", 50, ["Kaos - M"]), ("Home & Living", 50, ["kaos m"]))
+    apply_variant_weights(shared, org)
+    assert _shares(shared) == [("Home & Living", 55), ("Fashion & Apparel", 45)]      # 2+2 vs 2+1 of 7
+
+
+def test_a_primary_the_model_did_not_rank_first_is_kept():
+    org = {"product_names": SHIRTS + HOME}
+    result = _reply(("Fashion & Apparel", 50, ["Kaos - M"]), ("Home & Living", 50, []))
+    result["primaryIndustry"] = "Home & Living"                 # e.g. set by an org-name rule
+    result["classification"]["industries"][0]["percentage"] = 55
+    result["classification"]["industries"][1]["percentage"] = 45
+
+    apply_variant_weights(result, org)
+
+    assert _shares(result)[0][0] == "Fashion & Apparel"
+    assert result["primaryIndustry"] == "Home & Living"
+
+
+def test_missing_variant_products_is_logged_and_left_unweighted(caplog):
+    org = {"orgName": "Toko Kaos", "product_names": SHIRTS + HOME}
+    result = _reply(("Home & Living", 75, None), ("Fashion & Apparel", 25, None))
+
+    with caplog.at_level(logging.WARNING, logger="catalog"):
+        apply_variant_weights(result, org)
+
+    assert _shares(result) == [("Home & Living", 75), ("Fashion & Apparel", 25)]
+    assert "Toko Kaos" in caplog.text and VARIANTS_KEY in caplog.text
+
+
+def test_nothing_folded_nothing_logged(caplog):
+    result = _reply(("Home & Living", 100, None))
+    with caplog.at_level(logging.WARNING, logger="catalog"):
+        apply_variant_weights(result, {"product_names": HOME})
+    assert caplog.records == [] and _shares(result) == [("Home & Living", 100)]
+
+
+def test_classifier_weights_llm_replies_only_when_folding(fake_classifier, caplog):
+    org = {"_id": "o1", "orgName": "Toko Kaos", "countryCode": "ID", "product_names": SHIRTS + HOME}
+    reply = _reply(("Home & Living", 75, []), ("Fashion & Apparel", 25, ["Kaos - M"]))
+    reply.update(orgName="Toko Kaos", AIreasoning="")
+
+    clf = fake_classifier(reply=reply)
+    result = clf.classify_organization(org)
+    assert _shares(result) == [("Fashion & Apparel", 55), ("Home & Living", 45)]
+    prompted = clf.calls[0]["messages"][-1]["content"]
+    assert "Kaos - L" not in prompted and f'"{WEIGHT_KEY}": 4' in prompted
+
+    with caplog.at_level(logging.WARNING, logger="catalog"):
+        result = fake_classifier(reply=reply, fold_variants=False).classify_organization(org)
+    assert _shares(result) == [("Home & Living", 75), ("Fashion & Apparel", 25)]
+    assert caplog.records == []
+
+
+def test_org_name_primary_survives_the_weighting():
+    org = {"orgName": "VILLA KENANGA", "product_names": SHIRTS + HOME}
+    result = _reply(("Home & Living", 75, []), ("Fashion & Apparel", 25, ["Kaos - M"]))
+    result["primaryIndustry"] = "Hotels & Villa"
+
+    apply_variant_weights(result, org)
+
+    assert result["primaryIndustry"] == "Hotels & Villa"
+    assert _shares(result) == [("Fashion & Apparel", 55), ("Home & Living", 45)]
@@ -0,0 +1,147 @@
+import io
+import json
+import threading
+import time
+
+import pytest
+
+import dataset_store
+from dataset_store import DatasetStore, iter_csv, iter_json_array, iter_jsonl
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """Force objects to straddle read boundaries."""
+    monkeypatch.setattr(dataset_store, "CHUNK_SIZE", 7)
+
+
+def _orgs(make_orgs):
+    orgs = make_orgs(5)
+    orgs[2]["orgName"] = "Café \"Ünïcode\" [x] {y}"
+    orgs[3]["countryCode"] = "MY"
+    return orgs
+
+
+# ----------------------------------------------------------------------
+# Streaming parsers
+# ----------------------------------------------------------------------
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_json_array_round_trip(make_orgs, small_chunks, indent):
+    orgs = _orgs(make_orgs)
+    data = json.dumps(orgs, ensure_ascii=False, indent=indent).encode("utf-8")
+    assert list(iter_json_array(io.BytesIO(data))) == orgs
+
+
+def test_iter_json_array_bom_single_object_and_empty(make_orgs, small_chunks):
+    org = make_orgs(1)[0]
+    assert list(iter_json_array(io.BytesIO(b"\xef\xbb\xbf" + json.dumps([org]).encode()))) == [org]
+    assert list(iter_json_array(io.BytesIO(json.dumps(org).encode()))) == [org]
+    assert list(iter_json_array(io.BytesIO(b" [ ] "))) == []
+    assert list(iter_json_array(io.BytesIO(b""))) == []
+
+
+def test_iter_json_array_raises_on_broken_input(make_orgs):
+    data = json.dumps(make_orgs(2)).encode()[:-20]
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(io.BytesIO(data)))
+
+
+def test_parsers_leave_the_file_open(make_orgs):
+    f = io.BytesIO(json.dumps(make_orgs(2)).encode())
+    list(iter_json_array(f))
+    assert not f.closed
+
+
+def test_iter_jsonl_skips_blank_lines(make_orgs):
+    orgs = make_orgs(3)
+    data = ("\n".join(json.dumps(o) for o in orgs) + "\n\n").encode()
+    assert list(iter_jsonl(io.BytesIO(data))) == orgs
+
+
+def test_iter_csv_groups_product_rows_by_org():
+    data = (
+        "_id,orgName,countryCode,productName,typeOfCommodity\n"
+        "a,Alpha,ID,Bolt,1\n"
+        "a,Alpha,ID,Nut,x\n"
+        "b,Beta,MY,,\n"
+    ).encode()
+    orgs = list(iter_csv(io.BytesIO(data)))
+    assert [o["_id"] for o in orgs] == ["a", "b"]
+    assert [p["productName"] for p in orgs[0]["product_names"]] == ["Bolt", "Nut"]
+    assert [p["typeOfCommodity"] for p in orgs[0]["product_names"]] == [1, 0]
+    assert orgs[1]["product_names"] == []
+
+
+# ----------------------------------------------------------------------
+# Store
+# ----------------------------------------------------------------------
+
+def test_ingest_and_page_round_trip(tmp_path, make_orgs):
+    orgs = _orgs(make_orgs)
+    store = DatasetStore(str(tmp_path))
+    handle = store.ingest(io.BytesIO(json.dumps(orgs).encode()), "export.json")
+
+    assert len(handle) == 5
+    assert handle.page(0, 2) == orgs[:2]
+    assert handle.page(4, 10) == orgs[4:]
+    assert handle.get("org-2") == orgs[2]
+    assert handle.get("missing") is None
+    assert handle.take([3, 0]) == [orgs[3], orgs[0]]
+    assert handle.strata_keys()[3] == ("MY", 3)
+    assert list(handle.iter(batch=2)) == orgs
+
+
+def test_same_bytes_are_parsed_once(tmp_path, make_orgs, monkeypatch):
+    builds = []
+    build = DatasetStore._build
+    monkeypatch.setattr(DatasetStore, "_build", staticmethod(lambda orgs, path: builds.append(path) or build(orgs, path)))
+    data = json.dumps(make_orgs(3)).encode()
+    store = DatasetStore(str(tmp_path))
+
+    first = store.ingest(io.BytesIO(data), "a.json")
+    second = store.ingest(io.BytesIO(data), "b.json")
+
+    assert len(builds) == 1
+    assert first.path == second.path and second.name == "b.json"
+    assert [p.name for p in tmp_path.iterdir()] == [f"{first.digest}.sqlite"]
+
+
+def test_concurrent_uploads_of_the_same_bytes_share_one_parse(tmp_path, make_orgs, monkeypatch):
+    builds = []
+    build = DatasetStore._build
+    release = threading.Event()
+
+    def slow_build(orgs, path):
+        builds.append(path)
+        release.wait(5)
+        build(orgs, path)
+
+    monkeypatch.setattr(DatasetStore, "_build", staticmethod(slow_build))
+    data = json.dumps(make_orgs(3)).encode()
+    store = DatasetStore(str(tmp_path))
+    handles = []
+    threads = [threading.Thread(target=lambda: handles.append(store.ingest(io.BytesIO(data), "x.json")))
+               for _ in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.2)                 # the other uploads now wait on the first one's parse
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(builds) == 1
+    assert [len(h) for h in handles] == [3, 3, 3]
+
+
+def test_failed_parse_leaves_no_dataset(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    with pytest.raises(json.JSONDecodeError):
+        store.ingest(io.BytesIO(b'[{"_id": "a"}, {"_id": '), "broken.json")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_unsupported_extension():
+    with pytest.raises(ValueError, match="Unsupported file type"):
+        DatasetStore.detect_format("orgs.txt")
+    assert DatasetStore.detect_format("orgs.NDJSON") == "jsonl"
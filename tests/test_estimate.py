@@ -0,0 +1,143 @@
+import itertools
+import random
+from collections import Counter
+
+import pytest
+
+from estimate import DistributionEstimator, StratifiedSample, _wilson, estimate_distribution, size_band
+
+
+def _keys(seed=1):
+    rng = random.Random(seed)
+    countries = ["ID"] * 600 + ["MY"] * 300 + ["SG"] * 95 + ["TH"] * 5
+    return [(c, rng.choice([3, 20, 45, 200])) for c in countries]
+
+
+def _result(industry="Automotive", multi=False):
+    return {"primaryIndustry": industry, "operationType": "Seller",
+            "classification": {"isMultiIndustry": multi, "industries": []}}
+
+
+# ----------------------------------------------------------------------
+# Intervals
+# ----------------------------------------------------------------------
+
+def test_size_bands():
+    assert [size_band(n) for n in (0, 1, 10, 11, 30, 31, 60, 61, 5000)] == \
+        ["1-10", "1-10", "1-10", "11-30", "11-30", "31-60", "31-60", "61+", "61+"]
+
+
+def test_wilson_matches_the_closed_form():
+    low, high = _wilson(0.5, 100, 1.96)
+    assert (low, high) == pytest.approx((0.4038, 0.5962), abs=1e-4)
+
+    low, high = _wilson(0.0, 100, 1.96)
+    assert low == 0.0
+    assert high == pytest.approx(1.96 ** 2 / (100 + 1.96 ** 2), abs=1e-9)
+
+
+@pytest.mark.parametrize("p", [0.0, 0.01, 0.3, 0.99, 1.0])
+@pytest.mark.parametrize("n", [1, 10, 1000])
+def test_wilson_stays_in_bounds_and_contains_p(p, n):
+    low, high = _wilson(p, n, 1.96)
+    assert 0.0 <= low <= p <= high <= 1.0
+
+
+def test_wilson_narrows_with_n_and_without_data_is_uninformative():
+    widths = [_wilson(0.2, n, 1.96) for n in (10, 100, 1000)]
+    assert widths[0][1] - widths[0][0] > widths[1][1] - widths[1][0] > widths[2][1] - widths[2][0]
+    assert _wilson(0.2, 0, 1.96) == (0.0, 1.0)
+
+
+# ----------------------------------------------------------------------
+# Sampling
+# ----------------------------------------------------------------------
+
+def test_thin_countries_share_an_other_stratum():
+    sample = StratifiedSample(_keys(), min_country_share=0.01)
+    countries = {country for country, _ in sample.strata}
+    assert countries == {"ID", "MY", "SG", "other"}
+
+
+def test_draws_without_replacement_and_every_prefix_stays_proportional():
+    sample = StratifiedSample(_keys())
+    drawn = []
+    for n in (37, 100, 13, 250):
+        drawn += sample.draw(n)
+        assert len(drawn) == len(set(drawn))
+        got = Counter(sample.stratum_of[i] for i in drawn)
+        for h, members in sample.strata.items():
+            assert abs(got[h] - len(drawn) * len(members) / sample.population) <= 1
+
+    assert len(drawn) == 400
+
+
+def test_same_seed_same_sample_and_exhaustion():
+    assert StratifiedSample(_keys(), seed=3).draw(50) == StratifiedSample(_keys(), seed=3).draw(50)
+    assert StratifiedSample(_keys(), seed=3).draw(50) != StratifiedSample(_keys(), seed=4).draw(50)
+
+    sample = StratifiedSample(_keys())
+    everything = sample.draw(5000)
+    assert sorted(everything) == list(range(1000))
+    assert sample.exhausted and sample.draw(10) == []
+
+
+# ----------------------------------------------------------------------
+# Estimates
+# ----------------------------------------------------------------------
+
+def test_stratified_share_reweights_by_stratum_size():
+    keys = [("ID", 3)] * 80 + [("MY", 3)] * 20
+    sample = StratifiedSample(keys)
+    est = DistributionEstimator(sample)
+    for i in range(0, 80, 8):                   # 10 ID orgs, all Automotive
+        est.add(i, _result("Automotive"))
+    for i in range(80, 100, 2):                 # 10 MY orgs, all Food — oversampled vs. their 20%
+        est.add(i, _result("Food & Beverage"))
+    est.add(1, {"classification": {"error": "boom", "errorType": "transient"}})
+
+    shares = {s["value"]: s for s in est.distribution("primaryIndustry")}
+    assert shares["Automotive"]["share"] == pytest.approx(0.8)
+    assert shares["Food & Beverage"]["share"] == pytest.approx(0.2)
+    assert est.errors == 1
+
+
+def test_census_has_zero_width_intervals():
+    keys = [("ID", 3)] * 10
+    est = DistributionEstimator(StratifiedSample(keys))
+    for i in range(10):
+        est.add(i, _result(multi=i < 3))
+    multi = est._share("isMultiIndustry", True)
+    assert multi["low"] == multi["high"] == multi["share"] == 0.3
+
+
+def test_estimate_distribution_stops_on_precision(fake_classifier, make_orgs):
+    orgs = make_orgs(3000)
+    clf = fake_classifier()
+    rounds = []
+
+    report = estimate_distribution(clf, orgs, target_halfwidth=0.05, min_samples=100, round_size=50,
+                                   concurrency=8, on_round=rounds.append)
+
+    assert report["stoppedBy"] == "precision"
+    assert report["classified"] == len(clf.calls) == 100
+    assert report["primaryIndustry"][0]["value"] == "Automotive"
+    assert report["maxHalfWidth"] <= 0.05
+    assert len(rounds) == report["rounds"] == 1
+
+
+def test_estimate_distribution_stops_at_max_samples(fake_classifier, make_orgs, valid_reply):
+    flip = itertools.count()
+
+    def reply():
+        industry = "Automotive" if next(flip) % 2 else "Home & Living"
+        industries = [dict(valid_reply["classification"]["industries"][0], industry=industry)]
+        return dict(valid_reply, primaryIndustry=industry,
+                    classification=dict(valid_reply["classification"], industries=industries))
+
+    clf = fake_classifier(reply=reply)
+    report = estimate_distribution(clf, make_orgs(3000), target_halfwidth=0.01, min_samples=50,
+                                   max_samples=120, round_size=50)
+
+    assert report["stoppedBy"] == "budget"
+    assert report["sampled"] == 120 and report["rounds"] == 3
@@ -0,0 +1,169 @@
+import json
+import pickle
+import threading
+import time
+from types import SimpleNamespace as NS
+
+import pytest
+
+from hedging import HedgePolicy
+
+
+def _policy(delay=0.05, **kwargs):
+    """A policy that hedges after `delay` seconds from the first request on."""
+    kwargs.setdefault("max_hedge_fraction", 1.0)
+    policy = HedgePolicy(min_samples=3, min_delay=delay, **kwargs)
+    for _ in range(3):
+        policy._record(0.001)
+    return policy
+
+
+def _until(predicate, limit=5.0):
+    end = time.monotonic() + limit
+    while not predicate() and time.monotonic() < end:
+        time.sleep(0.005)
+    assert predicate()
+
+
+def test_threshold_is_the_percentile_of_recent_latencies():
+    policy = HedgePolicy(percentile=90, window=100, min_samples=10, min_delay=0.0)
+    assert policy.threshold() is None
+    for n in range(1, 201):
+        policy._record(n / 100)
+    assert policy.threshold() == pytest.approx(1.9, abs=0.011)    # last 100 are 1.01 … 2.00
+    policy.min_delay = 5.0
+    assert policy.threshold() == 5.0
+
+
+def test_no_hedge_without_history_or_over_the_cap():
+    backup_calls = []
+    policy = HedgePolicy(min_samples=3, min_delay=0.01)
+    slow = lambda: time.sleep(0.05) or "primary"
+    assert policy.run(slow, lambda: backup_calls.append(1)) == "primary"
+
+    capped = _policy(delay=0.01, max_hedge_fraction=0.1)
+    assert capped.run(slow, lambda: backup_calls.append(1)) == "primary"
+    assert backup_calls == [] and capped.stats()["hedges"] == 0
+
+
+def test_fast_primary_is_not_hedged():
+    policy = _policy(delay=0.5)
+    backup_calls = []
+    assert policy.run(lambda: "primary", lambda: backup_calls.append(1)) == "primary"
+    assert backup_calls == []
+
+
+def test_backup_wins_and_the_late_primary_is_billed():
+    policy = _policy(delay=0.05)
+    release = threading.Event()
+    late = []
+
+    started = time.monotonic()
+    value = policy.run(lambda: release.wait(5) and "primary", lambda: "backup", on_late=late.append)
+    elapsed = time.monotonic() - started
+
+    assert value == "backup"
+    assert 0.05 <= elapsed < 0.5
+    assert late == []
+    release.set()
+    _until(lambda: late)
+
+    assert late == ["primary"]
+    stats = policy.stats()
+    assert (stats["requests"], stats["hedges"], stats["hedgeWins"], stats["lateFinishes"]) == (1, 1, 1, 1)
+    assert stats["timeSavedSec"] >= 0
+
+
+def test_primary_that_wins_after_the_hedge_bills_the_backup():
+    policy = _policy(delay=0.05)
+    backup_release = threading.Event()
+    late = []
+
+    value = policy.run(lambda: time.sleep(0.1) or "primary", lambda: backup_release.wait(5) and "backup",
+                       on_late=late.append)
+
+    assert value == "primary"
+    backup_release.set()
+    _until(lambda: late)
+    assert late == ["backup"]
+    assert policy.stats()["hedgeWins"] == 0 and policy.stats()["timeSavedSec"] == 0
+
+
+def test_a_failed_attempt_falls_over_to_the_survivor():
+    policy = _policy(delay=0.05)
+
+    def primary_fails():
+        time.sleep(0.1)
+        raise ConnectionError("primary key down")
+
+    assert policy.run(primary_fails, lambda: time.sleep(0.15) or "backup") == "backup"
+
+    def backup_fails():
+        raise ConnectionError("backup key down")
+
+    assert policy.run(lambda: time.sleep(0.1) or "primary", backup_fails) == "primary"
+
+
+def test_both_failing_raises():
+    policy = _policy(delay=0.02)
+
+    def fails():
+        time.sleep(0.05)
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        policy.run(fails, fails)
+
+
+def test_queued_time_does_not_bring_the_hedge_forward():
+    policy = _policy(delay=0.1, max_workers=1)
+    blocker = threading.Event()
+    policy._pool.submit(blocker.wait, 5)            # the only worker is busy
+    backup_calls = []
+    result = {}
+    t = threading.Thread(target=lambda: result.update(v=policy.run(lambda: time.sleep(0.05) or "primary",
+                                                                      lambda: backup_calls.append(1))))
+    t.start()
+    time.sleep(0.3)                                 # queued well past the hedge delay
+    blocker.set()
+    t.join(5)
+    assert result["v"] == "primary" and backup_calls == []
+
+
+def test_pickles_with_its_own_pool():
+    policy = _policy()
+    clone = pickle.loads(pickle.dumps(policy))
+    assert clone.run(lambda: "ok", lambda: "backup") == "ok"
+    assert clone.threshold() == policy.threshold()
+
+
+# ----------------------------------------------------------------------
+# Through the classifier
+# ----------------------------------------------------------------------
+
+def _client(key, delay, calls, reply):
+    def create(**kwargs):
+        calls.append(key)
+        time.sleep(delay)
+        return NS(choices=[NS(message=NS(content=json.dumps(reply)))],
+                  usage=NS(prompt_tokens=1000, completion_tokens=100))
+    return NS(chat=NS(completions=NS(create=create)))
+
+
+def test_classifier_rotates_backup_keys_and_bills_the_late_loser(make_orgs, valid_reply):
+    from prompt import IndustryClassifier
+
+    clf = IndustryClassifier(api_key="primary", backup_api_keys=["b1", "b2"], hedge_policy=_policy(delay=0.05))
+    calls = []
+    clf.client = _client("primary", 0.3, calls, valid_reply)
+    clf.backup_clients = [_client(k, 0.0, calls, valid_reply) for k in ("b1", "b2")]
+    usage = []
+
+    for org in make_orgs(2):
+        result = clf.classify_organization(org, on_usage=usage.append)
+        assert result["primaryIndustry"] == "Automotive"
+
+    assert [c for c in calls if c != "primary"] == ["b1", "b2"]
+    _until(lambda: len(usage) == 4)                 # two winners, then the two primaries that landed late
+    assert clf.hedge_policy.stats()["lateFinishes"] == 2
+    assert all(u["completionTokens"] == 100 for u in usage)
@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+
+from local_model import LocalRouter, ProductModel, labelled_products, product_text
+
+NOUNS = {
+    "Automotive":      ["brake pad", "oil filter", "spark plug", "radiator hose", "wiper blade", "clutch plate"],
+    "Food & Beverage": ["jasmine rice", "instant noodle", "ground coffee", "palm sugar", "soy sauce", "chili paste"],
+    "Home & Living":   ["table lamp", "cotton pillow", "wall clock", "bath towel", "curtain rod", "flower vase"],
+}
+ADJECTIVES = ["front", "rear", "heavy duty", "premium", "standard"]
+SUBS = {"Automotive": "Spare Parts", "Food & Beverage": "Groceries", "Home & Living": "Decor"}
+
+
+def _examples():
+    return [(f"{adj} {noun}", industry, SUBS[industry])
+            for industry, nouns in NOUNS.items() for noun in nouns for adj in ADJECTIVES]
+
+
+@pytest.fixture(scope="module")
+def model():
+    return ProductModel.train(_examples(), n_features=1 << 14, epochs=200)
+
+
+def _org(names, org_name="Toko Sumber"):
+    return {"_id": "o1", "orgName": org_name, "countryCode": "ID",
+            "product_names": [{"productName": n, "categoryName": "Misc"} for n in names]}
+
+
+AUTO = ["front brake pad", "rear oil filter", "premium spark plug", "standard wiper blade"]
+UNKNOWN = ["qzx vmbr kjw", "wqpz xvnk"]
+
+
+# ----------------------------------------------------------------------
+# Training and persistence
+# ----------------------------------------------------------------------
+
+def test_labelled_products_skips_failures_and_unknown_industries():
+    results = [
+        {"classification": {"industries": [
+            {"industry": "Automotive", "subCategory": "Parts", "sampleProducts": ["Brake pad", "", 3]},
+            {"industry": "Spaceships", "sampleProducts": ["Rocket"]},
+        ]}},
+        {"classification": {"error": "boom", "errorType": "transient"}},
+    ]
+    assert list(labelled_products(results)) == [("Brake pad", "Automotive", "Parts")]
+
+
+def test_training_fits_a_temperature_and_records_holdout_metrics(model):
+    assert model.classes == sorted(NOUNS)
+    assert model.temperature > 0 and model.temperature != 1.0
+    assert model.metrics["examples"] == 90 and model.metrics["holdout"] == 18
+    assert model.metrics["accuracy"] >= 0.8
+    assert model.subcategories == SUBS
+    assert model.predict("heavy duty spark plug")[0] == "Automotive"
+    assert model.predict("premium ground coffee")[0] == "Food & Beverage"
+
+
+def test_unseen_vocabulary_abstains(model):
+    industry, p = model.predict(UNKNOWN[0])
+    assert industry is None and p == pytest.approx(1 / 3)
+    proba, coverage = model.scores([UNKNOWN[0], "front brake pad"])
+    assert coverage[0] < model.min_coverage <= coverage[1]
+    assert np.allclose(proba.sum(axis=1), 1.0)
+
+
+def test_save_load_round_trip(model, tmp_path):
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    loaded = ProductModel.load(path)
+
+    assert loaded.classes == model.classes
+    assert loaded.temperature == model.temperature
+    assert loaded.ngram_range == model.ngram_range and loaded.n_features == model.n_features
+    assert loaded.subcategories == model.subcategories and loaded.metrics == model.metrics
+    assert loaded.min_coverage == model.min_coverage
+    texts = AUTO + UNKNOWN
+    assert np.allclose(loaded.predict_proba(texts), model.predict_proba(texts), atol=1e-2)
+
+
+def test_training_rejects_bad_input():
+    with pytest.raises(ValueError, match="No labelled products"):
+        ProductModel.train([])
+    with pytest.raises(ValueError, match="power of two"):
+        ProductModel.train(_examples(), n_features=1000)
+
+
+# ----------------------------------------------------------------------
+# Routing
+# ----------------------------------------------------------------------
+
+def test_routing_scores_the_name_only(model):
+    product = {"productName": "front brake pad", "categoryName": "Completely Unrelated Words"}
+    assert product_text(product) == "front brake pad"
+
+
+def test_threshold_and_temperature_decide_the_route(model):
+    org = _org(AUTO)
+    assert LocalRouter(model, threshold=0.5).plan(org).mode == "local"
+    assert LocalRouter(model, threshold=1.01).plan(org).mode == "llm"
+
+    flat = ProductModel(model.classes, model.rows, model.weights, model.bias, temperature=100.0,
+                        n_features=model.n_features, ngram_range=model.ngram_range)
+    assert LocalRouter(flat, threshold=0.5).plan(org).mode == "llm"
+
+
+def test_partial_and_llm_routes(model):
+    router = LocalRouter(model, threshold=0.5, max_uncertain=0.4)
+
+    partial = router.plan(_org(AUTO + UNKNOWN[:1]))
+    assert partial.mode == "partial"
+    assert [p["productName"] for p in partial.llm_org["product_names"]] == UNKNOWN[:1]
+
+    assert router.plan(_org(AUTO[:1] + UNKNOWN)).mode == "llm"
+    assert router.stats()["orgsPartial"] == 1 and router.stats()["orgsLLM"] == 1
+
+
+def test_merge_weights_local_and_llm_percentages(model):
+    router = LocalRouter(model, threshold=0.5, max_uncertain=0.4)
+    plan = router.plan(_org(AUTO + UNKNOWN[:1]))
+    llm = {"operationType": "Seller", "confidenceScore": 0.6, "classification": {"industries": [
+        {"industry": "Home & Living", "subCategory": "Kitchen", "percentage": 100, "sampleProducts": [UNKNOWN[0]]},
+    ]}}
+
+    result = router.merge(plan, llm)
+
+    shares = {i["industry"]: i["percentage"] for i in result["classification"]["industries"]}
+    assert shares == {"Automotive": 80, "Home & Living": 20}
+    assert result["primaryIndustry"] == "Automotive"
+    assert result["classification"]["isMultiIndustry"] is True
+    assert result["classifiedBy"] == "hybrid"
+    home = next(i for i in result["classification"]["industries"] if i["industry"] == "Home & Living")
+    assert home["subCategory"] == "Kitchen"
+
+
+def test_name_rule_picks_the_primary_only_among_predicted_industries(model):
+    router = LocalRouter(model, threshold=0.5)
+    result = router.local_result(router.plan(_org(AUTO, org_name="HOTEL MELATI")))
+    assert result["primaryIndustry"] == "Automotive"
+    assert result["operationType"] == "Service"
+
+
+def test_all_local_org_makes_no_api_call(model, fake_classifier):
+    clf = fake_classifier(local_router=LocalRouter(model, threshold=0.5), fold_variants=False)
+    org = _org(AUTO)
+
+    result = clf.classify_organization(org)
+    streamed = list(clf.classify_organization_stream(org))
+
+    assert clf.calls == []
+    assert result["classifiedBy"] == "local"
+    assert result["primaryIndustry"] == "Automotive" and result["productCount"] == 4
+    assert streamed[-1] == ("result", result)
+
+
+def test_partially_routed_org_sends_only_the_uncertain_products(model, fake_classifier, valid_reply):
+    valid_reply["classification"]["industries"][0]["industry"] = "Home & Living"
+    valid_reply["primaryIndustry"] = "Home & Living"
+    router = LocalRouter(model, threshold=0.5, max_uncertain=0.4)
+    clf = fake_classifier(reply=valid_reply, local_router=router, fold_variants=False)
+
+    result = clf.classify_organization(_org(AUTO + UNKNOWN[:1]))
+
+    assert len(clf.calls) == 1
+    sent = clf.calls[0]["messages"][-1]["content"]
+    assert UNKNOWN[0] in sent and "brake pad" not in sent
+    shares = {i["industry"]: i["percentage"] for i in result["classification"]["industries"]}
+    assert shares == {"Automotive": 80, "Home & Living": 20}
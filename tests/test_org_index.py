@@ -0,0 +1,114 @@
+import io
+import json
+import os
+import threading
+
+import pytest
+
+import dataset_store
+from dataset_store import iter_json_array_spans
+from org_index import INDEX_SUFFIX, OrgIndex
+
+
+@pytest.fixture
+def orgs(make_orgs):
+    orgs = make_orgs(7)
+    orgs[1]["orgName"] = "Toko “Maju” — ünïcode"
+    orgs[4]["countryCode"] = "MY"
+    return orgs
+
+
+def _write(path, orgs, bom=False, indent=None, jsonl=False):
+    if jsonl:
+        body = "\n".join(json.dumps(o, ensure_ascii=False) for o in orgs) + "\n"
+    else:
+        body = json.dumps(orgs, ensure_ascii=False, indent=indent)
+    path.write_bytes((b"\xef\xbb\xbf" if bom else b"") + body.encode("utf-8"))
+    return str(path)
+
+
+@pytest.mark.parametrize("bom", [False, True])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_spans_point_at_each_object(orgs, monkeypatch, bom, indent):
+    monkeypatch.setattr(dataset_store, "CHUNK_SIZE", 5)
+    data = (b"\xef\xbb\xbf" if bom else b"") + json.dumps(orgs, ensure_ascii=False, indent=indent).encode("utf-8")
+
+    spans = list(iter_json_array_spans(io.BytesIO(data)))
+
+    assert [org for _, _, org in spans] == orgs
+    assert [json.loads(data[start:end]) for start, end, _ in spans] == orgs
+
+
+def test_span_of_a_single_top_level_object(orgs):
+    data = b"\xef\xbb\xbf  " + json.dumps(orgs[0]).encode()
+    [(start, end, org)] = iter_json_array_spans(io.BytesIO(data))
+    assert (start, end) == (5, len(data)) and org == orgs[0]
+
+
+@pytest.mark.parametrize("jsonl", [False, True])
+def test_random_access_round_trip(tmp_path, orgs, jsonl):
+    path = _write(tmp_path / ("orgs.jsonl" if jsonl else "orgs.json"), orgs, bom=True, indent=2, jsonl=jsonl)
+
+    with OrgIndex(path) as index:
+        assert len(index) == 7
+        assert index.ids() == [o["_id"] for o in orgs]
+        assert [index.at(p) for p in range(7)] == orgs
+        assert index.get("org-1") == orgs[1]
+        assert index.get("missing") is None
+        assert list(index.range(5, 99)) == orgs[5:]
+        assert index.take([4, 0]) == [orgs[4], orgs[0]]
+        assert index.strata_keys()[4] == ("MY", 3)
+        assert list(index.select(["org-3", "nope", "org-2"])) == [orgs[3], orgs[2]]
+        assert [o for k in range(3) for o in index.shard(k, 3)] == orgs
+        with pytest.raises(ValueError):
+            index.shard(3, 3)
+
+
+def test_index_is_reused_and_rebuilt_when_the_file_changes(tmp_path, orgs):
+    path = _write(tmp_path / "orgs.json", orgs)
+    OrgIndex(path).close()
+    idx_path = path + INDEX_SUFFIX
+    built = os.stat(idx_path).st_mtime_ns
+
+    OrgIndex(path).close()
+    assert os.stat(idx_path).st_mtime_ns == built
+
+    _write(tmp_path / "orgs.json", orgs[:3])
+    with OrgIndex(path) as index:
+        assert len(index) == 3 and index.at(2) == orgs[2]
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.json"
+    path.write_bytes(b"")
+    with OrgIndex(str(path)) as index:
+        assert len(index) == 0
+
+
+def test_concurrent_builds_do_not_collide(tmp_path, orgs):
+    path = _write(tmp_path / "orgs.json", orgs * 200)
+    errors = []
+
+    def build():
+        try:
+            with OrgIndex(path, rebuild=True) as index:
+                assert len(index) == len(orgs) * 200
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert sorted(os.listdir(tmp_path)) == ["orgs.json", "orgs.json" + INDEX_SUFFIX]
+
+
+def test_failed_build_leaves_no_temp_file(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text('[{"_id": 1}, {"_id": ', encoding="utf-8")
+    with pytest.raises(Exception):
+        OrgIndex(str(path))
+    assert os.listdir(tmp_path) == ["broken.json"]
@@ -0,0 +1,120 @@
+import json
+import multiprocessing
+import time
+
+import pytest
+
+from cancellation import CancellationToken
+from parallel import GlobalRateLimiter, classify_parallel
+from prompt import IndustryClassifier
+
+from conftest import VALID_REPLY, _org
+
+
+# ----------------------------------------------------------------------
+# GlobalRateLimiter
+# ----------------------------------------------------------------------
+
+def test_unlimited_never_waits():
+    limiter = GlobalRateLimiter()
+    assert all(limiter.acquire(10_000) < 0.01 for _ in range(50))
+    assert limiter.waited < 0.1
+
+
+def test_requests_are_paced_after_the_burst():
+    limiter = GlobalRateLimiter(rpm=600, burst=0.2)           # 10/s, bucket of 2
+    started = time.monotonic()
+    waits = [limiter.acquire() for _ in range(6)]
+    elapsed = time.monotonic() - started
+
+    assert max(waits[:2]) < 0.01 and min(waits[2:]) > 0.05
+    assert 0.35 <= elapsed < 1.0
+    assert limiter.waited == pytest.approx(sum(waits))
+
+
+def test_tokens_are_paced_and_oversized_calls_wait_for_a_full_bucket():
+    limiter = GlobalRateLimiter(tpm=60_000, burst=0.1)        # 1,000 tokens/s, bucket of 100
+    assert limiter.acquire(100) < 0.01
+    assert 0.04 <= limiter.acquire(50) < 0.5
+    assert 0.08 <= limiter.acquire(10_000) < 0.5               # capped at the bucket, not 10 s
+
+
+def _draw(limiter, count, out):
+    started = time.monotonic()
+    for _ in range(count):
+        limiter.acquire()
+    out.put(time.monotonic() - started)
+
+
+@pytest.mark.parametrize("method", ["spawn", "fork"])
+def test_worker_processes_share_one_budget(method):
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"{method} not available")
+    ctx = multiprocessing.get_context(method)
+    limiter = GlobalRateLimiter(rpm=1200, burst=0.05, context=ctx)    # 20/s, bucket of 1
+    out = ctx.Queue()
+    workers = [ctx.Process(target=_draw, args=(limiter, 5, out)) for _ in range(2)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+    elapsed = max(out.get(timeout=5) for _ in workers)
+
+    assert all(w.exitcode == 0 for w in workers)
+    assert elapsed >= 0.4                                       # 10 requests at 20/s, minus the first
+    assert limiter.waited >= 0.4
+
+
+# ----------------------------------------------------------------------
+# classify_parallel
+# ----------------------------------------------------------------------
+
+class EchoClassifier(IndustryClassifier):
+    """Answers every org with its own name, later orgs faster — results complete out of order."""
+
+    def _call_model(self, messages, timeout=None, model=None, on_usage=None, llm_org=None):
+        n = int(llm_org["_id"].split("-")[1])
+        time.sleep(0.002 * (20 - n))
+        return json.dumps(dict(VALID_REPLY, orgName=llm_org["orgName"]))
+
+
+@pytest.fixture
+def export(tmp_path):
+    path = tmp_path / "export.json"
+    path.write_text(json.dumps([_org(n) for n in range(12)]), encoding="utf-8")
+    return str(path)
+
+
+def test_parts_are_merged_in_the_order_of_positions(export, tmp_path):
+    out = str(tmp_path / "out.json")
+    positions = [11, 3, 5, 0, 7, 2, 9, 1, 10]
+    seen = []
+
+    summary = classify_parallel(EchoClassifier(api_key="test"), export, out, positions=positions, processes=2,
+                                part_size=2, on_result=lambda p, r: seen.append(p))
+
+    with open(out, encoding="utf-8") as f:
+        results = json.load(f)
+    assert [r["orgName"] for r in results] == [f"Org {p}" for p in positions]
+    assert seen == positions
+    assert summary["orgs"] == 9 and summary["parts"] == 5 and summary["errors"] == 0
+    assert list(tmp_path.glob(".parts-*")) == []
+
+
+def test_parts_cancelled_before_they_start_keep_their_place(export, tmp_path):
+    out = str(tmp_path / "out.json")
+    token = CancellationToken()
+    token.cancel("user stop")
+
+    summary = classify_parallel(EchoClassifier(api_key="test"), export, out, processes=2, part_size=2,
+                                cancel_token=token)
+
+    with open(out, encoding="utf-8") as f:
+        results = json.load(f)
+    assert len(results) == 12
+    for n, result in enumerate(results):
+        assert result["orgName"] == f"Org {n}"
+    cancelled = [r for r in results if r["classification"].get("errorType") == "cancelled"]
+    assert len(cancelled) >= 6                                  # at most 3 of 6 parts were already queued
+    assert cancelled[0]["classification"]["error"] == "user stop"
+    assert summary["errors"] == len(cancelled)
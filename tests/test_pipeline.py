@@ -0,0 +1,188 @@
+import itertools
+import json
+import threading
+import time
+
+import pytest
+
+from cancellation import CancellationToken
+from pipeline import Pipeline, Stage
+
+from conftest import VALID_REPLY, _org
+
+
+def _pipeline_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("pipeline-")]
+
+
+def _counting(source, read):
+    for item in source:
+        read.append(item)
+        yield item
+
+
+def _settled(read, wait=0.2, limit=10.0):
+    """len(read) once the reader has stopped advancing."""
+    end = time.monotonic() + limit
+    seen = -1
+    while len(read) != seen and time.monotonic() < end:
+        seen = len(read)
+        time.sleep(wait)
+    assert len(read) == seen
+    return seen
+
+
+# ----------------------------------------------------------------------
+# Pipeline
+# ----------------------------------------------------------------------
+
+def test_stages_transform_fan_out_and_filter():
+    stages = [Stage("double", lambda n: [n, n]), Stage("odd", lambda n: [n] if n % 2 else [], workers=3)]
+    assert sorted(Pipeline(stages, queue_size=2).run(range(10))) == [1, 1, 3, 3, 5, 5, 7, 7, 9, 9]
+    assert _pipeline_threads() == []
+
+
+def test_a_stalled_consumer_bounds_how_far_the_reader_runs_ahead():
+    read = []
+    out = Pipeline([Stage("a", lambda n: [n]), Stage("b", lambda n: [n])], queue_size=2).run(
+        _counting(itertools.count(), read))
+
+    assert next(out) == 0
+    assert _settled(read) <= 3 * 2 + 2 + 1 + 1          # 3 queues, 2 stage threads, the reader, the one taken
+    out.close()
+    assert _pipeline_threads() == []
+
+
+def test_closing_early_stops_every_thread():
+    out = Pipeline([Stage("slow", lambda n: time.sleep(0.01) or [n], workers=4)]).run(itertools.count())
+    assert [next(out) for _ in range(5)]
+    out.close()
+    assert _pipeline_threads() == []
+
+
+def test_a_failing_stage_shuts_the_pipeline_down():
+    def fn(n):
+        if n == 5:
+            raise ValueError("bad item")
+        return [n]
+
+    with pytest.raises(RuntimeError, match="Pipeline stage 'check' failed: bad item") as info:
+        list(Pipeline([Stage("check", fn)], queue_size=2).run(itertools.count()))
+    assert isinstance(info.value.__cause__, ValueError)
+    assert _pipeline_threads() == []
+
+
+def test_a_failing_source_is_reported_as_the_read_stage():
+    def source():
+        yield 1
+        raise OSError("disk gone")
+
+    with pytest.raises(RuntimeError, match="stage 'read' failed"):
+        list(Pipeline([Stage("id", lambda n: [n])]).run(source()))
+
+
+def test_cancel_stops_reading_but_drains_what_is_inside():
+    token = CancellationToken()
+    read = []
+    out = Pipeline([Stage("id", lambda n: [n])], queue_size=2, cancel_token=token).run(
+        _counting(itertools.count(), read))
+    next(out)
+    token.cancel("stop")
+    rest = list(out)
+    assert len(rest) <= len(read)
+    assert _pipeline_threads() == []
+
+
+# ----------------------------------------------------------------------
+# classify_stream
+# ----------------------------------------------------------------------
+
+def _stub(clf, delay=0.0, fail=lambda messages: False):
+    """Replace the API call; .calls counts the calls that reached it."""
+    clf.calls = []
+    lock = threading.Lock()
+
+    def call_model(messages, **kw):
+        with lock:
+            clf.calls.append(messages)
+        if delay:
+            time.sleep(delay)
+        if fail(messages):
+            raise TimeoutError("upstream timed out")
+        return json.dumps(VALID_REPLY)
+
+    clf._call_model = call_model
+    return clf
+
+
+def test_duplicate_orgs_are_classified_once(fake_classifier):
+    clf = _stub(fake_classifier(), delay=0.05)
+    orgs = [_org(0), _org(1), _org(0), _org(2), _org(0), _org(1)]
+
+    results = dict(clf.classify_stream(orgs, concurrency=2, queue_size=2))
+
+    assert sorted(results) == list(range(6))
+    assert len(clf.calls) == 3
+    assert results[0] == results[2] == results[4] and results[0] is not results[2]
+    results[2]["primaryIndustry"] = "changed"
+    assert results[4]["primaryIndustry"] == "Automotive"
+
+
+def test_failed_results_are_not_reused(fake_classifier):
+    attempts = itertools.count()
+    clf = _stub(fake_classifier(), fail=lambda messages: next(attempts) == 0)
+
+    first = list(clf.classify_stream([_org(0)], concurrency=1))
+    again = list(clf.classify_stream([_org(0), _org(0)], concurrency=1, dedupe=True))
+
+    assert "error" in first[0][1]["classification"]
+    assert len(clf.calls) == 2 and all("error" not in r["classification"] for _, r in again)
+
+
+def test_dedupe_off_calls_for_every_org(fake_classifier):
+    clf = _stub(fake_classifier())
+    assert len(list(clf.classify_stream([_org(0)] * 4, dedupe=False))) == 4
+    assert len(clf.calls) == 4
+
+
+def test_slow_api_blocks_the_reader(fake_classifier):
+    clf = _stub(fake_classifier(), delay=0.05)
+    read = []
+    orgs = _counting((_org(n) for n in itertools.count()), read)
+
+    out = clf.classify_stream(orgs, concurrency=2, queue_size=2)
+    next(out)
+    held = _settled(read)
+    out.close()
+
+    assert held <= 7 * 2 + 6 + 2 + 1                   # 7 queues, stage threads, the reader
+    assert _pipeline_threads() == []
+    calls = len(clf.calls)
+    time.sleep(0.3)
+    assert len(clf.calls) == calls                       # nothing keeps calling after close
+
+
+def test_a_failing_sink_stops_the_stream(fake_classifier):
+    clf = _stub(fake_classifier())
+
+    def on_result(index, result):
+        if index == 3:
+            raise OSError("results file full")
+
+    with pytest.raises(RuntimeError, match="stage 'sink' failed"):
+        list(clf.classify_stream((_org(n) for n in itertools.count()), on_result=on_result, queue_size=2))
+    assert _pipeline_threads() == []
+
+
+def test_cancelled_stream_reports_queued_orgs_as_cancelled(fake_classifier):
+    clf = _stub(fake_classifier(), delay=0.05)
+    token = CancellationToken()
+    results = []
+    for index, result in clf.classify_stream((_org(n) for n in range(100)), concurrency=1, queue_size=4,
+                                             cancel_token=token):
+        results.append(result)
+        token.cancel("user stop")
+
+    assert len(results) < 100
+    types = {r["classification"].get("errorType") for r in results[1:]}
+    assert "cancelled" in types and len(clf.calls) < len(results)
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import Counter
+
+from batch_worker import BatchWorker
+from cancellation import CancellationToken
+from planner import SpendGovernor, call_cost
+
+
+def _usage(model="gpt-4o", prompt_tokens=2000, completion_tokens=300):
+    return {"model": model, "products": 3, "estInputTokens": prompt_tokens,
+            "promptTokens": prompt_tokens, "completionTokens": completion_tokens, "latency": 0.1}
+
+
+def _paused_governor():
+    governor = SpendGovernor(budget=0.001, total=10, model="gpt-4o")
+    governor.record(_usage())
+    assert governor.update(1) == "paused"
+    return governor
+
+
+# ----------------------------------------------------------------------
+# SpendGovernor
+# ----------------------------------------------------------------------
+
+def test_uncapped_run_stays_normal():
+    governor = SpendGovernor(total=100)
+    governor.record(_usage())
+    assert governor.update(1, in_flight=50) == "normal"
+    assert governor.model_override("gpt-4o") is None
+
+
+def test_capped_run_without_plan_probes_before_fanning_out():
+    governor = SpendGovernor(budget=1.0, total=100, model="gpt-4o-mini")
+    assert governor.update(0) == "normal"                  # the probe call
+    assert governor.update(0, in_flight=1) == "probing"    # held until it is measured
+    governor.record(_usage("gpt-4o-mini"))
+    assert governor.update(1) == "normal"
+
+
+def test_pauses_before_the_cap_is_crossed():
+    cost = call_cost("gpt-4o", 2000, 300)
+    governor = SpendGovernor(budget=cost * 2.5, total=10, plan={"costPerOrg": cost, "models": {"gpt-4o-mini": 1}})
+    governor.record(_usage())
+    assert governor.update(1, in_flight=1) == "paused"     # spent + 2 × per-org > cap
+    assert governor.paused
+    assert governor.events[-1].startswith("paused at")
+
+
+def test_degrades_to_the_cheaper_model_when_the_projection_exceeds_the_cap():
+    cost = call_cost("gpt-4o", 2000, 300)
+    governor = SpendGovernor(budget=cost * 20, total=100, plan={"costPerOrg": cost, "models": {"gpt-4o": 100}})
+    assert governor.update(0) == "degraded"
+    assert governor.model_override("gpt-4o") == "gpt-4o-mini"
+
+
+def test_reports_a_missing_fallback_instead_of_degrading():
+    cost = call_cost("gpt-4o-mini", 2000, 300)
+    governor = SpendGovernor(budget=cost * 20, total=100,
+                             plan={"costPerOrg": cost, "models": {"gpt-4o-mini": 100}})
+    assert governor.update(0) == "normal"
+    assert governor.model_override("gpt-4o-mini") is None
+    assert "no cheaper fallback" in governor.events[-1]
+
+
+def test_wait_resume_returns_true_once_resumed():
+    governor = _paused_governor()
+    threading.Timer(0.1, governor.resume, kwargs={"budget": 10.0}).start()
+    assert governor.wait_resume(max_wait=5.0, poll=0.05)
+    assert not governor.paused and governor.budget == 10.0
+
+
+def test_wait_resume_stops_on_cancel_deadline_or_max_wait():
+    governor = _paused_governor()
+    token = CancellationToken()
+    token.cancel()
+    assert not governor.wait_resume(cancel_token=token)
+
+    started = time.monotonic()
+    assert not governor.wait_resume(deadline_at=started + 0.2, poll=0.05)
+    assert not governor.wait_resume(max_wait=0.2, poll=0.05)
+    assert time.monotonic() - started < 1.0
+    assert governor.paused
+
+
+# ----------------------------------------------------------------------
+# Paused batch jobs
+# ----------------------------------------------------------------------
+
+def _wait(job, limit: float = 10.0):
+    until = time.monotonic() + limit
+    while not job.finished and time.monotonic() < until:
+        time.sleep(0.02)
+    assert job.finished, f"job still {job.status} after {limit}s"
+
+
+def _error_types(job):
+    return Counter(r["classification"].get("errorType", "ok") for r in job.results())
+
+
+def test_unattended_pause_ends_after_the_pause_timeout(fake_classifier, make_orgs):
+    clf = fake_classifier(delay=0.02, model="gpt-4o")
+    worker = BatchWorker(pause_timeout=0.3)
+    started = time.monotonic()
+    job = worker.get(worker.submit(clf, make_orgs(10), concurrency=2, budget=0.01))
+    _wait(job)
+
+    assert job.status == "done"
+    assert time.monotonic() - started < 3.0
+    assert _error_types(job) == {"ok": 1, "budget": 9}
+    assert job.governor.stats()["spent"] <= 0.01
+
+
+def test_paused_job_stops_at_its_deadline(fake_classifier, make_orgs):
+    clf = fake_classifier(delay=0.02, model="gpt-4o")
+    worker = BatchWorker(pause_timeout=60)
+    started = time.monotonic()
+    job = worker.get(worker.submit(clf, make_orgs(10), concurrency=2, budget=0.01, deadline=0.5))
+    _wait(job)
+
+    assert job.status == "done"
+    assert time.monotonic() - started < 3.0
+    assert _error_types(job) == {"ok": 1, "deadline": 9}
+
+
+def test_resumed_job_runs_to_completion(fake_classifier, make_orgs):
+    clf = fake_classifier(delay=0.02, model="gpt-4o")
+    worker = BatchWorker(pause_timeout=60)
+    job = worker.get(worker.submit(clf, make_orgs(10), concurrency=2, budget=0.01))
+
+    until = time.monotonic() + 5.0
+    while job.status != "paused" and time.monotonic() < until:
+        time.sleep(0.02)
+    assert job.status == "paused"
+    job.resume(budget=10.0)
+    _wait(job)
+
+    assert job.status == "done"
+    assert _error_types(job) == {"ok": 10}
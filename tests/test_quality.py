@@ -0,0 +1,96 @@
+import pytest
+
+pytest.importorskip("pandas")
+
+from benchmark import load_sample_orgs
+from quality import (AMBIGUITY_PENALTY, MIN_SCORE, confidence_score, is_vague_name, org_quality, prescore,
+                     quality_summary)
+
+
+def _p(name="Brake pad", desc="Ceramic pad", unit="pcs", commodity=1):
+    return {"productName": name, "discription": desc, "unit": unit, "typeOfCommodity": commodity}
+
+
+def _org(*products):
+    return {"orgName": "X", "product_names": list(products)}
+
+
+EDGE_ORGS = {
+    "clean":                _org(_p(), _p("Oil filter")),
+    "no products":          _org(),
+    "products missing":     {"orgName": "X"},
+    "half without desc":    _org(_p(desc=""), _p()),                     # exactly half is not "more than half"
+    "most without desc":    _org(_p(desc=""), _p(desc=None), _p()),
+    "one vague":            _org(_p("SKU-1234"), _p()),
+    "vague up to the cap":  _org(*[_p(f"ITEM {n}") for n in range(7)]),
+    "units on services":    _org(_p(unit="", commodity=2), _p(unit="", commodity=2)),
+    "most units missing":   _org(_p(unit=""), _p(unit=" "), _p()),
+    "everything wrong":     _org(*[_p(f"PART-{n}", desc="", unit="") for n in range(6)]),
+    "string commodity":     _org(_p(unit="", commodity="1"), _p(unit="", commodity=None)),
+}
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("clean", 1.0),
+    ("no products", 0.9),
+    ("products missing", 0.9),
+    ("half without desc", 1.0),
+    ("most without desc", 0.9),
+    ("one vague", 0.95),
+    ("vague up to the cap", 0.8),
+    ("units on services", 1.0),
+    ("most units missing", 0.95),
+    ("everything wrong", 0.65),
+    ("string commodity", 1.0),
+])
+def test_penalties(name, expected):
+    assert org_quality(EDGE_ORGS[name]) == expected
+
+
+def test_prescore_matches_org_quality_on_edge_cases():
+    orgs = list(EDGE_ORGS.values())
+    assert prescore(orgs)["qualityScore"].tolist() == [org_quality(o) for o in orgs]
+
+
+def test_prescore_matches_org_quality_on_the_sample_data():
+    orgs = load_sample_orgs()
+    if not orgs:
+        pytest.skip("sample data not present")
+    scores = prescore(orgs)
+    assert len(scores) == len(orgs)
+    assert scores["qualityScore"].tolist() == [org_quality(o) for o in orgs]
+    assert scores["products"].tolist() == [len(o.get("product_names") or []) for o in orgs]
+
+
+def test_prescore_of_nothing_and_the_summary():
+    assert len(prescore([])) == 0
+    assert quality_summary(prescore([]))["median"] is None
+    summary = quality_summary(prescore([EDGE_ORGS["clean"], EDGE_ORGS["everything wrong"]]))
+    assert summary["orgs"] == 2 and summary["lowShare"] == 0.5 and summary["missingDescriptions"] == 0.5
+
+
+def test_vague_names():
+    assert is_vague_name("SKU-12345") and is_vague_name("Item No 4") and is_vague_name(None)
+    assert not is_vague_name("Brake pad 4mm")
+
+
+def _result(*shares):
+    return {"classification": {"industries": [{"industry": f"I{n}", "percentage": s} for n, s in enumerate(shares)]}}
+
+
+def test_confidence_score_applies_the_ambiguity_penalty():
+    assert confidence_score(0.9, _result(100)) == 0.9
+    assert confidence_score(0.9, _result(60, 40)) == 0.9
+    assert confidence_score(0.9, _result(55, 45)) == round(0.9 - AMBIGUITY_PENALTY, 2)
+    assert confidence_score(MIN_SCORE, _result(50, 50)) == MIN_SCORE
+    assert confidence_score(0.9, {"classification": {"error": "boom"}}) == 0.9
+
+
+def test_prescored_confidence_replaces_the_models_only_when_enabled(fake_classifier, valid_reply):
+    org = {"_id": "o1", "orgName": "X", "countryCode": "ID",
+           "product_names": [_p("SKU-1"), _p("SKU-2", desc=""), _p("Oil filter", desc="")]}
+    valid_reply["confidenceScore"] = 0.99
+
+    assert fake_classifier(reply=valid_reply).classify_organization(org)["confidenceScore"] == 0.99
+    result = fake_classifier(reply=valid_reply, prescore_confidence=True).classify_organization(org)
+    assert result["confidenceScore"] == org_quality(org) == 0.8
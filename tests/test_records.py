@@ -0,0 +1,130 @@
+import copy
+import json
+
+import pytest
+
+from records import (ClassificationResult, Organization, dump_results, iter_result_dicts, round_percentages,
+                     validate_llm_response)
+
+FULL_ORG = {
+    "_id": "o1",
+    "orgName": "Toko Jaya",
+    "businessId": "B-17",
+    "countryCode": "ID",
+    "product_names": [
+        {"productName": "Oil filter", "categoryName": "Parts", "unit": "pcs", "productCode": "OF-1",
+         "typeOfCommodity": 2, "discription": "Fits most cars"},
+    ],
+}
+
+
+# ----------------------------------------------------------------------
+# Dict round trips
+# ----------------------------------------------------------------------
+
+def test_organization_round_trip_keeps_the_dict_shape():
+    assert Organization.from_dict(FULL_ORG).to_dict() == FULL_ORG
+
+
+def test_sparse_organization_gains_empty_fields_only():
+    org = Organization.from_dict({"_id": 7, "orgName": "X", "product_names": [{"productName": "Lamp"}]}).to_dict()
+    assert org == {
+        "_id": "7", "orgName": "X", "businessId": "", "countryCode": "",
+        "product_names": [{"productName": "Lamp", "categoryName": "", "unit": "", "productCode": "",
+                           "typeOfCommodity": 0, "discription": ""}],
+    }
+
+
+def test_classifier_results_round_trip(fake_classifier, make_orgs):
+    clf = fake_classifier()
+    ok = clf.classify_organization(make_orgs(1)[0])
+    local = dict(copy.deepcopy(ok), classifiedBy="local")
+
+    clf._create_completion = lambda **kw: (_ for _ in ()).throw(ValueError("boom"))
+    failed = clf.classify_organization(make_orgs(1)[0])
+
+    for result in (ok, local, failed):
+        assert ClassificationResult.from_dict(result).to_dict() == result
+    assert failed["classification"] == {"error": "Classification failed: boom", "errorType": "error"}
+
+
+def test_error_without_a_type_reads_as_error():
+    record = ClassificationResult.from_dict({"orgName": "X", "classification": {"error": "boom"}})
+    assert record.to_dict()["classification"] == {"error": "boom", "errorType": "error"}
+
+
+def test_dump_results_writes_records_and_dicts_alike(tmp_path, valid_reply):
+    record = ClassificationResult.from_dict(valid_reply)
+    path = str(tmp_path / "results.json")
+
+    dump_results([record, valid_reply], path)
+
+    with open(path, encoding="utf-8") as f:
+        loaded = json.load(f)
+    assert loaded == list(iter_result_dicts([record, valid_reply])) == [record.to_dict(), valid_reply]
+
+
+def test_round_percentages():
+    assert round_percentages({"A": 2, "B": 1}) == [("A", 65), ("B", 35)]
+    assert round_percentages({"A": 99, "B": 1}) == [("A", 100)]
+    assert round_percentages({}) == []
+
+
+# ----------------------------------------------------------------------
+# Validation
+# ----------------------------------------------------------------------
+
+def test_valid_reply_has_no_problems(valid_reply):
+    assert validate_llm_response(valid_reply) == []
+
+
+def _industry(name, pct):
+    return {"industry": name, "subCategory": "", "percentage": pct, "sampleProducts": []}
+
+
+@pytest.mark.parametrize("change, problem", [
+    (lambda r: r.update(operationType="Retailer"), "operationType 'Retailer'"),
+    (lambda r: r.pop("primaryIndustry"), "primaryIndustry missing"),
+    (lambda r: r.update(confidenceScore=1.5), "confidenceScore"),
+    (lambda r: r.update(confidenceScore=True), "confidenceScore"),
+    (lambda r: r.update(classification=[]), "classification missing"),
+    (lambda r: r["classification"].update(industries=[]), "industries missing or empty"),
+    (lambda r: r["classification"].update(isMultiIndustry="no"), "isMultiIndustry missing"),
+    (lambda r: r["classification"]["industries"][0].update(industry="Spaceships"), "not in the taxonomy"),
+    (lambda r: r["classification"]["industries"][0].update(percentage=97), "positive multiple of 5"),
+    (lambda r: r["classification"]["industries"][0].update(percentage="100"), "not a number"),
+    (lambda r: r["classification"]["industries"][0].update(sampleProducts="Oil filter"), "not a list"),
+    (lambda r: r["classification"]["industries"].append("Automotive"), "is not an object"),
+    (lambda r: r["classification"]["industries"][0].update(percentage=90), "sum to 90"),
+    (lambda r: r["classification"].update(industries=[_industry("Automotive", 50), _industry("Automotive", 50)],
+                                          isMultiIndustry=True), "twice"),
+    (lambda r: r.update(primaryIndustry="Home & Living"), "not among the industries"),
+    (lambda r: r["classification"].update(isMultiIndustry=True), "does not match"),
+])
+def test_malformed_replies_are_rejected(valid_reply, change, problem):
+    change(valid_reply)
+    problems = validate_llm_response(valid_reply)
+    assert any(problem in p for p in problems), problems
+
+
+def test_non_object_reply_is_rejected():
+    assert validate_llm_response(["Automotive"]) == ["response is not a JSON object"]
+
+
+def test_unrepairable_reply_becomes_a_schema_error(fake_classifier, make_orgs, valid_reply):
+    valid_reply["operationType"] = "Retailer"
+    clf = fake_classifier(reply=valid_reply)
+
+    result = clf.classify_organization(make_orgs(1)[0])
+
+    assert result["classification"]["errorType"] == "schema"
+    assert "operationType 'Retailer'" in result["classification"]["error"]
+    assert result["primaryIndustry"] is None
+    assert ClassificationResult.from_dict(result).to_dict() == result
+
+
+def test_without_the_repairer_replies_are_accepted_as_they_parse(fake_classifier, make_orgs, valid_reply):
+    valid_reply["operationType"] = "Retailer"
+    result = fake_classifier(reply=valid_reply, repair_responses=False).classify_organization(make_orgs(1)[0])
+    assert result["operationType"] == "Retailer"
+    assert "error" not in result["classification"]
@@ -0,0 +1,237 @@
+import copy
+import json
+import pickle
+
+import pytest
+
+from records import INDUSTRIES, OPERATION_TYPES, validate_llm_response
+from repair import ResponseRepairer, match_choice, salvage_json
+
+ORG = {"_id": "o1", "orgName": "Bengkel Jaya", "countryCode": "ID",
+       "product_names": [{"productName": "Oil filter"}, {"productName": "Brake pad"}]}
+
+
+def _reply(**changes):
+    reply = {
+        "orgName": "Bengkel Jaya",
+        "primaryIndustry": "Automotive",
+        "operationType": "Seller",
+        "confidenceScore": 0.9,
+        "classification": {
+            "isMultiIndustry": True,
+            "industries": [
+                {"industry": "Automotive", "subCategory": "Parts", "percentage": 70, "sampleProducts": ["Oil filter"]},
+                {"industry": "Home & Living", "subCategory": "Decor", "percentage": 30, "sampleProducts": ["Lamp"]},
+            ],
+        },
+        "AIreasoning": "Mostly spare parts.",
+    }
+    reply.update(changes)
+    return reply
+
+
+def _industries(response):
+    return [(i["industry"], i["percentage"]) for i in response["classification"]["industries"]]
+
+
+# ----------------------------------------------------------------------
+# Helpers
+# ----------------------------------------------------------------------
+
+def test_salvage_closes_a_reply_cut_at_the_token_limit():
+    text = json.dumps(_reply())
+    cut = text[:text.index("Mostly") + 3]
+    salvaged = salvage_json(cut)
+    assert salvaged["classification"] == _reply()["classification"]
+    assert "AIreasoning" not in salvaged
+
+
+def test_salvage_keeps_only_complete_values():
+    text = json.dumps(_reply())
+    salvaged = salvage_json(text[:text.index('"Home & Living"') + 6])
+    industries = salvaged["classification"]["industries"]
+    assert industries[0] == _reply()["classification"]["industries"][0]
+    assert industries[1:] in ([], [{}])
+
+
+def test_salvage_ignores_surrounding_text_and_rejects_non_objects():
+    assert salvage_json("Sure! " + json.dumps(_reply()) + " Hope this helps {") == _reply()
+    assert salvage_json("no json here") is None
+    assert salvage_json("[1, 2") is None
+
+
+def test_match_choice():
+    assert match_choice("electronics and tech", INDUSTRIES) == "Electronics & Tech"
+    assert match_choice("  SELLER ", OPERATION_TYPES) == "Seller"
+    assert match_choice("Automot", INDUSTRIES) == "Automotive"
+    assert match_choice("Tobacco", INDUSTRIES) is None           # two industries start with it
+    assert match_choice("", INDUSTRIES) is None
+    assert match_choice(42, INDUSTRIES) is None
+
+
+# ----------------------------------------------------------------------
+# Repairer
+# ----------------------------------------------------------------------
+
+def test_clean_reply_is_returned_untouched():
+    repairer = ResponseRepairer()
+    response, problems = repairer.repair(json.dumps(_reply()), ORG)
+    assert response == _reply() and problems == []
+    assert repairer.stats()["clean"] == 1
+
+
+def test_deterministic_fixes_are_made_locally():
+    reply = _reply(primaryIndustry="automotive", operationType="seller", confidenceScore="85%")
+    reply["classification"]["isMultiIndustry"] = False
+    reply["classification"]["industries"] = [
+        {"industry": "automotive", "subCategory": "Parts", "percentage": 33, "sampleProducts": "Oil filter"},
+        {"industry": "Home and Living", "percentage": 33, "sampleProducts": []},
+        {"industry": "Automotive", "percentage": 34, "sampleProducts": ["Brake pad"],
+         "variantProducts": ["Brake pad"]},
+        "not an entry",
+    ]
+    repairer = ResponseRepairer()
+    follow_ups = []
+
+    response, problems = repairer.repair(json.dumps(reply), ORG, follow_up=follow_ups.append)
+
+    assert problems == [] and follow_ups == []
+    assert validate_llm_response(response) == []
+    assert _industries(response) == [("Automotive", 65), ("Home & Living", 35)]
+    automotive = response["classification"]["industries"][0]
+    assert automotive["sampleProducts"] == ["Oil filter", "Brake pad"]
+    assert automotive["variantProducts"] == ["Brake pad"]
+    assert response["primaryIndustry"] == "Automotive"
+    assert response["operationType"] == "Seller"
+    assert response["confidenceScore"] == 0.85
+    assert response["classification"]["isMultiIndustry"] is True
+
+    stats = repairer.stats()
+    assert stats["repairedLocally"] == 1 and stats["followUps"] == 0
+    assert {"duplicate industries merged", "percentages renormalized", "industry name matched",
+            "malformed industry entry dropped", "operationType matched", "primaryIndustry set"} <= set(stats["fixes"])
+
+
+def test_only_unresolved_fields_are_asked_again():
+    reply = _reply(operationType="Retailer")
+    reply["classification"]["industries"][1]["industry"] = "Garden Tools"
+    asked = []
+
+    def follow_up(messages):
+        asked.append(messages[-1]["content"])
+        return json.dumps({"operationType": "Seller", "industryMap": {"Garden Tools": "Home & Living"}})
+
+    repairer = ResponseRepairer()
+    response, problems = repairer.repair(json.dumps(reply), ORG, follow_up=follow_up)
+
+    assert problems == []
+    assert response == _reply()
+    assert len(asked) == 1
+    assert "operationType" in asked[0] and "industryMap" in asked[0] and '"Garden Tools"' in asked[0]
+    assert repairer.stats()["repairedByFollowUp"] == 1
+
+
+def test_list_cut_at_the_token_limit_is_rebuilt_by_a_follow_up():
+    text = json.dumps(_reply())
+    cut = text[:text.index('"Home & Living"') + 6]
+    full = _reply()["classification"]["industries"]
+
+    repairer = ResponseRepairer()
+    response, problems = repairer.repair(cut, ORG, follow_up=lambda messages: json.dumps({"industries": full}))
+
+    assert problems == []
+    assert _industries(response) == [("Automotive", 70), ("Home & Living", 30)]
+    assert "truncated JSON closed" in repairer.stats()["fixes"]
+
+
+@pytest.mark.parametrize("follow_ups, follow_up", [
+    (False, lambda messages: json.dumps({"operationType": "Seller"})),
+    (True, None),
+    (True, lambda messages: "not json"),
+    (True, lambda messages: (_ for _ in ()).throw(TimeoutError())),
+])
+def test_unresolved_fields_fail_without_a_usable_follow_up(follow_ups, follow_up):
+    repairer = ResponseRepairer(follow_ups=follow_ups)
+    response, problems = repairer.repair(json.dumps(_reply(operationType="Retailer")), ORG, follow_up=follow_up)
+    assert problems and "operationType" in problems[0]
+    assert repairer.stats()["failed"] == 1
+
+
+def test_confidence_falls_back_to_the_quality_score():
+    repairer = ResponseRepairer()
+    response, problems = repairer.repair(json.dumps(_reply(confidenceScore="very")), ORG)
+    assert problems == []
+    assert 0.0 <= response["confidenceScore"] <= 1.0
+
+
+def test_unparseable_reply_raises_and_is_counted():
+    repairer = ResponseRepairer()
+    with pytest.raises(json.JSONDecodeError):
+        repairer.repair("I cannot classify this.", ORG)
+    assert repairer.stats()["failed"] == 1
+
+
+def test_pickles_without_its_lock():
+    repairer = ResponseRepairer()
+    repairer.repair(json.dumps(_reply()), ORG)
+    clone = pickle.loads(pickle.dumps(repairer))
+    clone.repair(json.dumps(_reply()), ORG)
+    assert clone.stats()["clean"] == 2
+
+
+def test_classifier_repairs_and_reports_schema_errors(fake_classifier, make_orgs, valid_reply):
+    broken = copy.deepcopy(valid_reply)
+    broken["operationType"] = "seller"
+    result = fake_classifier(reply=broken).classify_organization(make_orgs(1)[0])
+    assert result["operationType"] == "Seller"
+    assert "error" not in result["classification"]
+
+    broken["operationType"] = "Retailer"
+    clf = fake_classifier(reply=broken)
+    result = clf.classify_organization(make_orgs(1)[0])
+    assert len(clf.calls) == 2                          # the reply and one follow-up
+    assert result["classification"]["errorType"] == "schema"
+
+
+HOTEL = dict(ORG, orgName="HOTEL MELATI")
+
+
+def test_org_name_rule_sets_the_primary_even_when_not_listed():
+    reply = _reply(orgName="HOTEL MELATI", primaryIndustry="Home & Living", confidenceScore="90%")
+    repairer = ResponseRepairer()
+
+    response, problems = repairer.repair(json.dumps(reply), HOTEL)
+
+    assert problems == []
+    assert response["primaryIndustry"] == "Hotels & Villa"
+    assert _industries(response) == [("Automotive", 70), ("Home & Living", 30)]
+
+
+def test_unmatched_primary_falls_back_to_the_org_name_rule_before_the_largest_share():
+    reply = _reply(orgName="Sparkle Laundry", primaryIndustry="Cleaning", operationType="service")
+    response, problems = ResponseRepairer().repair(json.dumps(reply), dict(ORG, orgName="Sparkle Laundry"))
+    assert problems == [] and response["primaryIndustry"] == "Laundry & Services"
+
+    response, problems = ResponseRepairer().repair(json.dumps(reply), ORG)
+    assert problems == [] and response["primaryIndustry"] == "Automotive"
+
+
+def test_reply_following_the_org_name_rule_is_clean():
+    reply = _reply(orgName="HOTEL MELATI", primaryIndustry="Hotels & Villa", operationType="Service")
+    repairer = ResponseRepairer()
+    response, problems = repairer.repair(json.dumps(reply), HOTEL)
+    assert problems == [] and response == reply
+    assert repairer.stats()["clean"] == 1
+    assert validate_llm_response(reply) == []
+    assert validate_llm_response(reply, org_name="Bengkel Jaya") != []
+
+
+def test_reply_breaking_the_org_name_rule_is_fixed_locally():
+    reply = _reply(orgName="HOTEL MELATI", operationType="Service")
+    assert validate_llm_response(reply) == ["primaryIndustry must be 'Hotels & Villa' for this org name"]
+
+    repairer = ResponseRepairer()
+    response, problems = repairer.repair(json.dumps(reply), HOTEL, follow_up=lambda messages: pytest.fail())
+
+    assert problems == [] and response["primaryIndustry"] == "Hotels & Villa"
+    assert repairer.stats()["repairedLocally"] == 1
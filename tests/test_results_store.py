@@ -0,0 +1,51 @@
+import time
+
+from batch_worker import BatchWorker
+from results_store import ResultsWarehouse
+
+
+def _org_ids(warehouse, run_id):
+    return [org_id for (org_id,) in warehouse._query("SELECT org_id FROM results WHERE run_id = ? ORDER BY id",
+                                                     (run_id,))]
+
+
+def _wait(job, limit: float = 20.0):
+    end = time.monotonic() + limit
+    while not job.finished and time.monotonic() < end:
+        time.sleep(0.02)
+    assert job.finished
+
+
+def test_org_ids_are_stored_alongside_the_results(tmp_path, valid_reply):
+    wh = ResultsWarehouse(str(tmp_path / "wh.db"))
+
+    assert wh.add([valid_reply, valid_reply], run_id="r1", org_ids=["o1", "o2"]) == 2
+    assert _org_ids(wh, "r1") == ["o1", "o2"]
+
+    wh.add([dict(valid_reply, _id="o3"), valid_reply], run_id="r2")
+    assert _org_ids(wh, "r2") == ["o3", None]
+
+
+def test_batch_jobs_store_every_org_id(tmp_path, fake_classifier, make_orgs):
+    wh = ResultsWarehouse(str(tmp_path / "wh.db"))
+    worker = BatchWorker(warehouse=wh)
+    orgs = make_orgs(6)
+
+    job = worker.get(worker.submit(fake_classifier(), orgs, concurrency=3))
+    _wait(job)
+
+    assert job.status == "done"
+    assert _org_ids(wh, job.id) == [o["_id"] for o in orgs]
+
+
+def test_estimate_jobs_store_the_sampled_org_ids(tmp_path, fake_classifier, make_orgs):
+    wh = ResultsWarehouse(str(tmp_path / "wh.db"))
+    worker = BatchWorker(warehouse=wh)
+    orgs = make_orgs(12)
+
+    job = worker.get(worker.submit_estimate(fake_classifier(), orgs, min_samples=5, max_samples=5))
+    _wait(job)
+
+    stored = _org_ids(wh, job.id)
+    assert job.status == "done" and len(stored) == 5
+    assert stored == [orgs[i]["_id"] for i in job._indices]
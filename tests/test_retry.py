@@ -0,0 +1,142 @@
+import threading
+import time
+
+import httpx
+from openai import APIConnectionError
+
+from cancellation import CancellationToken
+from retry import RetryLane, is_retryable
+
+
+def _ok(name="Org"):
+    return {"orgName": name, "classification": {"isMultiIndustry": False, "industries": []}}
+
+
+def _failed(error_type="transient"):
+    return {"orgName": "Org", "classification": {"error": "boom", "errorType": error_type}}
+
+
+def test_is_retryable_by_error_type():
+    assert is_retryable(_failed("transient"))
+    assert is_retryable(_failed("timeout"))
+    assert is_retryable(_failed("parse"))
+    assert not is_retryable(_failed("error"))
+    assert not is_retryable(_failed("cancelled"))
+    assert not is_retryable(_ok())
+
+
+def test_defer_dead_letters_permanent_failures_and_exhausted_attempts():
+    lane = RetryLane(max_attempts=3)
+    lane.defer(0, {"_id": "a"}, _failed("error"))
+    lane.defer(1, {"_id": "b"}, _failed("transient"), attempts=3)
+    lane.defer(2, {"_id": "c"}, _failed("transient"))
+
+    assert len(lane) == 1
+    assert [d["index"] for d in lane.dead_letters] == [0, 1]
+    assert lane.stats() == {"retried": 0, "recovered": 0, "deadLetters": 2}
+
+
+def test_backoff_is_jittered_and_capped():
+    lane = RetryLane(base_delay=2.0, max_delay=5.0)
+    for attempts, cap in ((1, 2.0), (2, 4.0), (3, 5.0), (10, 5.0)):
+        for _ in range(20):
+            assert cap / 2 <= lane._backoff(attempts) <= cap
+
+
+def test_drain_recovers_and_reports_per_index():
+    lane = RetryLane(base_delay=0.001, max_delay=0.001)
+    lane.defer(4, {"_id": "a"}, _failed())
+    lane.defer(7, {"_id": "b"}, _failed("timeout"))
+    seen = []
+
+    final = lane.drain(lambda org: _ok(org["_id"]), on_result=lambda i, r: seen.append(i))
+
+    assert set(final) == {4, 7}
+    assert final[4]["orgName"] == "a"
+    assert sorted(seen) == [4, 7]
+    assert len(lane) == 0
+    assert lane.stats() == {"retried": 2, "recovered": 2, "deadLetters": 0}
+
+
+def test_drain_dead_letters_after_max_attempts():
+    lane = RetryLane(max_attempts=3, base_delay=0.001, max_delay=0.001)
+    lane.defer(0, {"_id": "a"}, _failed())
+    calls = []
+
+    final = lane.drain(lambda org: calls.append(org) or _failed())
+
+    assert len(calls) == 2                      # attempts 2 and 3; the main pass was attempt 1
+    assert "error" in final[0]["classification"]
+    assert lane.dead_letters[0]["attempts"] == 3
+    assert lane.stats() == {"retried": 2, "recovered": 0, "deadLetters": 1}
+
+
+def test_drain_stops_on_cancel_and_keeps_last_error():
+    lane = RetryLane(base_delay=0.001, max_delay=0.001)
+    lane.defer(0, {"_id": "a"}, _failed())
+    token = CancellationToken()
+    token.cancel()
+
+    final = lane.drain(lambda org: _ok(), cancel_token=token)
+
+    assert final[0]["classification"]["errorType"] == "transient"
+    assert lane.retried == 0
+    assert len(lane) == 0
+    assert [(d["index"], d["attempts"]) for d in lane.dead_letters] == [(0, 1)]
+    assert lane.stats()["deadLetters"] == 1
+
+
+def test_cancel_wakes_a_drain_sleeping_through_its_backoff():
+    lane = RetryLane(base_delay=30.0, max_delay=30.0)
+    lane.defer(0, {"_id": "a"}, _failed())
+    token = CancellationToken()
+    threading.Timer(0.1, token.cancel).start()
+
+    started = time.monotonic()
+    final = lane.drain(lambda org: _ok(), cancel_token=token)
+
+    assert time.monotonic() - started < 2.0
+    assert final[0]["classification"]["errorType"] == "transient"
+    assert lane.retried == 0 and [d["index"] for d in lane.dead_letters] == [0]
+
+
+def test_drain_starts_no_retry_past_the_deadline():
+    lane = RetryLane(base_delay=10.0, max_delay=10.0)
+    lane.defer(0, {"_id": "a"}, _failed())
+
+    started = time.monotonic()
+    final = lane.drain(lambda org: _ok(), deadline_at=started + 1.0)
+
+    assert time.monotonic() - started < 0.5     # did not sleep through the backoff
+    assert final[0]["classification"]["errorType"] == "transient"
+    assert lane.retried == 0
+    assert lane.dead_letters[0]["org"] == {"_id": "a"}
+
+
+def test_an_org_requeued_before_the_deadline_is_dead_lettered_with_its_attempts():
+    lane = RetryLane(max_attempts=5, base_delay=0.3, max_delay=0.3)
+    lane.defer(0, {"_id": "a"}, _failed())
+    lane._queue[0]["ready_at"] = time.monotonic()
+
+    final = lane.drain(lambda org: _failed("timeout"), deadline_at=time.monotonic() + 0.1)
+
+    assert lane.retried == 1
+    assert final[0]["classification"]["errorType"] == "timeout"
+    assert [(d["index"], d["attempts"]) for d in lane.dead_letters] == [(0, 2)]
+
+
+def test_classify_batch_retries_transient_failures(fake_classifier, make_orgs, valid_reply):
+    failures = {"left": 1}
+
+    def reply():
+        if failures["left"]:
+            failures["left"] -= 1
+            raise APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+        return valid_reply
+
+    clf = fake_classifier(reply=reply)
+    lane = RetryLane(base_delay=0.001, max_delay=0.001)
+    results = clf.classify_batch(make_orgs(3), retry_lane=lane)
+
+    assert all("error" not in r["classification"] for r in results)
+    assert lane.stats() == {"retried": 1, "recovered": 1, "deadLetters": 0}
@@ -0,0 +1,88 @@
+import pytest
+
+from scheduler import SizeAwareScheduler, job_tokens
+
+
+def _est(tokens, seconds=1.0):
+    return {"inputTokens": tokens - 100, "outputTokens": 100, "seconds": seconds}
+
+
+def _drain(schedule, now=0.0):
+    order = []
+    while True:
+        idx, delay = schedule.next(now)
+        if idx is None:
+            return order, delay
+        order.append(idx)
+
+
+def test_job_tokens():
+    assert job_tokens(_est(500)) == 500
+    assert job_tokens(None) == 0.0
+
+
+def test_unpaced_order_is_longest_first_and_local_orgs_last():
+    schedule = SizeAwareScheduler([_est(100, 1.0), None, _est(100, 9.0), _est(100, 3.0)])
+    assert _drain(schedule) == ([2, 3, 0, 1], 0.0)
+    assert len(schedule) == 0
+
+
+def test_input_order_when_largest_first_is_off():
+    schedule = SizeAwareScheduler([_est(100, 1.0), _est(100, 9.0)], largest_first=False)
+    assert _drain(schedule)[0] == [0, 1]
+
+
+def test_bucket_admits_a_burst_then_paces_at_the_tpm_rate():
+    # 6,000 TPM = 100 tokens/s, bucket of 10 s = 1,000 tokens
+    schedule = SizeAwareScheduler([_est(400)] * 5, tpm=6000, backfill=False)
+
+    order, delay = _drain(schedule, now=0.0)
+    assert order == [0, 1]
+    assert delay == pytest.approx(2.0)             # 200 left, 400 needed
+
+    assert schedule.next(1.0) == (None, pytest.approx(1.0))
+    assert schedule.next(2.0) == (2, 0.0)
+    assert schedule.next(6.0) == (3, 0.0)
+    assert schedule.next(6.0) == (None, pytest.approx(4.0))
+
+
+def test_refill_is_capped_at_the_bucket_size():
+    schedule = SizeAwareScheduler([_est(1000)] * 3, tpm=6000, backfill=False)
+    assert schedule.next(0.0) == (0, 0.0)
+    assert schedule.next(1000.0) == (1, 0.0)
+    assert schedule.next(1000.0) == (None, pytest.approx(10.0))
+
+
+def test_prompt_bigger_than_the_bucket_goes_out_once_it_is_full():
+    schedule = SizeAwareScheduler([_est(50_000), _est(100)], tpm=6000, largest_first=False, backfill=False)
+    assert schedule.next(0.0) == (0, 0.0)
+    assert schedule.next(0.0) == (None, pytest.approx(1.0))
+
+
+def test_backfill_starts_small_orgs_while_the_head_waits_but_not_forever():
+    big, small = _est(900, seconds=5.0), _est(100, seconds=0.5)
+    schedule = SizeAwareScheduler([big, big, small, small, small], tpm=6000)
+
+    assert schedule.next(0.0) == (0, 0.0)          # 1,000 -> 100
+    assert schedule.next(0.0) == (2, 0.0)          # head waits, a small org fits the gap
+    idx, delay = schedule.next(0.0)
+    assert idx is None and delay == pytest.approx(9.0)
+
+    # Still inside the head's own call time: the refill goes to the next small org
+    assert schedule.next(1.0) == (3, 0.0)
+    # Past it: the head is no longer passed over, even though a small org would fit
+    idx, delay = schedule.next(6.0)
+    assert idx is None and delay > 0
+    assert schedule.next(14.0) == (1, 0.0)
+    assert _drain(schedule, now=20.0)[0] == [4]
+
+
+def test_without_backfill_the_head_blocks():
+    schedule = SizeAwareScheduler([_est(900, 5.0), _est(900, 5.0), _est(100, 0.5)], tpm=6000, backfill=False)
+    assert schedule.next(0.0) == (0, 0.0)
+    assert schedule.next(0.0) == (None, pytest.approx(8.0))
+
+
+def test_local_orgs_never_wait_for_tokens():
+    schedule = SizeAwareScheduler([_est(1000), None, None], tpm=6000, largest_first=False)
+    assert _drain(schedule, now=0.0) == ([0, 1, 2], 0.0)
@@ -0,0 +1,85 @@
+import json
+from types import SimpleNamespace as NS
+
+from streaming import IndustryStreamParser
+
+REPLY = {
+    "orgName": "Test Org",
+    "primaryIndustry": "Automotive",
+    "operationType": "Seller",
+    "confidenceScore": 0.9,
+    "AIreasoning": "Parts {and} [oils] with a \"quoted\" name",
+    "classification": {
+        "isMultiIndustry": True,
+        "industries": [
+            {"industry": "Automotive", "subCategory": "Parts", "percentage": 60,
+             "sampleProducts": ["Filter {A}", "Bolt ]x["]},
+            {"industry": "Home & Living", "subCategory": "Decor", "percentage": 40,
+             "sampleProducts": ["Lamp \"Nova\""]},
+        ],
+    },
+}
+
+
+def _feed_all(chunks):
+    parser = IndustryStreamParser()
+    seen = []
+    for chunk in chunks:
+        seen.append(parser.feed(chunk))
+    return parser, seen
+
+
+def test_entries_arrive_as_soon_as_they_close():
+    text = json.dumps(REPLY)
+    parser, seen = _feed_all(text)                 # one character at a time
+
+    entries = [e for batch in seen for e in batch]
+    assert entries == REPLY["classification"]["industries"]
+    assert parser.text() == text
+    first = json.dumps(REPLY["classification"]["industries"][0])
+    first_close = text.index(first) + len(first) - 1
+    assert [i for i, batch in enumerate(seen) if batch][0] == first_close
+
+
+def test_braces_and_quotes_inside_strings_are_not_structure():
+    text = json.dumps(REPLY)
+    parser = IndustryStreamParser()
+    assert parser.feed(text) == REPLY["classification"]["industries"]
+
+
+def test_key_split_across_chunks_and_nothing_after_the_array():
+    text = json.dumps(REPLY)
+    at = text.index('"industries"') + 5
+    parser, seen = _feed_all([text[:at], text[at:at + 3], text[at + 3:]])
+    assert seen[0] == [] and seen[1] == []
+    assert len(seen[2]) == 2
+    assert parser.feed('{"industries": [{"industry": "X"}]}') == []
+
+
+def test_incomplete_entry_is_held_back():
+    text = json.dumps(REPLY)
+    cut = text.index('"Home & Living"')
+    parser = IndustryStreamParser()
+    assert len(parser.feed(text[:cut])) == 1
+    assert len(parser.feed(text[cut:])) == 1
+
+
+def test_classify_organization_stream(fake_classifier, make_orgs):
+    clf = fake_classifier()
+    text = json.dumps(REPLY)
+
+    def create(stream=False, **kw):
+        assert stream and kw["stream_options"] == {"include_usage": True}
+        chunks = [NS(choices=[NS(delta=NS(content=text[i:i + 7]))], usage=None) for i in range(0, len(text), 7)]
+        return chunks + [NS(choices=[], usage=NS(prompt_tokens=1500, completion_tokens=200))]
+
+    clf._create_completion = create
+    usage = []
+    events = list(clf.classify_organization_stream(make_orgs(1)[0], on_usage=usage.append))
+
+    kinds = [kind for kind, _ in events]
+    assert kinds == ["industry", "industry", "result"]
+    result = events[-1][1]
+    assert result["primaryIndustry"] == "Automotive"
+    assert result["classification"]["isMultiIndustry"] is True
+    assert len(usage) == 1 and usage[0]["completionTokens"] == 200
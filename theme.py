@@ -0,0 +1,210 @@
+"""
+Static presentation assets for the Streamlit UI.
+app.py is re-executed on every interaction, but this module is imported once
+per process — the stylesheet and chart theme are built here a single time.
+"""
+
+# ── Dark Design System ──────────────────────────────────────────────────────
+APP_CSS = """
+<style>
+@import url('https://fonts.googleapis.com/css2?family=DM+Sans:ital,opsz,wght@0,9..40,300;0,9..40,400;0,9..40,500;0,9..40,600;1,9..40,300&family=DM+Mono:wght@400;500&display=swap');
+
+html, body, [class*="css"] { font-family: 'DM Sans', sans-serif; color-scheme: dark; }
+#MainMenu, footer, header { visibility: hidden; }
+
+.stApp { background: #0d0f18 !important; }
+.block-container { padding: 2rem 2.5rem 3rem !important; max-width: 1400px !important; }
+
+[data-testid="stSidebar"] {
+    background: #080a10 !important;
+    border-right: 1px solid #1a1e2e !important;
+}
+[data-testid="stSidebar"] * { color: #8b95b0 !important; }
+[data-testid="stSidebar"] h3 { color: #e2e8f8 !important; font-size: 0.95rem !important; font-weight: 600 !important; }
+[data-testid="stSidebar"] h5 { color: #5a647a !important; font-size: 0.72rem !important; font-weight: 600 !important; text-transform: uppercase !important; letter-spacing: 0.8px !important; }
+[data-testid="stSidebar"] .stTextInput input,
+[data-testid="stSidebar"] .stSelectbox > div > div {
+    background: #131625 !important;
+    border: 1px solid #232840 !important;
+    color: #c8d4f0 !important;
+    border-radius: 8px !important;
+    font-size: 0.84rem !important;
+}
+[data-testid="stSidebar"] label {
+    font-size: 0.72rem !important; font-weight: 600 !important;
+    text-transform: uppercase !important; letter-spacing: 0.7px !important;
+    color: #4a5470 !important;
+}
+[data-testid="stSidebar"] .stButton > button {
+    width: 100% !important; background: #2563eb !important; color: #fff !important;
+    border: none !important; border-radius: 8px !important;
+    font-weight: 600 !important; font-size: 0.84rem !important;
+    box-shadow: 0 4px 14px rgba(37,99,235,0.35) !important;
+    transition: all 0.2s !important;
+}
+[data-testid="stSidebar"] .stButton > button:hover { background: #1d4ed8 !important; }
+[data-testid="stSidebar"] hr { border-color: #1a1e2e !important; margin: 0.8rem 0 !important; }
+[data-testid="stSidebar"] [data-testid="stFileUploader"] {
+    background: #131625 !important; border: 1px dashed #2a3050 !important;
+    border-radius: 8px !important; padding: 0.5rem !important;
+}
+
+.page-header { padding: 0.4rem 0 1.5rem; border-bottom: 1px solid #1a1e2e; margin-bottom: 1.5rem; }
+.page-header h1 { font-size: 1.5rem; font-weight: 600; color: #e2e8f8; margin: 0 0 0.2rem; letter-spacing: -0.3px; }
+.page-header p  { font-size: 0.84rem; color: #4a5470; margin: 0; }
+
+.section-title {
+    font-size: 0.7rem; font-weight: 600; text-transform: uppercase;
+    letter-spacing: 0.9px; color: #3d4666; margin: 1.2rem 0 0.6rem;
+}
+
+.stat-card {
+    background: #131625; border: 1px solid #1e2438; border-radius: 10px;
+    padding: 1rem 1.2rem;
+    box-shadow: 0 2px 12px rgba(0,0,0,0.35), inset 0 1px 0 rgba(255,255,255,0.03);
+}
+.stat-card .label { font-size: 0.68rem; font-weight: 600; text-transform: uppercase; letter-spacing: 0.8px; color: #3d4666; margin-bottom: 0.35rem; }
+.stat-card .value { font-size: 1.35rem; font-weight: 600; color: #c8d4f0; line-height: 1.1; }
+.stat-card .value.blue  { color: #60a5fa; }
+.stat-card .value.green { color: #4ade80; }
+.stat-card .value.amber { color: #fbbf24; }
+.stat-card .value.red   { color: #f87171; }
+
+.result-panel {
+    background: #131625; border: 1px solid #1e2438; border-radius: 10px;
+    padding: 1.1rem 1.3rem;
+    box-shadow: 0 2px 12px rgba(0,0,0,0.3), inset 0 1px 0 rgba(255,255,255,0.03);
+}
+
+.badge { display: inline-block; padding: 0.2rem 0.65rem; border-radius: 999px; font-size: 0.72rem; font-weight: 600; }
+.badge-blue  { background: rgba(37,99,235,0.2);  color: #93c5fd; border: 1px solid rgba(37,99,235,0.3); }
+.badge-green { background: rgba(22,163,74,0.18); color: #86efac; border: 1px solid rgba(22,163,74,0.3); }
+.badge-amber { background: rgba(217,119,6,0.18); color: #fcd34d; border: 1px solid rgba(217,119,6,0.3); }
+.badge-red   { background: rgba(220,38,38,0.18); color: #fca5a5; border: 1px solid rgba(220,38,38,0.3); }
+.badge-slate { background: rgba(71,85,105,0.25); color: #94a3b8;  border: 1px solid rgba(71,85,105,0.35); }
+
+.ind-row { display:flex; align-items:center; gap:0.8rem; padding:0.7rem 0; border-bottom:1px solid #1a1e2e; }
+.ind-row:last-child { border-bottom:none; }
+.ind-name { font-size:0.85rem; font-weight:500; color:#c8d4f0; flex:1; }
+.ind-sub  { font-size:0.75rem; color:#3d4666; font-weight:400; }
+.ind-pct  { font-size:0.85rem; font-weight:600; color:#60a5fa; min-width:3rem; text-align:right; }
+.pct-bar-bg   { flex:2; background:#1a1e2e; border-radius:4px; height:4px; }
+.pct-bar-fill { background: linear-gradient(90deg,#2563eb,#60a5fa); border-radius:4px; height:4px; }
+
+.reasoning-box {
+    background: rgba(37,99,235,0.07); border-left: 3px solid #2563eb;
+    border-radius: 0 8px 8px 0; padding: 0.85rem 1rem;
+    font-size: 0.83rem; color: #8b95b0; line-height: 1.7;
+}
+
+.chip-list { display:flex; flex-wrap:wrap; gap:0.3rem; margin-top:0.3rem; }
+.chip {
+    background: #0d0f18; color: #4a5470; border: 1px solid #1e2438;
+    border-radius: 5px; padding: 0.15rem 0.45rem;
+    font-size: 0.7rem; font-family: 'DM Mono', monospace;
+}
+
+.empty-state { text-align:center; padding:3.5rem 1rem; color:#2a3050; }
+.empty-state .icon { font-size:2.2rem; margin-bottom:0.7rem; filter: grayscale(0.4) opacity(0.6); }
+.empty-state p { font-size:0.85rem; color:#2a3050; margin:0; }
+
+[data-testid="stTabs"] [data-baseweb="tab-list"] {
+    background: transparent !important; border-bottom: 1px solid #1a1e2e !important; gap: 0.1rem;
+}
+[data-testid="stTabs"] [data-baseweb="tab"] {
+    font-size: 0.82rem !important; font-weight: 500 !important;
+    padding: 0.55rem 1.1rem !important; color: #3d4666 !important;
+    background: transparent !important; border: none !important;
+    border-radius: 6px 6px 0 0 !important; transition: color 0.15s !important;
+}
+[data-testid="stTabs"] [data-baseweb="tab"]:hover { color: #8b95b0 !important; }
+[data-testid="stTabs"] [aria-selected="true"] { color: #60a5fa !important; border-bottom: 2px solid #2563eb !important; }
+
+.stTextArea > div { border-radius: 8px !important; }
+.stTextArea textarea {
+    font-family: 'DM Mono', monospace !important; font-size: 0.8rem !important;
+    line-height: 1.65 !important; border-radius: 8px !important;
+    border: 1px solid #1e2438 !important; background: #080a10 !important;
+    color: #7b92c4 !important; caret-color: #60a5fa !important;
+    padding: 0.9rem 1rem !important; box-shadow: inset 0 2px 8px rgba(0,0,0,0.4) !important;
+}
+.stTextArea textarea::placeholder { color: #232840 !important; }
+.stTextArea textarea:focus {
+    border-color: #2563eb !important;
+    box-shadow: inset 0 2px 8px rgba(0,0,0,0.4), 0 0 0 3px rgba(37,99,235,0.15) !important;
+    outline: none !important;
+}
+
+.stButton > button { border-radius: 8px !important; font-weight: 500 !important; font-size: 0.83rem !important; transition: all 0.2s !important; }
+[data-testid="stBaseButton-primary"] {
+    background: #2563eb !important; border: none !important; color: #fff !important;
+    box-shadow: 0 4px 14px rgba(37,99,235,0.35) !important;
+}
+[data-testid="stBaseButton-primary"]:hover { background: #1d4ed8 !important; }
+[data-testid="stBaseButton-secondary"] {
+    background: #131625 !important; border: 1px solid #1e2438 !important; color: #4a5470 !important;
+}
+[data-testid="stBaseButton-secondary"]:hover { background: #1a1e2e !important; color: #8b95b0 !important; }
+
+[data-testid="stSlider"] [data-baseweb="slider"] [role="slider"] { background: #2563eb !important; }
+
+[data-testid="stProgress"] > div > div { background: linear-gradient(90deg,#2563eb,#60a5fa) !important; border-radius: 4px !important; }
+[data-testid="stProgress"] > div { background: #1a1e2e !important; border-radius: 4px !important; }
+
+[data-testid="stAlert"] { border-radius: 8px !important; font-size: 0.83rem !important; }
+div[data-testid="stAlert"][class*="success"] { background: rgba(22,163,74,0.1) !important; border-color: rgba(22,163,74,0.3) !important; color: #86efac !important; }
+div[data-testid="stAlert"][class*="error"]   { background: rgba(220,38,38,0.1) !important;  border-color: rgba(220,38,38,0.3) !important;  color: #fca5a5 !important; }
+div[data-testid="stAlert"][class*="warning"] { background: rgba(217,119,6,0.1) !important;  border-color: rgba(217,119,6,0.3) !important;  color: #fcd34d !important; }
+div[data-testid="stAlert"][class*="info"]    { background: rgba(37,99,235,0.1) !important;  border-color: rgba(37,99,235,0.3) !important;  color: #93c5fd !important; }
+
+[data-testid="stExpander"] {
+    background: #131625 !important; border: 1px solid #1e2438 !important;
+    border-radius: 8px !important; box-shadow: 0 2px 8px rgba(0,0,0,0.2) !important;
+}
+[data-testid="stExpander"] summary { font-size: 0.83rem !important; font-weight: 500 !important; color: #5a647a !important; }
+[data-testid="stExpander"] summary:hover { color: #8b95b0 !important; }
+
+[data-testid="stDataFrame"] {
+    border-radius: 10px !important; overflow: hidden !important;
+    border: 1px solid #1e2438 !important; background: #0d0f18 !important;
+}
+[data-testid="stDataFrame"] *, [data-testid="stDataFrame"] div,
+[data-testid="stDataFrame"] span, [data-testid="stDataFrame"] p,
+[data-testid="stDataFrame"] td, [data-testid="stDataFrame"] th,
+[data-testid="stDataFrame"] [role="cell"], [data-testid="stDataFrame"] [role="columnheader"] {
+    color: #c9d8f0 !important; background: transparent !important;
+}
+[data-testid="stDataFrame"] thead *, [data-testid="stDataFrame"] th,
+[data-testid="stDataFrame"] [role="columnheader"] {
+    background: #131625 !important; color: #6b7a99 !important;
+    font-size: 0.72rem !important; text-transform: uppercase !important;
+    letter-spacing: 0.6px !important; font-weight: 600 !important;
+}
+[data-testid="stDataFrame"] table, [data-testid="stDataFrame"] tbody,
+[data-testid="stDataFrame"] tr { background: #0d0f18 !important; }
+[data-testid="stDataFrame"] td {
+    background: #0d0f18 !important; color: #c9d8f0 !important;
+    border-bottom: 1px solid #1a1e2e !important;
+    font-size: 0.83rem !important; padding: 0.6rem 0.8rem !important;
+}
+[data-testid="stDataFrame"] tr:hover, [data-testid="stDataFrame"] tr:hover td,
+[data-testid="stDataFrame"] tr:hover * { background: #161b27 !important; color: #e8edf8 !important; }
+
+[data-testid="stCaptionContainer"] p { color: #2a3050 !important; font-size: 0.78rem !important; }
+hr { border-color: #1a1e2e !important; }
+::-webkit-scrollbar { width: 6px; height: 6px; }
+::-webkit-scrollbar-track { background: #0d0f18; }
+::-webkit-scrollbar-thumb { background: #1e2438; border-radius: 3px; }
+::-webkit-scrollbar-thumb:hover { background: #2a3050; }
+</style>
+"""
+
+# ── Chart theme ─────────────────────────────────────────────────────────────
+CHART_COLORS = ["#2563eb", "#3b82f6", "#60a5fa", "#93c5fd", "#1d4ed8", "#7c3aed"]
+CHART_BG = "#131625"
+CHART_LAYOUT = dict(
+    paper_bgcolor=CHART_BG, plot_bgcolor=CHART_BG,
+    font=dict(family="DM Sans", size=11, color="#4a5470"),
+    margin=dict(t=30, b=20, l=10, r=10),
+)
+GRID_AXIS = dict(gridcolor="#1a1e2e", color="#4a5470")
@@ -0,0 +1,48 @@
+"""
+Shared HTTP transport for OpenAI clients.
+One pooled keep-alive httpx client per process (per pool size), so every
+classifier, Streamlit session and batch worker thread reuses warm TLS
+connections instead of opening its own pool.
+"""
+
+import threading
+from typing import Dict, Tuple
+
+import httpx
+from openai import DefaultHttpxClient
+
+try:
+    import h2  # noqa: F401  — HTTP/2 support is optional (pip install httpx[http2])
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_CLIENTS: Dict[Tuple[int, bool], httpx.Client] = {}
+_LOCK = threading.Lock()
+
+
+def get_http_client(pool_size: int = 50, http2: bool = True) -> httpx.Client:
+    """
+    Return the process-wide pooled HTTP client for this pool size.
+
+    Args:
+        pool_size: Maximum open connections; half of them are kept alive between calls.
+        http2:     Use HTTP/2 when the h2 package is installed (falls back to HTTP/1.1).
+
+    Returns:
+        A thread-safe httpx.Client carrying the OpenAI SDK defaults.
+    """
+    key = (pool_size, http2 and HTTP2_AVAILABLE)
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is None or client.is_closed:
+            client = DefaultHttpxClient(
+                http2=key[1],
+                limits=httpx.Limits(
+                    max_connections=pool_size,
+                    max_keepalive_connections=max(1, pool_size // 2),
+                    keepalive_expiry=60.0,
+                ),
+            )
+            _CLIENTS[key] = client
+        return client